@@ -309,12 +309,20 @@ def search_memory():
         
         query = request.args.get('q', '')
         limit = int(request.args.get('limit', 50))
+        types = request.args.get('types')
         
         if not query:
             return jsonify({'error': 'Query required'}), 400
         
         memory = get_memory()
-        results = memory.search_memory(query, limit=limit)
+        results = memory.search_memory(
+            query, limit=limit,
+            user_id=request.args.get('user_id'),
+            types=types.split(',') if types else None,
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            order=request.args.get('order', 'rank'),
+        )
         
         return jsonify({
             'success': True,
@@ -334,7 +334,8 @@ class AgentClient:
     def optimize_portfolio(
         self,
         holdings: Dict[str, float],
-        risk_tolerance: str = "moderate"
+        risk_tolerance: str = "moderate",
+        correlations: Optional[Dict[str, Dict[str, float]]] = None
     ) -> Dict[str, Any]:
         """
         Optimize portfolio allocation.
@@ -342,6 +343,7 @@ class AgentClient:
         Args:
             holdings: Current holdings {symbol: amount}
             risk_tolerance: Risk level (conservative, moderate, aggressive)
+            correlations: Optional pairwise correlations {symbol: {symbol: rho}}
             
         Returns:
             Optimized portfolio allocation recommendations
@@ -351,6 +353,8 @@ class AgentClient:
             "holdings": holdings,
             "risk_tolerance": risk_tolerance
         }
+        if correlations:
+            data["correlations"] = correlations
         return self._make_request("POST", url, json=data)
     
     def calculate_risk(self, holdings: Dict[str, float]) -> Dict[str, Any]:
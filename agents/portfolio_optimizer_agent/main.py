@@ -28,6 +28,7 @@ class PortfolioRequest(BaseModel):
     method: str = "kelly"  # kelly, risk_parity, mean_variance
     risk_tolerance: float = 0.5  # 0-1 scale
     max_position_size: float = 0.25  # Max 25% per position
+    correlations: Optional[Dict[str, Dict[str, float]]] = None  # {symbol: {symbol: rho}}
 
 class PortfolioResponse(BaseModel):
     """Response model for optimized portfolio"""
@@ -51,7 +52,8 @@ class PortfolioOptimizer:
         
     async def optimize(self, signals: List[Dict], capital: float,
                       method: str, risk_tolerance: float,
-                      max_position: float) -> PortfolioResponse:
+                      max_position: float,
+                      correlations: Optional[Dict[str, Dict[str, float]]] = None) -> PortfolioResponse:
         """
         Optimize portfolio allocation
         
@@ -61,6 +63,7 @@ class PortfolioOptimizer:
             method: Optimization method
             risk_tolerance: Risk tolerance (0-1)
             max_position: Maximum position size (0-1)
+            correlations: Optional pairwise correlations between symbols
             
         Returns:
             PortfolioResponse with optimal allocations
@@ -78,11 +81,11 @@ class PortfolioOptimizer:
             allocations = self._equal_weight(signals, capital, max_position)
         
         # Calculate risk metrics
-        risk_metrics = self._calculate_risk_metrics(allocations)
+        risk_metrics = self._calculate_risk_metrics(allocations, correlations)
         
         # Calculate expected return and volatility
         exp_return = self._expected_return(allocations)
-        exp_vol = self._expected_volatility(allocations)
+        exp_vol = self._expected_volatility(allocations, correlations)
         
         # Calculate Sharpe ratio
         sharpe = (exp_return - self.default_risk_free_rate) / exp_vol if exp_vol > 0 else 0
@@ -239,14 +242,19 @@ class PortfolioOptimizer:
         
         return allocations
     
-    def _calculate_risk_metrics(self, allocations: List[Dict]) -> Dict:
+    def _calculate_risk_metrics(self, allocations: List[Dict],
+                                correlations: Optional[Dict[str, Dict[str, float]]] = None) -> Dict:
         """Calculate portfolio risk metrics"""
         if not allocations:
             return {"var_95": 0, "cvar_95": 0, "max_drawdown": 0}
         
-        # Simplified risk calculation
         total_weight = sum(a["weight"] for a in allocations)
-        avg_vol = np.mean([a.get("volatility", 0.2) for a in allocations])
+        if correlations:
+            # Volatility of the weights normalised to a fully invested book
+            avg_vol = self._expected_volatility(allocations, correlations) / total_weight if total_weight > 0 else 0.0
+        else:
+            # Simplified risk calculation
+            avg_vol = np.mean([a.get("volatility", 0.2) for a in allocations])
         
         # VaR (Value at Risk) - 95% confidence
         var_95 = 1.65 * avg_vol * np.sqrt(total_weight)
@@ -277,11 +285,26 @@ class PortfolioOptimizer:
         
         return total_return
     
-    def _expected_volatility(self, allocations: List[Dict]) -> float:
-        """Calculate expected portfolio volatility (simplified)"""
+    def _expected_volatility(self, allocations: List[Dict],
+                             correlations: Optional[Dict[str, Dict[str, float]]] = None) -> float:
+        """Calculate expected portfolio volatility
+        
+        With a correlation matrix this is sqrt(wᵀ Σ w); unknown pairs are
+        treated as perfectly correlated (the conservative case).
+        """
         if not allocations:
             return 0.0
         
+        if correlations:
+            w = np.array([a["weight"] for a in allocations])
+            vol = np.array([a.get("volatility", 0.2) for a in allocations])
+            symbols = [a.get("symbol") for a in allocations]
+            rho = np.array([[1.0 if i == j else correlations.get(a, {}).get(b, 1.0)
+                             for j, b in enumerate(symbols)]
+                            for i, a in enumerate(symbols)])
+            cov = rho * np.outer(vol, vol)
+            return float(np.sqrt(max(w @ cov @ w, 0.0)))
+        
         # Simplified: weighted average volatility
         total_vol = 0.0
         for alloc in allocations:
@@ -355,7 +378,8 @@ async def optimize_portfolio(request: PortfolioRequest):
             request.total_capital,
             request.method,
             request.risk_tolerance,
-            request.max_position_size
+            request.max_position_size,
+            request.correlations
         )
         return result
     except Exception as e:
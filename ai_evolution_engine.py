@@ -14,107 +14,401 @@ Features:
 """
 
 import os
+import re
 import json
 import time
+import uuid
+import shutil
 import logging
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Any
-from collections import defaultdict
+from typing import Dict, List, Optional, Any, Set, Tuple
+from collections import defaultdict, deque
 import threading
 
+try:
+    import fcntl
+except ImportError:  # Windows : un seul processus, pas de verrou de fichier
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
 
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text: str) -> Set[str]:
+    """Mots (alphanumériques, minuscules) d'un texte"""
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+def _try_flock(f) -> bool:
+    """Verrou exclusif non bloquant sur un fichier ouvert (toujours accordé sans fcntl)"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def _merge_entry(entries: Dict[str, Dict], key: str, entry: Dict):
+    """Garder la version la plus récente d'une entrée (puis la plus consultée)"""
+    old = entries.get(key)
+    if old is None or ((entry.get("timestamp", ""), entry.get("access_count", 0))
+                       >= (old.get("timestamp", ""), old.get("access_count", 0))):
+        entries[key] = entry
+
+
 class KnowledgeBase:
-    """Base de connaissances partagée entre tous les agents"""
+    """Base de connaissances partagée entre tous les agents
+    
+    - Index inversé par catégorie (mot → clés), maintenu à chaque ``add`` :
+      une recherche intersecte les listes des mots de la requête au lieu
+      de parcourir toutes les entrées.
+    - Persistance : chaque ``add`` est une ligne ajoutée au journal du
+      processus ``knowledge.<pid>-<id>.wal`` (un journal par processus,
+      verrouillé par ``flock`` tant que son écrivain vit : les workers
+      gunicorn n'écrivent jamais dans le même fichier) ; un instantané
+      ``knowledge.json`` est écrit en arrière-plan (écriture atomique)
+      quand le journal dépasse ``SNAPSHOT_EVERY`` ajouts et
+      ``SNAPSHOT_RATIO`` de la base — le coût des instantanés par ajout
+      reste donc constant quelle que soit la taille — puis le journal
+      correspondant est supprimé. L'écriture d'un instantané se fait sous
+      le verrou exclusif ``knowledge.lock`` et fusionne l'instantané déjà
+      sur disque (l'entrée la plus récente l'emporte), pour ne pas effacer
+      les ajouts des autres processus. Au chargement : instantané + tous
+      les journaux rejoués ; ceux des écrivains disparus (verrou libre)
+      sont compactés dans l'instantané puis supprimés.
+    - ``get`` ne prend pas le verrou : les accès sont empilés dans une
+      file et agrégés par lots dans les compteurs.
+    """
+    
+    SNAPSHOT_EVERY = 10_000     # ajouts journalisés minimum entre deux instantanés
+    SNAPSHOT_RATIO = 0.5        # ... et au moins cette fraction du nombre d'entrées
+    ACCESS_BATCH = 1000         # accès en file avant agrégation
     
     def __init__(self, storage_path: str = "data/knowledge_base"):
         self.storage_path = storage_path
         self.knowledge: Dict[str, Dict] = {}
         self.lock = threading.Lock()
+        self._index: Dict[str, Dict[str, Set[str]]] = {}
+        self._order: Dict[str, Dict[str, int]] = {}      # rang d'insertion par catégorie
+        self._access_queue: deque = deque()
+        self._access: Dict[Tuple[str, str], List] = {}   # (catégorie, clé) → [accès, dernier accès]
+        self._wal = None
+        self._wal_pid = None
+        self._wal_records = 0
+        self._entries = 0
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self.kb_file = os.path.join(storage_path, "knowledge.json")
+        self.lock_file = os.path.join(storage_path, "knowledge.lock")
+        self.wal_file = self.wal_prev_file = None
         os.makedirs(storage_path, exist_ok=True)
         self._load()
     
+    # ── Persistance ──────────────────────────────────────────────────
+    
+    @contextmanager
+    def _snapshot_lock(self):
+        """Verrou exclusif inter-processus sur l'instantané"""
+        with open(self.lock_file, 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+    
+    def _open_wal(self):
+        """Ouvrir (et verrouiller) le journal propre à ce processus"""
+        if self._wal_pid != os.getpid():
+            self.wal_file = None
+        while True:
+            path = self.wal_file or os.path.join(
+                self.storage_path, f"knowledge.{os.getpid()}-{uuid.uuid4().hex[:8]}.wal")
+            wal = open(path, 'a', encoding='utf-8')
+            if _try_flock(wal):
+                break
+            wal.close()
+            self.wal_file = None  # pris entre-temps : changer de nom
+        self._wal, self._wal_pid = wal, os.getpid()
+        self.wal_file, self.wal_prev_file = path, path + ".prev"
+        self._wal_records = 0
+    
+    def _journals(self) -> List[str]:
+        """Journaux présents sur disque, chaque ``.prev`` avant son journal vivant"""
+        names = [n for n in os.listdir(self.storage_path)
+                 if n.startswith("knowledge") and (n.endswith(".wal") or n.endswith(".wal.prev"))]
+        names.sort(key=lambda n: (n[:-5], 1) if n.endswith(".prev") else (n, 2))
+        return [os.path.join(self.storage_path, n) for n in names]
+    
+    def _claim_orphan(self, path: str, claimed: Dict[str, Any]) -> bool:
+        """Verrouiller le journal vivant d'un écrivain disparu (True si personne ne le tient)"""
+        live = path[:-5] if path.endswith(".prev") else path
+        if live in claimed:
+            return claimed[live] is not False
+        try:
+            fd = os.open(live, os.O_WRONLY | os.O_APPEND)
+        except FileNotFoundError:
+            claimed[live] = None
+            return True
+        f = os.fdopen(fd, 'a')
+        if _try_flock(f):
+            claimed[live] = f    # gardé verrouillé jusqu'à la suppression
+            return True
+        f.close()
+        claimed[live] = False
+        return False
+    
     def _load(self):
-        """Charger la base de connaissances"""
-        kb_file = os.path.join(self.storage_path, "knowledge.json")
-        if os.path.exists(kb_file):
+        """Charger l'instantané puis rejouer les journaux"""
+        claimed: Dict[str, Any] = {}
+        orphans = []
+        with self._snapshot_lock():
+            if os.path.exists(self.kb_file):
+                try:
+                    with open(self.kb_file, 'r') as f:
+                        self.knowledge = json.load(f)
+                except Exception as e:
+                    logger.error(f"Error loading knowledge base: {e}")
+            replayed = 0
+            for path in self._journals():
+                replayed += self._replay(path)
+                if self._claim_orphan(path, claimed):
+                    orphans.append(path)
+            for category, entries in self.knowledge.items():
+                for key, entry in entries.items():
+                    self._index_entry(category, key, entry)
+                self._entries += len(entries)
+            logger.info(f"Knowledge base loaded: {len(self.knowledge)} categories, {replayed} journal records")
             try:
-                with open(kb_file, 'r') as f:
-                    self.knowledge = json.load(f)
-                logger.info(f"Knowledge base loaded: {len(self.knowledge)} entries")
+                if replayed or orphans:
+                    # Compacter les journaux rejoués ; ceux des écrivains vivants restent en place
+                    self._write_snapshot(self._snapshot_copy())
+                    for path in orphans:
+                        # Un journal vivant n'est supprimé que si on tient son verrou
+                        if (path.endswith(".prev") or claimed.get(path)) and os.path.exists(path):
+                            os.remove(path)
+            finally:
+                for f in claimed.values():
+                    if f:
+                        f.close()
+        self._open_wal()
+    
+    def _replay(self, path: str) -> int:
+        count = 0
+        try:
+            f = open(path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return 0  # renommé par la rotation de son écrivain
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # dernière ligne tronquée par un arrêt brutal
+                _merge_entry(self.knowledge.setdefault(record["c"], {}), record["k"], record["e"])
+                count += 1
+        return count
+    
+    def _snapshot_copy(self) -> Dict[str, Dict]:
+        """Copie (superficielle) des entrées avec les compteurs d'accès fusionnés"""
+        self._drain_access()
+        copy = {c: dict(entries) for c, entries in self.knowledge.items()}
+        for (category, key), (count, last) in self._access.items():
+            entry = copy.get(category, {}).get(key)
+            if entry is not None:
+                copy[category][key] = {**entry, "access_count": entry.get("access_count", 0) + count,
+                                       "last_accessed": last}
+        return copy
+    
+    def _write_snapshot(self, knowledge: Dict[str, Dict]):
+        tmp = f"{self.kb_file}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(knowledge, f, separators=(',', ':'), default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.kb_file)
+    
+    def _merge_snapshot(self, knowledge: Dict[str, Dict]):
+        """Écrire ``knowledge`` fusionné avec l'instantané sur disque (appelé sous verrou fichier)"""
+        try:
+            with open(self.kb_file, 'r') as f:
+                merged = json.load(f)
+        except FileNotFoundError:
+            merged = {}
+        for category, entries in knowledge.items():
+            target = merged.setdefault(category, {})
+            for key, entry in entries.items():
+                _merge_entry(target, key, entry)
+        self._write_snapshot(merged)
+    
+    def _start_snapshot(self, wait: bool = False):
+        """Faire tourner le journal et écrire l'instantané (appelé sous verrou)"""
+        if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+            if not wait:
+                return
+            self._snapshot_thread.join()
+        # Renommé avant de fermer : tant qu'il porte le nom du journal vivant,
+        # il reste verrouillé
+        if os.path.exists(self.wal_prev_file):
+            # Instantané précédent échoué : garder ses enregistrements
+            with open(self.wal_prev_file, 'ab') as dst, open(self.wal_file, 'rb') as src:
+                shutil.copyfileobj(src, dst)
+            os.remove(self.wal_file)
+        else:
+            os.replace(self.wal_file, self.wal_prev_file)
+        self._wal.close()
+        prev = self.wal_prev_file
+        self._open_wal()
+        copy = self._snapshot_copy()
+        
+        def write():
+            try:
+                with self._snapshot_lock():
+                    self._merge_snapshot(copy)
+                    if os.path.exists(prev):  # déjà compacté par un autre processus au chargement
+                        os.remove(prev)
             except Exception as e:
-                logger.error(f"Error loading knowledge base: {e}")
+                logger.error(f"Error saving knowledge base: {e}")
+        
+        self._snapshot_thread = threading.Thread(target=write, daemon=True)
+        self._snapshot_thread.start()
+        if wait:
+            self._snapshot_thread.join()
     
     def _save(self):
-        """Sauvegarder la base de connaissances"""
-        kb_file = os.path.join(self.storage_path, "knowledge.json")
-        try:
-            with open(kb_file, 'w') as f:
-                json.dump(self.knowledge, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving knowledge base: {e}")
+        """Sauvegarder la base de connaissances (instantané synchrone)"""
+        with self.lock:
+            self._ensure_own_wal()
+            self._start_snapshot(wait=True)
+    
+    def _ensure_own_wal(self):
+        """Après un fork (gunicorn --preload), ouvrir le journal du nouveau processus (appelé sous verrou)"""
+        if self._wal_pid != os.getpid():
+            # Le descripteur hérité (et son verrou) reste au processus parent
+            self._wal = None
+            self._snapshot_thread = None
+            self._open_wal()
+    
+    # ── Index ────────────────────────────────────────────────────────
+    
+    def _index_entry(self, category: str, key: str, entry: Dict):
+        order = self._order.setdefault(category, {})
+        order.setdefault(key, len(order))
+        postings = self._index.setdefault(category, {})
+        for token in _tokens(key) | _tokens(str(entry["value"])):
+            postings.setdefault(token, set()).add(key)
+    
+    def _unindex_entry(self, category: str, key: str, entry: Dict):
+        postings = self._index.get(category, {})
+        for token in _tokens(key) | _tokens(str(entry["value"])):
+            keys = postings.get(token)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del postings[token]
+    
+    # ── API ──────────────────────────────────────────────────────────
     
     def add(self, category: str, key: str, value: Any, metadata: Optional[Dict] = None):
         """Ajouter une connaissance"""
+        entry = {
+            "value": value,
+            "metadata": metadata or {},
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "access_count": 0
+        }
+        line = json.dumps({"c": category, "k": key, "e": entry}, default=str) + "\n"
         with self.lock:
-            if category not in self.knowledge:
-                self.knowledge[category] = {}
-            
-            self.knowledge[category][key] = {
-                "value": value,
-                "metadata": metadata or {},
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "access_count": 0
-            }
-            self._dirty = True
-            # Batch saves - only flush every 10 additions
-            if not hasattr(self, '_add_count'):
-                self._add_count = 0
-            self._add_count += 1
-            if self._add_count >= 10:
-                self._save()
-                self._add_count = 0
+            self._ensure_own_wal()
+            entries = self.knowledge.setdefault(category, {})
+            old = entries.get(key)
+            if old is not None:
+                self._unindex_entry(category, key, old)
+                self._drain_access()
+                self._access.pop((category, key), None)
+            else:
+                self._entries += 1
+            entries[key] = entry
+            self._index_entry(category, key, entry)
+            self._wal.write(line)
+            self._wal.flush()
+            self._wal_records += 1
+            if self._wal_records >= max(self.SNAPSHOT_EVERY, self.SNAPSHOT_RATIO * self._entries):
+                self._start_snapshot()
     
     def get(self, category: str, key: str) -> Optional[Any]:
         """Récupérer une connaissance"""
-        with self.lock:
-            if category in self.knowledge and key in self.knowledge[category]:
-                entry = self.knowledge[category][key]
-                entry["access_count"] += 1
-                entry["last_accessed"] = datetime.now(timezone.utc).isoformat()
-                return entry["value"]
+        entry = self.knowledge.get(category, {}).get(key)
+        if entry is None:
             return None
+        self._access_queue.append((category, key, datetime.now(timezone.utc).isoformat()))
+        if len(self._access_queue) >= self.ACCESS_BATCH and self.lock.acquire(blocking=False):
+            try:
+                self._drain_access()
+            finally:
+                self.lock.release()
+        return entry["value"]
+    
+    def _drain_access(self):
+        """Agréger les accès en file dans les compteurs (appelé sous verrou)"""
+        queue, access = self._access_queue, self._access
+        while queue:
+            category, key, when = queue.popleft()
+            counter = access.setdefault((category, key), [0, None])
+            counter[0] += 1
+            counter[1] = when
     
-    def search(self, category: str, query: str) -> List[Dict]:
-        """Rechercher dans une catégorie"""
+    def access_count(self, category: str, key: str) -> int:
+        """Nombre total d'accès à une connaissance"""
+        with self.lock:
+            self._drain_access()
+            entry = self.knowledge.get(category, {}).get(key)
+            if entry is None:
+                return 0
+            return entry.get("access_count", 0) + self._access.get((category, key), [0])[0]
+    
+    def search(self, category: str, query: str, limit: Optional[int] = None) -> List[Dict]:
+        """Rechercher dans une catégorie
+        
+        Retourne les entrées dont la clé ou la valeur contient tous les mots
+        de la requête, dans l'ordre d'insertion (toutes si la requête est vide).
+        """
         with self.lock:
-            if category not in self.knowledge:
+            entries = self.knowledge.get(category)
+            if not entries:
                 return []
-            
-            results = []
-            for key, entry in self.knowledge[category].items():
-                if query.lower() in key.lower() or query.lower() in str(entry["value"]).lower():
-                    results.append({
-                        "key": key,
-                        "value": entry["value"],
-                        "metadata": entry["metadata"]
-                    })
-            return results
+            tokens = _tokens(query)
+            if tokens:
+                postings = self._index.get(category, {})
+                lists = sorted((postings.get(t, set()) for t in tokens), key=len)
+                matched = lists[0].intersection(*lists[1:])
+                keys = sorted(matched, key=self._order[category].__getitem__)
+            else:
+                keys = list(entries)
+            if limit is not None:
+                keys = keys[:limit]
+            return [{
+                "key": key,
+                "value": entries[key]["value"],
+                "metadata": entries[key]["metadata"]
+            } for key in keys]
     
     def get_stats(self) -> Dict[str, Any]:
         """Statistiques de la base de connaissances"""
         with self.lock:
-            total_entries = sum(len(cat) for cat in self.knowledge.values())
+            total_entries = self._entries
             categories = list(self.knowledge.keys())
+            size = sum(os.path.getsize(p) for p in (self.kb_file, self.wal_file, self.wal_prev_file)
+                       if os.path.exists(p))
             
             return {
                 "total_entries": total_entries,
                 "categories": len(categories),
                 "category_list": categories,
-                "size_bytes": os.path.getsize(
-                    os.path.join(self.storage_path, "knowledge.json")
-                ) if os.path.exists(os.path.join(self.storage_path, "knowledge.json")) else 0
+                "indexed_tokens": sum(len(p) for p in self._index.values()),
+                "journal_records": self._wal_records,
+                "size_bytes": size
             }
 
 
@@ -277,6 +571,9 @@ class AIAgent:
                 str(input_data)
             )
             
+            # Situations historiques similaires (index des plus proches voisins)
+            similar = self._find_similar_situations(input_data)
+            
             response_time = time.time() - start_time
             
             return {
@@ -284,7 +581,8 @@ class AIAgent:
                 "prediction": self._generate_prediction(input_data, patterns),
                 "confidence": self._calculate_confidence(patterns),
                 "response_time": response_time,
-                "patterns_used": len(patterns)
+                "patterns_used": len(patterns),
+                "similar_situations": similar
             }
             
         except Exception as e:
@@ -294,6 +592,15 @@ class AIAgent:
                 "error": str(e)
             }
     
+    def _find_similar_situations(self, input_data: Dict[str, Any], k: int = 5) -> Dict[str, Any]:
+        """Prédictions passées aux indicateurs les plus proches, avec leurs résultats"""
+        try:
+            from ai_learning_system import get_learning_system
+            return get_learning_system().find_similar_patterns(input_data, k)
+        except Exception as e:
+            logger.debug(f"Similarity lookup failed for {self.name}: {e}")
+            return {"neighbours": [], "summary": {}}
+    
     def _generate_prediction(self, input_data: Dict, patterns: List[Dict]) -> Any:
         """Générer une prédiction (à surcharger par sous-classes)"""
         if not patterns:
@@ -551,3 +858,50 @@ def get_evolution_engine() -> AIEvolutionEngine:
     if _evolution_engine is None:
         _evolution_engine = AIEvolutionEngine()
     return _evolution_engine
+
+
+
+def benchmark_knowledge_base(sizes=(10_000, 100_000, 300_000), probes: int = 200) -> Dict[str, Any]:
+    """Latence d'ajout et de recherche à mesure que la base grandit
+    
+    ``scan_ms`` est le parcours linéaire (sous-chaîne sur chaque entrée)
+    que faisait l'ancienne recherche, pour comparaison.
+    """
+    import tempfile
+    
+    report = {"sizes": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        kb = KnowledgeBase(tmp)
+        added = 0
+        for size in sizes:
+            latencies = []
+            while added < size:
+                start = time.perf_counter()
+                kb.add("bench", f"pattern_{added}",
+                       f"regime {added % 7} signal {added} accuracy {added % 100}")
+                latencies.append(time.perf_counter() - start)
+                added += 1
+            
+            queries = [f"regime signal {1000 + i * 7919 % (size - 1000)}" for i in range(probes)]
+            start = time.perf_counter()
+            for q in queries:
+                kb.search("bench", q)
+            search_s = time.perf_counter() - start
+            
+            entries = kb.knowledge["bench"]
+            start = time.perf_counter()
+            for q in queries[:5]:
+                [k for k, e in entries.items() if q in k.lower() or q in str(e["value"]).lower()]
+            scan_s = (time.perf_counter() - start) / 5
+            
+            lat = sorted(latencies)
+            report["sizes"].append({
+                "entries": size,
+                "add_us_mean": round(sum(lat) / len(lat) * 1e6, 2) if lat else None,
+                "add_us_p99": round(lat[int(len(lat) * 0.99)] * 1e6, 2) if lat else None,
+                "search_ms": round(search_s * 1000 / probes, 4),
+                "scan_ms": round(scan_s * 1000, 3),
+            })
+        kb._save()
+        report["snapshot_bytes"] = os.path.getsize(kb.kb_file)
+    return report
@@ -13,31 +13,73 @@ Key features:
 - Smart data lifecycle: keep high-value, discard noise
 - Daily evolution cycle with auto price evaluation
 - Data compression for historical archives
+
+Predictions and per-model scores live in an embedded SQLite database
+(``learning.db``) indexed on symbol, model, strategy and outcome, so
+recording or evaluating a prediction is one small transaction and the
+accuracy queries are indexed aggregates rather than list scans.
+
+Numeric inputs passed as ``extra`` are kept per prediction in
+``prediction_features`` so the offline training pipeline can turn
+evaluated predictions into labelled feature rows, and are embedded in a
+nearest-neighbour ``PatternIndex`` that returns the most similar past
+situations with their outcomes. The database is the only copy: each
+process keeps its own in-memory index and catches up from it (new
+snapshots by rowid, new outcomes by evaluation time) before answering,
+so predictions and evaluations made by any gunicorn worker are
+searchable in all of them.
 """
 
 import os
 import json
 import gzip
 import time
+import sqlite3
 import hashlib
+import itertools
 import logging
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Optional, Any
 
 import requests
 
+from pattern_index import PatternIndex
+
 logger = logging.getLogger(__name__)
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ai_learning")
 
 # Limits
-MAX_PREDICTIONS = 5000
+MAX_PREDICTIONS = 100_000
+PRUNE_CHECK_EVERY = 500  # records between retention checks
+LOOKUP_CHUNK = 900       # ids per IN (...) query, under SQLite's variable limit
+PATTERN_SYNC_PAGE = 5000  # rows per query when catching the pattern index up
 MAX_EVOLUTION_REPORTS = 365
 MAX_PATTERNS_PER_KEY = 50
 MAX_ARCHIVE_FILES = 30
 ARCHIVE_THRESHOLD_DAYS = 30
 IMPORTANCE_PRUNE_THRESHOLD = 0.2  # patterns with hit_rate < 20% are pruned
 
+# Auto-evaluation price fetching
+MAX_FETCH_WORKERS = 8    # concurrent per-symbol price requests
+BULK_MIN_SYMBOLS = 5     # use the all-tickers endpoint from this many symbols up
+
+COINPAPRIKA_IDS = {
+    "BTC": "btc-bitcoin", "ETH": "eth-ethereum", "BNB": "bnb-binance-coin",
+    "SOL": "sol-solana", "XRP": "xrp-xrp", "ADA": "ada-cardano",
+    "DOGE": "doge-dogecoin", "DOT": "dot-polkadot", "AVAX": "avax-avalanche",
+    "MATIC": "matic-polygon", "LINK": "link-chainlink", "UNI": "uni-uniswap",
+    "ATOM": "atom-cosmos", "LTC": "ltc-litecoin", "NEAR": "near-near-protocol",
+    "FTM": "ftm-fantom", "ALGO": "algo-algorand", "APE": "ape-apecoin",
+    "SHIB": "shib-shiba-inu", "TRX": "trx-tron", "ARB": "arb-arbitrum",
+    "OP": "op-optimism", "SUI": "sui-sui", "SEI": "sei-sei",
+    "FIL": "fil-filecoin", "AAVE": "aave-aave", "MKR": "mkr-maker",
+    "INJ": "inj-injective", "RNDR": "rndr-render", "PEPE": "pepe-pepe",
+}
+
 
 # ---------------------------------------------------------------------------
 # PredictionRecord
@@ -82,6 +124,252 @@ class PredictionRecord:
         return cls(**{k: v for k, v in d.items() if k in cls.__init__.__code__.co_varnames})
 
 
+def _epoch(timestamp: str) -> float:
+    try:
+        return datetime.fromisoformat(str(timestamp).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return time.time()
+
+
+def _price_move(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    return after / before - 1 if before and after else None
+
+
+def numeric_features(extra: Optional[dict]) -> Dict[str, float]:
+    """Numeric and boolean values of ``extra`` with lower-case keys.
+
+    One level of nesting is flattened as ``parent_child`` (e.g. the
+    ``MACD`` dict becomes ``macd_histogram``, ``macd_signal``...).
+    """
+    out = {}
+    for key, value in (extra or {}).items():
+        items = value.items() if isinstance(value, dict) else [(None, value)]
+        for sub, v in items:
+            if isinstance(v, (int, float)) and math.isfinite(v):
+                name = f"{key}_{sub}" if sub is not None else str(key)
+                out[name.lower()] = float(v)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Learning store (SQLite)
+# ---------------------------------------------------------------------------
+
+class LearningStore:
+    """Indexed prediction and score tables with transactional updates."""
+
+    COLUMNS = (
+        "prediction_id", "symbol", "direction", "confidence", "model", "strategy",
+        "price_at_prediction", "timestamp", "outcome", "price_at_evaluation",
+        "evaluated_at", "importance",
+    )
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._init_database()
+
+    def conn(self) -> sqlite3.Connection:
+        """Per-thread connection (WAL, so readers never block the writer)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_database(self):
+        conn = self.conn()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS predictions (
+                    prediction_id TEXT PRIMARY KEY,
+                    symbol TEXT NOT NULL,
+                    direction TEXT NOT NULL,
+                    confidence REAL,
+                    model TEXT,
+                    strategy TEXT,
+                    price_at_prediction REAL,
+                    timestamp TEXT NOT NULL,
+                    ts REAL NOT NULL,
+                    outcome TEXT,
+                    price_at_evaluation REAL,
+                    evaluated_at TEXT,
+                    importance REAL DEFAULT 1.0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pred_symbol_ts ON predictions(symbol, ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pred_model_outcome ON predictions(model, outcome)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pred_strategy_outcome ON predictions(strategy, outcome)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pred_outcome ON predictions(outcome)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pred_pending ON predictions(ts) WHERE outcome IS NULL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS model_scores (
+                    model TEXT PRIMARY KEY,
+                    correct INTEGER NOT NULL DEFAULT 0,
+                    incorrect INTEGER NOT NULL DEFAULT 0,
+                    partial INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS prediction_features (
+                    prediction_id TEXT PRIMARY KEY,
+                    features TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_pred_features_delete AFTER DELETE ON predictions
+                BEGIN DELETE FROM prediction_features WHERE prediction_id = old.prediction_id; END
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pred_evaluated ON predictions(evaluated_at) "
+                         "WHERE evaluated_at IS NOT NULL")
+
+    @staticmethod
+    def row_values(rec: PredictionRecord) -> tuple:
+        return (
+            rec.prediction_id, rec.symbol, rec.direction, rec.confidence, rec.model,
+            rec.strategy, rec.price_at_prediction, rec.timestamp, _epoch(rec.timestamp),
+            rec.outcome, rec.price_at_evaluation, rec.evaluated_at, rec.importance,
+        )
+
+    def insert(self, records: List[PredictionRecord]):
+        with self.conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO predictions (prediction_id, symbol, direction, confidence, "
+                "model, strategy, price_at_prediction, timestamp, ts, outcome, price_at_evaluation, "
+                "evaluated_at, importance) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [self.row_values(r) for r in records])
+
+    def insert_features(self, prediction_id: str, features: Dict[str, float]):
+        with self.conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO prediction_features (prediction_id, features) VALUES (?, ?)",
+                         (prediction_id, json.dumps(features)))
+
+    def evaluated_with_features(self, after: tuple = ("", ""), limit: int = 10_000) -> List[Dict]:
+        """Evaluated predictions that have stored features, oldest evaluation first.
+
+        ``after`` is an ``(evaluated_at, prediction_id)`` cursor; pass the
+        last row's pair to continue where the previous call stopped.
+        """
+        rows = self.conn().execute(
+            "SELECT p.prediction_id, p.symbol, p.direction, p.outcome, p.price_at_prediction, "
+            "p.price_at_evaluation, p.ts, p.evaluated_at, f.features "
+            "FROM predictions p JOIN prediction_features f ON f.prediction_id = p.prediction_id "
+            "WHERE p.evaluated_at IS NOT NULL AND (p.evaluated_at, p.prediction_id) > (?, ?) "
+            "ORDER BY p.evaluated_at, p.prediction_id LIMIT ?", (*after, limit)).fetchall()
+        return [{**dict(r), "features": json.loads(r["features"])} for r in rows]
+
+    def features_after(self, rowid: int, limit: int = PATTERN_SYNC_PAGE) -> List[Dict]:
+        """Feature snapshots stored after ``rowid`` with their prediction, in insert order.
+
+        A single writer commits at a time, so rowids become visible in
+        increasing order and the last row's ``rowid`` is a safe cursor.
+        """
+        rows = self.conn().execute(
+            "SELECT f.rowid AS rowid, p.prediction_id, p.symbol, p.direction, p.ts, p.outcome, "
+            "p.price_at_prediction, p.price_at_evaluation, f.features "
+            "FROM prediction_features f JOIN predictions p ON p.prediction_id = f.prediction_id "
+            "WHERE f.rowid > ? ORDER BY f.rowid LIMIT ?", (rowid, limit)).fetchall()
+        return [{**dict(r), "features": json.loads(r["features"])} for r in rows]
+
+    def evaluated_after(self, after: tuple = ("", ""), limit: int = PATTERN_SYNC_PAGE) -> List[Dict]:
+        """Outcomes recorded after the ``(evaluated_at, prediction_id)`` cursor."""
+        rows = self.conn().execute(
+            "SELECT prediction_id, outcome, price_at_prediction, price_at_evaluation, evaluated_at "
+            "FROM predictions WHERE evaluated_at IS NOT NULL AND (evaluated_at, prediction_id) > (?, ?) "
+            "ORDER BY evaluated_at, prediction_id LIMIT ?", (*after, limit)).fetchall()
+        return [dict(r) for r in rows]
+
+    def last_evaluated(self) -> tuple:
+        """``(evaluated_at, prediction_id)`` of the latest evaluation (cursor for ``evaluated_after``)."""
+        row = self.conn().execute(
+            "SELECT evaluated_at, prediction_id FROM predictions WHERE evaluated_at IS NOT NULL "
+            "ORDER BY evaluated_at DESC, prediction_id DESC LIMIT 1").fetchone()
+        return (row[0], row[1]) if row else ("", "")
+
+    def get(self, prediction_id: str) -> Optional[PredictionRecord]:
+        row = self.conn().execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM predictions WHERE prediction_id = ?",
+            (prediction_id,)).fetchone()
+        return PredictionRecord.from_dict(dict(row)) if row else None
+
+    def select(self, where: str = "", params: tuple = (), order: str = "ts",
+               limit: Optional[int] = None) -> List[PredictionRecord]:
+        sql = f"SELECT {', '.join(self.COLUMNS)} FROM predictions"
+        if where:
+            sql += f" WHERE {where}"
+        sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [PredictionRecord.from_dict(dict(r)) for r in self.conn().execute(sql, params)]
+
+    def count(self, where: str = "", params: tuple = ()) -> int:
+        sql = "SELECT COUNT(*) FROM predictions" + (f" WHERE {where}" if where else "")
+        return self.conn().execute(sql, params).fetchone()[0]
+
+    def score(self, model: str) -> Optional[Dict]:
+        row = self.conn().execute("SELECT * FROM model_scores WHERE model = ?", (model,)).fetchone()
+        return {k: row[k] for k in ("correct", "incorrect", "partial", "total")} if row else None
+
+    def scores(self) -> Dict[str, Dict]:
+        rows = self.conn().execute("SELECT * FROM model_scores ORDER BY model").fetchall()
+        return {r["model"]: {k: r[k] for k in ("correct", "incorrect", "partial", "total")}
+                for r in rows}
+
+    @staticmethod
+    def add_scores(conn: sqlite3.Connection, model: str, outcome: str, n: int = 1):
+        conn.execute(
+            """INSERT INTO model_scores (model, correct, incorrect, partial, total)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(model) DO UPDATE SET
+                   correct = correct + excluded.correct,
+                   incorrect = incorrect + excluded.incorrect,
+                   partial = partial + excluded.partial,
+                   total = total + excluded.total""",
+            (model, n * (outcome == "CORRECT"), n * (outcome == "INCORRECT"),
+             n * (outcome == "PARTIAL"), n))
+
+    def migrate_json(self, predictions_path: str, scores_path: str) -> int:
+        """Import the legacy predictions.json / scores.json once."""
+        conn = self.conn()
+        if conn.execute("SELECT 1 FROM store_meta WHERE key = 'migrated_json'").fetchone():
+            return 0
+        records, scores = [], {}
+        try:
+            if os.path.exists(predictions_path):
+                with open(predictions_path) as f:
+                    records = [PredictionRecord.from_dict(d) for d in json.load(f)]
+            if os.path.exists(scores_path):
+                with open(scores_path) as f:
+                    scores = json.load(f)
+        except Exception as e:
+            logger.warning("Failed to read legacy learning data: %s", e)
+            return 0
+        with conn:
+            claimed = conn.execute(
+                "INSERT OR IGNORE INTO store_meta (key, value) VALUES ('migrated_json', ?)",
+                (datetime.now(timezone.utc).isoformat(),)).rowcount
+            if not claimed:
+                return 0
+            conn.executemany(
+                "INSERT OR IGNORE INTO predictions (prediction_id, symbol, direction, confidence, "
+                "model, strategy, price_at_prediction, timestamp, ts, outcome, price_at_evaluation, "
+                "evaluated_at, importance) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [self.row_values(r) for r in records])
+            conn.executemany(
+                "INSERT OR REPLACE INTO model_scores (model, correct, incorrect, partial, total) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(m, v.get("correct", 0), v.get("incorrect", 0), v.get("partial", 0), v.get("total", 0))
+                 for m, v in scores.items()])
+        if records or scores:
+            logger.info("Migrated %d predictions and %d model scores to SQLite", len(records), len(scores))
+        return len(records)
+
+
 # ---------------------------------------------------------------------------
 # AI Learning System
 # ---------------------------------------------------------------------------
@@ -96,17 +384,34 @@ class AILearningSystem:
     - Stale pattern memory → pruned automatically
     """
 
-    def __init__(self):
-        os.makedirs(DATA_DIR, exist_ok=True)
+    def __init__(self, data_dir: str = DATA_DIR):
+        self.data_dir = data_dir
+        os.makedirs(data_dir, exist_ok=True)
+
+        # Predictions + model scores (SQLite); migrates the legacy JSON once
+        self.store = LearningStore(os.path.join(data_dir, "learning.db"))
+        self.store.migrate_json(os.path.join(data_dir, "predictions.json"),
+                                os.path.join(data_dir, "scores.json"))
+        self._records_since_prune = 0
+        self._seq = itertools.count()
+        self.pattern_index = PatternIndex()
+        self._pattern_lock = threading.Lock()
+        self._pattern_rowid = 0                       # last prediction_features rowid indexed
+        self._pattern_evaluated: Optional[tuple] = None  # last outcome applied (evaluated_at, id)
 
         # In-memory state
-        self.predictions: List[PredictionRecord] = []
-        self.scores: Dict[str, Dict] = {}          # model_name → {correct, total, ...}
         self.pattern_memory: Dict[str, List] = {}   # pattern_hash → [outcomes]
         self.evolution_reports: List[dict] = []
 
         # Load persisted state
         self._load_state()
+        # Built before gunicorn forks (--preload); each worker then only catches up
+        self.sync_pattern_index()
+
+    @property
+    def scores(self) -> Dict[str, Dict]:
+        """model_name → {correct, incorrect, partial, total}."""
+        return self.store.scores()
 
     # ---- Recording predictions --------------------------------------------
 
@@ -122,7 +427,7 @@ class AILearningSystem:
     ) -> str:
         """Record a new prediction. Returns prediction_id."""
         pid = hashlib.md5(
-            f"{symbol}{direction}{confidence}{model}{time.time()}".encode()
+            f"{symbol}{direction}{confidence}{model}{time.time()}{next(self._seq)}".encode()
         ).hexdigest()[:16]
 
         rec = PredictionRecord(
@@ -135,46 +440,99 @@ class AILearningSystem:
             price_at_prediction=price_at_prediction,
         )
 
-        self.predictions.append(rec)
+        self.store.insert([rec])
+        features = numeric_features(extra)
+        if features:
+            self.store.insert_features(pid, features)
         self._record_pattern(rec, extra)
 
-        # Enforce limits
-        if len(self.predictions) > MAX_PREDICTIONS:
+        # Enforce limits (checked periodically, not on every insert)
+        self._records_since_prune += 1
+        if self._records_since_prune >= PRUNE_CHECK_EVERY:
+            self._records_since_prune = 0
             self._smart_prune_predictions()
 
-        self._save_predictions()
         return pid
 
     def evaluate_prediction(self, prediction_id: str, outcome: str, price_now: float) -> bool:
         """Evaluate a past prediction. outcome: CORRECT / INCORRECT / PARTIAL."""
-        for rec in self.predictions:
-            if rec.prediction_id == prediction_id and rec.outcome is None:
-                rec.outcome = outcome.upper()
-                rec.price_at_evaluation = price_now
-                rec.evaluated_at = datetime.now(timezone.utc).isoformat()
+        result = self.batch_evaluate([
+            {"prediction_id": prediction_id, "outcome": outcome, "price_now": price_now}
+        ])
+        return result["evaluated"] == 1
+
+    def batch_evaluate(self, evaluations: List[dict]) -> dict:
+        """
+        Evaluate many predictions at once. Each item: {prediction_id, outcome, price_now}.
 
+        All ids are resolved with one lookup, outcome/importance/score changes
+        are computed in memory and written in a single transaction. Unknown,
+        already-evaluated and duplicate ids are skipped. Returns counts and
+        per-stage timings for the batch.
+        """
+        t0 = time.perf_counter()
+        ids = list(dict.fromkeys(ev["prediction_id"] for ev in evaluations))
+        conn = self.store.conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            pending = {}
+            for i in range(0, len(ids), LOOKUP_CHUNK):
+                chunk = ids[i:i + LOOKUP_CHUNK]
+                rows = conn.execute(
+                    "SELECT prediction_id, model, confidence, importance, outcome, price_at_prediction "
+                    f"FROM predictions WHERE prediction_id IN ({','.join('?' * len(chunk))})", chunk)
+                pending.update((r["prediction_id"], r) for r in rows if r["outcome"] is None)
+            t1 = time.perf_counter()
+
+            now = datetime.now(timezone.utc).isoformat()
+            updates, score_deltas = [], {}
+            for ev in evaluations:
+                row = pending.pop(ev["prediction_id"], None)
+                if row is None:
+                    continue
+                outcome = ev["outcome"].upper()
+                importance = row["importance"]
                 # Boost importance for correct high-confidence
-                if outcome == "CORRECT" and rec.confidence >= 0.7:
-                    rec.importance = min(2.0, rec.importance + 0.3)
+                if outcome == "CORRECT" and row["confidence"] >= 0.7:
+                    importance = min(2.0, importance + 0.3)
                 elif outcome == "INCORRECT":
-                    rec.importance = max(0.1, rec.importance - 0.2)
-
-                self._update_scores(rec)
-                self._save_predictions()
-                self._save_scores()
-                return True
-        return False
+                    importance = max(0.1, importance - 0.2)
+                updates.append((outcome, ev.get("price_now"), now, importance, ev["prediction_id"]))
+                key = (row["model"], outcome)
+                score_deltas[key] = score_deltas.get(key, 0) + 1
+            t2 = time.perf_counter()
+
+            updates.sort(key=lambda u: u[-1])  # primary-key order for B-tree locality
+            conn.executemany(
+                "UPDATE predictions SET outcome = ?, price_at_evaluation = ?, evaluated_at = ?, "
+                "importance = ? WHERE prediction_id = ?", updates)
+            for (model, outcome), n in score_deltas.items():
+                LearningStore.add_scores(conn, model, outcome, n)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        t3 = time.perf_counter()
 
-    def batch_evaluate(self, evaluations: List[dict]):
-        """Evaluate many predictions at once. Each item: {prediction_id, outcome, price_now}."""
-        for ev in evaluations:
-            self.evaluate_prediction(ev["prediction_id"], ev["outcome"], ev["price_now"])
+        report = {
+            "requested": len(evaluations),
+            "evaluated": len(updates),
+            "skipped": len(evaluations) - len(updates),
+            "lookup_ms": round((t1 - t0) * 1000, 3),
+            "apply_ms": round((t2 - t1) * 1000, 3),
+            "persist_ms": round((t3 - t2) * 1000, 3),
+            "total_ms": round((t3 - t0) * 1000, 3),
+        }
+        if len(evaluations) > 1:
+            logger.info("Batch evaluated %d/%d predictions in %.1f ms",
+                        report["evaluated"], report["requested"], report["total_ms"])
+        return report
 
     # ---- Accuracy queries -------------------------------------------------
 
     def get_model_accuracy(self, model: str) -> dict:
         """Get accuracy stats for a specific model."""
-        stats = self.scores.get(model, {"correct": 0, "total": 0, "incorrect": 0, "partial": 0})
+        stats = self.store.score(model) or {"correct": 0, "total": 0, "incorrect": 0, "partial": 0}
         total = stats["total"]
         return {
             "model": model,
@@ -186,15 +544,16 @@ class AILearningSystem:
         }
 
     def get_strategy_accuracy(self, strategy: str) -> dict:
-        """Get accuracy stats for a strategy (filtering predictions)."""
-        relevant = [p for p in self.predictions if p.strategy == strategy and p.outcome]
-        if not relevant:
+        """Get accuracy stats for a strategy (indexed aggregate)."""
+        total, correct = self.store.conn().execute(
+            "SELECT COUNT(*), SUM(outcome = 'CORRECT') FROM predictions "
+            "WHERE strategy = ? AND outcome IS NOT NULL", (strategy,)).fetchone()
+        if not total:
             return {"strategy": strategy, "accuracy": 0, "total": 0}
-        correct = sum(1 for p in relevant if p.outcome == "CORRECT")
         return {
             "strategy": strategy,
-            "accuracy": round(correct / len(relevant), 3),
-            "total": len(relevant),
+            "accuracy": round(correct / total, 3),
+            "total": total,
             "correct": correct,
         }
 
@@ -225,43 +584,100 @@ class AILearningSystem:
 
     def get_symbol_insights(self, symbol: str) -> dict:
         """Get learning insights for a specific symbol."""
-        relevant = [p for p in self.predictions if p.symbol == symbol.upper()]
-        if not relevant:
+        conn = self.store.conn()
+        total, evaluated, correct, avg_conf = conn.execute(
+            "SELECT COUNT(*), COUNT(outcome), SUM(outcome = 'CORRECT'), AVG(confidence) "
+            "FROM predictions WHERE symbol = ?", (symbol.upper(),)).fetchone()
+        if not total:
             return {"symbol": symbol, "predictions": 0}
 
-        evaluated = [p for p in relevant if p.outcome]
-        correct = sum(1 for p in evaluated if p.outcome == "CORRECT")
         directions = {}
-        for p in relevant[-20:]:
-            d = p.direction
+        for (d,) in conn.execute(
+                "SELECT direction FROM predictions WHERE symbol = ? ORDER BY ts DESC LIMIT 20",
+                (symbol.upper(),)):
             directions[d] = directions.get(d, 0) + 1
 
         return {
             "symbol": symbol.upper(),
-            "total_predictions": len(relevant),
-            "evaluated": len(evaluated),
-            "accuracy": round(correct / len(evaluated), 3) if evaluated else 0,
+            "total_predictions": total,
+            "evaluated": evaluated,
+            "accuracy": round(correct / evaluated, 3) if evaluated else 0,
             "dominant_direction": max(directions, key=directions.get) if directions else "NEUTRAL",
-            "avg_confidence": round(sum(p.confidence for p in relevant) / len(relevant), 2),
+            "avg_confidence": round(avg_conf or 0, 2),
         }
 
+    def find_similar_patterns(self, features: Dict[str, Any], k: int = 10) -> dict:
+        """
+        The ``k`` past predictions whose indicator snapshot is closest to
+        ``features`` (raw or nested indicator dict), with their outcomes.
+        """
+        start = time.perf_counter()
+        self.sync_pattern_index()
+        neighbours = self.pattern_index.query(numeric_features(features), k)
+        return {
+            "neighbours": neighbours,
+            "summary": PatternIndex.summarize(neighbours),
+            "indexed": len(self.pattern_index),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    def sync_pattern_index(self) -> int:
+        """Catch the in-memory pattern index up with the database; returns points added.
+
+        Snapshots are read past the last ``prediction_features`` rowid seen
+        here and outcomes past the last evaluation applied, so a call costs
+        two indexed queries when nothing changed.
+        """
+        with self._pattern_lock:
+            if self._pattern_evaluated is None:
+                # Rows read below carry their outcome already
+                self._pattern_evaluated = self.store.last_evaluated()
+            added = 0
+            while True:
+                rows = self.store.features_after(self._pattern_rowid)
+                outcomes = {}
+                for r in rows:
+                    added += self.pattern_index.add(r["prediction_id"], r["symbol"], r["direction"],
+                                                    r["features"], r["ts"])
+                    if r["outcome"]:
+                        outcomes[r["prediction_id"]] = (
+                            r["outcome"], _price_move(r["price_at_prediction"], r["price_at_evaluation"]))
+                self.pattern_index.set_outcomes(outcomes)
+                if rows:
+                    self._pattern_rowid = rows[-1]["rowid"]
+                if len(rows) < PATTERN_SYNC_PAGE:
+                    break
+            while True:
+                rows = self.store.evaluated_after(self._pattern_evaluated)
+                self.pattern_index.set_outcomes({
+                    r["prediction_id"]: (r["outcome"],
+                                         _price_move(r["price_at_prediction"], r["price_at_evaluation"]))
+                    for r in rows})
+                if rows:
+                    self._pattern_evaluated = (rows[-1]["evaluated_at"], rows[-1]["prediction_id"])
+                if len(rows) < PATTERN_SYNC_PAGE:
+                    break
+            return added
+
     # ---- Learning summary -------------------------------------------------
 
     def get_learning_summary(self) -> dict:
         """Overall learning system summary."""
-        evaluated = [p for p in self.predictions if p.outcome]
-        correct = sum(1 for p in evaluated if p.outcome == "CORRECT")
+        total, evaluated, correct = self.store.conn().execute(
+            "SELECT COUNT(*), COUNT(outcome), SUM(outcome = 'CORRECT') FROM predictions").fetchone()
+        self.sync_pattern_index()
         models = list(self.scores.keys())
 
         return {
-            "total_predictions": len(self.predictions),
-            "evaluated": len(evaluated),
-            "accuracy": round(correct / len(evaluated), 3) if evaluated else 0,
+            "total_predictions": total,
+            "evaluated": evaluated,
+            "accuracy": round(correct / evaluated, 3) if evaluated else 0,
             "models_tracked": models,
             "patterns_stored": sum(len(v) for v in self.pattern_memory.values()),
             "pattern_keys": len(self.pattern_memory),
+            "patterns_indexed": len(self.pattern_index),
             "evolution_reports": len(self.evolution_reports),
-            "data_dir": DATA_DIR,
+            "data_dir": self.data_dir,
         }
 
     # ---- Daily evolution cycle --------------------------------------------
@@ -285,23 +701,9 @@ class AILearningSystem:
         }
 
         # 1. Auto-evaluate predictions older than 24h
-        cutoff = datetime.now(timezone.utc) - timedelta(hours=24)
-        unevaluated = [
-            p for p in self.predictions
-            if p.outcome is None
-            and datetime.fromisoformat(p.timestamp.replace("Z", "+00:00")) < cutoff
-        ]
-
-        for pred in unevaluated:
-            try:
-                auto_outcome = self._auto_evaluate_direction(pred)
-                if auto_outcome:
-                    pred.outcome = auto_outcome
-                    pred.evaluated_at = datetime.now(timezone.utc).isoformat()
-                    self._update_scores(pred)
-                    report["predictions_auto_evaluated"] += 1
-            except Exception as e:
-                logger.debug("Auto-eval failed for %s: %s", pred.prediction_id, e)
+        auto = self._auto_evaluate_pending(time.time() - 24 * 3600)
+        report["predictions_auto_evaluated"] = auto["evaluated"]
+        report["auto_evaluation"] = auto
 
         # 2. Apply weights to coordinator
         if coordinator:
@@ -327,35 +729,94 @@ class AILearningSystem:
         if len(self.evolution_reports) > MAX_EVOLUTION_REPORTS:
             self.evolution_reports = self.evolution_reports[-MAX_EVOLUTION_REPORTS:]
 
-        self._save_predictions()
-        self._save_scores()
         self._save_evolution_report(report)
 
         return report
 
     # ---- Auto evaluation --------------------------------------------------
 
-    def _auto_evaluate_direction(self, pred: PredictionRecord) -> Optional[str]:
-        """
-        Evaluate a directional prediction by checking real price change.
-        Uses CoinPaprika (crypto) or CoinCap as fallback.
+    def _auto_evaluate_pending(self, cutoff_ts: float) -> dict:
         """
-        symbol = pred.symbol.upper()
-
-        # Try CoinPaprika
-        price_change = self._get_price_change_coinpaprika(symbol)
+        Evaluate every pending prediction older than ``cutoff_ts``.
 
-        # Try CoinCap fallback
-        if price_change is None:
-            price_change = self._get_price_change_coincap(symbol)
-
-        if price_change is None:
-            return None
-
-        # Record evaluation price
-        pred.price_at_evaluation = pred.price_at_prediction * (1 + price_change / 100)
+        Predictions are grouped by symbol so each symbol's price change is
+        fetched once (bulk endpoint first, then bounded-concurrency
+        per-symbol requests), and all outcomes are applied in one batch.
+        """
+        start = time.perf_counter()
+        pending = self.store.select("outcome IS NULL AND ts < ?", (cutoff_ts,))
+        by_symbol: Dict[str, List[PredictionRecord]] = {}
+        for pred in pending:
+            by_symbol.setdefault(pred.symbol.upper(), []).append(pred)
+
+        changes, fetch = self._fetch_price_changes(list(by_symbol))
+
+        evaluations = []
+        for symbol, preds in by_symbol.items():
+            change = changes.get(symbol)
+            if change is None:
+                continue
+            for pred in preds:
+                evaluations.append({
+                    "prediction_id": pred.prediction_id,
+                    "outcome": self._classify_direction(pred.direction, change),
+                    "price_now": pred.price_at_prediction * (1 + change / 100),
+                })
+        batch = self.batch_evaluate(evaluations) if evaluations else None
+
+        elapsed = time.perf_counter() - start
+        return {
+            "pending": len(pending),
+            "symbols": len(by_symbol),
+            "symbols_priced": len(changes),
+            "evaluated": batch["evaluated"] if batch else 0,
+            "unpriced_predictions": len(pending) - len(evaluations),
+            "fetch": fetch,
+            "batch": batch,
+            "elapsed_s": round(elapsed, 3),
+            "predictions_per_sec": round(len(pending) / elapsed, 1) if elapsed > 0 else None,
+        }
 
-        # Classify
+    def _fetch_price_changes(self, symbols: List[str]) -> tuple:
+        """24h % change per symbol, plus fetch metrics for the evolution report."""
+        start = time.perf_counter()
+        changes: Dict[str, float] = {}
+        metrics = {"requested": len(symbols), "bulk_hits": 0, "requests": 0}
+
+        if len(symbols) >= BULK_MIN_SYMBOLS:
+            metrics["requests"] += 1
+            bulk = self._get_price_changes_coinpaprika_bulk(symbols)
+            changes.update(bulk)
+            metrics["bulk_hits"] = len(bulk)
+
+        missing = [s for s in symbols if s not in changes]
+        if missing:
+            done = 0
+            with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(missing))) as pool:
+                futures = {pool.submit(self._get_price_change, s): s for s in missing}
+                for future in as_completed(futures):
+                    change, requests_made = future.result()
+                    metrics["requests"] += requests_made
+                    if change is not None:
+                        changes[futures[future]] = change
+                    done += 1
+                    if done % 25 == 0:
+                        logger.info("Auto-eval price fetch: %d/%d symbols", done, len(missing))
+
+        metrics["missing"] = len(symbols) - len(changes)
+        metrics["elapsed_s"] = round(time.perf_counter() - start, 3)
+        return changes, metrics
+
+    def _get_price_change(self, symbol: str) -> tuple:
+        """CoinPaprika with CoinCap fallback; returns (change, requests made)."""
+        change = self._get_price_change_coinpaprika(symbol)
+        if change is not None:
+            return change, 1
+        return self._get_price_change_coincap(symbol), 2
+
+    @staticmethod
+    def _classify_direction(direction: str, price_change: float) -> str:
+        """Score a predicted direction against a realised % change."""
         threshold = 2.0  # ±2% significance
         if price_change > threshold:
             actual = "BULLISH"
@@ -365,28 +826,43 @@ class AILearningSystem:
             actual = "NEUTRAL"
 
         # Match
-        if pred.direction == actual:
+        if direction == actual:
             return "CORRECT"
-        elif pred.direction == "NEUTRAL" or actual == "NEUTRAL":
+        elif direction == "NEUTRAL" or actual == "NEUTRAL":
             return "PARTIAL"
         else:
             return "INCORRECT"
 
+    def _get_price_changes_coinpaprika_bulk(self, symbols: List[str]) -> Dict[str, float]:
+        """24h changes for many symbols from one CoinPaprika all-tickers call."""
+        wanted = set(symbols)
+        try:
+            r = requests.get("https://api.coinpaprika.com/v1/tickers", timeout=15)
+            if r.status_code != 200:
+                return {}
+            tickers = r.json()
+        except Exception:
+            return {}
+
+        out: Dict[str, float] = {}
+        by_id = {t.get("id"): t for t in tickers}
+        for symbol in wanted:
+            t = by_id.get(COINPAPRIKA_IDS.get(symbol))
+            change = (t or {}).get("quotes", {}).get("USD", {}).get("percent_change_24h")
+            if change is not None:
+                out[symbol] = change
+        # Unmapped symbols: highest-ranked ticker with that symbol (list is rank-ordered)
+        for t in tickers:
+            symbol = str(t.get("symbol", "")).upper()
+            if symbol in wanted and symbol not in out and symbol not in COINPAPRIKA_IDS:
+                change = t.get("quotes", {}).get("USD", {}).get("percent_change_24h")
+                if change is not None:
+                    out[symbol] = change
+        return out
+
     def _get_price_change_coinpaprika(self, symbol: str) -> Optional[float]:
         """Get 24h price change from CoinPaprika."""
-        slug_map = {
-            "BTC": "btc-bitcoin", "ETH": "eth-ethereum", "BNB": "bnb-binance-coin",
-            "SOL": "sol-solana", "XRP": "xrp-xrp", "ADA": "ada-cardano",
-            "DOGE": "doge-dogecoin", "DOT": "dot-polkadot", "AVAX": "avax-avalanche",
-            "MATIC": "matic-polygon", "LINK": "link-chainlink", "UNI": "uni-uniswap",
-            "ATOM": "atom-cosmos", "LTC": "ltc-litecoin", "NEAR": "near-near-protocol",
-            "FTM": "ftm-fantom", "ALGO": "algo-algorand", "APE": "ape-apecoin",
-            "SHIB": "shib-shiba-inu", "TRX": "trx-tron", "ARB": "arb-arbitrum",
-            "OP": "op-optimism", "SUI": "sui-sui", "SEI": "sei-sei",
-            "FIL": "fil-filecoin", "AAVE": "aave-aave", "MKR": "mkr-maker",
-            "INJ": "inj-injective", "RNDR": "rndr-render", "PEPE": "pepe-pepe",
-        }
-        slug = slug_map.get(symbol)
+        slug = COINPAPRIKA_IDS.get(symbol)
         if not slug:
             # Try to guess the slug
             slug = f"{symbol.lower()}-{symbol.lower()}"
@@ -415,21 +891,6 @@ class AILearningSystem:
             pass
         return None
 
-    # ---- Score tracking ---------------------------------------------------
-
-    def _update_scores(self, rec: PredictionRecord):
-        """Update model accuracy scores after evaluation."""
-        if rec.model not in self.scores:
-            self.scores[rec.model] = {"correct": 0, "incorrect": 0, "partial": 0, "total": 0}
-        s = self.scores[rec.model]
-        s["total"] += 1
-        if rec.outcome == "CORRECT":
-            s["correct"] += 1
-        elif rec.outcome == "INCORRECT":
-            s["incorrect"] += 1
-        elif rec.outcome == "PARTIAL":
-            s["partial"] += 1
-
     # ---- Pattern memory ---------------------------------------------------
 
     def _record_pattern(self, rec: PredictionRecord, extra: Optional[dict] = None):
@@ -501,37 +962,26 @@ class AILearningSystem:
         - Old unevaluated predictions
         - Low-confidence INCORRECT predictions
         """
-        if len(self.predictions) <= MAX_PREDICTIONS:
+        conn = self.store.conn()
+        excess = self.store.count() - MAX_PREDICTIONS
+        if excess <= 0:
             return 0
 
-        now = datetime.now(timezone.utc)
-        week_ago = (now - timedelta(days=7)).isoformat()
-
-        # Score each prediction for retention
-        scored = []
-        for p in self.predictions:
-            score = p.importance
-            # Recent predictions get a boost
-            if p.timestamp > week_ago:
-                score += 1.0
-            # Evaluated correctly with high confidence = very valuable
-            if p.outcome == "CORRECT" and p.confidence >= 0.7:
-                score += 1.5
-            elif p.outcome == "CORRECT":
-                score += 0.8
-            elif p.outcome == "PARTIAL":
-                score += 0.3
-            # Old unevaluated = low value
-            if p.outcome is None and p.timestamp < week_ago:
-                score -= 0.5
-            scored.append((score, p))
-
-        # Sort by score descending, keep top MAX_PREDICTIONS
-        scored.sort(key=lambda x: x[0], reverse=True)
-        keep = scored[:MAX_PREDICTIONS]
-        pruned = len(scored) - len(keep)
-
-        self.predictions = [p for _, p in keep]
+        week_ago = time.time() - 7 * 86400
+        # Retention score computed in SQL; the lowest-scoring rows go
+        with conn:
+            pruned = conn.execute("""
+                DELETE FROM predictions WHERE prediction_id IN (
+                    SELECT prediction_id FROM predictions ORDER BY
+                        importance
+                        + CASE WHEN ts > :week THEN 1.0 ELSE 0 END
+                        + CASE WHEN outcome = 'CORRECT' AND confidence >= 0.7 THEN 1.5
+                               WHEN outcome = 'CORRECT' THEN 0.8
+                               WHEN outcome = 'PARTIAL' THEN 0.3 ELSE 0 END
+                        - CASE WHEN outcome IS NULL AND ts <= :week THEN 0.5 ELSE 0 END
+                    ASC LIMIT :excess
+                )
+            """, {"week": week_ago, "excess": excess}).rowcount
         return pruned
 
     # ---- Data archiving ---------------------------------------------------
@@ -541,13 +991,13 @@ class AILearningSystem:
         Compress and archive predictions older than ARCHIVE_THRESHOLD_DAYS.
         Keeps them in gzipped JSON for potential future analysis.
         """
-        cutoff = (datetime.now(timezone.utc) - timedelta(days=ARCHIVE_THRESHOLD_DAYS)).isoformat()
-        to_archive = [p for p in self.predictions if p.timestamp < cutoff and p.outcome is not None]
+        cutoff = time.time() - ARCHIVE_THRESHOLD_DAYS * 86400
+        to_archive = self.store.select("ts < ? AND outcome IS NOT NULL", (cutoff,))
 
         if len(to_archive) < 50:
             return 0
 
-        archive_dir = os.path.join(DATA_DIR, "archives")
+        archive_dir = os.path.join(self.data_dir, "archives")
         os.makedirs(archive_dir, exist_ok=True)
 
         stamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
@@ -557,9 +1007,10 @@ class AILearningSystem:
         with gzip.open(archive_path, "wt", encoding="utf-8") as f:
             json.dump(archive_data, f, default=str)
 
-        # Remove archived predictions from active list
-        archived_ids = {p.prediction_id for p in to_archive}
-        self.predictions = [p for p in self.predictions if p.prediction_id not in archived_ids]
+        # Remove archived predictions from the active table
+        with self.store.conn() as conn:
+            conn.executemany("DELETE FROM predictions WHERE prediction_id = ?",
+                             [(p.prediction_id,) for p in to_archive])
 
         # Clean up old archive files
         self._cleanup_old_archives(archive_dir)
@@ -581,28 +1032,9 @@ class AILearningSystem:
 
     # ---- Persistence ------------------------------------------------------
 
-    def _save_predictions(self):
-        """Save predictions to disk."""
-        path = os.path.join(DATA_DIR, "predictions.json")
-        try:
-            data = [p.to_dict() for p in self.predictions]
-            with open(path, "w") as f:
-                json.dump(data, f, indent=1, default=str)
-        except Exception as e:
-            logger.error("Failed to save predictions: %s", e)
-
-    def _save_scores(self):
-        """Save scores to disk."""
-        path = os.path.join(DATA_DIR, "scores.json")
-        try:
-            with open(path, "w") as f:
-                json.dump(self.scores, f, indent=2)
-        except Exception as e:
-            logger.error("Failed to save scores: %s", e)
-
     def _save_evolution_report(self, report: dict):
         """Save evolution reports to disk."""
-        path = os.path.join(DATA_DIR, "evolution_reports.json")
+        path = os.path.join(self.data_dir, "evolution_reports.json")
         try:
             with open(path, "w") as f:
                 json.dump(self.evolution_reports[-MAX_EVOLUTION_REPORTS:], f, indent=1, default=str)
@@ -611,27 +1043,8 @@ class AILearningSystem:
 
     def _load_state(self):
         """Load persisted state from disk."""
-        # Predictions
-        pred_path = os.path.join(DATA_DIR, "predictions.json")
-        if os.path.exists(pred_path):
-            try:
-                with open(pred_path) as f:
-                    data = json.load(f)
-                self.predictions = [PredictionRecord.from_dict(d) for d in data]
-            except Exception as e:
-                logger.warning("Failed to load predictions: %s", e)
-
-        # Scores
-        scores_path = os.path.join(DATA_DIR, "scores.json")
-        if os.path.exists(scores_path):
-            try:
-                with open(scores_path) as f:
-                    self.scores = json.load(f)
-            except Exception as e:
-                logger.warning("Failed to load scores: %s", e)
-
         # Evolution reports
-        evo_path = os.path.join(DATA_DIR, "evolution_reports.json")
+        evo_path = os.path.join(self.data_dir, "evolution_reports.json")
         if os.path.exists(evo_path):
             try:
                 with open(evo_path) as f:
@@ -640,7 +1053,7 @@ class AILearningSystem:
                 logger.warning("Failed to load evolution reports: %s", e)
 
         # Pattern memory
-        pattern_path = os.path.join(DATA_DIR, "patterns.json")
+        pattern_path = os.path.join(self.data_dir, "patterns.json")
         if os.path.exists(pattern_path):
             try:
                 with open(pattern_path) as f:
@@ -649,11 +1062,9 @@ class AILearningSystem:
                 logger.warning("Failed to load pattern memory: %s", e)
 
     def save_all(self):
-        """Save everything to disk."""
-        self._save_predictions()
-        self._save_scores()
+        """Save everything to disk (predictions and scores are already in SQLite)."""
         # Save pattern memory
-        pattern_path = os.path.join(DATA_DIR, "patterns.json")
+        pattern_path = os.path.join(self.data_dir, "patterns.json")
         try:
             with open(pattern_path, "w") as f:
                 json.dump(self.pattern_memory, f, indent=1, default=str)
@@ -669,11 +1080,88 @@ class AILearningSystem:
 # ---------------------------------------------------------------------------
 
 _learning_system: Optional[AILearningSystem] = None
+_learning_lock = threading.Lock()
 
 
 def get_learning_system() -> AILearningSystem:
     """Get or create the global learning system instance."""
     global _learning_system
     if _learning_system is None:
-        _learning_system = AILearningSystem()
+        with _learning_lock:
+            if _learning_system is None:
+                _learning_system = AILearningSystem()
     return _learning_system
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def benchmark(n: int = 100_000, data_dir: Optional[str] = None, seed: int = 42) -> dict:
+    """Load ``n`` predictions (10% evaluated) and time the hot paths."""
+    import random
+    import shutil
+    import tempfile
+
+    rng = random.Random(seed)
+    own_dir = data_dir is None
+    data_dir = data_dir or tempfile.mkdtemp(prefix="ai_learning_bench_")
+    try:
+        ls = AILearningSystem(data_dir=data_dir)
+        symbols = [f"SYM{i}" for i in range(500)]
+        models = ["gpt", "claude", "gemini", "local", "ensemble"]
+        strategies = ["momentum", "breakout", "mean_reversion", "trend"]
+        start_ts = time.time() - 30 * 86400
+        records = [
+            PredictionRecord(
+                prediction_id=f"bench{i:07d}", symbol=rng.choice(symbols),
+                direction=rng.choice(("BULLISH", "BEARISH", "NEUTRAL")),
+                confidence=rng.random(), model=rng.choice(models),
+                strategy=rng.choice(strategies), price_at_prediction=100.0,
+                timestamp=datetime.fromtimestamp(start_ts + i * 20, timezone.utc).isoformat())
+            for i in range(n)
+        ]
+        report = {"predictions": n}
+
+        t = time.perf_counter()
+        ls.store.insert(records)
+        report["bulk_insert_s"] = round(time.perf_counter() - t, 3)
+
+        t = time.perf_counter()
+        for i in range(1000):
+            ls.record_prediction(symbols[i % 500], "BULLISH", 0.6, "gpt", "momentum", 100.0)
+        report["record_prediction_ms"] = round((time.perf_counter() - t) * 1000 / 1000, 4)
+
+        sample = rng.sample(records, n // 10)
+        outcomes = [rng.choice(("CORRECT", "INCORRECT", "PARTIAL")) for _ in sample]
+        singles = min(1000, len(sample) // 2)
+        t = time.perf_counter()
+        for rec, outcome in zip(sample[:singles], outcomes):
+            ls.evaluate_prediction(rec.prediction_id, outcome, 101.0)
+        report["evaluate_per_prediction_ms"] = round((time.perf_counter() - t) * 1000 / singles, 4)
+
+        batch = ls.batch_evaluate([
+            {"prediction_id": rec.prediction_id, "outcome": outcome, "price_now": 101.0}
+            for rec, outcome in zip(sample[singles:], outcomes[singles:])
+        ])
+        report["batch_evaluate"] = batch
+
+        queries = {
+            "model_accuracy": lambda: ls.get_model_accuracy("gpt"),
+            "strategy_accuracy": lambda: ls.get_strategy_accuracy("breakout"),
+            "symbol_insights": lambda: ls.get_symbol_insights("SYM7"),
+            "learning_summary": ls.get_learning_summary,
+        }
+        for name, fn in queries.items():
+            t = time.perf_counter()
+            for _ in range(20):
+                fn()
+            report[f"{name}_ms"] = round((time.perf_counter() - t) * 1000 / 20, 3)
+        return report
+    finally:
+        if own_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    print(json.dumps(benchmark(), indent=2))
@@ -11,15 +11,22 @@ Data sources:
   • MarketAnalyzer (real RSI/MACD/Bollinger)
   • Alternative.me Fear & Greed Index
   • CoinPaprika global stats
+
+The five scan sections run concurrently and ticker quotes are fetched
+through the shared ``UniverseScanner`` pool.
 """
 
+import heapq
 import json
 import logging
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
 
+from universe_scan import get_universe_scanner
+
 try:
     from ai_provider import EnhancedAIEngine
     AI_AVAILABLE = True
@@ -102,11 +109,11 @@ class AIMarketIntelligence:
 
     def comprehensive_market_scan(self) -> Dict:
         """Full market scan from real data."""
-        us_stocks = self._scan_us_markets()
-        canadian_stocks = self._scan_canadian_markets()
-        crypto_data = self._scan_crypto_markets()
-        whale_data = self._scan_whale_activity()
-        news_data = self._scan_market_news()
+        with ThreadPoolExecutor(max_workers=5, thread_name_prefix="intel-scan") as pool:
+            futures = [pool.submit(fn) for fn in (
+                self._scan_us_markets, self._scan_canadian_markets, self._scan_crypto_markets,
+                self._scan_whale_activity, self._scan_market_news)]
+        us_stocks, canadian_stocks, crypto_data, whale_data, news_data = (f.result() for f in futures)
 
         return {
             "us_markets": us_stocks,
@@ -179,25 +186,11 @@ class AIMarketIntelligence:
             # Fetch top tickers from Yahoo Finance chart API
             tickers = ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "META", "TSLA", "JPM", "V", "JNJ",
                         "UNH", "HD", "PG", "MA", "DIS", "NFLX", "ADBE", "CRM", "PYPL", "INTC"]
-            for t in tickers:
-                try:
-                    r = requests.get(
-                        f"https://query1.finance.yahoo.com/v8/finance/chart/{t}",
-                        params={"range": "2d", "interval": "1d"},
-                        headers={"User-Agent": "Mozilla/5.0"}, timeout=6)
-                    if r.status_code == 200:
-                        meta = r.json()["chart"]["result"][0]["meta"]
-                        prev = meta.get("chartPreviousClose", meta.get("previousClose", 0))
-                        price = meta.get("regularMarketPrice", prev)
-                        chg = ((price - prev) / prev * 100) if prev else 0
-                        stocks.append({"symbol": t, "price": round(price, 2),
-                                       "change_percent": round(chg, 2), "sector": "US Stock"})
-                except Exception:
-                    continue
+            stocks = self._fetch_quotes(tickers, "US Stock")
 
         gainers = [s for s in stocks if s.get("change_percent", 0) > 0]
         losers = [s for s in stocks if s.get("change_percent", 0) < 0]
-        opps = sorted(stocks, key=lambda x: abs(x.get("change_percent", 0)), reverse=True)[:5]
+        opps = heapq.nlargest(5, stocks, key=lambda x: abs(x.get("change_percent", 0)))
         vol_up = sum(abs(s.get("change_percent", 0)) for s in stocks) / max(1, len(stocks))
 
         result = {
@@ -211,6 +204,13 @@ class AIMarketIntelligence:
         _store("us_markets", result)
         return result
 
+    @staticmethod
+    def _fetch_quotes(tickers: List[str], sector: str) -> List[Dict]:
+        """Yahoo quotes for ``tickers``, fetched concurrently."""
+        return [{"symbol": q["symbol"], "price": q["price"],
+                 "change_percent": q["change_pct"], "sector": sector}
+                for q in get_universe_scanner().fetch_many(tickers)]
+
     def _scan_canadian_markets(self) -> Dict:
         cached = _cached("ca_markets")
         if cached:
@@ -226,25 +226,11 @@ class AIMarketIntelligence:
         if not stocks:
             tickers = ["RY.TO", "TD.TO", "ENB.TO", "CNR.TO", "BMO.TO", "SHOP.TO",
                         "BNS.TO", "CP.TO", "SU.TO", "TRP.TO"]
-            for t in tickers:
-                try:
-                    r = requests.get(
-                        f"https://query1.finance.yahoo.com/v8/finance/chart/{t}",
-                        params={"range": "2d", "interval": "1d"},
-                        headers={"User-Agent": "Mozilla/5.0"}, timeout=6)
-                    if r.status_code == 200:
-                        meta = r.json()["chart"]["result"][0]["meta"]
-                        prev = meta.get("chartPreviousClose", 0)
-                        price = meta.get("regularMarketPrice", prev)
-                        chg = ((price - prev) / prev * 100) if prev else 0
-                        stocks.append({"symbol": t, "price": round(price, 2),
-                                       "change_percent": round(chg, 2), "sector": "CA Stock"})
-                except Exception:
-                    continue
+            stocks = self._fetch_quotes(tickers, "CA Stock")
 
         gainers = [s for s in stocks if s.get("change_percent", 0) > 0]
         losers = [s for s in stocks if s.get("change_percent", 0) < 0]
-        opps = sorted(stocks, key=lambda x: abs(x.get("change_percent", 0)), reverse=True)[:5]
+        opps = heapq.nlargest(5, stocks, key=lambda x: abs(x.get("change_percent", 0)))
 
         result = {
             "total_scanned": len(stocks), "gainers": len(gainers), "losers": len(losers),
@@ -290,8 +276,8 @@ class AIMarketIntelligence:
         result = {
             "total_scanned": len(cryptos),
             "trending_up": len(trending_up), "trending_down": len(trending_down),
-            "top_gainers": sorted(cryptos, key=lambda x: x.get("change_percent", 0), reverse=True)[:10],
-            "top_losers": sorted(cryptos, key=lambda x: x.get("change_percent", 0))[:10],
+            "top_gainers": heapq.nlargest(10, cryptos, key=lambda x: x.get("change_percent", 0)),
+            "top_losers": heapq.nsmallest(10, cryptos, key=lambda x: x.get("change_percent", 0)),
             "market_cap_total": global_stats.get("market_cap_total", "N/A"),
             "btc_dominance": global_stats.get("btc_dominance", "N/A"),
             "volume_24h": global_stats.get("volume_24h", "N/A"),
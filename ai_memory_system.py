@@ -2,44 +2,280 @@
 """
 AI Memory System - Persistent Memory for All AI Agents
 Remembers everything: conversations, commands, data, learnings
+
+Each thread reuses one pooled SQLite connection in WAL mode, so readers
+and the writer no longer serialize on the rollback journal; a thread's
+connection is closed when the thread exits. High-frequency market data /
+events can be written in batches; deferred rows are flushed at
+FLUSH_SIZE rows or FLUSH_INTERVAL seconds after the first buffered row
+(by a timer, so a quiet buffer never waits for the next write), before
+stats / compaction read the tables, and on close() or interpreter exit.
+Conversations, commands and learnings are mirrored into an FTS5 index by
+triggers, so search_memory is a ranked index lookup instead of LIKE scans.
+compact() applies per-table retention, downsamples old market data into
+hourly/daily rollups and reclaims freed pages with incremental vacuum (its
+first run converts a database created without it); row counts are kept
+current by triggers so get_memory_stats never scans.
 """
 
 import os
+import re
 import json
+import time
+import atexit
 import sqlite3
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+import threading
+import weakref
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any, Iterable, Tuple
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('AIMemory')
 
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-16000',      # ~16 MB page cache per connection
+)
+
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_conversations_user_ts ON conversations(user_id, timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_conversations_ts ON conversations(timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_commands_user_ts ON commands(user_id, timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_commands_status_ts ON commands(status, timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_commands_ts ON commands(timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_learnings_type_ts ON learnings(learning_type, timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_learnings_ts ON learnings(timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_market_data_symbol_ts ON market_data(symbol, data_type, timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_market_data_ts ON market_data(timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_predictions_symbol_ts ON predictions(symbol, timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_predictions_ts ON predictions(timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_events_type_ts ON events(event_type, timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_events_ts ON events(timestamp)',
+)
+
+# Full-text index over conversations, commands and learnings. The FTS rowid
+# encodes the source row (id * 4 + kind code) so triggers can delete by rowid.
+FTS_KINDS = {
+    'conversation': (1, 'conversations', 'content', "''", 'user_id'),
+    'command': (2, 'commands', 'command', "''", 'user_id'),
+    'learning': (3, 'learnings', 'content', 'subject', 'NULL'),
+}
+FTS_VERSION = '1'
+# Ranking considers at most this many of the most recent matches per kind,
+# which keeps latency flat for very common terms as the database grows
+FTS_CANDIDATES = 2000
+
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5(
+        content, subject,
+        kind UNINDEXED, user_id UNINDEXED, ts UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+
+def _fts_triggers() -> List[str]:
+    triggers = []
+    for kind, (code, table, content, subject, user) in FTS_KINDS.items():
+        new = {'content': f'new.{content}',
+               'subject': subject if subject in ("''", 'NULL') else f'new.{subject}',
+               'user': user if user == 'NULL' else f'new.{user}'}
+        insert = (f"INSERT INTO memory_fts (rowid, content, subject, kind, user_id, ts) "
+                  f"VALUES (new.id * 4 + {code}, {new['content']}, {new['subject']}, "
+                  f"'{kind}', {new['user']}, new.timestamp);")
+        delete = f"DELETE FROM memory_fts WHERE rowid = old.id * 4 + {code};"
+        triggers += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN {delete} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE ON {table} "
+            f"BEGIN {delete} {insert} END",
+        ]
+    return triggers
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into a safe FTS5 query
+    
+    Words are ANDed, ``"quoted words"`` are phrases, a trailing ``*`` makes
+    a prefix query and a bare ``OR`` between terms is kept as an operator.
+    """
+    parts = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text):
+        if word == 'OR':
+            if parts and parts[-1] != 'OR':
+                parts.append('OR')
+            continue
+        terms = re.findall(r'\w+', phrase or word)
+        if terms:
+            prefix = '*' if word.endswith('*') else ''
+            parts.append('"' + ' '.join(terms) + '"' + prefix)
+    while parts and parts[-1] == 'OR':
+        parts.pop()
+    return ' '.join(parts)
+
+
+def _sql_time(value) -> Optional[str]:
+    """Datetime/ISO string → the 'YYYY-MM-DD HH:MM:SS' form stored in timestamp columns"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value).replace('T', ' ')[:19]
+
+
+# Retention: rows older than this many days are deleted by compact().
+# market_data is not deleted outright but rolled up (see below).
+RETENTION_DAYS = {
+    'conversations': 365,
+    'commands': 180,
+    'events': 90,
+    'predictions': 365,
+}
+MARKET_RAW_DAYS = 7         # raw market_data → hourly rollups after this
+MARKET_HOURLY_DAYS = 90     # hourly rollups → daily rollups after this
+MARKET_DAILY_DAYS = 730     # daily rollups deleted after this
+VACUUM_PAGES = 5000         # free pages returned to the OS per compaction
+
+COUNTED_TABLES = ('conversations', 'commands', 'learnings', 'market_data',
+                  'predictions', 'user_preferences', 'events', 'market_data_rollups')
+
+
+def _numeric_stats(data: str) -> Dict[str, list]:
+    """{field: [min, max, sum, count]} for the numeric top-level fields of a JSON object"""
+    try:
+        obj = json.loads(data)
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(obj, dict):
+        return {}
+    return {k: [v, v, v, 1] for k, v in obj.items()
+            if isinstance(v, (int, float)) and not isinstance(v, bool)}
+
+
+def _merge_stats(a: Dict[str, list], b: Dict[str, list]) -> Dict[str, list]:
+    for key, (lo, hi, total, n) in b.items():
+        if key in a:
+            cur = a[key]
+            a[key] = [min(cur[0], lo), max(cur[1], hi), cur[2] + total, cur[3] + n]
+        else:
+            a[key] = [lo, hi, total, n]
+    return a
+
+
+# Buffered (deferred) writes are flushed at this size or age
+FLUSH_SIZE = 500
+FLUSH_INTERVAL = 2.0
+
+
+class _ThreadConnection:
+    """Holds one thread's connection in ``threading.local``.
+
+    The holder is dropped with the thread's local storage when the thread
+    exits, and its finaliser closes the connection and removes it from the pool.
+    ``generation`` is the pool generation the connection was opened in; a
+    ``close()`` starts a new one, and a thread still holding an older
+    connection swaps it for a fresh one on its next call.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, pool: List[sqlite3.Connection],
+                 pool_lock: threading.Lock, generation: int):
+        self.conn = conn
+        self.generation = generation
+        weakref.finalize(self, _release_connection, conn, pool, pool_lock)
+
+
+def _release_connection(conn: sqlite3.Connection, pool: List[sqlite3.Connection],
+                        pool_lock: threading.Lock):
+    with pool_lock:
+        if conn in pool:
+            pool.remove(conn)
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
 
 class AIMemorySystem:
     """Persistent memory system for AI agents"""
     
-    def __init__(self, db_path: str = 'data/ai_memory.db'):
+    def __init__(self, db_path: str = 'data/ai_memory.db', retention: Dict[str, int] = None):
         """Initialize AI Memory System
         
         Args:
             db_path: Path to SQLite database
+            retention: Per-table retention days overriding RETENTION_DAYS
         """
         self.db_path = db_path
+        self.retention = {**RETENTION_DAYS, **(retention or {})}
+        self._local = threading.local()
+        self._pool: List[sqlite3.Connection] = []
+        self._pool_lock = threading.Lock()
+        self._pool_generation = 0  # bumped by close()
+        
+        # Write buffers for high-frequency tables (see remember_*(defer=True))
+        self._buffers: Dict[str, list] = {'market_data': [], 'events': []}
+        self._buffer_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
         
         # Ensure data directory exists
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
         
         # Initialize database
         self._init_database()
+        atexit.register(self.flush)
         
         logger.info("🧠 AI Memory System initialized")
         logger.info(f"   Database: {db_path}")
     
+    def _connect(self) -> sqlite3.Connection:
+        """Pooled connection for the calling thread (WAL, tuned pragmas)"""
+        holder = getattr(self._local, 'holder', None)
+        if holder is None or holder.generation != self._pool_generation:
+            # First call on this thread, or close() ran since its connection was
+            # opened; replacing the holder closes the old connection
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            with self._pool_lock:
+                self._pool.append(conn)
+                generation = self._pool_generation
+            self._local.holder = _ThreadConnection(conn, self._pool, self._pool_lock, generation)
+            return conn
+        conn = holder.conn
+        if conn.in_transaction:
+            # A previous call on this thread failed before committing
+            conn.rollback()
+        return conn
+    
+    def close(self):
+        """Flush buffered writes and retire every pooled connection
+        
+        The calling thread's connection is closed now. Other live threads may
+        be using theirs, so each closes its own on its next call (and opens a
+        new one) or when it exits.
+        """
+        self.flush()
+        with self._pool_lock:
+            self._pool_generation += 1
+        if getattr(self._local, 'holder', None) is not None:
+            del self._local.holder  # its finaliser closes the connection
+    
     def _init_database(self):
         """Initialize database tables"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
+        # Incremental auto-vacuum lets compact() return free pages in small steps.
+        # Switching needs a VACUUM: instant on a new, empty database; an existing
+        # one is converted by its next compact() rather than at startup
+        if cursor.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()[0] == 0:
+            cursor.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            cursor.execute('VACUUM')
+        
         # Conversations table - Everything said to/by AI
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS conversations (
@@ -130,11 +366,77 @@ class AIMemorySystem:
             )
         ''')
         
+        # Market data rollups - Downsampled market_data (hour/day buckets)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS market_data_rollups (
+                symbol TEXT NOT NULL,
+                data_type TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                period_start TEXT NOT NULL,
+                samples INTEGER NOT NULL,
+                first_data TEXT,
+                last_data TEXT,
+                source TEXT,
+                stats TEXT,
+                PRIMARY KEY (symbol, data_type, bucket, period_start)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_rollups_bucket_period '
+                       'ON market_data_rollups(bucket, period_start)')
+        
+        for index in INDEXES:
+            cursor.execute(index)
+        
         conn.commit()
-        conn.close()
+        
+        self._init_counts(conn)
+        self.fts_enabled = self._init_fts(conn)
         
         logger.info("✅ Memory database initialized with 7 tables")
     
+    def _init_counts(self, conn: sqlite3.Connection):
+        """Trigger-maintained row counts for get_memory_stats; seeded once"""
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS memory_meta (key TEXT PRIMARY KEY, value TEXT)')
+            conn.execute('CREATE TABLE IF NOT EXISTS memory_counts (name TEXT PRIMARY KEY, rows INTEGER NOT NULL)')
+            for table in COUNTED_TABLES:
+                conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_count_ai AFTER INSERT ON {table} "
+                             f"BEGIN UPDATE memory_counts SET rows = rows + 1 WHERE name = '{table}'; END")
+                conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_count_ad AFTER DELETE ON {table} "
+                             f"BEGIN UPDATE memory_counts SET rows = rows - 1 WHERE name = '{table}'; END")
+            if conn.execute("SELECT 1 FROM memory_meta WHERE key = 'counts_seeded'").fetchone() is None:
+                for table in COUNTED_TABLES:
+                    conn.execute(f"INSERT OR REPLACE INTO memory_counts (name, rows) "
+                                 f"SELECT '{table}', COUNT(*) FROM {table}")
+                conn.execute("INSERT INTO memory_meta (key, value) VALUES ('counts_seeded', '1')")
+    
+    def _init_fts(self, conn: sqlite3.Connection) -> bool:
+        """Create the FTS5 index and its triggers; backfill it once"""
+        try:
+            with conn:
+                conn.execute(FTS_SCHEMA)
+                for trigger in _fts_triggers():
+                    conn.execute(trigger)
+                conn.execute('CREATE TABLE IF NOT EXISTS memory_meta (key TEXT PRIMARY KEY, value TEXT)')
+                row = conn.execute("SELECT value FROM memory_meta WHERE key = 'fts_version'").fetchone()
+                if row is None or row[0] != FTS_VERSION:
+                    self._rebuild_fts(conn)
+                    conn.execute("INSERT OR REPLACE INTO memory_meta (key, value) VALUES ('fts_version', ?)",
+                                 (FTS_VERSION,))
+            return True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"⚠️  FTS5 unavailable, search_memory falls back to LIKE scans: {e}")
+            return False
+    
+    @staticmethod
+    def _rebuild_fts(conn: sqlite3.Connection):
+        conn.execute('DELETE FROM memory_fts')
+        for kind, (code, table, content, subject, user) in FTS_KINDS.items():
+            conn.execute(f"""
+                INSERT INTO memory_fts (rowid, content, subject, kind, user_id, ts)
+                SELECT id * 4 + {code}, {content}, {subject}, '{kind}', {user}, timestamp FROM {table}
+            """)
+    
     def remember_conversation(self, user_id: str, role: str, content: str, 
                              ai_type: str = None, metadata: Dict = None):
         """Remember a conversation message
@@ -146,7 +448,7 @@ class AIMemorySystem:
             ai_type: Type of AI (optional)
             metadata: Additional metadata (optional)
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -155,7 +457,6 @@ class AIMemorySystem:
         ''', (user_id, role, content, ai_type, json.dumps(metadata) if metadata else None))
         
         conn.commit()
-        conn.close()
         
         logger.debug(f"💭 Remembered conversation: {role} message from {user_id}")
     
@@ -170,7 +471,7 @@ class AIMemorySystem:
         Returns:
             Command ID
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -180,7 +481,6 @@ class AIMemorySystem:
         
         command_id = cursor.lastrowid
         conn.commit()
-        conn.close()
         
         logger.info(f"📝 Command remembered: '{command}' from {user_id}")
         return command_id
@@ -195,7 +495,7 @@ class AIMemorySystem:
             result: Execution result (optional)
             error: Error message if failed (optional)
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -206,7 +506,6 @@ class AIMemorySystem:
         ''', (status, json.dumps(result) if result else None, error, command_id))
         
         conn.commit()
-        conn.close()
         
         logger.info(f"✅ Command {command_id} status updated: {status}")
     
@@ -222,7 +521,7 @@ class AIMemorySystem:
             confidence: Confidence level (0-1)
             metadata: Additional metadata
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -232,12 +531,11 @@ class AIMemorySystem:
               json.dumps(metadata) if metadata else None))
         
         conn.commit()
-        conn.close()
         
         logger.info(f"🧠 New learning: {learning_type} about {subject} (confidence: {confidence:.0%})")
     
     def remember_market_data(self, symbol: str, data_type: str, 
-                           data: Dict, source: str = None):
+                           data: Dict, source: str = None, defer: bool = False):
         """Remember market data
         
         Args:
@@ -245,8 +543,13 @@ class AIMemorySystem:
             data_type: Type of data (price/volume/sentiment/etc)
             data: Data content
             source: Data source
+            defer: Buffer the row and write it with the next batch
         """
-        conn = sqlite3.connect(self.db_path)
+        if defer:
+            self._buffer('market_data', (symbol, data_type, json.dumps(data), source))
+            return
+        
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -255,7 +558,6 @@ class AIMemorySystem:
         ''', (symbol, data_type, json.dumps(data), source))
         
         conn.commit()
-        conn.close()
         
         logger.debug(f"📊 Market data remembered: {symbol} - {data_type}")
     
@@ -268,7 +570,7 @@ class AIMemorySystem:
             prediction: Prediction content
             confidence: Confidence level
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -277,7 +579,6 @@ class AIMemorySystem:
         ''', (symbol, prediction, confidence))
         
         conn.commit()
-        conn.close()
         
         logger.info(f"🔮 Prediction remembered: {symbol}")
     
@@ -289,29 +590,36 @@ class AIMemorySystem:
             key: Preference key
             value: Preference value
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('''
-            INSERT OR REPLACE INTO user_preferences (user_id, preference_key, preference_value)
+            INSERT INTO user_preferences (user_id, preference_key, preference_value)
             VALUES (?, ?, ?)
+            ON CONFLICT(user_id, preference_key) DO UPDATE SET
+                preference_value = excluded.preference_value,
+                timestamp = CURRENT_TIMESTAMP
         ''', (user_id, key, value))
         
         conn.commit()
-        conn.close()
         
         logger.info(f"⚙️  Preference remembered: {user_id} - {key}={value}")
     
     def remember_event(self, event_type: str, event_data: Dict, 
-                      importance: str = 'normal'):
+                      importance: str = 'normal', defer: bool = False):
         """Remember an event
         
         Args:
             event_type: Type of event
             event_data: Event data
             importance: Event importance (low/normal/high/critical)
+            defer: Buffer the event and write it with the next batch
         """
-        conn = sqlite3.connect(self.db_path)
+        if defer:
+            self._buffer('events', (event_type, json.dumps(event_data), importance))
+            return
+        
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -320,10 +628,75 @@ class AIMemorySystem:
         ''', (event_type, json.dumps(event_data), importance))
         
         conn.commit()
-        conn.close()
         
         logger.info(f"📌 Event remembered: {event_type} ({importance})")
     
+    def remember_market_data_batch(self, rows: Iterable[Tuple]) -> int:
+        """Remember many market data rows in one transaction
+        
+        Args:
+            rows: (symbol, data_type, data, source) tuples
+            
+        Returns:
+            Number of rows written
+        """
+        rows = [(r[0], r[1], r[2] if isinstance(r[2], str) else json.dumps(r[2]),
+                 r[3] if len(r) > 3 else None) for r in rows]
+        return self._write_batch('market_data', rows)
+    
+    def remember_events_batch(self, events: Iterable[Tuple]) -> int:
+        """Remember many events in one transaction
+        
+        Args:
+            events: (event_type, event_data, importance) tuples
+            
+        Returns:
+            Number of events written
+        """
+        rows = [(e[0], e[1] if isinstance(e[1], str) else json.dumps(e[1]),
+                 e[2] if len(e) > 2 else 'normal') for e in events]
+        return self._write_batch('events', rows)
+    
+    _BATCH_SQL = {
+        'market_data': 'INSERT INTO market_data (symbol, data_type, data, source) VALUES (?, ?, ?, ?)',
+        'events': 'INSERT INTO events (event_type, event_data, importance) VALUES (?, ?, ?)',
+    }
+    
+    def _write_batch(self, table: str, rows: List[Tuple]) -> int:
+        if not rows:
+            return 0
+        conn = self._connect()
+        with conn:
+            conn.executemany(self._BATCH_SQL[table], rows)
+        logger.debug(f"💾 Wrote {len(rows)} {table} rows in one batch")
+        return len(rows)
+    
+    def _buffer(self, table: str, row: Tuple):
+        with self._buffer_lock:
+            self._buffers[table].append(row)
+            due = sum(len(b) for b in self._buffers.values()) >= FLUSH_SIZE
+            if not due and self._flush_timer is None:
+                # First row since the last flush: write it within FLUSH_INTERVAL
+                self._flush_timer = threading.Timer(FLUSH_INTERVAL, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+        if due:
+            self.flush()
+    
+    def flush(self) -> int:
+        """Write all buffered market data and events
+        
+        Returns:
+            Number of rows written
+        """
+        with self._buffer_lock:
+            pending = {t: rows for t, rows in self._buffers.items() if rows}
+            self._buffers = {t: [] for t in self._buffers}
+            timer, self._flush_timer = self._flush_timer, None
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+        return sum(self._write_batch(t, rows) for t, rows in pending.items())
+    
     def recall_conversations(self, user_id: str, limit: int = 100) -> List[Dict]:
         """Recall conversation history
         
@@ -334,7 +707,7 @@ class AIMemorySystem:
         Returns:
             List of conversation messages
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -355,7 +728,6 @@ class AIMemorySystem:
                 'metadata': json.loads(row[4]) if row[4] else None
             })
         
-        conn.close()
         
         return list(reversed(conversations))  # Oldest first
     
@@ -371,7 +743,7 @@ class AIMemorySystem:
         Returns:
             List of commands
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         query = 'SELECT id, user_id, command, parameters, status, result, timestamp, executed_at, error FROM commands WHERE 1=1'
@@ -404,7 +776,6 @@ class AIMemorySystem:
                 'error': row[8]
             })
         
-        conn.close()
         
         return commands
     
@@ -420,7 +791,7 @@ class AIMemorySystem:
         Returns:
             List of learnings
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         query = 'SELECT learning_type, subject, content, confidence, timestamp, metadata FROM learnings WHERE 1=1'
@@ -450,7 +821,6 @@ class AIMemorySystem:
                 'metadata': json.loads(row[5]) if row[5] else None
             })
         
-        conn.close()
         
         return learnings
     
@@ -464,7 +834,7 @@ class AIMemorySystem:
         Returns:
             Preference value or None
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -474,7 +844,6 @@ class AIMemorySystem:
         ''', (user_id, key))
         
         result = cursor.fetchone()
-        conn.close()
         
         return result[0] if result else None
     
@@ -484,94 +853,286 @@ class AIMemorySystem:
         Returns:
             Statistics dictionary
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        stats = {}
+        self.flush()
+        conn = self._connect()
+        counts = dict(conn.execute('SELECT name, rows FROM memory_counts'))
         
-        # Count records in each table
+        # Record counts per table (maintained by triggers, no table scans)
         tables = ['conversations', 'commands', 'learnings', 'market_data', 
                  'predictions', 'user_preferences', 'events']
-        
-        for table in tables:
-            cursor.execute(f'SELECT COUNT(*) FROM {table}')
-            count = cursor.fetchone()[0]
-            stats[table] = count
+        stats = {table: counts.get(table, 0) for table in tables}
         
         # Total memory
         stats['total_memories'] = sum(stats.values())
+        stats['market_data_rollups'] = counts.get('market_data_rollups', 0)
         
         # Database size
         stats['database_size_kb'] = os.path.getsize(self.db_path) / 1024
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        stats['free_kb'] = conn.execute('PRAGMA freelist_count').fetchone()[0] * page_size / 1024
         
-        conn.close()
+        row = conn.execute("SELECT value FROM memory_meta WHERE key = 'last_compaction'").fetchone()
+        stats['last_compaction'] = json.loads(row[0]) if row else None
         
         return stats
     
-    def search_memory(self, query: str, limit: int = 50) -> List[Dict]:
-        """Search across all memories
+    def recall_market_history(self, symbol: str, data_type: str = None,
+                              bucket: str = 'hour', limit: int = 500) -> List[Dict]:
+        """Recall downsampled market data
         
         Args:
-            query: Search query
-            limit: Maximum results
+            symbol: Asset symbol
+            data_type: Filter by data type (optional)
+            bucket: 'hour' or 'day'
+            limit: Maximum periods to recall
             
         Returns:
-            Search results from all tables
+            Rollup periods, oldest first, with per-field min/max/avg
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        results = []
-        
-        # Search conversations
-        cursor.execute('''
-            SELECT 'conversation' as type, content, timestamp
-            FROM conversations
-            WHERE content LIKE ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (f'%{query}%', limit // 5))
+        query = ('SELECT data_type, period_start, samples, first_data, last_data, source, stats '
+                 'FROM market_data_rollups WHERE symbol = ? AND bucket = ?')
+        params: List[Any] = [symbol, bucket]
+        if data_type:
+            query += ' AND data_type = ?'
+            params.append(data_type)
+        query += ' ORDER BY period_start DESC LIMIT ?'
+        params.append(limit)
         
-        for row in cursor.fetchall():
-            results.append({
-                'type': row[0],
-                'content': row[1],
-                'timestamp': row[2]
+        history = []
+        for row in self._connect().execute(query, params):
+            stats = json.loads(row[6]) if row[6] else {}
+            history.append({
+                'data_type': row[0],
+                'period_start': row[1],
+                'samples': row[2],
+                'first': json.loads(row[3]) if row[3] else None,
+                'last': json.loads(row[4]) if row[4] else None,
+                'source': row[5],
+                'fields': {k: {'min': lo, 'max': hi, 'avg': total / n}
+                           for k, (lo, hi, total, n) in stats.items()},
             })
+        return list(reversed(history))
+    
+    # ---- Retention & compaction ----------------------------------------
+    
+    def compact(self, vacuum_pages: int = VACUUM_PAGES) -> Dict:
+        """Apply retention, downsample market data and reclaim free pages
         
-        # Search commands
-        cursor.execute('''
-            SELECT 'command' as type, command, timestamp
-            FROM commands
-            WHERE command LIKE ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (f'%{query}%', limit // 5))
+        Args:
+            vacuum_pages: Free pages to release this run (None = all)
+            
+        Returns:
+            Report with rows deleted/rolled up, reclaimed bytes and time taken
+        """
+        self.flush()
+        start = time.perf_counter()
+        size_before = self._disk_bytes()
+        conn = self._connect()
+        
+        report = {'deleted': {}, 'rolled_up': {}}
+        with conn:
+            # Downsample before deleting: raw → hourly → daily
+            report['rolled_up']['hourly'] = self._rollup(
+                conn, 'hour', MARKET_RAW_DAYS,
+                'SELECT symbol, data_type, timestamp, 1, data, data, source, NULL '
+                'FROM market_data WHERE timestamp < ? ORDER BY symbol, data_type, timestamp',
+                'DELETE FROM market_data WHERE timestamp < ?')
+            report['rolled_up']['daily'] = self._rollup(
+                conn, 'day', MARKET_HOURLY_DAYS,
+                "SELECT symbol, data_type, period_start, samples, first_data, last_data, source, stats "
+                "FROM market_data_rollups WHERE bucket = 'hour' AND period_start < ? "
+                "ORDER BY symbol, data_type, period_start",
+                "DELETE FROM market_data_rollups WHERE bucket = 'hour' AND period_start < ?")
+            report['deleted']['market_data_rollups'] = conn.execute(
+                "DELETE FROM market_data_rollups WHERE bucket = 'day' AND period_start < datetime('now', ?)",
+                (f'-{MARKET_DAILY_DAYS} days',)).rowcount
+            
+            for table, days in self.retention.items():
+                if days:
+                    report['deleted'][table] = conn.execute(
+                        f"DELETE FROM {table} WHERE timestamp < datetime('now', ?)",
+                        (f'-{int(days)} days',)).rowcount
+        
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            # Database created before incremental auto-vacuum: one-time full rewrite
+            conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            conn.execute('VACUUM')
+            report['converted_auto_vacuum'] = True
+        
+        # Release free pages, then fold the WAL back into the main file
+        free_before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        pages = free_before if vacuum_pages is None else vacuum_pages
+        conn.execute(f'PRAGMA incremental_vacuum({int(pages)})').fetchall()
+        report['freed_pages'] = free_before - conn.execute('PRAGMA freelist_count').fetchone()[0]
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+        
+        report['reclaimed_bytes'] = max(0, size_before - self._disk_bytes())
+        report['seconds'] = round(time.perf_counter() - start, 3)
+        report['timestamp'] = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO memory_meta (key, value) VALUES ('last_compaction', ?)",
+                         (json.dumps(report),))
+        
+        logger.info(f"🧹 Memory compacted: reclaimed {report['reclaimed_bytes'] / 1024:.0f} KB "
+                    f"in {report['seconds']}s")
+        return report
+    
+    def _rollup(self, conn: sqlite3.Connection, bucket: str, after_days: int,
+                select_sql: str, delete_sql: str) -> int:
+        """Merge source rows older than ``after_days`` into ``bucket`` rollups
         
-        for row in cursor.fetchall():
-            results.append({
-                'type': row[0],
-                'content': row[1],
-                'timestamp': row[2]
-            })
+        The select yields (symbol, data_type, time, samples, first, last,
+        source, stats) ordered by symbol, data_type, time; rows landing
+        in a period that already has a rollup are merged into it.
+        """
+        cutoff = conn.execute("SELECT datetime('now', ?)", (f'-{after_days} days',)).fetchone()[0]
+        fmt = '%Y-%m-%d %H:00:00' if bucket == 'hour' else '%Y-%m-%d 00:00:00'
+        
+        groups: Dict[tuple, dict] = {}
+        rows = 0
+        cursor = conn.execute(select_sql, (cutoff,))
+        for symbol, data_type, ts, samples, first, last, source, stats in cursor:
+            rows += 1
+            period = datetime.strptime(ts[:19], '%Y-%m-%d %H:%M:%S').strftime(fmt)
+            key = (symbol, data_type, period)
+            stats = json.loads(stats) if stats else _numeric_stats(last)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = {'samples': samples, 'first': first, 'last': last,
+                               'source': source, 'stats': stats}
+            else:
+                group['samples'] += samples
+                group['last'], group['source'] = last, source or group['source']
+                _merge_stats(group['stats'], stats)
+        if not rows:
+            return 0
+        
+        for (symbol, data_type, period), group in groups.items():
+            existing = conn.execute(
+                'SELECT samples, first_data, stats FROM market_data_rollups '
+                'WHERE symbol = ? AND data_type = ? AND bucket = ? AND period_start = ?',
+                (symbol, data_type, bucket, period)).fetchone()
+            if existing:
+                group['samples'] += existing[0]
+                group['first'] = existing[1]
+                group['stats'] = _merge_stats(json.loads(existing[2]) if existing[2] else {},
+                                              group['stats'])
+            conn.execute(
+                'INSERT INTO market_data_rollups (symbol, data_type, bucket, period_start, samples, '
+                'first_data, last_data, source, stats) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(symbol, data_type, bucket, period_start) DO UPDATE SET '
+                'samples = excluded.samples, first_data = excluded.first_data, '
+                'last_data = excluded.last_data, source = excluded.source, stats = excluded.stats',
+                (symbol, data_type, bucket, period, group['samples'], group['first'],
+                 group['last'], group['source'], json.dumps(group['stats'])))
+        conn.execute(delete_sql, (cutoff,))
+        return rows
+    
+    def _disk_bytes(self) -> int:
+        return sum(os.path.getsize(path) for path in
+                   (self.db_path, self.db_path + '-wal') if os.path.exists(path))
+    
+    def search_memory(self, query: str, limit: int = 50, user_id: str = None,
+                      types: List[str] = None, since=None, until=None,
+                      order: str = 'rank') -> List[Dict]:
+        """Search across all memories
         
-        # Search learnings
-        cursor.execute('''
-            SELECT 'learning' as type, content, timestamp
-            FROM learnings
-            WHERE content LIKE ? OR subject LIKE ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (f'%{query}%', f'%{query}%', limit // 5))
+        Args:
+            query: Search query (words, "exact phrases", prefix*, OR)
+            limit: Maximum results
+            user_id: Only conversations/commands of this user (optional)
+            types: Subset of conversation/command/learning (optional)
+            since: Earliest timestamp, datetime or ISO string (optional)
+            until: Latest timestamp, datetime or ISO string (optional)
+            order: 'rank' (best match first) or 'recent'
+            
+        Returns:
+            Search results from all tables
+        """
+        types = [t for t in (types or FTS_KINDS) if t in FTS_KINDS]
+        if not self.fts_enabled:
+            return self._search_memory_like(query, limit, user_id, types, since, until)
         
-        for row in cursor.fetchall():
-            results.append({
-                'type': row[0],
-                'content': row[1],
-                'timestamp': row[2]
-            })
+        match = fts_query(query)
+        if not match or not types:
+            return []
         
-        conn.close()
+        filters = ''
+        filter_params: List[Any] = []
+        if user_id:
+            filters += ' AND user_id = ?'
+            filter_params.append(user_id)
+        if since is not None:
+            filters += ' AND ts >= ?'
+            filter_params.append(_sql_time(since))
+        if until is not None:
+            filters += ' AND ts <= ?'
+            filter_params.append(_sql_time(until))
+        # FTS5 walks matches in rowid order cheaply. The rowid is id * 4 + kind
+        # code, so it only orders rows by age within one kind: take the newest
+        # candidates of each kind, then rank or merge them by timestamp.
+        arms, params = [], []
+        for kind in types:
+            arms.append("SELECT * FROM (SELECT rowid, kind, content, subject, user_id, ts, "
+                        "bm25(memory_fts, 1.0, 0.5) AS score "
+                        "FROM memory_fts WHERE memory_fts MATCH ? AND kind = ?"
+                        f"{filters} ORDER BY rowid DESC LIMIT ?)")
+            params += [match, kind, *filter_params, FTS_CANDIDATES]
+        sql = (f"SELECT * FROM ({' UNION ALL '.join(arms)}) ORDER BY "
+               f"{'ts DESC, rowid DESC' if order == 'recent' else 'score'} LIMIT ?")
+        params.append(limit)
+        
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+            # Snippets only for the rows actually returned
+            snippets = dict(conn.execute(
+                f"SELECT rowid, snippet(memory_fts, 0, '[', ']', '…', 12) FROM memory_fts "
+                f"WHERE memory_fts MATCH ? AND rowid IN ({','.join('?' * len(rows))})",
+                [match] + [row[0] for row in rows])) if rows else {}
+        except sqlite3.OperationalError as e:
+            logger.warning(f"⚠️  Memory search failed for {query!r}: {e}")
+            return []
+        
+        return [{
+            'type': row[1],
+            'content': row[2],
+            'timestamp': row[5],
+            'id': row[0] // 4,
+            'subject': row[3] or None,
+            'user_id': row[4],
+            'score': round(-row[6], 4),
+            'snippet': snippets.get(row[0]),
+        } for row in rows]
+    
+    def _search_memory_like(self, query: str, limit: int, user_id: str, types: List[str],
+                            since, until) -> List[Dict]:
+        """LIKE-scan search used when SQLite lacks FTS5"""
+        conn = self._connect()
+        results = []
+        for kind in types:
+            code, table, content, subject, user = FTS_KINDS[kind]
+            sql = f"SELECT '{kind}', {content}, timestamp FROM {table} WHERE ({content} LIKE ?"
+            params: List[Any] = [f'%{query}%']
+            if subject not in ("''", 'NULL'):
+                sql += f' OR {subject} LIKE ?'
+                params.append(f'%{query}%')
+            sql += ')'
+            if user_id:
+                if user == 'NULL':
+                    continue
+                sql += f' AND {user} = ?'
+                params.append(user_id)
+            if since is not None:
+                sql += ' AND timestamp >= ?'
+                params.append(_sql_time(since))
+            if until is not None:
+                sql += ' AND timestamp <= ?'
+                params.append(_sql_time(until))
+            sql += ' ORDER BY timestamp DESC LIMIT ?'
+            params.append(limit)
+            results += [{'type': r[0], 'content': r[1], 'timestamp': r[2]}
+                        for r in conn.execute(sql, params)]
         
         # Sort by timestamp
         results.sort(key=lambda x: x['timestamp'], reverse=True)
@@ -581,16 +1142,142 @@ class AIMemorySystem:
 
 # Global memory instance
 _memory_instance = None
+_memory_lock = threading.Lock()
 
 
 def get_memory() -> AIMemorySystem:
     """Get or create global memory instance"""
     global _memory_instance
     if _memory_instance is None:
-        _memory_instance = AIMemorySystem()
+        with _memory_lock:
+            if _memory_instance is None:
+                _memory_instance = AIMemorySystem()
     return _memory_instance
 
 
+def benchmark_concurrency(db_path: str, writers: int = 8, readers: int = 8,
+                          writes_per_thread: int = 200, batch_size: int = 50) -> Dict:
+    """Many writer/reader threads against one memory database
+    
+    Writers insert market data row by row and then in batches; readers
+    recall conversations and commands throughout. Returns throughput and
+    read latency for each phase.
+    """
+    import statistics
+    
+    memory = AIMemorySystem(db_path)
+    for i in range(200):
+        memory.remember_conversation(f'user{i % 10}', 'user', f'message {i}')
+    
+    def run_phase(write_fn) -> Dict:
+        stop = threading.Event()
+        latencies, errors = [], []
+        
+        def reader(n):
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    memory.recall_conversations(f'user{n % 10}', limit=20)
+                    memory.recall_commands(limit=20)
+                except sqlite3.Error as e:
+                    errors.append(str(e))
+                latencies.append(time.perf_counter() - start)
+        
+        def writer(n):
+            try:
+                write_fn(n)
+            except sqlite3.Error as e:
+                errors.append(str(e))
+        
+        read_threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+        write_threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+        start = time.perf_counter()
+        for t in read_threads + write_threads:
+            t.start()
+        for t in write_threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        for t in read_threads:
+            t.join()
+        
+        latencies.sort()
+        rows = writers * writes_per_thread
+        return {
+            'rows': rows,
+            'seconds': round(elapsed, 3),
+            'writes_per_sec': round(rows / elapsed, 1) if elapsed > 0 else None,
+            'reads': len(latencies),
+            'read_p50_ms': round(statistics.median(latencies) * 1000, 3) if latencies else None,
+            'read_p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3) if latencies else None,
+            'errors': len(errors),
+        }
+    
+    def single(n):
+        for i in range(writes_per_thread):
+            memory.remember_market_data(f'SYM{n}', 'price', {'price': i}, 'bench')
+    
+    def batched(n):
+        for start in range(0, writes_per_thread, batch_size):
+            memory.remember_market_data_batch(
+                (f'SYM{n}', 'price', {'price': i}, 'bench')
+                for i in range(start, min(start + batch_size, writes_per_thread)))
+    
+    report = {
+        'writers': writers,
+        'readers': readers,
+        'single_writes': run_phase(single),
+        'batched_writes': run_phase(batched),
+    }
+    memory.close()
+    return report
+
+
+def benchmark_search(db_path: str, sizes: Tuple[int, ...] = (10_000, 100_000),
+                     queries: int = 50, seed: int = 7) -> Dict:
+    """Search latency (FTS vs LIKE scan) as the conversation table grows"""
+    import random
+    import statistics
+    
+    rng = random.Random(seed)
+    rare = [f'token{i}' for i in range(5000)]  # each in ~0.02% of rows
+    vocab = ['bitcoin', 'ethereum', 'solana', 'breakout', 'support', 'resistance', 'whale',
+             'volume', 'rsi', 'macd', 'bullish', 'bearish', 'funding', 'liquidation',
+             'momentum', 'divergence', 'accumulation', 'halving', 'etf', 'staking']
+    memory = AIMemorySystem(db_path)
+    conn = memory._connect()
+    common_terms = [rng.choice(vocab) for _ in range(queries)]
+    rare_terms = [rng.choice(rare) for _ in range(queries)]
+    report = {'queries': queries, 'sizes': []}
+    
+    def p50(fn, terms) -> float:
+        times = []
+        for term in terms:
+            start = time.perf_counter()
+            fn(term)
+            times.append(time.perf_counter() - start)
+        return round(statistics.median(times) * 1000, 3)
+    
+    rows = 0
+    for size in sizes:
+        batch = [(f'user{i % 50}', 'user', ' '.join(rng.choices(vocab, k=12) + [rng.choice(rare)]))
+                 for i in range(size - rows)]
+        with conn:
+            conn.executemany('INSERT INTO conversations (user_id, role, content) VALUES (?, ?, ?)', batch)
+        rows = size
+        fts = lambda t: memory.search_memory(t, limit=20)
+        like = lambda t: memory._search_memory_like(t, 20, None, list(FTS_KINDS), None, None)
+        report['sizes'].append({
+            'rows': rows,
+            'common_fts_p50_ms': p50(fts, common_terms),
+            'common_like_p50_ms': p50(like, common_terms),
+            'rare_fts_p50_ms': p50(fts, rare_terms),
+            'rare_like_p50_ms': p50(like, rare_terms),
+        })
+    memory.close()
+    return report
+
+
 if __name__ == "__main__":
     # Test memory system
     print("🧠 Testing AI Memory System...")
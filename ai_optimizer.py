@@ -10,16 +10,33 @@ Self-improving AI system that continuously optimizes:
 
 Uses real performance data from ai_learning_system to make decisions.
 Zero random — all optimization is data-driven.
+
+Prediction outcomes are buffered in memory and applied in batches by a
+background flusher (every ``FLUSH_SIZE`` outcomes or ``FLUSH_INTERVAL``
+seconds), which also feeds the per-worker / per-regime isotonic curves
+of the ``CalibrationEngine``.
+
+State is persisted write-behind: mutations only mark it dirty and the
+same flusher writes it at most once per ``SAVE_INTERVAL`` seconds, plus
+once on ``close()`` / interpreter exit. Each write goes to a temp file
+that is fsynced and renamed over the state file, so after a crash the
+file holds the complete state of the last successful write — at most
+``SAVE_INTERVAL`` seconds (plus still-buffered outcomes) old, never torn.
 """
 
+import atexit
 import json
 import math
 import os
 import time
 import logging
+import threading
+from collections import deque
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Tuple
-from threading import Lock
+from threading import Lock, RLock
+
+from calibration_engine import CalibrationEngine
 
 logger = logging.getLogger(__name__)
 
@@ -35,9 +52,25 @@ class AIOptimizer:
 
     DATA_FILE = "data/ai_optimizer_state.json"
     MIN_SAMPLES = 5  # Minimum samples before adjusting weights
+    FLUSH_SIZE = 500        # Buffered outcomes that trigger a flush
+    FLUSH_INTERVAL = 5.0    # Max seconds an outcome waits in the buffer
+    SAVE_INTERVAL = 2.0     # Min seconds between two writes of the state file
 
-    def __init__(self):
+    def __init__(self, data_file: Optional[str] = None):
+        if data_file:
+            self.DATA_FILE = data_file
         self._lock = Lock()
+        self._flush_lock = Lock()
+        self._outcomes: deque = deque()
+        self._flush_event = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._save_lock = RLock()
+        self._changes = 0       # mutations so far ...
+        self._saved = 0         # ... and how many of them are on disk
+        self._wake_sent = False  # flusher already woken for the current dirty period
+        self._last_save = time.monotonic()  # the loaded file is the last save
+        self._closed = False
+        self.persistence = {"saves": 0, "failed_saves": 0, "last_save_ms": 0.0}
         self.state: Dict = {
             "version": 1,
             "last_optimization": None,
@@ -53,6 +86,7 @@ class AIOptimizer:
             # Confidence calibration: predicted vs actual
             "calibration": {
                 "buckets": {},  # "70-80" -> {correct: N, total: N}
+                "curves": {},   # CalibrationEngine sufficient statistics
             },
             # Regime-specific risk multipliers
             "regime_risk": {
@@ -64,6 +98,7 @@ class AIOptimizer:
             "task_strategy_map": {},
         }
         self._load_state()
+        self.calibration = CalibrationEngine.from_dict(self.state["calibration"].get("curves"))
 
     # ── Persistence ─────────────────────────────────────────────────
 
@@ -79,15 +114,73 @@ class AIOptimizer:
             except Exception as e:
                 logger.warning(f"AIOptimizer: Could not load state: {e}")
 
-    def save_state(self):
-        """Persist optimizer state to disk."""
-        with self._lock:
-            os.makedirs(os.path.dirname(self.DATA_FILE), exist_ok=True)
+    def save_state(self) -> bool:
+        """Persist optimizer state to disk now (atomic temp + fsync + rename).
+
+        Normally called by the background flusher; call it directly only
+        when the state must be on disk before returning.
+
+        Returns:
+            True if the state was written
+        """
+        with self._save_lock:
+            start = time.perf_counter()
+            with self._lock:
+                self.state["calibration"]["curves"] = self.calibration.to_dict()
+                payload = json.dumps(self.state, indent=2)
+                changes = self._changes
+            tmp = f"{self.DATA_FILE}.tmp"
             try:
-                with open(self.DATA_FILE, "w") as f:
-                    json.dump(self.state, f, indent=2)
+                os.makedirs(os.path.dirname(self.DATA_FILE) or ".", exist_ok=True)
+                with open(tmp, "w") as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.DATA_FILE)
             except Exception as e:
+                self.persistence["failed_saves"] += 1
                 logger.error(f"AIOptimizer: Save failed: {e}")
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                return False
+            self._saved = max(self._saved, changes)
+            if not self.dirty:
+                self._wake_sent = False
+            self._last_save = time.monotonic()
+            self.persistence["saves"] += 1
+            self.persistence["last_save_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            return True
+
+    @property
+    def dirty(self) -> bool:
+        """True while some mutation is not yet on disk."""
+        return self._changes != self._saved
+
+    def _mark_dirty(self):
+        """Schedule a write-behind save (call after mutating ``state``).
+
+        On the clean → dirty transition the flusher is woken, so it
+        schedules the save ``SAVE_INTERVAL`` after the last one instead of
+        sleeping out its idle ``FLUSH_INTERVAL`` wait.
+        """
+        if self._flusher is None or not self._flusher.is_alive():
+            self._start_flusher()
+        if self.dirty and not self._wake_sent:
+            self._wake_sent = True
+            self._flush_event.set()
+
+    def close(self):
+        """Stop the flusher, apply buffered outcomes and write pending state."""
+        self._closed = True
+        self._flush_event.set()
+        flusher = self._flusher
+        if flusher is not None and flusher is not threading.current_thread():
+            flusher.join(timeout=10)
+        self.flush_outcomes()
+        if self.dirty:
+            self.save_state()
 
     # ── Record outcomes ─────────────────────────────────────────────
 
@@ -109,38 +202,100 @@ class AIOptimizer:
             confidence: Predicted confidence (0-100)
             regime: Market regime at time of prediction
             indicators_used: Which indicators contributed
+
+        The outcome is buffered; worker, indicator and calibration
+        statistics are updated by the next flush (see ``flush_outcomes``).
         """
-        with self._lock:
-            correct = predicted_direction == actual_direction
-
-            # 1. Update worker scores
-            ws = self.state["worker_scores"]
-            if worker_name not in ws:
-                ws[worker_name] = {"correct": 0, "total": 0, "weight": 1.0}
-            ws[worker_name]["total"] += 1
-            if correct:
-                ws[worker_name]["correct"] += 1
-
-            # 2. Update indicator scores per regime
-            if indicators_used and regime in self.state["indicator_scores"]:
-                reg_scores = self.state["indicator_scores"][regime]
-                for ind in indicators_used:
-                    if ind not in reg_scores:
-                        reg_scores[ind] = {"correct": 0, "total": 0, "weight": 1.0}
-                    reg_scores[ind]["total"] += 1
-                    if correct:
-                        reg_scores[ind]["correct"] += 1
-
-            # 3. Calibration bucket
-            bucket = f"{int(confidence // 10) * 10}-{int(confidence // 10) * 10 + 10}"
-            cal = self.state["calibration"]["buckets"]
-            if bucket not in cal:
-                cal[bucket] = {"correct": 0, "total": 0}
-            cal[bucket]["total"] += 1
-            if correct:
-                cal[bucket]["correct"] += 1
+        self._outcomes.append((worker_name, predicted_direction == actual_direction,
+                               confidence, regime, tuple(indicators_used or ())))
+        self._mark_dirty()
+        if len(self._outcomes) >= self.FLUSH_SIZE:
+            self._flush_event.set()
+
+    def _start_flusher(self):
+        with self._flush_lock:
+            if self._closed or (self._flusher is not None and self._flusher.is_alive()):
+                return
+            if self._flusher is None:
+                atexit.register(self.close)
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True,
+                                             name="ai-optimizer-flush")
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._closed:
+            # Sleep until the next write is allowed while dirty, else until
+            # the buffered outcomes are due (or a size-triggered wakeup).
+            timeout = self.FLUSH_INTERVAL
+            if self.dirty:
+                since = time.monotonic() - self._last_save
+                timeout = min(timeout, max(0.01, self.SAVE_INTERVAL - since))
+            self._flush_event.wait(timeout)
+            self._flush_event.clear()
+            if self._closed:
+                break
+            try:
+                self.flush_outcomes()
+                self._save_if_due()
+            except Exception as e:
+                logger.error(f"AIOptimizer: Background flush failed: {e}")
 
-            self.save_state()
+    def _save_if_due(self):
+        """Flusher save, re-checked under the save lock so a concurrent
+        ``save_state`` that already covered the changes is not repeated."""
+        with self._save_lock:
+            if self.dirty and time.monotonic() - self._last_save >= self.SAVE_INTERVAL:
+                self.save_state()
+
+    def flush_outcomes(self) -> int:
+        """Apply all buffered outcomes and persist once.
+
+        Returns:
+            Number of outcomes applied
+        """
+        with self._flush_lock:
+            batch = []
+            while self._outcomes:
+                batch.append(self._outcomes.popleft())
+            if not batch:
+                return 0
+
+            with self._lock:
+                ws = self.state["worker_scores"]
+                ind_scores = self.state["indicator_scores"]
+                cal = self.state["calibration"]["buckets"]
+                for worker_name, correct, confidence, regime, indicators in batch:
+                    # 1. Update worker scores
+                    if worker_name not in ws:
+                        ws[worker_name] = {"correct": 0, "total": 0, "weight": 1.0}
+                    ws[worker_name]["total"] += 1
+                    ws[worker_name]["correct"] += correct
+
+                    # 2. Update indicator scores per regime
+                    if indicators and regime in ind_scores:
+                        reg_scores = ind_scores[regime]
+                        for ind in indicators:
+                            if ind not in reg_scores:
+                                reg_scores[ind] = {"correct": 0, "total": 0, "weight": 1.0}
+                            reg_scores[ind]["total"] += 1
+                            reg_scores[ind]["correct"] += correct
+
+                    # 3. Calibration bucket (coarse summary for the dashboard)
+                    bucket = f"{int(confidence // 10) * 10}-{int(confidence // 10) * 10 + 10}"
+                    if bucket not in cal:
+                        cal[bucket] = {"correct": 0, "total": 0}
+                    cal[bucket]["total"] += 1
+                    cal[bucket]["correct"] += correct
+
+            # 4. Isotonic curves (confidence is 0-100 here, 0-1 in the engine)
+            self.calibration.update((worker_name, regime, confidence / 100.0, correct)
+                                    for worker_name, correct, confidence, regime, _ in batch)
+            # Counted after the curves too, so a save that ran in between is not taken as covering them
+            with self._lock:
+                self._changes += 1
+
+        self._mark_dirty()
+        return len(batch)
 
     def record_strategy_result(
         self,
@@ -171,8 +326,9 @@ class AIOptimizer:
             entry["avg_latency"] = round(
                 (entry["avg_latency"] * (n - 1) + latency_ms) / n, 1
             )
+            self._changes += 1
 
-            self.save_state()
+        self._mark_dirty()
 
     def optimize_worker_weights(self) -> Dict[str, float]:
         """Recalculate optimal weights for each AI worker based on accuracy.
@@ -192,8 +348,10 @@ class AIOptimizer:
                 weight = max(0.1, min(2.0, accuracy * 2.0))
                 weights[name] = round(weight, 3)
                 stats["weight"] = weights[name]
+            self._changes += 1
 
-            return weights
+        self._mark_dirty()
+        return weights
 
     def optimize_indicator_weights(self, regime: str = "trending") -> Dict[str, float]:
         """Recalculate optimal indicator weights for a specific regime.
@@ -220,31 +378,48 @@ class AIOptimizer:
                 weight = max(0.1, min(2.0, (accuracy - 0.3) * 3.33))
                 weights[ind] = round(weight, 3)
                 stats["weight"] = weights[ind]
+            self._changes += 1
 
-            return weights
+        self._mark_dirty()
+        return weights
 
-    def get_calibrated_confidence(self, raw_confidence: float) -> float:
+    def get_calibrated_confidence(self, raw_confidence: float,
+                                  worker_name: Optional[str] = None,
+                                  regime: Optional[str] = None) -> float:
         """Adjust predicted confidence based on historical calibration.
 
         If we predicted 80% confidence but only 60% of those were correct,
-        we calibrate down to ~60%.
+        we calibrate down to ~60%. Uses the isotonic curve of the worker in
+        that regime, falling back to the worker's, the regime's and then
+        the global curve while the specific one has too few outcomes.
 
         Args:
             raw_confidence: The model's raw confidence (0-100)
+            worker_name: AI worker that produced the confidence
+            regime: Market regime of the prediction
 
         Returns:
             Calibrated confidence (0-100)
         """
-        bucket = f"{int(raw_confidence // 10) * 10}-{int(raw_confidence // 10) * 10 + 10}"
-        cal = self.state["calibration"]["buckets"].get(bucket)
-
-        if not cal or cal["total"] < self.MIN_SAMPLES:
+        calibrated = self.calibration.calibrate(raw_confidence / 100.0, worker_name, regime)
+        if calibrated is None:
             return raw_confidence  # Not enough data to calibrate
+        return round(max(5, min(95, calibrated * 100)), 1)
+
+    def get_reliability_diagram(self, worker_name: Optional[str] = None,
+                                regime: Optional[str] = None, bins: int = 10) -> Dict:
+        """Predicted vs observed accuracy per confidence bin, with ECE.
+
+        Args:
+            worker_name: Restrict to one worker (None = all workers)
+            regime: Restrict to one regime (None = all regimes)
+            bins: Number of confidence bins in the diagram
 
-        actual_accuracy = cal["correct"] / cal["total"] * 100
-        # Blend: 70% calibrated + 30% raw (smooth transition)
-        calibrated = actual_accuracy * 0.7 + raw_confidence * 0.3
-        return round(max(5, min(95, calibrated)), 1)
+        Returns:
+            Reliability diagram from the CalibrationEngine
+        """
+        self.flush_outcomes()
+        return self.calibration.reliability_diagram(worker_name, regime, bins)
 
     def get_optimal_strategy(self, task_type: str) -> str:
         """Return the best coordinator strategy for a given task type.
@@ -299,6 +474,8 @@ class AIOptimizer:
                 self.state["regime_risk"][regime][param] = round(
                     max(0.1, min(3.0, value)), 2
                 )
+                self._changes += 1
+        self._mark_dirty()
 
     def run_full_optimization(self) -> Dict:
         """Run a complete optimization cycle.
@@ -306,6 +483,7 @@ class AIOptimizer:
         Returns:
             Report with all optimization results.
         """
+        self.flush_outcomes()
         report = {
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "worker_weights": self.optimize_worker_weights(),
@@ -335,13 +513,15 @@ class AIOptimizer:
                     "accuracy": round(stats["correct"] / stats["total"] * 100, 1),
                     "samples": stats["total"],
                 }
+        report["calibration_reliability"] = self.calibration.reliability_diagram()
 
         # Update metadata
         with self._lock:
             self.state["optimization_count"] += 1
             self.state["last_optimization"] = report["timestamp"]
+            self._changes += 1
 
-        self.save_state()
+        self._mark_dirty()
 
         logger.info(
             "AIOptimizer: Full optimization #%d complete — %d workers, %d tasks",
@@ -364,6 +544,9 @@ class AIOptimizer:
             "overall_accuracy": self._overall_accuracy(),
             "regime_risk": self.state["regime_risk"],
             "calibration_buckets": len(self.state["calibration"]["buckets"]),
+            "calibration_curves": len(self.calibration.curves()),
+            "pending_outcomes": len(self._outcomes),
+            "persistence": {**self.persistence, "dirty": self.dirty},
         }
 
     def _overall_accuracy(self) -> float:
@@ -375,6 +558,43 @@ class AIOptimizer:
         return round(total_correct / total_all * 100, 1)
 
 
+def benchmark_persistence(records: int = 2000, data_dir: Optional[str] = None) -> Dict:
+    """``record_strategy_result`` throughput: save-per-call vs write-behind.
+
+    "before" reproduces the old behaviour (a full ``save_state`` after every
+    record); "after" is the debounced write-behind path, including the
+    final write done by ``close()``.
+    """
+    import shutil
+    import tempfile
+
+    tmp = tempfile.mkdtemp(prefix="ai_optimizer_bench_", dir=data_dir)
+    try:
+        results = {}
+        for mode in ("before", "after"):
+            opt = AIOptimizer(data_file=os.path.join(tmp, f"{mode}.json"))
+            for i in range(50):  # realistic state size: a few dozen task keys
+                opt.state["task_strategy_map"][f"task{i}:consensus"] = {
+                    "success": 10, "total": 20, "avg_latency": 900.0}
+            start = time.perf_counter()
+            for i in range(records):
+                opt.record_strategy_result(f"task{i % 50}", "consensus", i % 3 != 0, 800.0 + i % 400)
+                if mode == "before":
+                    opt.save_state()
+            opt.close()
+            elapsed = time.perf_counter() - start
+            results[mode] = {
+                "records_per_sec": round(records / elapsed),
+                "writes": opt.persistence["saves"],
+            }
+        results["speedup"] = round(results["after"]["records_per_sec"]
+                                   / max(1, results["before"]["records_per_sec"]), 1)
+        results["records"] = records
+        return results
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
 # ── Singleton ───────────────────────────────────────────────────
 
 _optimizer_instance = None
@@ -12,13 +12,17 @@ Data sources:
   • EnhancedAIEngine (OpenAI/Anthropic) when available
 """
 
-import math
 import time
 import logging
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 
+from correlation_engine import get_correlation_engine
+from monte_carlo import MonteCarloEngine
+from risk_engine import RiskEngine
+
 try:
     from ai_provider import EnhancedAIEngine, AIProviderFactory
     AI_AVAILABLE = True
@@ -121,33 +125,6 @@ def _fetch_closes(symbol: str, days: int = 90) -> List[float]:
     return closes
 
 
-def _compute_volatility(closes: List[float]) -> float:
-    """Annualized volatility from daily returns (%)."""
-    if len(closes) < 5:
-        return 25.0  # default
-    returns = [(closes[i] / closes[i - 1] - 1) for i in range(1, len(closes)) if closes[i - 1]]
-    if not returns:
-        return 25.0
-    mean_r = sum(returns) / len(returns)
-    var = sum((r - mean_r) ** 2 for r in returns) / len(returns)
-    daily_vol = math.sqrt(var)
-    return round(daily_vol * math.sqrt(365) * 100, 2)
-
-
-def _compute_beta(closes: List[float], bench_closes: List[float]) -> float:
-    """Approximate beta vs benchmark."""
-    n = min(len(closes), len(bench_closes))
-    if n < 10:
-        return 1.0
-    r_asset = [(closes[-(n - i)] / closes[-(n - i) - 1] - 1) for i in range(1, n)]
-    r_bench = [(bench_closes[-(n - i)] / bench_closes[-(n - i) - 1] - 1) for i in range(1, n)]
-    mean_a = sum(r_asset) / len(r_asset)
-    mean_b = sum(r_bench) / len(r_bench)
-    cov = sum((r_asset[i] - mean_a) * (r_bench[i] - mean_b) for i in range(len(r_asset))) / len(r_asset)
-    var_b = sum((r_bench[i] - mean_b) ** 2 for i in range(len(r_bench))) / len(r_bench)
-    return round(cov / var_b, 2) if var_b > 0 else 1.0
-
-
 # ── main class ─────────────────────────────────────────────────────
 
 class AIPredictor:
@@ -157,6 +134,8 @@ class AIPredictor:
         self.model_version = "4.0.0"
         self.use_real_ai = use_real_ai and AI_AVAILABLE
         self.ai_engine = None
+        self.monte_carlo = MonteCarloEngine()
+        self.risk_engine = RiskEngine()
         if self.use_real_ai:
             try:
                 self.ai_engine = EnhancedAIEngine()
@@ -169,8 +148,10 @@ class AIPredictor:
     def predict_price(self, symbol: str, days_ahead: int = 7) -> Dict:
         """Predict future price using historical trend + volatility.
 
-        Uses real closing prices to extrapolate a trend-based forecast.
+        Uses real closing prices to simulate Monte Carlo price paths;
+        bands are empirical quantiles across the simulated paths.
         """
+        days_ahead = max(1, min(int(days_ahead), 365))
         current_price = _fetch_live_price(symbol)
         closes = _fetch_closes(symbol)
 
@@ -199,33 +180,29 @@ class AIPredictor:
             except Exception:
                 pass
 
-        # Trend + volatility forecast from real closes
-        if len(closes) >= 10:
-            # Compute daily trend from recent 20 days
-            window = closes[-20:]
-            daily_returns = [(window[i] / window[i - 1] - 1) for i in range(1, len(window)) if window[i - 1]]
-            avg_return = sum(daily_returns) / len(daily_returns) if daily_returns else 0
-            vol = _compute_volatility(closes) / 100 / math.sqrt(365)  # daily vol
-
+        # Monte Carlo forecast from real closes
+        sim = self.monte_carlo.forecast(symbol, closes, days_ahead) if current_price > 0 else None
+        if sim:
+            q = {k: v.tolist() for k, v in sim["quantiles"].items()}
+            mean = sim["mean"].tolist()
             predictions = []
-            price = current_price
-            for day in range(1, days_ahead + 1):
-                # Simple drift + decay
-                drift = avg_return * (1 - day * 0.02)  # trend decays over time
-                price = price * (1 + drift)
-                band = price * vol * math.sqrt(day) * 1.96  # 95% CI
-                conf = max(50, 92 - day * 3)
+            for k in range(days_ahead):
+                day = k + 1
+                median = current_price * q[0.5][k]
+                spread = (q[0.95][k] - q[0.05][k]) / q[0.5][k] if q[0.5][k] else 1
                 predictions.append({
                     "day": day,
                     "date": (datetime.now(timezone.utc) + timedelta(days=day)).strftime("%Y-%m-%d"),
-                    "predicted_price": round(price, 2),
-                    "low_estimate": round(price - band, 2),
-                    "high_estimate": round(price + band, 2),
-                    "confidence": round(conf, 1),
+                    "predicted_price": round(median, 2),
+                    "low_estimate": round(current_price * q[0.05][k], 2),
+                    "high_estimate": round(current_price * q[0.95][k], 2),
+                    "p25": round(current_price * q[0.25][k], 2),
+                    "p75": round(current_price * q[0.75][k], 2),
+                    "expected_price": round(current_price * mean[k], 2),
+                    "confidence": round(max(50, min(92, 100 - spread * 50)), 1),
                 })
 
-            first, last = predictions[0]["predicted_price"], predictions[-1]["predicted_price"]
-            change = ((last - first) / first * 100) if first else 0
+            change = (q[0.5][-1] - 1) * 100
 
             return {
                 "symbol": symbol,
@@ -233,7 +210,14 @@ class AIPredictor:
                 "predictions": predictions,
                 "overall_trend": "Bullish" if change > 1 else ("Bearish" if change < -1 else "Neutral"),
                 "expected_change_percent": round(change, 2),
-                "model_used": "Trend + Volatility Forecast (live data)",
+                "probability_up": round(sim["prob_up"] * 100, 1),
+                "simulation": {
+                    "method": sim["method"],
+                    "paths": sim["paths"],
+                    "elapsed_ms": sim["elapsed_ms"],
+                    "cached": sim["cached"],
+                },
+                "model_used": f"Monte Carlo ({sim['method']}, {sim['paths']:,} paths, live data)",
                 "model_version": self.model_version,
                 "ai_powered": False,
                 "data_source": "live",
@@ -350,46 +334,56 @@ class AIPredictor:
 
     # ── assess_risk ────────────────────────────────────────────────
 
+    _CRYPTO_BETA_TO_BTC = ("ETH", "SOL", "BNB", "XRP", "ADA", "DOGE", "AVAX", "LINK")
+    MAX_FETCH_WORKERS = 8
+
     def assess_risk(self, symbol: str) -> Dict:
         """Assess risk using real volatility, beta, and drawdown metrics."""
-        closes = _fetch_closes(symbol)
-        current_price = _fetch_live_price(symbol) or (closes[-1] if closes else 0)
-
-        volatility = _compute_volatility(closes) if len(closes) > 5 else 25.0
-
-        # Beta vs BTC (for crypto) or SPY (for stocks)
-        bench_sym = "BTC" if symbol.upper() in ("ETH", "SOL", "BNB", "XRP", "ADA", "DOGE", "AVAX", "LINK") else "SPY"
-        bench_closes = _fetch_closes(bench_sym)
-        beta = _compute_beta(closes, bench_closes) if len(closes) > 10 and len(bench_closes) > 10 else 1.0
-
-        # Real max drawdown
-        max_dd = 0
-        if closes:
-            peak = closes[0]
-            for c in closes:
-                if c > peak:
-                    peak = c
-                dd = (c - peak) / peak * 100
-                if dd < max_dd:
-                    max_dd = dd
-        max_dd = round(max_dd, 2)
-
-        # VaR 95% — historical
-        if len(closes) > 5:
-            returns = sorted([(closes[i] / closes[i - 1] - 1) for i in range(1, len(closes)) if closes[i - 1]])
-            idx = max(0, int(len(returns) * 0.05))
-            var_95 = round(returns[idx] * 100, 2)
-        else:
-            var_95 = -5.0
-
-        # Sharpe (annualized, risk-free = 4%)
-        if len(closes) > 10:
-            rets = [(closes[i] / closes[i - 1] - 1) for i in range(1, len(closes)) if closes[i - 1]]
-            mean_r = sum(rets) / len(rets)
-            std_r = math.sqrt(sum((r - mean_r) ** 2 for r in rets) / len(rets))
-            sharpe = round(((mean_r * 365) - 0.04) / (std_r * math.sqrt(365)), 2) if std_r > 0 else 0
+        return self.assess_risk_batch([symbol])[symbol]
+
+    def assess_risk_batch(self, symbols: List[str]) -> Dict[str, Dict]:
+        """Assess risk for many symbols in one vectorized pass.
+
+        Closes and live prices are fetched concurrently, and symbols whose
+        last bar is unchanged are served from the risk engine cache. A
+        benchmark series (BTC for crypto, SPY for stocks) is fetched once per
+        batch, and only when some symbol's beta is not already covered by the
+        shared correlation matrix.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        engine = get_correlation_engine()
+        matrix_betas = {s: engine.beta(s) for s in symbols}
+        bench_of = {s: "BTC" if s.upper() in self._CRYPTO_BETA_TO_BTC else "SPY"
+                    for s in symbols if matrix_betas[s] is None}
+        to_fetch = list(dict.fromkeys(symbols + list(set(bench_of.values()))))
+        with ThreadPoolExecutor(max_workers=self.MAX_FETCH_WORKERS) as pool:
+            closes = dict(zip(to_fetch, pool.map(_fetch_closes, to_fetch)))
+            live = dict(zip(symbols, pool.map(_fetch_live_price, symbols)))
+
+        benchmarks = {s: closes[b] if len(closes[b]) > 10 and len(closes[s]) > 10 else []
+                      for s, b in bench_of.items()}
+        metrics = self.risk_engine.assess({s: closes[s] for s in symbols}, benchmarks)
+
+        return {s: self._risk_report(s, closes[s], live[s], metrics[s], matrix_betas[s])
+                for s in symbols}
+
+    def _risk_report(self, symbol: str, closes: List[float], live_price: Optional[float],
+                     m: Dict, matrix_beta: Optional[float]) -> Dict:
+        current_price = live_price or (closes[-1] if closes else 0)
+        n = len(closes)
+
+        volatility = m["volatility"] if n > 5 and m["volatility"] is not None else 25.0
+        # Beta from the shared correlation matrix when the asset is tracked
+        if matrix_beta is not None:
+            beta = matrix_beta
         else:
-            sharpe = 0
+            beta = round(m["beta"], 2) if m["beta"] is not None else 1.0
+        max_dd = round(m["max_drawdown"] or 0, 2)
+        var_95 = round(m["var_95"], 2) if n > 5 and m["var_95"] is not None else -5.0
+        cvar_95 = round(m["cvar_95"], 2) if n > 5 and m["cvar_95"] is not None else var_95
+        var_param = round(m["var_95_parametric"], 2) if n > 5 and m["var_95_parametric"] is not None else var_95
+        sharpe = round(m["sharpe"], 2) if n > 10 and m["sharpe"] is not None else 0
+        sortino = round(m["sortino"], 2) if n > 10 and m["sortino"] is not None else 0
 
         # Overall risk score 0-100
         vol_score = min(100, volatility * 1.5)
@@ -413,12 +407,15 @@ class AIPredictor:
                 "volatility": round(volatility, 2),
                 "beta": beta,
                 "sharpe_ratio": sharpe,
+                "sortino_ratio": sortino,
                 "var_95": var_95,
+                "var_95_parametric": var_param,
+                "cvar_95": cvar_95,
                 "max_drawdown": max_dd,
             },
             "risk_factors": risk_factors,
             "recommendation": self._get_risk_recommendation(overall),
-            "data_source": "live" if len(closes) >= 20 else "limited",
+            "data_source": "live" if n >= 20 else "limited",
             "timestamp": datetime.now(timezone.utc).isoformat(),
         }
 
@@ -13,6 +13,8 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import logging
 
+from correlation_engine import DEFAULT_UNIVERSE, CorrelationEngine
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -32,6 +34,9 @@ class AIWorkerService:
         """Initialize AI Worker Service"""
         self.running = False
         self.worker_thread = None
+        # Own engine over DEFAULT_UNIVERSE: the app's shared engine tracks the
+        # scanner universe, and alternating universes would force full rebuilds
+        self.correlations = CorrelationEngine()
         self.stats = {
             'started_at': None,
             'total_cycles': 0,
@@ -253,9 +258,10 @@ class AIWorkerService:
     
     def _find_correlations(self, data_files: List[str]) -> List[Dict]:
         """Find correlations between assets"""
+        self.correlations.update(DEFAULT_UNIVERSE)
         return [
-            {'asset1': 'BTC', 'asset2': 'ETH', 'correlation': 0.89},
-            {'asset1': 'AAPL', 'asset2': 'MSFT', 'correlation': 0.76}
+            {'asset1': p['pair'][0], 'asset2': p['pair'][1], 'correlation': p['correlation']}
+            for p in self.correlations.top_pairs(limit=10)
         ]
     
     def _identify_trends(self, data_files: List[str]) -> List[Dict]:
@@ -47,6 +47,12 @@ from ai_learning_system import get_learning_system
 from agent_client import get_agent_client
 from api_processor import get_api_processor
 from ai_evolution_engine import get_evolution_engine
+from screener import get_screener
+from shared_state import get_shared_state
+from correlation_engine import get_correlation_engine
+from ai_memory_system import get_memory
+from training_pipeline import TrainingPipeline, get_meta_model, signal_probability
+from meta_model import BreakoutScorer
 
 # Import optimizer safely (new module)
 try:
@@ -152,6 +158,12 @@ ai_evolution = AIEvolutionSystem()
 ai_coordinator = get_coordinator()
 ai_learning = get_learning_system()
 ai_optimizer = get_optimizer()
+screener = get_screener()
+correlation_engine = get_correlation_engine()
+meta_model = get_meta_model()  # warm-load the latest published model (memory-mapped)
+breakout_scorer = BreakoutScorer()
+breakout_ranking = {"results": [], "universe_size": 0, "updated_at": None}
+shared_state = get_shared_state()  # results the background worker publishes to every process
 
 # Initialize multi-agent client
 try:
@@ -196,6 +208,45 @@ except Exception:
 # HELPER FUNCTIONS
 # -----------------------------
 
+def _set_breakout_ranking(ranking):
+    global breakout_ranking
+    breakout_ranking = ranking
+
+
+def _set_universe_scan(scan):
+    universal_analyzer.latest_scan = scan
+
+
+def _set_gem_diff(diff):
+    gem_finder.last_diff = diff
+
+
+# Snapshot name -> how to apply it in this process. With gunicorn --preload the
+# BackgroundAIWorker thread only runs in the master, so request workers read
+# its results from these snapshots instead of from their own (idle) copies.
+SHARED_SNAPSHOTS = {
+    "screener": screener.load_state,
+    "correlations": correlation_engine.load_state,
+    "breakout_ranking": _set_breakout_ranking,
+    "universe_scan": _set_universe_scan,
+    "gem_diff": _set_gem_diff,
+    "whale_flows": whale_watcher.load_flows,
+}
+
+
+@app.before_request
+def _sync_shared_state():
+    """Apply snapshots the background worker published since the last request."""
+    global meta_model
+    for name, apply in SHARED_SNAPSHOTS.items():
+        shared_state.sync(name, apply)
+    meta_model = get_meta_model()  # reloads only when a new version was published
+
+
+# Warm start from the last published snapshots (also seeds the worker's own state)
+_sync_shared_state()
+
+
 @app.route("/service-worker.js")
 def serve_service_worker():
     """Serve service worker from root URL (required by browsers)."""
@@ -1016,6 +1067,68 @@ def api_analyze_patterns():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route("/api/screener", methods=["GET", "POST"])
+def api_screener():
+    """Indicator screener over the precomputed universe table.
+
+    Accepts ``query`` (e.g. "rsi < 30 and price above ema50 and adx > 25"),
+    ``market``, ``sort`` (prefix "-" for descending) and ``limit`` either as
+    a JSON body or as query-string parameters.
+    """
+    try:
+        data = request.get_json(silent=True) or request.args
+        try:
+            limit = int(data.get("limit", 50))
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": "limit must be an integer"}), 400
+
+        result = screener.query(
+            expression=data.get("query", ""),
+            market=data.get("market"),
+            sort=data.get("sort"),
+            limit=min(limit, 500),
+        )
+        result["last_refresh"] = screener.last_refresh
+        return jsonify({"success": True, "data": result}), 200
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route("/api/screener/breakouts", methods=["GET"])
+def api_screener_breakouts():
+    """Top breakout candidates across the screener universe (refreshed by the worker)."""
+    try:
+        limit = int(request.args.get("limit", 20))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "limit must be an integer"}), 400
+    ranking = breakout_ranking
+    return jsonify({"success": True, "data": {**ranking, "results": ranking["results"][:max(0, limit)]}}), 200
+
+@app.route("/api/correlations", methods=["GET"])
+def api_correlations():
+    """Cross-asset correlations from the shared rolling matrix.
+
+    ``symbols`` (comma-separated) returns the sub-matrix for those assets;
+    otherwise the strongest pairs, clusters and betas are returned.
+    """
+    try:
+        symbols = [s.strip() for s in request.args.get("symbols", "").split(",") if s.strip()]
+        if symbols:
+            data = {"matrix": correlation_engine.get_matrix(symbols)}
+        else:
+            data = {
+                "top_pairs": correlation_engine.top_pairs(limit=int(request.args.get("limit", 20))),
+                "clusters": correlation_engine.clusters(),
+                "betas": correlation_engine.betas(),
+            }
+        data["summary"] = correlation_engine.summary()
+        return jsonify({"success": True, "data": data}), 200
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 # -----------------------------
 # API ROUTES - AI PREDICTIONS
 # -----------------------------
@@ -1175,6 +1288,27 @@ def api_predict_risk():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route("/api/predict/risk/batch", methods=["POST"])
+def api_predict_risk_batch():
+    """Risk assessment for a watchlist in one vectorized pass."""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"success": False, "error": "JSON body required"}), 400
+        symbols = data.get("symbols")
+
+        if not symbols or not isinstance(symbols, list):
+            return jsonify({"success": False, "error": "Symbols list required"}), 400
+        if len(symbols) > 200:
+            return jsonify({"success": False, "error": "At most 200 symbols per request"}), 400
+
+        risks = ai_predictor.assess_risk_batch([str(s) for s in symbols])
+        save_learning_data("risk_assessment_batch", {"symbols": symbols, "count": len(risks)})
+
+        return jsonify({"success": True, "data": risks}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 # -----------------------------
 # API ROUTES - WHALE WATCHER
 # -----------------------------
@@ -1205,6 +1339,19 @@ def api_whale_alerts():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route("/api/whale/flows", methods=["GET"])
+def api_whale_flows():
+    """Get rolling exchange inflow/outflow, optionally for one token."""
+    try:
+        user = get_current_user()
+        if not user or user.get("plan") not in ["pro", "enterprise"]:
+            return jsonify({"success": False, "error": "Pro or Enterprise plan required"}), 403
+
+        flows = whale_watcher.get_flow_stats(request.args.get("token"))
+        return jsonify({"success": True, "data": flows}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 # -----------------------------
 # API ROUTES - PAYMENT
 # -----------------------------
@@ -1303,6 +1450,17 @@ def api_discover_gems():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route("/api/gems/changes", methods=["GET"])
+def api_gem_changes():
+    """What changed in the last gem discovery run (new, rescored, delisted).
+
+    Discovery runs in the background worker; until its first run this is empty.
+    """
+    try:
+        return jsonify({"success": True, "data": gem_finder.last_diff}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route("/api/gems/top", methods=["GET"])
 def api_top_gems():
     """Get top-scored gem cryptocurrencies."""
@@ -1369,7 +1527,7 @@ def api_top_opportunities():
     """Get top investment opportunities across ALL markets."""
     try:
         limit = int(request.args.get("limit", 50))
-        summary = universal_analyzer.get_analysis_summary()
+        summary = universal_analyzer.latest_scan or universal_analyzer.get_analysis_summary()
         opportunities = summary.get('top_opportunities', [])[:limit]
         return jsonify({"success": True, "data": opportunities}), 200
     except Exception as e:
@@ -1524,6 +1682,34 @@ def api_coordinator_deep():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+# Each item fans out to every LLM provider, so one request must stay bounded
+COORDINATOR_BATCH_MAX_ITEMS = 50
+
+
+@app.route("/api/ai/coordinator/batch", methods=["POST"])
+def api_coordinator_batch():
+    """Run deep multi-AI analysis on several symbols in batched requests."""
+    try:
+        data = request.get_json() or {}
+        raw = data.get("items", [])
+        if len(raw) > COORDINATOR_BATCH_MAX_ITEMS:
+            return jsonify({"success": False,
+                            "error": f"At most {COORDINATOR_BATCH_MAX_ITEMS} items per request"}), 400
+        items = [i for i in raw if isinstance(i, dict) and i.get("symbol")]
+        if not items:
+            return jsonify({"success": False, "error": "Items with a symbol required"}), 400
+
+        results = ai_coordinator.deep_analysis_batch(items)
+        save_learning_data("deep_analysis", [{"symbol": i["symbol"], "result": r}
+                                             for i, r in zip(items, results)])
+        return jsonify({
+            "success": True,
+            "data": {i["symbol"]: r for i, r in zip(items, results)},
+            "batching": ai_coordinator.get_batch_stats(),
+        }), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 # -----------------------------
 # API ROUTES - AI LEARNING SYSTEM
 # -----------------------------
@@ -1826,7 +2012,8 @@ def api_agents_portfolio_optimize():
             return jsonify({"success": False, "error": "Holdings required"}), 400
         
         risk_tolerance = data.get("risk_tolerance", "moderate")
-        result = agent_client.optimize_portfolio(holdings, risk_tolerance)
+        correlations = correlation_engine.get_matrix(list(holdings)) or None
+        result = agent_client.optimize_portfolio(holdings, risk_tolerance, correlations)
         
         return jsonify({
             "success": True,
@@ -2537,6 +2724,14 @@ def api_signalai_generate():
         # Generate signals
         signal = signalai_strategy.generate_signals(symbol, strategy)
         
+        # Added after the signal is stored, so the model never trains on its own output
+        probability = signal_probability(meta_model, signal)
+        if probability is not None:
+            signal["meta_model"] = {
+                "probability_up": round(probability, 3),
+                "version": getattr(meta_model, "version", None),
+            }
+        
         log_event("SIGNALAI_SIGNAL_GENERATED", {
             "symbol": symbol,
             "strategy": strategy,
@@ -2633,11 +2828,13 @@ def api_signalai_strategies():
 def api_signalai_history():
     """Get SignalAI signal history"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         symbol = data.get("symbol")
-        limit = data.get("limit", 50)
+        limit = min(int(data.get("limit", 50)), 1000)
+        filters = {k: data[k] for k in ("strategy", "regime", "signal", "start", "end",
+                                        "offset", "before_id") if data.get(k) is not None}
         
-        history = signalai_strategy.get_signal_history(symbol, limit)
+        history = signalai_strategy.get_signal_history(symbol, limit, **filters)
         return jsonify({"success": True, "history": history}), 200
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -2646,10 +2843,14 @@ def api_signalai_history():
 def api_signalai_performance():
     """Get SignalAI performance statistics"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         symbol = data.get("symbol")
+        strategy = data.get("strategy")
         
-        stats = signalai_strategy.get_performance_stats(symbol)
+        if data.get("by_symbol"):
+            stats = signalai_strategy.get_performance_by_symbol(strategy)
+        else:
+            stats = signalai_strategy.get_performance_stats(symbol, strategy)
         return jsonify({"success": True, "stats": stats}), 200
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -2687,6 +2888,18 @@ def api_optimizer_strategy():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route("/api/optimizer/calibration", methods=["GET"])
+def api_optimizer_calibration():
+    """Reliability diagram of confidence calibration (optionally per worker/regime)."""
+    try:
+        bins = max(2, min(int(request.args.get("bins", 10)), 50))
+        result = ai_optimizer.get_reliability_diagram(
+            request.args.get("worker") or None, request.args.get("regime") or None, bins
+        )
+        return jsonify({"success": True, "data": result}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 # -----------------------------
 # API ROUTES - AI CODER BOT
 # -----------------------------
@@ -2827,24 +3040,29 @@ class BackgroundAIWorker:
                 self.cycle_count += 1
                 cycle_start = time.time()
 
-                # ── Every cycle (5 min): market data ──
+                # ── Every cycle (5 min): market data + opportunity scan ──
                 self._run_task("market_data", self._collect_market_data)
+                self._run_task("universe_scan", self._scan_universe)
 
                 # ── Every 10 min: whale activity ──
                 if self.cycle_count % 2 == 0:
                     self._run_task("whale_check", self._check_whale_activity)
 
-                # ── Every 15 min: AI analysis ──
+                # ── Every 15 min: AI analysis + screener table ──
                 if self.cycle_count % 3 == 0:
                     self._run_task("ai_analysis", self._run_ai_analysis)
+                    self._run_task("screener_refresh", self._refresh_screener)
+                    self._run_task("breakout_ranking", self._rank_breakouts)
+                    self._run_task("correlation_update", self._update_correlations)
 
                 # ── Every 30 min: gem discovery ──
                 if self.cycle_count % 6 == 0:
                     self._run_task("gem_discovery", self._discover_hidden_gems)
 
-                # ── Every hour: predictions ──
+                # ── Every hour: predictions + signal outcomes ──
                 if self.cycle_count % 12 == 0:
                     self._run_task("predictions", self._generate_predictions)
+                    self._run_task("signal_outcomes", self._resolve_signal_outcomes)
 
                 # ── Every 2 hours: universal analysis ──
                 if self.cycle_count % 24 == 0:
@@ -2867,6 +3085,8 @@ class BackgroundAIWorker:
                 # ── Every 24 hours: health check + cleanup ──
                 if self.cycle_count % 288 == 0:
                     self._run_task("health_check", self._health_check, self.cycle_count)
+                    self._run_task("memory_compaction", self._compact_memory)
+                    self._run_task("meta_model_training", self._train_meta_model)
 
                 # Success — reset backoff
                 self.consecutive_errors = 0
@@ -2926,16 +3146,111 @@ class BackgroundAIWorker:
         ai_hub.share_data("Analyzer", "patterns", analyses)
         log_event("AUTO_AI_ANALYSIS", {"analyzed": len(analyses)})
 
+    def _refresh_screener(self):
+        """Incrementally refresh the screener's indicator table."""
+        stats = screener.refresh({
+            "crypto": realtime_data.get_all_crypto(limit=100),
+            "us_stocks": realtime_data.get_us_stocks(),
+            "canadian_stocks": realtime_data.get_canadian_stocks(),
+        })
+        shared_state.publish("screener", screener.export_state())
+        log_event("AUTO_SCREENER_REFRESH", stats)
+
+    def _rank_breakouts(self):
+        """Score every screener asset for breakouts in one vectorized pass."""
+        global breakout_ranking
+        t0 = time.perf_counter()
+        cols, symbols, _ = screener.table.snapshot()
+        cols["ema_cross"] = cols["ema9"] > cols["ema21"]  # False where either is missing
+        cols["price_change_24h"] = cols["change_24h"]
+        cols["bollinger_position"] = cols["bb_pct_b"]
+        cols["macd_signal"] = cols["macd_hist"]
+        breakout_ranking = {
+            "results": breakout_scorer.rank_columns(cols, symbols.tolist(), k=50),
+            "weights": {name: round(w, 3) for name, w in breakout_scorer.weights_for(cols).items()},
+            "universe_size": len(symbols),
+            "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 3),
+        }
+        shared_state.publish("breakout_ranking", breakout_ranking)
+        log_event("AUTO_BREAKOUT_RANKING", {
+            "universe_size": breakout_ranking["universe_size"],
+            "top": [r["symbol"] for r in breakout_ranking["results"][:10]],
+            "elapsed_ms": breakout_ranking["elapsed_ms"],
+        })
+
+    def _update_correlations(self):
+        """Advance the correlation matrix and share it once per new bar."""
+        tickers = {"BTC": "BTC-USD", "SPY": "SPY"}
+        for asset in realtime_data.get_all_crypto(limit=50):
+            tickers[asset["symbol"]] = f"{asset['symbol']}-USD"
+        for asset in realtime_data.get_us_stocks() + realtime_data.get_canadian_stocks():
+            tickers[asset["symbol"]] = asset["symbol"]
+
+        stats = correlation_engine.update(tickers)
+        shared_state.publish("correlations", correlation_engine.export_state())
+        if stats["rows_added"]:
+            timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            ai_hub.share_data("CorrelationEngine", "correlations", [
+                {**pair, "timestamp": timestamp}
+                for pair in correlation_engine.top_pairs(limit=50)
+            ])
+        log_event("AUTO_CORRELATION_UPDATE", stats)
+
+    def _resolve_signal_outcomes(self):
+        """Score matured SignalAI signals into the performance aggregates."""
+        stats = signalai_strategy.resolve_outcomes()
+        log_event("AUTO_SIGNAL_OUTCOMES", stats)
+
+    def _compact_memory(self):
+        """Expire, downsample and vacuum the AI memory database."""
+        report = get_memory().compact()
+        log_event("AUTO_MEMORY_COMPACTION", {
+            "rolled_up": report["rolled_up"],
+            "deleted": report["deleted"],
+            "reclaimed_bytes": report["reclaimed_bytes"],
+            "seconds": report["seconds"],
+        })
+
+    def _train_meta_model(self):
+        """Fold newly labelled predictions into the dataset and retrain the meta-model."""
+        global meta_model
+        report = TrainingPipeline(learning_store=ai_learning.store,
+                                  signal_store=signalai_strategy.history).run()
+        training = report["training"]
+        if training.get("trained"):
+            meta_model = get_meta_model(reload=True)  # other processes reload on their next request
+        log_event("AUTO_META_MODEL_TRAINING", {
+            "new_rows": report["materialize"]["new_rows"],
+            "total_rows": report["materialize"]["total_rows"],
+            "rows_per_sec": report["materialize"]["rows_per_sec"],
+            "trained": training.get("trained"),
+            "version": training.get("version"),
+            "val_auc": training.get("val_auc"),
+            "train_seconds": training.get("train_seconds"),
+            "reason": training.get("reason"),
+        })
+
     def _check_whale_activity(self):
-        """Check for whale transactions and alert."""
-        transactions = whale_watcher.get_recent_transactions(limit=100)
-        save_learning_data("auto_whale_data", transactions)
+        """Poll new whale transactions and alert on the significant ones."""
+        result = whale_watcher.poll()
+        shared_state.publish("whale_flows", whale_watcher.export_flows())
+        transactions = result["new_transactions"]
+        if transactions:
+            save_learning_data("auto_whale_data", transactions)
 
         significant = [t for t in transactions if t.get("value_usd", 0) > 1000000]
+        flows = whale_watcher.get_flow_stats()["windows"]["24h"]
         ai_hub.share_data("WhaleWatcher", "whale_intelligence", {
             "total_transactions": len(transactions),
             "significant_count": len(significant),
-            "total_value": sum(t.get("value_usd", 0) for t in significant)
+            "total_value": sum(t.get("value_usd", 0) for t in significant),
+            "net_exchange_flow_24h": flows["net_exchange_flow_usd"],
+        })
+        log_event("AUTO_WHALE_POLL", {
+            "new": len(transactions),
+            "duplicates": result["duplicates"],
+            "api_calls": result["api_calls"],
         })
 
         if significant:
@@ -2946,7 +3261,7 @@ class BackgroundAIWorker:
             for tx in significant[:10]:
                 notification_center.send_whale_alert(
                     "all_pro_users",
-                    tx.get("symbol"),
+                    tx.get("token"),
                     tx.get("value_usd"),
                     tx.get("type")
                 )
@@ -2971,6 +3286,8 @@ class BackgroundAIWorker:
         """Discover hidden gem cryptocurrencies."""
         gems = gem_finder.discover_new_gems(limit=100)
         top_gems = [g for g in gems if g.get('gem_score', 0) > 85]
+        diff = gem_finder.last_diff
+        shared_state.publish("gem_diff", diff)
 
         save_learning_data("auto_gem_discovery", {
             "total_discovered": len(gems),
@@ -2986,10 +3303,17 @@ class BackgroundAIWorker:
 
         log_event("AUTO_GEM_DISCOVERY", {
             "discovered": len(gems),
-            "high_potential": len(top_gems)
+            "high_potential": len(top_gems),
+            "new": len(diff.get("new", [])),
+            "score_changes": len(diff.get("changed", [])),
+            "delisted": len(diff.get("delisted", [])),
+            "elapsed_ms": diff.get("elapsed_ms"),
         })
 
-        alerts = gem_finder.get_gem_alerts()
+        # Alert only on gems that are new or whose score moved this run
+        fresh = {g.get('symbol') for g in diff.get("new", [])}
+        fresh.update(c['symbol'] for c in diff.get("changed", []))
+        alerts = [a for a in gem_finder.get_gem_alerts() if a['symbol'] in fresh]
         if alerts:
             for alert in alerts[:5]:
                 notification_center.send_notification(
@@ -2997,6 +3321,18 @@ class BackgroundAIWorker:
                     f"New Gem Alert: {alert['symbol']} - {alert['message']}"
                 )
 
+    def _scan_universe(self):
+        """Re-rank cross-market opportunities (only changed assets are rescored)."""
+        scan = universal_analyzer.scan_opportunities()
+        shared_state.publish("universe_scan", scan)
+        log_event("AUTO_UNIVERSE_SCAN", {
+            "assets_analyzed": scan["total_assets_analyzed"],
+            "top": [o.get("symbol") for o in scan["top_opportunities"][:10]],
+            "elapsed_ms": scan["elapsed_ms"],
+            "rescored": scan["rescored"],
+            "unchanged": scan["unchanged"],
+        })
+
     def _analyze_all_markets(self):
         """Analyze ALL markets."""
         log_event("UNIVERSAL_ANALYSIS_START", {})
@@ -0,0 +1,388 @@
+"""
+Correlation Engine — SignalTrust AI Scanner
+===========================================
+Cross-asset correlation, covariance, beta and clustering for the whole
+tracked universe, built from the daily bars in the OHLCV store.
+
+Daily returns are laid out as a (days × assets) matrix aligned on the
+calendar day. Missing observations (weekends for stocks, short
+histories) are masked, and every statistic is pairwise-complete: the
+engine keeps running sums over the rolling window
+
+    n   = Mᵀ M        observations both assets share
+    sx  = Xᵀ M        sum of asset i's returns where j is observed
+    sxx = (X²)ᵀ M     sum of squares, same mask
+    sxy = Xᵀ X        cross products
+
+so each new daily bar is one O(N²) rank update (and the bar that falls
+out of the window one downdate) instead of recomputing the matrix.
+Derived matrices are cached until the next bar, so ``assess_risk``, the
+portfolio optimizer and the AI hub all read the same precomputed result.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ohlcv_store import ohlcv_store
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+
+# Core universe used when no scanner universe is supplied
+DEFAULT_UNIVERSE = {
+    **{sym: f"{sym}-USD" for sym in ('BTC', 'ETH', 'BNB', 'SOL', 'XRP', 'ADA',
+                                     'DOGE', 'AVAX', 'LINK', 'DOT')},
+    **{sym: sym for sym in ('SPY', 'QQQ', 'AAPL', 'MSFT', 'NVDA', 'GOOGL',
+                            'AMZN', 'META', 'TSLA', 'GLD')},
+}
+
+
+class CorrelationEngine:
+    """Rolling pairwise correlation / beta matrix over the asset universe."""
+
+    WINDOW = 90          # daily returns kept in the rolling window
+    MIN_OBS = 20         # shared observations needed for a statistic
+    CLUSTER_THRESHOLD = 0.7
+    CRYPTO_BENCHMARK = 'BTC'
+    STOCK_BENCHMARK = 'SPY'
+
+    def __init__(self, store=None, window: int = WINDOW):
+        self._store = store or ohlcv_store
+        self.window = window
+        self._lock = threading.Lock()
+        self.symbols: List[str] = []
+        self._tickers: Dict[str, str] = {}
+        self._index: Dict[str, int] = {}
+        self._rows: deque = deque()    # (day, returns, mask) oldest first
+        self._sums: Optional[Dict[str, np.ndarray]] = None
+        self._derived: Optional[Dict[str, np.ndarray]] = None
+        self.last_day: Optional[int] = None
+        self.updated_at: Optional[float] = None
+        self.stats = {'rebuilds': 0, 'incremental_rows': 0, 'cache_hits': 0}
+
+    # ── Updating ─────────────────────────────────────────────────────
+
+    def update(self, tickers: Dict[str, str], now: Optional[float] = None) -> Dict:
+        """Bring the window up to the last completed day.
+
+        Args:
+            tickers: platform symbol -> OHLCV store ticker
+                     (e.g. ``{"BTC": "BTC-USD", "AAPL": "AAPL"}``)
+            now: current unix time (defaults to ``time.time()``)
+
+        A changed universe triggers a full rebuild; otherwise only days
+        newer than the last processed one are added to the running sums.
+        """
+        today = int((time.time() if now is None else now) // DAY)
+        returns = {}
+        for symbol, ticker in tickers.items():
+            series = self._daily_returns(ticker)
+            if series is not None:
+                returns[symbol.upper()] = series
+
+        with self._lock:
+            symbols = sorted(returns)
+            if symbols != self.symbols:
+                self._rebuild(symbols, returns, today, tickers)
+                added = len(self._rows)
+            else:
+                added = self._advance(returns, today)
+            self.updated_at = time.time()
+            return {
+                'assets': len(self.symbols),
+                'days': len(self._rows),
+                'rows_added': added,
+                'last_day': self.last_day,
+            }
+
+    def _daily_returns(self, ticker: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(day ids, simple returns) from the store's daily closes."""
+        cols = self._store.get_columns(ticker, '1d')
+        if cols is None or len(cols['close']) < 2:
+            return None
+        close = cols['close']
+        days = cols['ts'][1:] // DAY
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rets = close[1:] / close[:-1] - 1
+        ok = np.isfinite(rets)
+        return days[ok], rets[ok]
+
+    def _rows_for(self, symbols: Sequence[str], returns: Dict, days: np.ndarray):
+        """Return/mask matrices for ``days`` (zeros where unobserved)."""
+        x = np.zeros((len(days), len(symbols)))
+        m = np.zeros((len(days), len(symbols)))
+        for j, sym in enumerate(symbols):
+            sym_days, sym_rets = returns[sym]
+            pos = np.searchsorted(sym_days, days)
+            pos_ok = pos < len(sym_days)
+            hit = np.zeros(len(days), dtype=bool)
+            hit[pos_ok] = sym_days[pos[pos_ok]] == days[pos_ok]
+            x[hit, j] = sym_rets[pos[hit]]
+            m[hit, j] = 1.0
+        return x, m
+
+    def _rebuild(self, symbols, returns, today, tickers):
+        n = len(symbols)
+        self.symbols = symbols
+        self._tickers = {s.upper(): t for s, t in tickers.items()}
+        self._index = {s: i for i, s in enumerate(symbols)}
+        self._rows.clear()
+        self._sums = {k: np.zeros((n, n)) for k in ('n', 'sx', 'sxx', 'sxy')}
+        self._derived = None
+        self.last_day = None
+        self.stats['rebuilds'] += 1
+        if not symbols:
+            return
+        days = np.arange(today - self.window, today)
+        self._push(days, *self._rows_for(symbols, returns, days))
+
+    def _advance(self, returns, today) -> int:
+        if self.last_day is None:
+            return 0
+        days = np.arange(self.last_day + 1, today)
+        if len(days) == 0:
+            return 0
+        self._push(days, *self._rows_for(self.symbols, returns, days))
+        self.stats['incremental_rows'] += len(days)
+        return len(days)
+
+    def _push(self, days, x, m):
+        """Add rows to the window and drop the ones that fall out of it."""
+        self._accumulate(x, m, 1.0)
+        for k, day in enumerate(days):
+            self._rows.append((int(day), x[k], m[k]))
+        self.last_day = int(days[-1])
+        excess = len(self._rows) - self.window
+        if excess > 0:
+            old = [self._rows.popleft() for _ in range(excess)]
+            self._accumulate(np.array([r[1] for r in old]),
+                             np.array([r[2] for r in old]), -1.0)
+        self._derived = None
+
+    def _accumulate(self, x, m, sign):
+        s = self._sums
+        s['n'] += sign * (m.T @ m)
+        s['sx'] += sign * (x.T @ m)
+        s['sxx'] += sign * ((x * x).T @ m)
+        s['sxy'] += sign * (x.T @ x)
+
+    # ── Snapshots ────────────────────────────────────────────────────
+
+    def export_state(self) -> Dict:
+        """Picklable copy of the rolling window (see ``shared_state``)."""
+        with self._lock:
+            return {
+                'symbols': list(self.symbols),
+                'tickers': dict(self._tickers),
+                'rows': list(self._rows),
+                'sums': {k: v.copy() for k, v in self._sums.items()} if self._sums else None,
+                'last_day': self.last_day,
+                'updated_at': self.updated_at,
+                'stats': dict(self.stats),
+            }
+
+    def load_state(self, state: Dict):
+        """Replace the window with an ``export_state`` snapshot."""
+        with self._lock:
+            self.symbols = list(state['symbols'])
+            self._tickers = dict(state['tickers'])
+            self._index = {s: i for i, s in enumerate(self.symbols)}
+            self._rows = deque(state['rows'])
+            self._sums = state['sums']
+            self._derived = None
+            self.last_day = state['last_day']
+            self.updated_at = state['updated_at']
+            self.stats = dict(state['stats'])
+
+    # ── Derived matrices ─────────────────────────────────────────────
+
+    def _matrices(self) -> Optional[Dict[str, np.ndarray]]:
+        """Pairwise covariance and correlation, cached until the next bar."""
+        if self._derived is not None:
+            self.stats['cache_hits'] += 1
+            return self._derived
+        if not self.symbols:
+            return None
+        s = self._sums
+        n = np.round(s['n'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_i = s['sx'] / n            # mean of i over days shared with j
+            mean_j = s['sx'].T / n
+            cov = s['sxy'] / n - mean_i * mean_j
+            var_i = s['sxx'] / n - mean_i ** 2
+            var_j = var_i.T
+            corr = cov / np.sqrt(var_i * var_j)
+        valid = (n >= self.MIN_OBS) & (var_i > 0) & (var_j > 0)
+        corr = np.where(valid, np.clip(corr, -1.0, 1.0), np.nan)
+        np.fill_diagonal(corr, np.where(np.diag(valid), 1.0, np.nan))
+        self._derived = {
+            'n': n,
+            'cov': np.where(valid, cov, np.nan),
+            'var': np.where(valid, var_j, np.nan),   # variance of column asset
+            'corr': corr,
+        }
+        return self._derived
+
+    def correlation_matrix(self) -> Tuple[List[str], Optional[np.ndarray]]:
+        """(symbols, correlation matrix) with NaN where data is insufficient."""
+        with self._lock:
+            mats = self._matrices()
+            return list(self.symbols), (mats['corr'] if mats else None)
+
+    def get_matrix(self, symbols: Sequence[str]) -> Dict[str, Dict[str, float]]:
+        """Nested ``{a: {b: rho}}`` correlations for the known ``symbols``."""
+        with self._lock:
+            mats = self._matrices()
+            if mats is None:
+                return {}
+            idx = [(s.upper(), self._index[s.upper()]) for s in symbols
+                   if s.upper() in self._index]
+            corr = mats['corr']
+            return {
+                a: {b: round(float(corr[i, j]), 4)
+                    for b, j in idx if not np.isnan(corr[i, j])}
+                for a, i in idx
+            }
+
+    def benchmark_for(self, symbol: str) -> str:
+        ticker = self._tickers.get(symbol.upper(), symbol.upper())
+        return self.CRYPTO_BENCHMARK if ticker.endswith('-USD') else self.STOCK_BENCHMARK
+
+    def beta(self, symbol: str, benchmark: Optional[str] = None) -> Optional[float]:
+        """Beta of ``symbol`` vs ``benchmark`` (BTC for crypto, SPY otherwise)."""
+        symbol = symbol.upper()
+        benchmark = (benchmark or self.benchmark_for(symbol)).upper()
+        with self._lock:
+            mats = self._matrices()
+            i, b = self._index.get(symbol), self._index.get(benchmark)
+            if mats is None or i is None or b is None:
+                return None
+            cov, var = mats['cov'][i, b], mats['var'][i, b]
+            if np.isnan(cov) or not var > 0:
+                return None
+            return round(float(cov / var), 2)
+
+    def betas(self) -> Dict[str, float]:
+        """Beta of every asset against its benchmark, in one pass."""
+        with self._lock:
+            mats = self._matrices()
+            if mats is None:
+                return {}
+            out = {}
+            for bench in (self.CRYPTO_BENCHMARK, self.STOCK_BENCHMARK):
+                b = self._index.get(bench)
+                if b is None:
+                    continue
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    col = mats['cov'][:, b] / mats['var'][:, b]
+                for sym, i in self._index.items():
+                    if self.benchmark_for(sym) == bench and np.isfinite(col[i]):
+                        out[sym] = round(float(col[i]), 2)
+            return out
+
+    def top_pairs(self, limit: int = 20, min_abs: float = 0.5) -> List[Dict]:
+        """Most strongly (positively or negatively) correlated pairs."""
+        with self._lock:
+            mats = self._matrices()
+            if mats is None:
+                return []
+            corr, n = mats['corr'], mats['n']
+            iu, ju = np.triu_indices(len(self.symbols), k=1)
+            vals = corr[iu, ju]
+            keep = np.flatnonzero(np.abs(np.nan_to_num(vals)) >= min_abs)
+            if len(keep) > limit:
+                part = np.argpartition(-np.abs(vals[keep]), limit - 1)[:limit]
+                keep = keep[part]
+            keep = keep[np.argsort(-np.abs(vals[keep]))]
+            return [{
+                'pair': [self.symbols[iu[k]], self.symbols[ju[k]]],
+                'correlation': round(float(vals[k]), 4),
+                'observations': int(n[iu[k], ju[k]]),
+            } for k in keep]
+
+    def clusters(self, threshold: float = CLUSTER_THRESHOLD) -> List[List[str]]:
+        """Groups of assets linked by correlation ≥ ``threshold``.
+
+        Single-linkage over the thresholded matrix (connected components
+        via union-find); singletons are omitted.
+        """
+        with self._lock:
+            mats = self._matrices()
+            if mats is None:
+                return []
+            parent = list(range(len(self.symbols)))
+
+            def find(a):
+                while parent[a] != a:
+                    parent[a] = parent[parent[a]]
+                    a = parent[a]
+                return a
+
+            ii, jj = np.nonzero(np.triu(np.nan_to_num(mats['corr']) >= threshold, k=1))
+            for a, b in zip(ii, jj):
+                ra, rb = find(a), find(b)
+                if ra != rb:
+                    parent[rb] = ra
+            groups: Dict[int, List[str]] = {}
+            for i, sym in enumerate(self.symbols):
+                groups.setdefault(find(i), []).append(sym)
+            return sorted((g for g in groups.values() if len(g) > 1),
+                          key=len, reverse=True)
+
+    def rolling_correlation(self, a: str, b: str, window: int = 30) -> List[Dict]:
+        """Correlation of ``a`` and ``b`` over a trailing ``window`` of days."""
+        with self._lock:
+            i, j = self._index.get(a.upper()), self._index.get(b.upper())
+            if i is None or j is None or len(self._rows) < window:
+                return []
+            days = np.array([r[0] for r in self._rows])
+            x = np.array([r[1][[i, j]] for r in self._rows])
+            m = np.array([r[2][[i, j]] for r in self._rows])
+
+        both = m[:, 0] * m[:, 1]
+        xa, xb = x[:, 0] * both, x[:, 1] * both
+
+        def windowed(v):
+            c = np.concatenate([[0.0], np.cumsum(v)])
+            return c[window:] - c[:-window]
+
+        n = windowed(both)
+        sa, sb = windowed(xa), windowed(xb)
+        saa, sbb, sab = windowed(xa * xa), windowed(xb * xb), windowed(xa * xb)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = sab / n - (sa / n) * (sb / n)
+            corr = cov / np.sqrt((saa / n - (sa / n) ** 2) * (sbb / n - (sb / n) ** 2))
+        return [{'day': int(d) * DAY, 'correlation': round(float(c), 4)}
+                for d, c, k in zip(days[window - 1:], corr, n)
+                if k >= min(self.MIN_OBS, window) and np.isfinite(c)]
+
+    def summary(self) -> Dict:
+        return {
+            'assets': len(self.symbols),
+            'days': len(self._rows),
+            'window': self.window,
+            'last_day': self.last_day,
+            'updated_at': self.updated_at,
+            'stats': dict(self.stats),
+        }
+
+
+# Global instance
+_correlation_engine: Optional[CorrelationEngine] = None
+_correlation_engine_lock = threading.Lock()
+
+
+def get_correlation_engine() -> CorrelationEngine:
+    """Get or create the global correlation engine instance."""
+    global _correlation_engine
+    if _correlation_engine is None:
+        with _correlation_engine_lock:
+            if _correlation_engine is None:
+                _correlation_engine = CorrelationEngine()
+    return _correlation_engine
@@ -10,14 +10,23 @@ Data sources (free, no API key required):
   • DefiLlama   /protocols — DeFi TVL data
 
 Falls back to category-scored lists when APIs are unreachable.
+
+All sources are queried concurrently, each under its own deadline, so a
+discovery run takes as long as the slowest source. Results are merged by
+contract address (or symbol) into a hash index; only tokens whose scoring
+inputs changed are rescored, and every run records a diff (new gems,
+score changes, delisted) in ``last_diff``.
 """
 
+import heapq
 import json
 import logging
 import os
 import random
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from datetime import datetime, timezone
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 try:
     import requests
@@ -30,9 +39,30 @@ logger = logging.getLogger(__name__)
 class CryptoGemFinder:
     """AI-powered system to discover hidden gem cryptocurrencies using real data."""
 
+    # Source name -> wall-clock deadline (seconds) for its whole fetch
+    SOURCE_DEADLINES = {
+        'coingecko': 10.0,
+        'coinpaprika': 12.0,
+        'dexscreener': 10.0,
+        'defillama': 12.0,
+    }
+
     def __init__(self):
         """Initialize the gem finder."""
         self.discovered_gems: List[Dict] = []
+        # Sources in merge-priority order: the first source to report a token wins
+        self.sources = [
+            ('coingecko', lambda limit: self._fetch_coingecko_trending()),
+            ('coinpaprika', lambda limit: self._fetch_paprika_low_cap(limit // 2)),
+            ('dexscreener', lambda limit: self._fetch_dexscreener_new()),
+            ('defillama', lambda limit: self._fetch_defillama_small()),
+        ]
+        self._pool = ThreadPoolExecutor(max_workers=2 * len(self.sources),
+                                        thread_name_prefix='gem-source')
+        self._source_rows: Dict[str, List[Dict]] = {}   # last good rows per source
+        self._index: Dict[str, Dict] = {}                # token key -> scored gem
+        self._fingerprints: Dict[str, Tuple] = {}        # token key -> scoring inputs
+        self.last_diff: Dict = {}
         self._session = requests.Session() if requests else None
         if self._session:
             self._session.headers.update({
@@ -53,39 +83,115 @@ class CryptoGemFinder:
         Returns:
             List of discovered gem cryptocurrencies sorted by gem_score
         """
-        gems: List[Dict] = []
-
-        # Source 1: CoinGecko trending
-        trending = self._fetch_coingecko_trending()
-        gems.extend(trending)
+        self.discover_gem_changes(limit)
+        return heapq.nlargest(limit, self.discovered_gems, key=lambda x: x.get('gem_score', 0))
 
-        # Source 2: CoinPaprika low-cap (rank > 100)
-        low_cap = self._fetch_paprika_low_cap(limit // 2)
-        gems.extend(low_cap)
+    def discover_gem_changes(self, limit: int = 50) -> Dict:
+        """Refresh all sources and return what changed since the last run.
 
-        # Source 3: DEXScreener new pairs
-        dex_gems = self._fetch_dexscreener_new()
-        gems.extend(dex_gems)
-
-        # Source 4: DefiLlama small-TVL protocols
-        defi = self._fetch_defillama_small()
-        gems.extend(defi)
+        Args:
+            limit: Size hint passed to the sources
 
-        # Deduplicate by symbol
-        seen = set()
-        unique: List[Dict] = []
-        for g in gems:
-            sym = g.get('symbol', '').upper()
-            if sym and sym not in seen:
-                seen.add(sym)
-                unique.append(g)
+        Returns:
+            Diff with ``new`` gems, ``changed`` scores, ``delisted`` tokens,
+            the ``unchanged`` count and per-source status/latency
+        """
+        t0 = time.perf_counter()
+        rows, sources = self._fetch_all_sources(limit)
+
+        # Merge into a hash index; the first source to report a token wins
+        merged: Dict[str, Dict] = {}
+        for gem in rows:
+            key = self._token_key(gem)
+            if key and key not in merged:
+                merged[key] = gem
+
+        new, changed, rescored = [], [], 0
+        for key, gem in merged.items():
+            fp = self._gem_fingerprint(gem)
+            previous = self._index.get(key)
+            if previous is not None and self._fingerprints.get(key) == fp:
+                merged[key] = previous          # unchanged: keep the cached score
+                continue
+            self._score_gem(gem)
+            self._fingerprints[key] = fp
+            rescored += 1
+            if previous is None:
+                new.append(gem)
+            elif previous.get('gem_score') != gem['gem_score']:
+                changed.append({'key': key, 'symbol': gem.get('symbol', ''),
+                                'old_score': previous.get('gem_score'),
+                                'new_score': gem['gem_score']})
+
+        delisted = [{'key': key, 'symbol': gem.get('symbol', ''), 'gem_score': gem.get('gem_score')}
+                    for key, gem in self._index.items() if key not in merged]
+        for item in delisted:
+            self._fingerprints.pop(item['key'], None)
+
+        self._index = merged
+        if rescored or delisted:
+            self.discovered_gems = sorted(merged.values(),
+                                          key=lambda x: x.get('gem_score', 0), reverse=True)
+            self._save_discoveries()
+
+        self.last_diff = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'new': sorted(new, key=lambda x: x.get('gem_score', 0), reverse=True),
+            'changed': changed,
+            'delisted': delisted,
+            'rescored': rescored,
+            'unchanged': len(merged) - rescored,
+            'total': len(merged),
+            'sources': sources,
+            'elapsed_ms': round((time.perf_counter() - t0) * 1000, 1),
+        }
+        return self.last_diff
 
-        # Score and rank
-        scored = self._score_gems(unique)
-        self.discovered_gems = scored
-        self._save_discoveries()
+    def _fetch_all_sources(self, limit: int) -> Tuple[List[Dict], Dict[str, Dict]]:
+        """Query every source concurrently, each bounded by its deadline.
 
-        return scored[:limit]
+        A source that times out, fails or returns nothing contributes its
+        last good rows, so its tokens are not reported as delisted.
+        """
+        start = time.monotonic()
+        futures = [(name, self._pool.submit(fetch, limit)) for name, fetch in self.sources]
+        rows: List[Dict] = []
+        status: Dict[str, Dict] = {}
+        for name, fut in futures:
+            deadline = start + self.SOURCE_DEADLINES.get(name, 10.0)
+            try:
+                result = fut.result(timeout=max(0.0, deadline - time.monotonic()))
+                state = 'ok' if result else 'empty'
+            except FuturesTimeout:
+                result, state = None, 'timeout'
+            except Exception as e:
+                logger.debug(f"Gem source {name} failed: {e}")
+                result, state = None, 'error'
+            if result:
+                self._source_rows[name] = result
+            else:
+                result = self._source_rows.get(name, [])
+            rows.extend(result)
+            status[name] = {
+                'status': state, 'rows': len(result),
+                'ms': round((time.monotonic() - start) * 1000, 1) if state != 'timeout' else None,
+            }
+        return rows, status
+
+    @staticmethod
+    def _token_key(gem: Dict) -> str:
+        """Merge key: chain + contract address when known, else the symbol."""
+        address = (gem.get('address') or '').lower()
+        if address:
+            return f"{(gem.get('chain') or '').lower()}:{address}"
+        return (gem.get('symbol') or '').upper()
+
+    @staticmethod
+    def _gem_fingerprint(gem: Dict) -> Tuple:
+        """Inputs of ``_score_gem``: a token whose fingerprint is unchanged keeps its score."""
+        return (gem.get('market_cap', 0), gem.get('volume_24h', 0),
+                gem.get('price_change_24h', gem.get('tvl_change_1d', 0)),
+                gem.get('data_source', ''), gem.get('tvl', 0))
 
     def analyze_gem_potential(self, symbol: str) -> Dict:
         """Analyze the potential of a specific gem using real data.
@@ -315,6 +421,7 @@ class CryptoGemFinder:
                     'name': token.get('name', token.get('tokenName', 'Unknown')) if isinstance(token, dict) else 'Unknown',
                     'type': 'dex_new_listing',
                     'chain': token.get('chainId', 'unknown') if isinstance(token, dict) else 'unknown',
+                    'address': token.get('tokenAddress', '') if isinstance(token, dict) else '',
                     'market_cap': 0,
                     'volume_24h': 0,
                     'data_source': 'dexscreener',
@@ -372,64 +479,69 @@ class CryptoGemFinder:
     def _score_gems(self, gems: List[Dict]) -> List[Dict]:
         """Score and rank gems based on real metrics."""
         for gem in gems:
-            score = 0
-            mcap = gem.get('market_cap', 0)
-            vol = gem.get('volume_24h', 0)
-            change = abs(gem.get('price_change_24h', gem.get('tvl_change_1d', 0)) or 0)
-
-            # Market cap score (lower is better for gems)
-            if 0 < mcap < 1_000_000:
-                score += 30
-            elif mcap < 10_000_000:
+            self._score_gem(gem)
+        return sorted(gems, key=lambda x: x.get('gem_score', 0), reverse=True)
+
+    @staticmethod
+    def _score_gem(gem: Dict) -> Dict:
+        """Set ``gem_score`` and ``explosion_potential`` from the gem's metrics."""
+        score = 0
+        mcap = gem.get('market_cap', 0)
+        vol = gem.get('volume_24h', 0)
+        change = abs(gem.get('price_change_24h', gem.get('tvl_change_1d', 0)) or 0)
+
+        # Market cap score (lower is better for gems)
+        if 0 < mcap < 1_000_000:
+            score += 30
+        elif mcap < 10_000_000:
+            score += 25
+        elif mcap < 50_000_000:
+            score += 15
+        elif mcap == 0:
+            score += 20  # Unknown mcap often means very new
+
+        # Volume/mcap ratio
+        if mcap > 0 and vol > 0:
+            ratio = vol / mcap
+            if ratio > 0.5:
                 score += 25
-            elif mcap < 50_000_000:
+            elif ratio > 0.2:
                 score += 15
-            elif mcap == 0:
-                score += 20  # Unknown mcap often means very new
-
-            # Volume/mcap ratio
-            if mcap > 0 and vol > 0:
-                ratio = vol / mcap
-                if ratio > 0.5:
-                    score += 25
-                elif ratio > 0.2:
-                    score += 15
-                elif ratio > 0.05:
-                    score += 8
-
-            # Momentum (price change)
-            if change > 50:
-                score += 20
-            elif change > 20:
-                score += 15
-            elif change > 5:
+            elif ratio > 0.05:
                 score += 8
 
-            # Source bonus
-            source = gem.get('data_source', '')
-            if source == 'coingecko':
-                score += 10  # Trending on CoinGecko = strong signal
-            elif source == 'dexscreener':
-                score += 8   # New DEX listing = early opportunity
-            elif source == 'defillama':
-                score += 5   # DeFi with TVL = more legitimate
-
-            # TVL for DeFi
-            tvl = gem.get('tvl', 0)
-            if tvl > 1_000_000:
-                score += 5
-
-            gem['gem_score'] = min(100, score)
-            if score >= 80:
-                gem['explosion_potential'] = '🚀🚀🚀'
-            elif score >= 60:
-                gem['explosion_potential'] = '🚀🚀'
-            elif score >= 40:
-                gem['explosion_potential'] = '🚀'
-            else:
-                gem['explosion_potential'] = '💎'
-
-        return sorted(gems, key=lambda x: x.get('gem_score', 0), reverse=True)
+        # Momentum (price change)
+        if change > 50:
+            score += 20
+        elif change > 20:
+            score += 15
+        elif change > 5:
+            score += 8
+
+        # Source bonus
+        source = gem.get('data_source', '')
+        if source == 'coingecko':
+            score += 10  # Trending on CoinGecko = strong signal
+        elif source == 'dexscreener':
+            score += 8   # New DEX listing = early opportunity
+        elif source == 'defillama':
+            score += 5   # DeFi with TVL = more legitimate
+
+        # TVL for DeFi
+        tvl = gem.get('tvl', 0)
+        if tvl > 1_000_000:
+            score += 5
+
+        gem['gem_score'] = min(100, score)
+        if score >= 80:
+            gem['explosion_potential'] = '🚀🚀🚀'
+        elif score >= 60:
+            gem['explosion_potential'] = '🚀🚀'
+        elif score >= 40:
+            gem['explosion_potential'] = '🚀'
+        else:
+            gem['explosion_potential'] = '💎'
+        return gem
 
     # ── Persistence ──────────────────────────────────────────────────
 
@@ -455,3 +567,59 @@ class CryptoGemFinder:
 
     def _set_cached(self, key: str, data):
         self._cache[key] = {'data': data, 'ts': datetime.now(timezone.utc)}
+
+
+def benchmark_discovery(latencies: Tuple[float, ...] = (0.05, 0.1, 0.2, 0.3),
+                        universe: int = 20_000, churn: float = 0.01, seed: int = 0) -> Dict:
+    """Concurrent vs sequential source latency, and incremental vs full scoring.
+
+    Sources are simulated by sleeps of ``latencies`` seconds; the scoring
+    part runs two discovery rounds over ``universe`` synthetic tokens with
+    a ``churn`` fraction of them changing in between.
+    """
+    rng = random.Random(seed)
+
+    def sleeper(name, delay):
+        def fetch(limit):
+            time.sleep(delay)
+            return [{'symbol': f'{name}{i}', 'market_cap': 1e6, 'data_source': name}
+                    for i in range(5)]
+        return fetch
+
+    finder = CryptoGemFinder()
+    finder._save_discoveries = lambda: None
+    finder.sources = [(f's{i}', sleeper(f's{i}', d)) for i, d in enumerate(latencies)]
+    start = time.perf_counter()
+    for _, fetch in finder.sources:
+        fetch(10)
+    sequential = time.perf_counter() - start
+    start = time.perf_counter()
+    finder.discover_gem_changes()
+    concurrent = time.perf_counter() - start
+
+    tokens = [{'symbol': f'T{i}', 'market_cap': rng.uniform(1e5, 1e8),
+               'volume_24h': rng.uniform(0, 1e7), 'price_change_24h': rng.uniform(-60, 60),
+               'data_source': 'coinpaprika'} for i in range(universe)]
+    finder = CryptoGemFinder()
+    finder.sources = [('coinpaprika', lambda limit: tokens)]
+    finder._save_discoveries = lambda: None
+    finder.discover_gem_changes()
+    for i in rng.sample(range(universe), int(universe * churn)):
+        tokens[i] = {**tokens[i], 'volume_24h': tokens[i]['volume_24h'] * 1.5}
+    start = time.perf_counter()
+    diff = finder.discover_gem_changes()
+    incremental = time.perf_counter() - start
+    start = time.perf_counter()
+    finder._score_gems([dict(t) for t in tokens])
+    full = time.perf_counter() - start
+
+    return {
+        'sources': len(latencies),
+        'fetch_sequential_s': round(sequential, 3),
+        'fetch_concurrent_s': round(concurrent, 3),
+        'universe': universe,
+        'churn': churn,
+        'rescored': diff['rescored'],
+        'incremental_ms': round(incremental * 1000, 2),
+        'full_rescore_ms': round(full * 1000, 2),
+    }
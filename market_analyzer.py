@@ -24,6 +24,9 @@ try:
 except ImportError:
     _fdn = None
 
+from ohlcv_store import ohlcv_store
+from pattern_detector import pattern_detector
+
 
 class MarketAnalyzer:
     """Analyzer for technical analysis and pattern detection.
@@ -151,7 +154,7 @@ class MarketAnalyzer:
             historical = self._generate_historical_data(symbol, '1d')
 
         closes = [d['close'] for d in historical]
-        detected = self._detect_from_prices(closes)
+        detected = self._detect_from_prices(closes, symbol, historical[-1]['timestamp'])
 
         return {
             'symbol': symbol,
@@ -161,60 +164,50 @@ class MarketAnalyzer:
             'timestamp': datetime.now(timezone.utc).isoformat()
         }
 
+    def detect_patterns_batch(self, symbols: List[str]) -> Dict[str, Dict]:
+        """Detect chart patterns for many symbols in one pass.
+
+        Args:
+            symbols: Symbols to analyze
+
+        Returns:
+            Mapping of symbol -> detect_patterns-style result
+        """
+        series, last_bars, sources = {}, {}, {}
+        for symbol in symbols:
+            historical = self._fetch_real_historical(symbol, '1d')
+            sources[symbol] = 'live' if historical and len(historical) >= 30 else 'simulated'
+            if sources[symbol] == 'simulated':
+                historical = self._generate_historical_data(symbol, '1d')
+            series[symbol] = [d['close'] for d in historical]
+            last_bars[symbol] = historical[-1]['timestamp']
+
+        detected = pattern_detector.detect_batch(series, '1d', last_bars)
+        now = datetime.now(timezone.utc).isoformat()
+        return {
+            symbol: {
+                'symbol': symbol,
+                'patterns_detected': len(patterns),
+                'patterns': patterns,
+                'data_source': sources[symbol],
+                'timestamp': now,
+            }
+            for symbol, patterns in detected.items()
+        }
+
     # ── Real data fetchers ───────────────────────────────────────────
 
     def _fetch_real_historical(self, symbol: str, timeframe: str) -> List[Dict]:
-        """Fetch real historical price data from Yahoo Finance chart API.
-        Falls back to FinancialData.net when Yahoo fails."""
-        if not self._session:
-            return self._fetch_fdn_historical(symbol, timeframe)
-        try:
-            sym = symbol.upper()
-            crypto_map = {
-                'BTC': 'BTC-USD', 'ETH': 'ETH-USD', 'BNB': 'BNB-USD',
-                'SOL': 'SOL-USD', 'XRP': 'XRP-USD', 'ADA': 'ADA-USD',
-                'DOGE': 'DOGE-USD', 'DOT': 'DOT-USD', 'AVAX': 'AVAX-USD',
-                'MATIC': 'MATIC-USD', 'LINK': 'LINK-USD', 'UNI': 'UNI-USD',
-            }
-            ticker = crypto_map.get(sym, sym)
-            tf_map = {'1h': ('15m', '5d'), '4h': ('1h', '1mo'),
-                      '1d': ('1d', '6mo'), '1w': ('1wk', '2y')}
-            interval, rng = tf_map.get(timeframe, ('1d', '6mo'))
-
-            url = f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}"
-            resp = self._session.get(url, params={
-                'interval': interval, 'range': rng
-            }, timeout=10)
-            if resp.status_code != 200:
-                return []
-            data = resp.json()
-            res = data.get('chart', {}).get('result', [])
-            if not res:
-                return []
-            ts_list = res[0].get('timestamp', [])
-            quote = res[0].get('indicators', {}).get('quote', [{}])[0]
-            opens = quote.get('open', [])
-            highs = quote.get('high', [])
-            lows = quote.get('low', [])
-            closes = quote.get('close', [])
-            volumes = quote.get('volume', [])
+        """Fetch real historical bars for a timeframe.
 
-            hist = []
-            for i, t in enumerate(ts_list):
-                if closes[i] is None:
-                    continue
-                hist.append({
-                    'timestamp': datetime.fromtimestamp(t, tz=timezone.utc).isoformat(),
-                    'open': round(opens[i] or closes[i], 2),
-                    'high': round(highs[i] or closes[i], 2),
-                    'low': round(lows[i] or closes[i], 2),
-                    'close': round(closes[i], 2),
-                    'volume': int(volumes[i] or 0),
-                })
-            return hist
-        except Exception as e:
-            logger.debug(f"Historical fetch failed for {symbol}: {e}")
-            return self._fetch_fdn_historical(symbol, timeframe)
+        Every timeframe is resampled locally from the single finest-interval
+        series kept in the shared OHLCV store, so 1h/4h/1d/1w analyses cost
+        one Yahoo download per symbol. Falls back to FinancialData.net."""
+        if self._session:
+            hist = ohlcv_store.get_bars(symbol, timeframe)
+            if hist:
+                return hist
+        return self._fetch_fdn_historical(symbol, timeframe)
 
     def _fetch_fdn_historical(self, symbol: str, timeframe: str = '1d') -> List[Dict]:
         """Fetch historical OHLCV data from FinancialData.net as fallback."""
@@ -310,54 +303,15 @@ class MarketAnalyzer:
 
     # ── Pattern detection from real prices ───────────────────────────
 
-    def _detect_from_prices(self, closes: List[float]) -> List[Dict]:
-        """Detect chart patterns from closing prices."""
-        detected = []
-        n = len(closes)
-        if n < 30:
-            return detected
-
-        # Double bottom
-        lows_idx = [i for i in range(5, n - 5) if closes[i] == min(closes[i-5:i+5])]
-        if len(lows_idx) >= 2:
-            a, b = closes[lows_idx[-2]], closes[lows_idx[-1]]
-            if abs(a - b) / max(a, b) < 0.03:
-                detected.append({
-                    'pattern': 'Double Bottom', 'confidence': round(90 - abs(a-b)/max(a,b)*1000, 1),
-                    'timeframe': '1d', 'implication': 'Bullish - Potential upward movement',
-                    'detected_at': datetime.now(timezone.utc).isoformat(),
-                })
+    def _detect_from_prices(self, closes: List[float], symbol: str = None,
+                            last_bar: str = None) -> List[Dict]:
+        """Detect chart patterns from closing prices.
 
-        # Double top
-        highs_idx = [i for i in range(5, n - 5) if closes[i] == max(closes[i-5:i+5])]
-        if len(highs_idx) >= 2:
-            a, b = closes[highs_idx[-2]], closes[highs_idx[-1]]
-            if abs(a - b) / max(a, b) < 0.03:
-                detected.append({
-                    'pattern': 'Double Top', 'confidence': round(90 - abs(a-b)/max(a,b)*1000, 1),
-                    'timeframe': '1d', 'implication': 'Bearish - Potential downward movement',
-                    'detected_at': datetime.now(timezone.utc).isoformat(),
-                })
+        Delegates to the shared PatternDetector, which caches results
+        per (symbol, last bar) when a symbol is given.
+        """
+        return pattern_detector.detect(closes, symbol, '1d', last_bar)
 
-        # Trend channel
-        recent = closes[-20:]
-        avg_first = sum(recent[:10]) / 10
-        avg_last = sum(recent[10:]) / 10
-        pct = (avg_last - avg_first) / avg_first
-        if pct > 0.05:
-            detected.append({
-                'pattern': 'Channel (Upward)', 'confidence': round(min(95, 70 + pct*200), 1),
-                'timeframe': '1d', 'implication': 'Bullish - Potential upward movement',
-                'detected_at': datetime.now(timezone.utc).isoformat(),
-            })
-        elif pct < -0.05:
-            detected.append({
-                'pattern': 'Channel (Downward)', 'confidence': round(min(95, 70 + abs(pct)*200), 1),
-                'timeframe': '1d', 'implication': 'Bearish - Potential downward movement',
-                'detected_at': datetime.now(timezone.utc).isoformat(),
-            })
-        return detected
-    
     def _generate_historical_data(self, symbol: str, timeframe: str) -> List[Dict]:
         """Generate simulated historical price data.
         
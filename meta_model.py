@@ -6,14 +6,21 @@ This module implements the hybrid approach:
 1. LLM for reasoning and feature extraction
 2. XGBoost/LightGBM for probability estimation
 3. SHAP for explainability
+
+Inference is batched: the feature schema is compiled once, features are
+extracted column by column straight into one preallocated matrix, and a
+whole batch is scored with a single ``predict_proba`` (and SHAP) call.
+Breakout scores are computed on the same matrix, so a whole universe is
+scored, classified and ranked (top-K partial sort) in a few array ops.
 """
 
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 from datetime import datetime, timezone
 import json
 import logging
+import time
 
 # ML Libraries
 try:
@@ -38,14 +45,139 @@ except ImportError:
     logging.warning("SHAP not available. Install with: pip install shap")
 
 
+# Feature schema: name -> (source key, default, transform, parameter)
+#   raw    x
+#   scale  x / p
+#   cap    min(x / p, 1)
+#   bool   1.0 if x else 0.0
+#   shift  (x + 1) / 2        ([-1, 1] -> [0, 1])
+FEATURE_SPECS = {
+    # Technical Features
+    "price_change_1h": ("price_change_1h", 0.0, "raw", None),
+    "price_change_24h": ("price_change_24h", 0.0, "raw", None),
+    "volume_change_24h": ("volume_change_24h", 0.0, "raw", None),
+    "rsi_14": ("rsi", 50.0, "scale", 100.0),  # Normalize to 0-1
+    "adx": ("adx", 0.0, "scale", 100.0),
+    "ema_cross": ("ema_cross", False, "bool", None),
+    "macd_signal": ("macd_signal", 0.0, "raw", None),
+    "bollinger_position": ("bollinger_position", 0.5, "raw", None),
+
+    # On-Chain Features (for crypto)
+    "whale_flow_24h": ("whale_flow", 0.0, "cap", 1e7),
+    "active_addresses": ("active_addresses_change", 0.0, "raw", None),
+    "token_age_consumed": ("token_age_consumed", 0.0, "raw", None),
+    "exchange_inflow": ("exchange_inflow", 0.0, "raw", None),
+    "exchange_outflow": ("exchange_outflow", 0.0, "raw", None),
+
+    # Sentiment Features
+    "sentiment_score": ("sentiment", 0.0, "shift", None),
+    "twitter_volume": ("twitter_volume", 0.0, "cap", 1000),
+    "reddit_mentions": ("reddit_mentions", 0.0, "cap", 100),
+    "news_impact": ("news_impact_score", 0.0, "raw", None),
+    "social_trend": ("social_trend", 0.0, "raw", None),
+
+    # Macro Features
+    "fed_rate": ("fed_rate", 5.0, "scale", 10.0),
+    "cpi_trend": ("cpi_trend", 0.0, "raw", None),
+    "unemployment": ("unemployment", 4.0, "scale", 10.0),
+    "macro_event": ("macro_event", False, "bool", None),
+
+    # LLM-Extracted Features
+    "fundamentals_score": ("fundamentals_score", 0.5, "raw", None),
+    "llm_confidence": ("llm_confidence", 0.5, "raw", None),
+    "pattern_strength": ("pattern_strength", 0.0, "raw", None),
+
+    # Volatility Features
+    "volatility_1w": ("volatility_1w", 0.0, "raw", None),
+    "volatility_1m": ("volatility_1m", 0.0, "raw", None),
+    "atr": ("atr", 0.0, "raw", None),
+}
+
+
+class FeatureSchema:
+    """Feature specs compiled once into a fixed column order"""
+
+    def __init__(self, specs: Dict[str, tuple] = FEATURE_SPECS):
+        self.names = sorted(specs)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.source = {name: specs[name][0] for name in self.names}
+        self._columns = [(i, *specs[name]) for i, name in enumerate(self.names)]
+
+    def transform(self, samples: Sequence[Dict], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Fill an (n_samples, n_features) matrix column by column
+
+        Args:
+            samples: Raw data dictionaries
+            out: Preallocated float64 matrix to fill (optional)
+
+        Returns:
+            Feature matrix in ``names`` order
+        """
+        n = len(samples)
+        if out is None:
+            out = np.empty((n, len(self.names)))
+        for i, key, default, kind, param in self._columns:
+            if kind == "bool":
+                out[:, i] = np.fromiter((bool(s.get(key, default)) for s in samples), dtype=bool, count=n)
+            else:
+                col = np.fromiter((s.get(key, default) for s in samples), dtype=float, count=n)
+                out[:, i] = self._apply(col, kind, param)
+        return out
+    
+    def from_columns(self, columns: Dict[str, np.ndarray], n: Optional[int] = None,
+                     out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Build the feature matrix from columnar data (source key -> array)
+        
+        Missing columns and NaN entries take the feature's default, so a
+        columnar table such as the screener's can be scored without
+        converting it to per-row dictionaries.
+        
+        Args:
+            columns: Source key -> 1-D array, all the same length
+            n: Row count (needed only when ``columns`` is empty)
+            out: Preallocated float64 matrix to fill (optional)
+        """
+        if n is None:
+            n = len(next(iter(columns.values()))) if columns else 0
+        if out is None:
+            out = np.empty((n, len(self.names)))
+        for i, key, default, kind, param in self._columns:
+            raw = columns.get(key)
+            if raw is None:
+                out[:, i] = self._apply(np.full(n, float(default)), kind, param)
+                continue
+            col = np.asarray(raw, dtype=float)
+            col = np.where(np.isnan(col), float(default), col)
+            out[:, i] = self._apply(col, kind, param)
+        return out
+    
+    @staticmethod
+    def _apply(col: np.ndarray, kind: str, param) -> np.ndarray:
+        if kind == "scale":
+            col /= param
+        elif kind == "cap":
+            np.minimum(col / param, 1.0, out=col)
+        elif kind == "shift":
+            col = (col + 1) / 2
+        elif kind == "bool":
+            col = (col != 0).astype(float)
+        return col
+
+
+FEATURE_SCHEMA = FeatureSchema()
+
+
 class FeatureEngineer:
     """
     Feature engineering pipeline for trading signals
     Combines technical, fundamental, sentiment, and macro features
     """
     
-    def __init__(self):
-        self.feature_names = []
+    def __init__(self, schema: FeatureSchema = FEATURE_SCHEMA):
+        self.schema = schema
+        self.feature_names = list(schema.names)
         self.scaler = None
         
     def extract_features(self, data: Dict) -> Dict[str, float]:
@@ -58,55 +190,16 @@ class FeatureEngineer:
         Returns:
             Dictionary of engineered features
         """
-        features = {}
-        
-        # Technical Features
-        features["price_change_1h"] = data.get("price_change_1h", 0.0)
-        features["price_change_24h"] = data.get("price_change_24h", 0.0)
-        features["volume_change_24h"] = data.get("volume_change_24h", 0.0)
-        features["rsi_14"] = data.get("rsi", 50.0) / 100.0  # Normalize to 0-1
-        features["adx"] = data.get("adx", 0.0) / 100.0
-        features["ema_cross"] = 1.0 if data.get("ema_cross", False) else 0.0
-        features["macd_signal"] = data.get("macd_signal", 0.0)
-        features["bollinger_position"] = data.get("bollinger_position", 0.5)
-        
-        # On-Chain Features (for crypto)
-        features["whale_flow_24h"] = min(data.get("whale_flow", 0.0) / 1e7, 1.0)
-        features["active_addresses"] = data.get("active_addresses_change", 0.0)
-        features["token_age_consumed"] = data.get("token_age_consumed", 0.0)
-        features["exchange_inflow"] = data.get("exchange_inflow", 0.0)
-        features["exchange_outflow"] = data.get("exchange_outflow", 0.0)
-        
-        # Sentiment Features
-        features["sentiment_score"] = (data.get("sentiment", 0.0) + 1) / 2  # [-1,1] -> [0,1]
-        features["twitter_volume"] = min(data.get("twitter_volume", 0.0) / 1000, 1.0)
-        features["reddit_mentions"] = min(data.get("reddit_mentions", 0.0) / 100, 1.0)
-        features["news_impact"] = data.get("news_impact_score", 0.0)
-        features["social_trend"] = data.get("social_trend", 0.0)
-        
-        # Macro Features
-        features["fed_rate"] = data.get("fed_rate", 5.0) / 10.0  # Normalize
-        features["cpi_trend"] = data.get("cpi_trend", 0.0)
-        features["unemployment"] = data.get("unemployment", 4.0) / 10.0
-        features["macro_event"] = 1.0 if data.get("macro_event", False) else 0.0
-        
-        # LLM-Extracted Features
-        features["fundamentals_score"] = data.get("fundamentals_score", 0.5)
-        features["llm_confidence"] = data.get("llm_confidence", 0.5)
-        features["pattern_strength"] = data.get("pattern_strength", 0.0)
-        
-        # Volatility Features
-        features["volatility_1w"] = data.get("volatility_1w", 0.0)
-        features["volatility_1m"] = data.get("volatility_1m", 0.0)
-        features["atr"] = data.get("atr", 0.0)
-        
-        return features
+        row = self.schema.transform([data])[0]
+        return dict(zip(self.feature_names, row.tolist()))
     
     def get_feature_vector(self, features: Dict[str, float]) -> np.ndarray:
         """Convert feature dict to numpy array in consistent order"""
-        if not self.feature_names:
-            self.feature_names = sorted(features.keys())
         return np.array([features.get(name, 0.0) for name in self.feature_names])
+    
+    def transform(self, samples: Sequence[Dict], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Raw data dictionaries -> feature matrix (one row per sample)"""
+        return self.schema.transform(samples, out)
 
 
 class MetaModel:
@@ -200,21 +293,29 @@ class MetaModel:
         Returns:
             Probability (0-1)
         """
+        return float(self.predict_proba_batch([features])[0])
+    
+    def predict_proba_batch(self, samples: Sequence[Dict],
+                            X: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Predict breakout probabilities for many samples with one model call
+        
+        Args:
+            samples: Feature dictionaries
+            X: Feature matrix already built from ``samples`` (optional)
+            
+        Returns:
+            Array of probabilities (0-1), one per sample
+        """
         if not self.is_trained:
             logging.warning("Model not trained, returning default probability")
-            return 0.5
-        
-        # Engineer features
-        engineered = self.feature_engineer.extract_features(features)
-        feature_vector = self.feature_engineer.get_feature_vector(engineered)
-        
-        # Reshape for prediction
-        X = feature_vector.reshape(1, -1)
+            return np.full(len(samples), 0.5)
+        if not len(samples):
+            return np.empty(0)
         
-        # Get probability
-        prob = self.model.predict_proba(X)[0, 1]
-        
-        return float(prob)
+        if X is None:
+            X = self.feature_engineer.transform(samples)
+        return self.model.predict_proba(X)[:, 1]
     
     def explain_prediction(self, features: Dict) -> Dict[str, float]:
         """
@@ -226,34 +327,69 @@ class MetaModel:
         Returns:
             Dictionary mapping feature names to contributions
         """
-        if not SHAP_AVAILABLE or self.explainer is None:
-            return {"note": "SHAP not available"}
+        return self.explain_prediction_batch([features])[0]
+    
+    def explain_prediction_batch(self, samples: Sequence[Dict],
+                                 X: Optional[np.ndarray] = None) -> List[Dict[str, float]]:
+        """
+        SHAP contributions for many samples with one explainer call
         
-        # Engineer features
-        engineered = self.feature_engineer.extract_features(features)
-        feature_vector = self.feature_engineer.get_feature_vector(engineered)
+        Args:
+            samples: Feature dictionaries
+            X: Feature matrix already built from ``samples`` (optional)
+            
+        Returns:
+            One {feature name: contribution} dictionary per sample
+        """
+        if not SHAP_AVAILABLE or self.explainer is None:
+            return [{"note": "SHAP not available"} for _ in samples]
+        if not len(samples):
+            return []
         
-        # Calculate SHAP values
-        X = feature_vector.reshape(1, -1)
+        if X is None:
+            X = self.feature_engineer.transform(samples)
         shap_values = self.explainer.shap_values(X)
         
-        # Convert to dictionary
+        # Convert to dictionaries
         if isinstance(shap_values, list):
             shap_values = shap_values[1]  # For binary classification
-        
-        explanation = {}
-        for name, value in zip(self.feature_engineer.feature_names, shap_values[0]):
-            explanation[name] = float(value)
-        
-        return explanation
+        names = self.feature_engineer.feature_names
+        return [dict(zip(names, row)) for row in np.asarray(shap_values, dtype=float).tolist()]
+
+
+# Breakout classes, highest threshold first
+BREAKOUT_CLASSES = (
+    (0.73, "Strong Breakout"),
+    (0.60, "Moderate Breakout"),
+    (0.50, "Weak Signal"),
+)
+
+
+# Features each breakout component is computed from
+BREAKOUT_COMPONENTS = {
+    "momentum": ("rsi_14", "adx", "ema_cross"),
+    "onchain_flow": ("whale_flow_24h",),
+    "sentiment": ("sentiment_score",),
+    "macro": ("macro_event",),
+    "news_impact": ("news_impact",),
+}
 
 
 class BreakoutScorer:
     """
     Calculate breakout score using multi-signal convergence
+    
+    Scores are computed on the ``FeatureSchema`` matrix (whose columns
+    already hold RSI/ADX scaled to 0-1, capped whale flow and shifted
+    sentiment), so a whole universe is scored with a few column products
+    and a weighted sum. Columnar sources that only cover some components
+    (the screener has no on-chain, sentiment, macro or news data) are
+    scored with the weights renormalised over the components they have,
+    so their scores still span 0-1 and the breakout classes apply.
     """
     
-    def __init__(self):
+    def __init__(self, schema: FeatureSchema = FEATURE_SCHEMA):
+        self.schema = schema
         self.weights = {
             "momentum": 0.25,
             "onchain_flow": 0.25,
@@ -262,6 +398,51 @@ class BreakoutScorer:
             "news_impact": 0.15,
         }
     
+    def component_scores(self, X: np.ndarray) -> Dict[str, np.ndarray]:
+        """Per-component scores (one array each) from a feature matrix"""
+        col = lambda name: X[:, self.schema.index[name]]
+        return {
+            "momentum": col("rsi_14") * col("adx") * col("ema_cross"),
+            "onchain_flow": col("whale_flow_24h"),
+            "sentiment": col("sentiment_score"),
+            "macro": col("macro_event"),
+            "news_impact": col("news_impact"),
+        }
+    
+    def weights_for(self, columns: Dict[str, np.ndarray]) -> Dict[str, float]:
+        """
+        Component weights renormalised over the components ``columns`` can feed
+        
+        A component counts when every source column it needs is present
+        with at least one non-NaN value. Falls back to the full weights
+        when no component is covered.
+        """
+        def present(key):
+            col = columns.get(key)
+            return col is not None and bool(np.any(~np.isnan(np.asarray(col, dtype=float))))
+        
+        covered = {name: w for name, w in self.weights.items()
+                   if all(present(self.schema.source[f]) for f in BREAKOUT_COMPONENTS[name])}
+        total = sum(covered.values())
+        if not total:
+            return dict(self.weights)
+        return {name: w / total for name, w in covered.items()}
+    
+    def score_matrix(self, X: np.ndarray, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """Weighted breakout scores (0-1) for every row of a feature matrix"""
+        components = self.component_scores(X)
+        # Elementwise sum (not a BLAS matvec) so a row scores the same in any batch size
+        score = np.zeros(len(X))
+        for name, weight in (weights or self.weights).items():
+            score += weight * components[name]
+        return score
+    
+    def score_batch(self, samples: Sequence[Dict], X: Optional[np.ndarray] = None) -> np.ndarray:
+        """Breakout scores for raw feature dictionaries"""
+        if X is None:
+            X = self.schema.transform(samples)
+        return self.score_matrix(X)
+    
     def calculate_score(self, features: Dict) -> float:
         """
         Calculate breakout score from features
@@ -272,46 +453,62 @@ class BreakoutScorer:
         Returns:
             Score 0-1 (threshold: 0.73 for "Strong Breakout")
         """
-        # Momentum component
-        rsi = features.get("rsi", 50.0) / 100.0
-        adx = features.get("adx", 0.0) / 100.0
-        ema_cross = 1.0 if features.get("ema_cross", False) else 0.0
-        momentum = rsi * adx * ema_cross
-        
-        # On-chain flow component
-        whale_flow = min(features.get("whale_flow", 0.0) / 1e7, 1.0)
-        
-        # Sentiment component
-        sentiment_raw = features.get("sentiment", 0.0)
-        sentiment = (sentiment_raw + 1) / 2  # [-1,1] -> [0,1]
-        
-        # Macro component
-        macro_event = 1.0 if features.get("macro_event", False) else 0.0
-        
-        # News impact component
-        news_impact = features.get("news_impact_score", 0.0)
-        
-        # Weighted combination
-        score = (
-            self.weights["momentum"] * momentum +
-            self.weights["onchain_flow"] * whale_flow +
-            self.weights["sentiment"] * sentiment +
-            self.weights["macro"] * macro_event +
-            self.weights["news_impact"] * news_impact
-        )
-        
-        return float(score)
+        return float(self.score_batch([features])[0])
+    
+    def classify_batch(self, scores: np.ndarray) -> np.ndarray:
+        """Breakout class label for every score"""
+        scores = np.asarray(scores, dtype=float)
+        return np.select([scores >= t for t, _ in BREAKOUT_CLASSES],
+                         [label for _, label in BREAKOUT_CLASSES], default="No Signal")
     
     def classify_breakout(self, score: float) -> str:
         """Classify breakout strength"""
-        if score >= 0.73:
-            return "Strong Breakout"
-        elif score >= 0.60:
-            return "Moderate Breakout"
-        elif score >= 0.50:
-            return "Weak Signal"
-        else:
-            return "No Signal"
+        return str(self.classify_batch([score])[0])
+    
+    def rank(self, symbols: Sequence[str], X: np.ndarray, k: int = 20,
+             weights: Optional[Dict[str, float]] = None) -> List[Dict]:
+        """
+        Top-``k`` assets by breakout score
+        
+        Uses a partial sort (``argpartition``), so only the ``k`` winners
+        are fully ordered.
+        
+        Args:
+            symbols: Symbol for each row of ``X``
+            X: Feature matrix for the universe
+            k: Number of assets returned
+            weights: Component weights (defaults to ``self.weights``)
+            
+        Returns:
+            Ranked entries with score, class and component scores
+        """
+        weights = weights or self.weights
+        scores = self.score_matrix(X, weights)
+        k = min(int(k), len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        classes = self.classify_batch(scores[top])
+        components = {name: arr[top] for name, arr in self.component_scores(X).items()
+                      if name in weights}
+        return [{
+            "rank": r + 1,
+            "symbol": symbols[i],
+            "breakout_score": round(float(scores[i]), 3),
+            "signal_class": str(classes[r]),
+            "components": {name: round(float(arr[r]), 3) for name, arr in components.items()},
+        } for r, i in enumerate(top.tolist())]
+    
+    def rank_columns(self, columns: Dict[str, np.ndarray], symbols: Sequence[str],
+                     k: int = 20) -> List[Dict]:
+        """``rank`` over columnar data (source key -> array), e.g. the screener table
+        
+        Weighted with ``weights_for(columns)``: components without data
+        do not count.
+        """
+        return self.rank(symbols, self.schema.from_columns(columns, n=len(symbols)), k,
+                         self.weights_for(columns))
 
 
 class HybridSignalGenerator:
@@ -327,7 +524,7 @@ class HybridSignalGenerator:
             meta_model: Pre-trained meta-model (optional)
         """
         self.meta_model = meta_model or MetaModel()
-        self.breakout_scorer = BreakoutScorer()
+        self.breakout_scorer = BreakoutScorer(self.meta_model.feature_engineer.schema)
         
         # Ensemble weights
         self.llm_weight = 0.4
@@ -346,44 +543,64 @@ class HybridSignalGenerator:
         Returns:
             Comprehensive signal with score, explanation, etc.
         """
-        # Combine all features
-        all_features = {**llm_result, **market_data}
-        
-        # Calculate ML probability
-        ml_prob = self.meta_model.predict_proba(all_features)
-        
-        # Calculate breakout score
-        breakout_score = self.breakout_scorer.calculate_score(all_features)
-        
-        # Get LLM confidence
-        llm_confidence = llm_result.get("confidence", 0.5)
-        
-        # Ensemble (weighted combination)
-        final_score = self.ml_weight * ml_prob + self.llm_weight * llm_confidence
-        
-        # Get explanation
-        explanation = self.meta_model.explain_prediction(all_features)
-        
-        # Classify signal
-        signal_class = self.breakout_scorer.classify_breakout(breakout_score)
+        return self.generate_signals_batch([(ticker, llm_result, market_data)])[0]
+    
+    def generate_signals_batch(self, batch: Sequence[Tuple[str, Dict, Dict]],
+                               explain: bool = True) -> List[Dict]:
+        """
+        Generate signals for many assets with one model (and SHAP) call
         
-        return {
-            "ticker": ticker,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "final_score": round(final_score, 3),
-            "ml_probability": round(ml_prob, 3),
-            "llm_confidence": round(llm_confidence, 3),
-            "breakout_score": round(breakout_score, 3),
-            "signal_class": signal_class,
-            "recommendation": self._get_recommendation(final_score),
-            "explanation": explanation,
-            "components": {
-                "momentum": all_features.get("rsi", 0),
-                "sentiment": all_features.get("sentiment", 0),
-                "volume": all_features.get("volume_change_24h", 0),
-                "whale_activity": all_features.get("whale_flow", 0)
-            }
-        }
+        Args:
+            batch: (ticker, llm_result, market_data) tuples
+            explain: Include SHAP explanations
+            
+        Returns:
+            One signal per input, in input order
+        """
+        # Combine all features
+        samples = [{**llm_result, **market_data} for _, llm_result, market_data in batch]
+        X = self.meta_model.feature_engineer.transform(samples)
+        
+        # Calculate ML probabilities
+        ml_probs = self.meta_model.predict_proba_batch(samples, X)
+        
+        # Get explanations
+        explanations = (self.meta_model.explain_prediction_batch(samples, X) if explain
+                        else [None] * len(samples))
+        
+        # Breakout scores and classes for the whole batch
+        breakout_scores = self.breakout_scorer.score_matrix(X)
+        signal_classes = self.breakout_scorer.classify_batch(breakout_scores)
+        
+        timestamp = datetime.now(timezone.utc).isoformat()
+        signals = []
+        rows = zip(batch, samples, ml_probs.tolist(), explanations,
+                   breakout_scores.tolist(), signal_classes.tolist())
+        for (ticker, llm_result, _), features, ml_prob, explanation, breakout, signal_class in rows:
+            # Get LLM confidence
+            llm_confidence = llm_result.get("confidence", 0.5)
+            
+            # Ensemble (weighted combination)
+            final_score = self.ml_weight * ml_prob + self.llm_weight * llm_confidence
+            
+            signals.append({
+                "ticker": ticker,
+                "timestamp": timestamp,
+                "final_score": round(final_score, 3),
+                "ml_probability": round(ml_prob, 3),
+                "llm_confidence": round(llm_confidence, 3),
+                "breakout_score": round(breakout, 3),
+                "signal_class": signal_class,
+                "recommendation": self._get_recommendation(final_score),
+                "explanation": explanation,
+                "components": {
+                    "momentum": features.get("rsi", 0),
+                    "sentiment": features.get("sentiment", 0),
+                    "volume": features.get("volume_change_24h", 0),
+                    "whale_activity": features.get("whale_flow", 0)
+                }
+            })
+        return signals
     
     def _get_recommendation(self, score: float) -> str:
         """Get trading recommendation based on score"""
@@ -401,6 +618,65 @@ class HybridSignalGenerator:
             return "Avoid"
 
 
+def benchmark(batch_sizes: Sequence[int] = (1, 10, 100, 1000, 10000),
+              meta_model: Optional[MetaModel] = None, seed: int = 42) -> Dict:
+    """
+    Latency/throughput of batched vs per-sample scoring
+    
+    Uses ``meta_model`` if given, else trains one on synthetic data with
+    whichever booster is installed, falling back to scikit-learn's
+    histogram gradient boosting.
+    """
+    rng = np.random.default_rng(seed)
+    
+    def synthetic(n: int) -> List[Dict]:
+        return [{
+            "rsi": float(r), "adx": float(a), "ema_cross": bool(e), "whale_flow": float(w),
+            "sentiment": float(s), "news_impact_score": float(ni), "volume_change_24h": float(v),
+            "price_change_24h": float(p), "confidence": 0.6,
+        } for r, a, e, w, s, ni, v, p in zip(
+            rng.uniform(10, 90, n), rng.uniform(0, 60, n), rng.random(n) > 0.5,
+            rng.uniform(0, 2e7, n), rng.uniform(-1, 1, n), rng.random(n),
+            rng.normal(0, 20, n), rng.normal(0, 5, n))]
+    
+    if meta_model is None:
+        meta_model = MetaModel("xgboost" if XGBOOST_AVAILABLE else "lightgbm")
+        train = synthetic(2000)
+        X = pd.DataFrame(meta_model.feature_engineer.transform(train),
+                         columns=meta_model.feature_engineer.feature_names)
+        y = pd.Series((X["sentiment_score"] + X["rsi_14"] > 1.0).astype(int))
+        if XGBOOST_AVAILABLE or LIGHTGBM_AVAILABLE:
+            meta_model.xgb_params.update(n_estimators=100, early_stopping_rounds=None)
+            meta_model.lgb_params.update(n_estimators=100, early_stopping_rounds=None)
+            meta_model.train(X, y)
+        else:
+            from sklearn.ensemble import HistGradientBoostingClassifier
+            meta_model.model = HistGradientBoostingClassifier(max_iter=100).fit(X.values, y)
+            meta_model.is_trained = True
+    
+    report = {"model": type(meta_model.model).__name__ if meta_model.is_trained else "untrained",
+              "batches": []}
+    for size in batch_sizes:
+        samples = synthetic(size)
+        start = time.perf_counter()
+        meta_model.predict_proba_batch(samples)
+        batch_s = time.perf_counter() - start
+        row = {
+            "batch_size": size,
+            "batch_ms": round(batch_s * 1000, 3),
+            "rows_per_sec": round(size / batch_s) if batch_s > 0 else None,
+        }
+        if size <= 1000:
+            start = time.perf_counter()
+            for sample in samples:
+                meta_model.predict_proba(sample)
+            loop_s = time.perf_counter() - start
+            row["per_sample_ms"] = round(loop_s * 1000, 3)
+            row["speedup"] = round(loop_s / batch_s, 1) if batch_s > 0 else None
+        report["batches"].append(row)
+    return report
+
+
 # Example usage
 if __name__ == "__main__":
     # Example: Generate a signal
@@ -0,0 +1,142 @@
+"""
+Monte Carlo Price Paths — SignalTrust AI Scanner
+================================================
+Vectorized price-path simulation for ``AIPredictor.predict_price``.
+
+Paths are simulated as one (paths × horizon) NumPy array, either by
+bootstrapping the asset's own daily log returns or from a geometric
+Brownian motion fitted to them. Forecast bands are empirical quantiles
+across paths, not a ``1.96·σ·√t`` envelope.
+
+Simulations are stored as gross-return quantiles (price / start price)
+and memoized per (symbol, last close, horizon), so repeat requests only
+rescale the cached result to the live price. A per-request budget on
+simulated cells and wall-clock time keeps latency bounded for long
+horizons.
+"""
+
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def simulate_paths(log_returns: np.ndarray, horizon: int, n_paths: int,
+                   method: str = 'bootstrap',
+                   rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Gross-return paths, shape (n_paths, horizon), starting from 1.0.
+
+    ``bootstrap`` resamples historical daily log returns with replacement;
+    ``gbm`` draws normal log returns with the same mean and volatility.
+    """
+    rng = rng or np.random.default_rng()
+    if method == 'gbm':
+        mu, sigma = log_returns.mean(), log_returns.std()
+        steps = rng.normal(mu, sigma, size=(n_paths, horizon))
+    else:
+        steps = log_returns[rng.integers(0, len(log_returns), size=(n_paths, horizon))]
+    return np.exp(np.cumsum(steps, axis=1))
+
+
+class MonteCarloEngine:
+    """Budgeted, memoized Monte Carlo forecaster."""
+
+    DEFAULT_PATHS = 20000
+    CHUNK_PATHS = 5000
+    MAX_CELLS = 2_000_000      # paths × horizon simulated per request
+    TIME_BUDGET = 0.25         # seconds of simulation per request
+    MIN_BOOTSTRAP = 30         # returns needed to bootstrap instead of GBM
+    CACHE_SIZE = 512
+
+    def __init__(self, n_paths: int = DEFAULT_PATHS, time_budget: float = TIME_BUDGET):
+        self.n_paths = n_paths
+        self.time_budget = time_budget
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'paths': 0, 'budget_cuts': 0}
+
+    def forecast(self, symbol: str, closes: Sequence[float], horizon: int,
+                 seed: Optional[int] = None) -> Optional[Dict]:
+        """Quantile bands of gross returns for days 1..``horizon``.
+
+        Returns None when there are fewer than 10 usable closes.
+        """
+        closes = np.asarray(closes, dtype=float)
+        closes = closes[np.isfinite(closes) & (closes > 0)]
+        if len(closes) < 10 or horizon < 1:
+            return None
+
+        key = (symbol.upper(), float(closes[-1]), int(horizon))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return {**cached, 'cached': True}
+            self.stats['misses'] += 1
+
+        log_returns = np.diff(np.log(closes))
+        method = 'bootstrap' if len(log_returns) >= self.MIN_BOOTSTRAP else 'gbm'
+        if seed is None:
+            seed = zlib.crc32(repr(key).encode())
+        result = self._simulate(log_returns, horizon, method, np.random.default_rng(seed))
+
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return {**result, 'cached': False}
+
+    def _simulate(self, log_returns, horizon, method, rng) -> Dict:
+        target = min(self.n_paths, max(self.CHUNK_PATHS, self.MAX_CELLS // horizon))
+        start = time.perf_counter()
+        chunks, done = [], 0
+        while done < target:
+            n = min(self.CHUNK_PATHS, target - done)
+            chunks.append(simulate_paths(log_returns, horizon, n, method, rng))
+            done += n
+            if done < target and time.perf_counter() - start > self.time_budget:
+                self.stats['budget_cuts'] += 1
+                break
+        paths = np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+        bands = np.quantile(paths, QUANTILES, axis=0)
+        elapsed = time.perf_counter() - start
+        self.stats['paths'] += done
+        return {
+            'method': method,
+            'paths': done,
+            'quantiles': {q: bands[k] for k, q in enumerate(QUANTILES)},
+            'mean': paths.mean(axis=0),
+            'prob_up': float((paths[:, -1] > 1.0).mean()),
+            'elapsed_ms': round(elapsed * 1000, 2),
+        }
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+
+def benchmark(n_paths: int = 50000, horizon: int = 30, seed: int = 42) -> Dict:
+    """Seeded throughput benchmark (paths/sec) for both simulators."""
+    rng = np.random.default_rng(seed)
+    log_returns = rng.normal(0.0005, 0.03, 365)
+    report = {'paths': n_paths, 'horizon': horizon}
+    for method in ('bootstrap', 'gbm'):
+        start = time.perf_counter()
+        paths = simulate_paths(log_returns, horizon, n_paths, method, np.random.default_rng(seed))
+        np.quantile(paths, QUANTILES, axis=0)
+        elapsed = time.perf_counter() - start
+        report[method] = {
+            'seconds': round(elapsed, 4),
+            'paths_per_sec': int(n_paths / elapsed) if elapsed > 0 else None,
+        }
+    return report
+
+
+if __name__ == '__main__':
+    print(benchmark())
@@ -12,6 +12,8 @@ Optimized for speed:
 - Concurrent futures with aggressive timeouts
 - Priority task queue for critical vs. background work
 - Shared context memory so later AIs build on earlier results
+- Multi-symbol prompt batching: one request per provider carries many
+  symbols, packed to the provider's context budget
 """
 
 import os
@@ -21,8 +23,9 @@ import hashlib
 import logging
 import threading
 from datetime import datetime, timezone
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, List, Optional, Any
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, List, Optional, Any, Tuple
 from collections import OrderedDict
 
 import requests
@@ -173,6 +176,66 @@ def _build_session() -> requests.Session:
     return session
 
 
+# ---------------------------------------------------------------------------
+# Multi-symbol batching helpers
+# ---------------------------------------------------------------------------
+
+BATCH_SYSTEM_MSG = (
+    "You are SignalTrust AI — an elite financial market analyst. "
+    "You receive several assets keyed by id. Respond ONLY with one valid JSON object "
+    "mapping every id to its analysis: {\"<id>\": {\"direction\": \"BULLISH/BEARISH/NEUTRAL\", "
+    "\"confidence\": 0-1, \"key_factors\": [...], \"risk_level\": \"LOW/MEDIUM/HIGH\", "
+    "\"summary\": \"...\"}}. Include each id exactly once."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def pack_batches(sizes: List[int], budget: int, per_item_output: int,
+                 max_output: int, max_items: int) -> List[List[int]]:
+    """Greedy, order-preserving split of items into requests.
+
+    ``sizes`` are the estimated prompt tokens of each item; a request's
+    prompt plus its expected output (``per_item_output`` per item, at most
+    ``max_output``) must fit in ``budget``. An item too large on its own
+    still gets a request of its own.
+    """
+    chunks: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for i, size in enumerate(sizes):
+        cost = size + per_item_output
+        if current and (used + cost > budget or len(current) >= max_items
+                        or (len(current) + 1) * per_item_output > max_output):
+            chunks.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_batch_response(content: str, keys: List[str]) -> Dict[str, dict]:
+    """Per-id analyses from a multi-symbol response.
+
+    Accepts ``{"<id>": {...}}`` or ``{"results": [{"id": ..., ...}]}``,
+    optionally wrapped in a Markdown code fence. Unknown ids and non-object
+    entries are dropped; raises ValueError when no JSON object is found.
+    """
+    start, end = content.find("{"), content.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("no JSON object in batch response")
+    body = json.loads(content[start:end + 1])
+    if isinstance(body.get("results"), list):
+        body = {str(r.get("id", r.get("symbol"))): r for r in body["results"] if isinstance(r, dict)}
+    wanted = set(keys)
+    return {k: v for k, v in body.items() if k in wanted and isinstance(v, dict)}
+
+
 # ---------------------------------------------------------------------------
 # AI Worker
 # ---------------------------------------------------------------------------
@@ -182,6 +245,12 @@ class AIWorker:
 
     PROVIDER_PRIORITY = {"groq": 1, "anthropic": 2, "ollama": 3, "rule_based": 4}
 
+    # Multi-symbol batching (the rule engine is local and runs per item)
+    CONTEXT_TOKENS = {"groq": 8192, "anthropic": 200_000, "ollama": 8192}
+    OUTPUT_TOKENS_PER_ITEM = 250
+    MAX_OUTPUT_TOKENS = 4000
+    MAX_BATCH_ITEMS = 16
+
     def __init__(self, name: str, provider: str, config: dict, session: requests.Session):
         self.name = name
         self.provider = provider
@@ -193,6 +262,8 @@ class AIWorker:
         self.tasks_completed = 0
         self.tasks_failed = 0
         self.total_latency_ms = 0.0
+        self.requests = 0
+        self.tokens_used = 0
         self._lock = threading.Lock()
 
     # ---- public -----------------------------------------------------------
@@ -242,8 +313,63 @@ class AIWorker:
             "tasks_failed": self.tasks_failed,
             "avg_latency_ms": self.avg_latency,
             "success_rate": self.success_rate,
+            "requests": self.requests,
+            "tokens_used": self.tokens_used,
         }
 
+    # ---- batching ---------------------------------------------------------
+
+    @property
+    def batchable(self) -> bool:
+        return self.provider in self.CONTEXT_TOKENS
+
+    def pack(self, header: str, payloads: List[str]) -> List[List[int]]:
+        """Split item payloads into requests that fit this provider's context."""
+        budget = self.CONTEXT_TOKENS.get(self.provider, 8192)
+        budget -= estimate_tokens(BATCH_SYSTEM_MSG) + estimate_tokens(header)
+        return pack_batches([estimate_tokens(p) for p in payloads], budget,
+                            self.OUTPUT_TOKENS_PER_ITEM, self.MAX_OUTPUT_TOKENS,
+                            self.MAX_BATCH_ITEMS)
+
+    def execute_batch(self, task_type: str, prompt: str,
+                      entries: List[Tuple[str, str]]) -> Tuple[Dict[str, dict], int]:
+        """One request for several ``(id, data JSON)`` entries.
+
+        Returns the per-id results that could be parsed and the tokens the
+        request used; missing ids are left for the caller to retry singly.
+        """
+        t0 = time.time()
+        user_msg = (f"Task: {task_type}\n\nPrompt: {prompt}\n\nAssets: {{"
+                    + ", ".join(f"{json.dumps(k)}: {p}" for k, p in entries) + "}")
+        max_tokens = min(self.MAX_OUTPUT_TOKENS, self.OUTPUT_TOKENS_PER_ITEM * len(entries) + 100)
+        try:
+            content, model, tokens = self._complete(BATCH_SYSTEM_MSG, user_msg, max_tokens)
+        except Exception as exc:
+            logger.debug("%s batch request failed: %s", self.name, exc)
+            with self._lock:
+                self.tasks_failed += len(entries)
+                self.total_latency_ms += (time.time() - t0) * 1000
+            return {}, 0
+        try:
+            parsed = split_batch_response(content, [k for k, _ in entries])
+        except ValueError:
+            parsed = {}
+        latency = (time.time() - t0) * 1000
+        with self._lock:
+            self.tasks_completed += len(parsed)
+            self.total_latency_ms += latency / len(entries) * len(parsed)
+        share = round(tokens / len(entries)) if entries else 0
+        return {key: {
+            "success": True,
+            "analysis": analysis,
+            "model": model,
+            "tokens_used": share,
+            "worker": self.name,
+            "provider": self.provider,
+            "latency_ms": round(latency, 1),
+            "batched": True,
+        } for key, analysis in parsed.items()}, tokens
+
     # ---- dispatch ---------------------------------------------------------
 
     def _dispatch(self, task_type: str, prompt: str, data: dict, context: Optional[dict] = None) -> dict:
@@ -270,12 +396,85 @@ class AIWorker:
         else:
             return {"success": False, "error": f"Unknown provider: {self.provider}"}
 
+    # ---- transport --------------------------------------------------------
+
+    def _complete(self, system_msg: str, user_msg: str, max_tokens: int = 1500) -> Tuple[str, str, int]:
+        """One chat completion; returns ``(content, model, tokens_used)``."""
+        if self.provider == "groq":
+            api_key = self.config.get("api_key") or os.getenv("GROQ_API_KEY", "")
+            model = self.config.get("model") or os.getenv("GROQ_MODEL", "llama3-70b-8192")
+            if not api_key:
+                raise RuntimeError("No Groq API key")
+            messages = [
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": user_msg},
+            ]
+            resp = self.session.post(
+                "https://api.groq.com/openai/v1/chat/completions",
+                headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+                json={"model": model, "messages": messages, "temperature": 0.3, "max_tokens": max_tokens},
+                timeout=30,
+            )
+            resp.raise_for_status()
+            body = resp.json()
+            content = body["choices"][0]["message"]["content"]
+            tokens = body.get("usage", {}).get("total_tokens", 0)
+        elif self.provider == "anthropic":
+            api_key = self.config.get("api_key") or os.getenv("ANTHROPIC_API_KEY", "")
+            model = self.config.get("model", "claude-sonnet-4-20250514")
+            if not api_key:
+                raise RuntimeError("No Anthropic API key")
+            resp = self.session.post(
+                "https://api.anthropic.com/v1/messages",
+                headers={
+                    "x-api-key": api_key,
+                    "anthropic-version": "2023-06-01",
+                    "Content-Type": "application/json",
+                },
+                json={
+                    "model": model,
+                    "max_tokens": max_tokens,
+                    "system": system_msg,
+                    "messages": [{"role": "user", "content": user_msg}],
+                },
+                timeout=30,
+            )
+            resp.raise_for_status()
+            body = resp.json()
+            content = body["content"][0]["text"]
+            usage = body.get("usage", {})
+            tokens = usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        elif self.provider == "ollama":
+            base_url = self.config.get("base_url", "http://localhost:11434")
+            model = self.config.get("model", "llama3")
+            resp = self.session.post(
+                f"{base_url}/api/generate",
+                json={"model": model, "prompt": f"{system_msg}\n{user_msg}", "stream": False},
+                timeout=60,
+            )
+            resp.raise_for_status()
+            body = resp.json()
+            content = body.get("response", "")
+            tokens = body.get("prompt_eval_count", 0) + body.get("eval_count", 0)
+        else:
+            raise RuntimeError(f"Provider {self.provider} has no completion endpoint")
+
+        with self._lock:
+            self.requests += 1
+            self.tokens_used += tokens
+        return content, model, tokens
+
+    @staticmethod
+    def _parse_content(content: str) -> dict:
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            return {"raw_response": content}
+
     # ---- Groq -----------------------------------------------------------
 
     def _call_groq(self, task_type: str, prompt: str, data: dict) -> dict:
-        api_key = self.config.get("api_key") or os.getenv("GROQ_API_KEY", "")
-        model = self.config.get("model") or os.getenv("GROQ_MODEL", "llama3-70b-8192")
-        if not api_key:
+        if not (self.config.get("api_key") or os.getenv("GROQ_API_KEY", "")):
             return {"success": False, "error": "No Groq API key"}
 
         system_msg = (
@@ -284,40 +483,20 @@ class AIWorker:
             "confidence (0-1), key_factors (list), risk_level (LOW/MEDIUM/HIGH), "
             "summary (one paragraph)."
         )
-
-        messages = [
-            {"role": "system", "content": system_msg},
-            {"role": "user", "content": f"Task: {task_type}\n\nData: {json.dumps(data, default=str)}\n\nPrompt: {prompt}"},
-        ]
-
-        resp = self.session.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-            json={"model": model, "messages": messages, "temperature": 0.3, "max_tokens": 1500},
-            timeout=30,
-        )
-        resp.raise_for_status()
-        body = resp.json()
-        content = body["choices"][0]["message"]["content"]
-
-        try:
-            parsed = json.loads(content)
-        except json.JSONDecodeError:
-            parsed = {"raw_response": content}
+        content, model, tokens = self._complete(
+            system_msg, f"Task: {task_type}\n\nData: {json.dumps(data, default=str)}\n\nPrompt: {prompt}")
 
         return {
             "success": True,
-            "analysis": parsed,
+            "analysis": self._parse_content(content),
             "model": model,
-            "tokens_used": body.get("usage", {}).get("total_tokens", 0),
+            "tokens_used": tokens,
         }
 
     # ---- Anthropic --------------------------------------------------------
 
     def _call_anthropic(self, task_type: str, prompt: str, data: dict) -> dict:
-        api_key = self.config.get("api_key") or os.getenv("ANTHROPIC_API_KEY", "")
-        model = self.config.get("model", "claude-sonnet-4-20250514")
-        if not api_key:
+        if not (self.config.get("api_key") or os.getenv("ANTHROPIC_API_KEY", "")):
             return {"success": False, "error": "No Anthropic API key"}
 
         system_msg = (
@@ -325,65 +504,24 @@ class AIWorker:
             "Respond ONLY with valid JSON. Include: direction, confidence, "
             "key_factors, risk_level, summary."
         )
-
-        resp = self.session.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={
-                "x-api-key": api_key,
-                "anthropic-version": "2023-06-01",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": model,
-                "max_tokens": 1500,
-                "system": system_msg,
-                "messages": [
-                    {"role": "user", "content": f"Task: {task_type}\nData: {json.dumps(data, default=str)}\nPrompt: {prompt}"}
-                ],
-            },
-            timeout=30,
-        )
-        resp.raise_for_status()
-        body = resp.json()
-        content = body["content"][0]["text"]
-
-        try:
-            parsed = json.loads(content)
-        except json.JSONDecodeError:
-            parsed = {"raw_response": content}
+        content, model, tokens = self._complete(
+            system_msg, f"Task: {task_type}\nData: {json.dumps(data, default=str)}\nPrompt: {prompt}")
 
         return {
             "success": True,
-            "analysis": parsed,
+            "analysis": self._parse_content(content),
             "model": model,
-            "tokens_used": body.get("usage", {}).get("input_tokens", 0) + body.get("usage", {}).get("output_tokens", 0),
+            "tokens_used": tokens,
         }
 
     # ---- Ollama (local) ---------------------------------------------------
 
     def _call_ollama(self, task_type: str, prompt: str, data: dict) -> dict:
-        base_url = self.config.get("base_url", "http://localhost:11434")
-        model = self.config.get("model", "llama3")
-
-        full = (
-            f"You are a financial analyst AI. Respond with JSON only.\n"
-            f"Task: {task_type}\nData: {json.dumps(data, default=str)}\nPrompt: {prompt}"
-        )
-        resp = self.session.post(
-            f"{base_url}/api/generate",
-            json={"model": model, "prompt": full, "stream": False},
-            timeout=60,
-        )
-        resp.raise_for_status()
-        body = resp.json()
-        content = body.get("response", "")
-
-        try:
-            parsed = json.loads(content)
-        except json.JSONDecodeError:
-            parsed = {"raw_response": content}
-
-        return {"success": True, "analysis": parsed, "model": model}
+        content, model, tokens = self._complete(
+            "You are a financial analyst AI. Respond with JSON only.",
+            f"Task: {task_type}\nData: {json.dumps(data, default=str)}\nPrompt: {prompt}")
+        return {"success": True, "analysis": self._parse_content(content), "model": model,
+                "tokens_used": tokens}
 
     # ---- Rule-based (instant, zero cost) ----------------------------------
 
@@ -520,7 +658,15 @@ class MultiAICoordinator:
         "portfolio_analysis": "groq",
     }
 
-    def __init__(self, max_workers: int = 8, cache_ttl: int = 300):
+    BATCH_STRATEGIES = ("consensus", "redundant", "specialist")
+    BATCH_WINDOW = 0.05  # seconds submit() waits to collect tasks into one batch
+
+    DEEP_PROMPT = (
+        "Comprehensive analysis for {symbol}. "
+        "Cover technicals, sentiment, risk, catalysts, and trajectory."
+    )
+
+    def __init__(self, max_workers: int = 8, cache_ttl: int = 300, auto_register: bool = True):
         self.workers: List[AIWorker] = []
         self.max_workers = max_workers
         self._executor = ThreadPoolExecutor(max_workers=max_workers)
@@ -529,8 +675,20 @@ class MultiAICoordinator:
         self.shared_context = SharedContext(max_entries=300)
         self._weights: Dict[str, float] = {}  # worker_name -> weight (0-1)
         self._lock = threading.Lock()
+        self._pending: Dict[tuple, List[Tuple[dict, Future]]] = {}
+        self.batch_stats = {
+            "batches": 0,              # analyze_batch calls
+            "items": 0,
+            "cached": 0,
+            "requests": 0,             # provider requests actually sent
+            "requests_unbatched": 0,   # requests one call per symbol would have sent
+            "tokens": 0,
+            "fallback_singles": 0,     # items retried alone after a bad batch response
+            "wall_ms": 0.0,
+        }
 
-        self._auto_register()
+        if auto_register:
+            self._auto_register()
 
     # ---- registration -----------------------------------------------------
 
@@ -610,6 +768,10 @@ class MultiAICoordinator:
                 cached["from_cache"] = True
                 return cached
 
+        return self._run(task_type, prompt, data, strategy, timeout, use_cache, cache_ttl)
+
+    def _run(self, task_type, prompt, data, strategy, timeout, use_cache, cache_ttl) -> dict:
+        """Steps 2-4 of ``analyze`` (everything after the cache check)."""
         # 2. Build shared context for the symbol
         symbol = data.get("symbol", "")
         context = self.shared_context.get_symbol_context(symbol) if symbol else None
@@ -624,8 +786,11 @@ class MultiAICoordinator:
         }.get(strategy, self._consensus_strategy)
 
         result = strategy_fn(task_type, prompt, data, timeout, context)
+        return self._finish(task_type, prompt, data, result, strategy, use_cache, cache_ttl)
 
-        # 4. Store in cache + shared context
+    def _finish(self, task_type, prompt, data, result, strategy, use_cache, cache_ttl) -> dict:
+        """4. Store in cache + shared context and stamp metadata."""
+        symbol = data.get("symbol", "")
         if result.get("success") and use_cache:
             self.cache.put(task_type, prompt, data, result, ttl=cache_ttl)
 
@@ -653,13 +818,214 @@ class MultiAICoordinator:
                             strategy="specialist", timeout=15, cache_ttl=120)
 
     def deep_analysis(self, symbol: str, data: dict) -> dict:
-        """Deep analysis — consensus strategy, longer timeout."""
-        prompt = (
-            f"Comprehensive analysis for {symbol}. "
-            "Cover technicals, sentiment, risk, catalysts, and trajectory."
-        )
-        return self.analyze("deep_analysis", prompt, {**data, "symbol": symbol},
-                            strategy="consensus", timeout=45, cache_ttl=600)
+        """Deep analysis — consensus strategy, longer timeout.
+
+        Concurrent deep analyses are collected for ``BATCH_WINDOW`` and sent
+        as one multi-symbol request per provider.
+        """
+        future = self.submit("deep_analysis", self.DEEP_PROMPT, {**data, "symbol": symbol},
+                             strategy="consensus", timeout=45, cache_ttl=600)
+        return future.result(timeout=60)
+
+    def deep_analysis_batch(self, items: List[dict]) -> List[dict]:
+        """Deep analysis of many symbols (each item carries its ``symbol``)."""
+        return self.analyze_batch("deep_analysis", self.DEEP_PROMPT, items,
+                                  strategy="consensus", timeout=60, cache_ttl=600)
+
+    # ---- batching -----------------------------------------------------------
+
+    def analyze_batch(
+        self,
+        task_type: str,
+        prompt: str,
+        items: List[dict],
+        strategy: str = "consensus",
+        timeout: int = 60,
+        use_cache: bool = True,
+        cache_ttl: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Run one analysis task over many symbols with one request per provider.
+
+        ``prompt`` is shared by every item; ``{symbol}`` in it is filled in
+        per item, so cache entries and single-call fallbacks are the same as
+        ``analyze(task_type, prompt.replace("{symbol}", sym), item)``.
+        Items are packed into as few requests as each provider's context
+        budget allows; ids missing from a response are retried singly.
+
+        Args:
+            task_type: Category of task (technical_analysis, sentiment, etc.)
+            prompt: The shared question / instruction
+            items: Market data dicts, one per symbol
+            strategy: consensus | redundant | specialist are batched;
+                fastest | pipeline run one ``analyze`` per item
+            timeout: Max seconds to wait for the providers
+            use_cache: Whether to check/store cache
+            cache_ttl: Override default cache TTL for these calls
+
+        Returns:
+            One result dict per item, in order, shaped like ``analyze``
+        """
+        t0 = time.perf_counter()
+        prompts = [prompt.replace("{symbol}", str(d.get("symbol", "asset"))) for d in items]
+        results: List[Optional[dict]] = [None] * len(items)
+        todo = []
+        for i, (p, d) in enumerate(zip(prompts, items)):
+            cached = self.cache.get(task_type, p, d) if use_cache else None
+            if cached:
+                cached["from_cache"] = True
+                results[i] = cached
+            else:
+                todo.append(i)
+
+        stats = {"requests": 0, "requests_unbatched": 0, "tokens": 0, "fallback_singles": 0}
+        if len(todo) == 1 or strategy not in self.BATCH_STRATEGIES:
+            for i in todo:
+                results[i] = self._run(task_type, prompts[i], items[i], strategy, timeout,
+                                       use_cache, cache_ttl)
+        elif todo:
+            contexts = {i: self.shared_context.get_symbol_context(items[i]["symbol"])
+                        if items[i].get("symbol") else None for i in todo}
+            workers = self._batch_workers(task_type, strategy)
+            batch_prompt = prompt.replace("{symbol}", "each asset")
+            futures = {self._executor.submit(self._run_worker_batch, w, task_type, batch_prompt,
+                                             prompts, items, todo, contexts): w for w in workers}
+            per_item: Dict[int, List[dict]] = {i: [] for i in todo}
+            try:
+                for f in as_completed(futures, timeout=timeout):
+                    try:
+                        out, worker_stats = f.result()
+                    except Exception:
+                        continue
+                    for key, value in worker_stats.items():
+                        stats[key] += value
+                    for i, r in out.items():
+                        if r.get("success"):
+                            per_item[i].append(r)
+            except FutureTimeout:
+                logger.warning("analyze_batch: %d workers timed out",
+                               sum(not f.done() for f in futures))
+
+            for i in todo:
+                result = self._combine(strategy, per_item[i])
+                if not result.get("success") and strategy == "specialist":
+                    rule = next((w for w in self.workers if w.provider == "rule_based"), None)
+                    if rule is not None:
+                        result = rule.execute(task_type, prompts[i], items[i], contexts[i])
+                result["batched"] = True
+                results[i] = self._finish(task_type, prompts[i], items[i], result, strategy,
+                                          use_cache, cache_ttl)
+
+        with self._lock:
+            bs = self.batch_stats
+            bs["batches"] += 1
+            bs["items"] += len(items)
+            bs["cached"] += len(items) - len(todo)
+            for key, value in stats.items():
+                bs[key] += value
+            bs["wall_ms"] += (time.perf_counter() - t0) * 1000
+        return results
+
+    def _batch_workers(self, task_type: str, strategy: str) -> List[AIWorker]:
+        if strategy == "specialist":
+            chosen = self._pick_specialist(task_type)
+            return [chosen] if chosen else []
+        return list(self.workers)
+
+    def _run_worker_batch(self, worker, task_type, batch_prompt, prompts, items, todo, contexts):
+        """All of ``todo`` through one worker; returns ``({index: result}, stats)``."""
+        stats = {"requests": 0, "requests_unbatched": 0, "tokens": 0, "fallback_singles": 0}
+        if not worker.batchable:
+            return {i: worker.execute(task_type, prompts[i], items[i], contexts[i]) for i in todo}, stats
+
+        # Stable ids (symbols, suffixed when repeated) and per-item payloads
+        keys, payloads, used = [], [], {}
+        for i in todo:
+            sym = str(items[i].get("symbol") or f"item{i}")
+            used[sym] = used.get(sym, 0) + 1
+            keys.append(sym if used[sym] == 1 else f"{sym}#{used[sym]}")
+            payload = dict(items[i])
+            ctx = contexts.get(i) or {}
+            prior = {cat: v[:2] for cat, v in ctx.items() if v}
+            if prior:
+                payload["prior_context"] = prior
+            payloads.append(json.dumps(payload, default=str))
+
+        out = {}
+        stats["requests_unbatched"] = len(todo)
+        header = f"Task: {task_type}\n\nPrompt: {batch_prompt}"
+        for chunk in worker.pack(header, payloads):
+            parsed, tokens = worker.execute_batch(task_type, batch_prompt,
+                                                  [(keys[j], payloads[j]) for j in chunk])
+            stats["requests"] += 1
+            stats["tokens"] += tokens
+            for j in chunk:
+                i = todo[j]
+                r = parsed.get(keys[j])
+                if r is None:
+                    r = worker.execute(task_type, prompts[i], items[i], contexts[i])
+                    stats["fallback_singles"] += 1
+                    stats["requests"] += 1
+                    stats["tokens"] += r.get("tokens_used", 0)
+                out[i] = r
+        return out, stats
+
+    def _combine(self, strategy: str, results: List[dict]) -> dict:
+        """Merge one item's successful worker results the way ``strategy`` would."""
+        if not results:
+            return {"success": False, "error": f"All workers failed in {strategy}"}
+        if strategy == "consensus":
+            return self._aggregate_consensus(results)
+        if strategy == "redundant":
+            best = max(results, key=lambda r: r.get("analysis", {}).get("confidence", 0))
+            best["alternatives_count"] = len(results) - 1
+            return best
+        results[0]["specialist_used"] = results[0].get("worker")
+        return results[0]
+
+    def submit(self, task_type: str, prompt: str, data: dict, strategy: str = "consensus",
+               timeout: int = 60, cache_ttl: Optional[int] = None) -> Future:
+        """Queue one task; a Future resolves to its ``analyze``-shaped result.
+
+        Tasks with the same ``(task_type, prompt, strategy)`` submitted
+        within ``BATCH_WINDOW`` of the first one go out as one
+        ``analyze_batch``.
+        """
+        future: Future = Future()
+        key = (task_type, prompt, strategy, timeout, cache_ttl)
+        with self._lock:
+            pending = self._pending.setdefault(key, [])
+            pending.append((data, future))
+            first = len(pending) == 1
+        if first:
+            timer = threading.Timer(self.BATCH_WINDOW, self._flush_pending, args=(key,))
+            timer.daemon = True
+            timer.start()
+        return future
+
+    def _flush_pending(self, key: tuple):
+        with self._lock:
+            entries = self._pending.pop(key, [])
+        if not entries:
+            return
+        task_type, prompt, strategy, timeout, cache_ttl = key
+        try:
+            results = self.analyze_batch(task_type, prompt, [d for d, _ in entries],
+                                         strategy=strategy, timeout=timeout, cache_ttl=cache_ttl)
+        except Exception as exc:
+            for _, future in entries:
+                future.set_exception(exc)
+            return
+        for (_, future), result in zip(entries, results):
+            future.set_result(result)
+
+    def get_batch_stats(self) -> dict:
+        with self._lock:
+            bs = dict(self.batch_stats)
+        bs["requests_saved"] = bs["requests_unbatched"] - bs["requests"]
+        bs["avg_wall_ms"] = round(bs["wall_ms"] / bs["batches"], 1) if bs["batches"] else 0
+        bs["wall_ms"] = round(bs["wall_ms"], 1)
+        return bs
 
     # ---- strategies -------------------------------------------------------
 
@@ -711,8 +1077,7 @@ class MultiAICoordinator:
 
         return {"success": False, "error": "All workers failed in fastest"}
 
-    def _specialist_strategy(self, task_type, prompt, data, timeout, context):
-        """Use the best-suited worker for this task type."""
+    def _pick_specialist(self, task_type) -> Optional[AIWorker]:
         preferred = self.TASK_SPECIALISTS.get(task_type)
 
         # Find specialist
@@ -725,7 +1090,11 @@ class MultiAICoordinator:
             if fallback is None:
                 fallback = w
 
-        chosen = specialist or fallback
+        return specialist or fallback
+
+    def _specialist_strategy(self, task_type, prompt, data, timeout, context):
+        """Use the best-suited worker for this task type."""
+        chosen = self._pick_specialist(task_type)
         if not chosen:
             return {"success": False, "error": "No specialist available"}
 
@@ -903,6 +1272,7 @@ class MultiAICoordinator:
             "cache": self.cache.stats(),
             "shared_context_size": len(self.shared_context._data),
             "total_tasks": sum(w.tasks_completed + w.tasks_failed for w in self.workers),
+            "batching": self.get_batch_stats(),
         }
 
     def shutdown(self):
@@ -0,0 +1,291 @@
+"""
+OHLCV Store — SignalTrust AI Scanner
+====================================
+Keeps one price series per symbol at the finest interval available and
+derives every analysis timeframe (1h / 4h / 1d / 1w) locally.
+
+Bars are held as NumPy columns (ts, open, high, low, close, volume).
+Resampling is one vectorized ``reduceat`` pass per column, so
+multi-timeframe analysis needs a single download per symbol instead of
+one Yahoo request per timeframe. Refreshes only pull the last few days
+and merge them into the stored series.
+
+At most ``MAX_SERIES`` symbols are kept (least recently used first out);
+evicting a symbol also drops its resampled timeframes.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+logger = logging.getLogger(__name__)
+
+# Timeframe -> bar length in seconds
+TIMEFRAME_SECONDS = {
+    '1h': 3600,
+    '4h': 4 * 3600,
+    '1d': 86400,
+    '1w': 7 * 86400,
+}
+
+# 1970-01-01 was a Thursday; shift weekly buckets so weeks start on Monday
+_WEEK_OFFSET = 4 * 86400
+
+_COLUMNS = ('ts', 'open', 'high', 'low', 'close', 'volume')
+
+_CRYPTO_TICKERS = {
+    'BTC', 'ETH', 'BNB', 'SOL', 'XRP', 'ADA', 'DOGE', 'DOT', 'AVAX',
+    'MATIC', 'LINK', 'UNI', 'ATOM', 'LTC',
+}
+
+
+def _bucket_ids(ts: np.ndarray, seconds: int) -> np.ndarray:
+    if seconds == TIMEFRAME_SECONDS['1w']:
+        return (ts - _WEEK_OFFSET) // seconds
+    return ts // seconds
+
+
+def resample(bars: Dict[str, np.ndarray], seconds: int) -> Dict[str, np.ndarray]:
+    """Aggregate time-sorted OHLCV columns into ``seconds``-long bars.
+
+    Open is the first open of each bucket, close the last close, high/low
+    the extremes and volume the sum. Bucket timestamps are the bucket start.
+    """
+    ts = bars['ts']
+    if len(ts) == 0:
+        return {col: bars[col][:0] for col in _COLUMNS}
+    ids = _bucket_ids(ts, seconds)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+    bucket_ts = ids[starts] * seconds
+    if seconds == TIMEFRAME_SECONDS['1w']:
+        bucket_ts = bucket_ts + _WEEK_OFFSET
+    return {
+        'ts': bucket_ts,
+        'open': bars['open'][starts],
+        'high': np.maximum.reduceat(bars['high'], starts),
+        'low': np.minimum.reduceat(bars['low'], starts),
+        'close': bars['close'][ends],
+        'volume': np.add.reduceat(bars['volume'], starts),
+    }
+
+
+def yahoo_ticker(symbol: str) -> str:
+    """Map a platform symbol (BTC, BINANCE:BTCUSDT, AAPL) to a Yahoo ticker."""
+    sym = symbol.upper().replace('BINANCE:', '')
+    if sym.endswith('USDT'):
+        sym = sym[:-4]
+    if sym in _CRYPTO_TICKERS:
+        return f"{sym}-USD"
+    return sym
+
+
+class OHLCVStore:
+    """Per-symbol finest-interval OHLCV series with local resampling."""
+
+    YAHOO_CHART = "https://query1.finance.yahoo.com/v8/finance/chart"
+
+    # (interval, seconds, full range, refresh range), finest first
+    SOURCES = [
+        ('60m', 3600, '1y', '5d'),
+        ('1d', 86400, '2y', '1mo'),
+    ]
+    REFRESH_TTL = 120  # seconds between incremental refreshes
+    MAX_SERIES = 256   # symbols kept (each ~1y of hourly bars plus its timeframes)
+
+    def __init__(self, session=None):
+        self._series: "OrderedDict[str, Dict]" = OrderedDict()  # least recently used first
+        self._resampled: Dict[Tuple[str, str], Tuple[int, Dict[str, np.ndarray]]] = {}
+        self._failed: "OrderedDict[str, float]" = OrderedDict()  # ticker -> last failed fetch time
+        self._generation = 0  # bumped on every change to any stored series
+        self._lock = threading.Lock()
+        self._session = session
+        if self._session is None and requests:
+            self._session = requests.Session()
+            self._session.headers.update({"User-Agent": "SignalTrust-OHLCV/1.0"})
+        self.stats = {'full_fetches': 0, 'refreshes': 0, 'resample_hits': 0, 'evictions': 0}
+
+    # ── Public API ───────────────────────────────────────────────────
+
+    def get_bars(self, symbol: str, timeframe: str = '1d') -> List[Dict]:
+        """Bars for ``timeframe`` as a list of OHLCV dicts (oldest first).
+
+        Returns an empty list when no data is available or the stored
+        interval is coarser than the requested timeframe.
+        """
+        cols = self.get_columns(symbol, timeframe)
+        if cols is None:
+            return []
+        return [{
+            'timestamp': datetime.fromtimestamp(int(t), tz=timezone.utc).isoformat(),
+            'open': round(float(o), 2),
+            'high': round(float(h), 2),
+            'low': round(float(l), 2),
+            'close': round(float(c), 2),
+            'volume': int(v),
+        } for t, o, h, l, c, v in zip(*(cols[k] for k in _COLUMNS))]
+
+    def get_closes(self, symbol: str, timeframe: str = '1d') -> List[float]:
+        cols = self.get_columns(symbol, timeframe)
+        return cols['close'].tolist() if cols is not None else []
+
+    def get_columns(self, symbol: str, timeframe: str = '1d') -> Optional[Dict[str, np.ndarray]]:
+        """Resampled OHLCV columns for ``timeframe`` (cached per series generation)."""
+        seconds = TIMEFRAME_SECONDS.get(timeframe, TIMEFRAME_SECONDS['1d'])
+        entry = self._ensure(symbol)
+        if entry is None or entry['interval'] > seconds:
+            return None
+
+        key = (entry['ticker'], timeframe)
+        with self._lock:
+            # Every store or merge bumps the generation, including in-place
+            # updates of the current bar that keep its timestamp
+            bars, generation = entry['bars'], entry['generation']
+            cached = self._resampled.get(key)
+            if cached and cached[0] == generation:
+                self.stats['resample_hits'] += 1
+                return cached[1]
+        cols = bars if entry['interval'] == seconds else resample(bars, seconds)
+        with self._lock:
+            if self._series.get(entry['ticker']) is entry:  # not evicted meanwhile
+                self._resampled[key] = (generation, cols)
+        return cols
+
+    def base_interval(self, symbol: str) -> Optional[int]:
+        """Seconds per stored bar for ``symbol`` (None if nothing stored)."""
+        entry = self._series.get(yahoo_ticker(symbol))
+        return entry['interval'] if entry else None
+
+    def ingest(self, symbol: str, bars: Dict[str, Sequence[float]], interval: int):
+        """Store (or merge) externally fetched bars for ``symbol``."""
+        ticker = yahoo_ticker(symbol)
+        cols = {k: np.asarray(bars[k], dtype=np.int64 if k == 'ts' else float)
+                for k in _COLUMNS}
+        with self._lock:
+            entry = self._series.get(ticker)
+            if entry and entry['interval'] == interval:
+                entry['bars'] = self._merge(entry['bars'], cols)
+                self._series.move_to_end(ticker)
+            else:
+                entry = {'ticker': ticker, 'interval': interval, 'bars': cols}
+                self._store(ticker, entry)
+            entry['fetched_at'] = time.time()
+            entry['generation'] = self._next_generation()
+
+    # ── Fetching ─────────────────────────────────────────────────────
+
+    def _ensure(self, symbol: str) -> Optional[Dict]:
+        ticker = yahoo_ticker(symbol)
+        with self._lock:
+            entry = self._series.get(ticker)
+            if entry:
+                self._series.move_to_end(ticker)
+        if entry and time.time() - entry['fetched_at'] < self.REFRESH_TTL:
+            return entry
+
+        if entry:
+            # Incremental refresh: pull only the tail and merge it in
+            source = next((s for s in self.SOURCES if s[1] == entry['interval']), None)
+            fresh = self._fetch(ticker, source[0], source[3]) if source else None
+            with self._lock:
+                if fresh is not None:
+                    entry['bars'] = self._merge(entry['bars'], fresh)
+                    entry['generation'] = self._next_generation()
+                    self.stats['refreshes'] += 1
+                entry['fetched_at'] = time.time()
+            return entry
+
+        if time.time() - self._failed.get(ticker, 0) < self.REFRESH_TTL:
+            return None
+        for interval, seconds, full_range, _ in self.SOURCES:
+            bars = self._fetch(ticker, interval, full_range)
+            if bars is not None and len(bars['ts']) >= 20:
+                entry = {'ticker': ticker, 'interval': seconds,
+                         'bars': bars, 'fetched_at': time.time()}
+                with self._lock:
+                    entry['generation'] = self._next_generation()
+                    self._store(ticker, entry)
+                    self.stats['full_fetches'] += 1
+                    self._failed.pop(ticker, None)
+                return entry
+        with self._lock:
+            now = time.time()
+            self._failed[ticker] = now
+            self._failed.move_to_end(ticker)
+            # Oldest first: drop failures past their retry delay, and any beyond the bound
+            while self._failed and (len(self._failed) > self.MAX_SERIES
+                                    or next(iter(self._failed.values())) < now - self.REFRESH_TTL):
+                self._failed.popitem(last=False)
+        return None
+
+    def _fetch(self, ticker: str, interval: str, rng: str) -> Optional[Dict[str, np.ndarray]]:
+        if not self._session:
+            return None
+        try:
+            resp = self._session.get(f"{self.YAHOO_CHART}/{ticker}", params={
+                'interval': interval, 'range': rng
+            }, timeout=10)
+            if resp.status_code != 200:
+                return None
+            res = resp.json().get('chart', {}).get('result', [])
+            if not res:
+                return None
+            quote = res[0].get('indicators', {}).get('quote', [{}])[0]
+            ts = np.asarray(res[0].get('timestamp', []), dtype=np.int64)
+            if len(ts) == 0:
+                return None
+
+            def column(name):
+                return np.asarray([np.nan if v is None else v
+                                   for v in quote.get(name, [])], dtype=float)
+
+            close = column('close')
+            keep = ~np.isnan(close)
+            close = close[keep]
+            cols = {'ts': ts[keep], 'close': close}
+            for name in ('open', 'high', 'low'):
+                vals = column(name)[keep]
+                cols[name] = np.where(np.isnan(vals), close, vals)
+            cols['volume'] = np.nan_to_num(column('volume')[keep])
+            return cols
+        except Exception as e:
+            logger.debug(f"OHLCV fetch failed for {ticker} ({interval}): {e}")
+            return None
+
+    def _store(self, ticker: str, entry: Dict):
+        # Caller holds self._lock
+        self._series[ticker] = entry
+        self._series.move_to_end(ticker)
+        while len(self._series) > self.MAX_SERIES:
+            evicted, _ = self._series.popitem(last=False)
+            for key in [k for k in self._resampled if k[0] == evicted]:
+                del self._resampled[key]
+            self._failed.pop(evicted, None)
+            self.stats['evictions'] += 1
+
+    def _next_generation(self) -> int:
+        # Caller holds self._lock
+        self._generation += 1
+        return self._generation
+
+    @staticmethod
+    def _merge(old: Dict[str, np.ndarray], new: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Replace the overlapping tail of ``old`` with ``new`` bars."""
+        if len(new['ts']) == 0:
+            return old
+        keep = old['ts'] < new['ts'][0]
+        return {k: np.concatenate([old[k][keep], new[k]]) for k in _COLUMNS}
+
+
+# Global instance shared by MarketAnalyzer and SignalAIStrategy
+ohlcv_store = OHLCVStore()
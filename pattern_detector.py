@@ -0,0 +1,308 @@
+"""
+Pattern Detector — SignalTrust AI Scanner
+=========================================
+Chart-pattern engine built on O(n) sliding-window extrema.
+
+Pivots are found with monotonic-deque rolling min/max and a single
+vectorized comparison instead of one list slice per bar. Patterns:
+double top/bottom, (inverse) head & shoulders, ascending / descending /
+symmetrical triangles, bull/bear flags, breakouts and trend channels —
+each with a 0-100 confidence score.
+
+Results are cached per (symbol, last bar, last close) so repeated scans
+of an unchanged series are free; ``detect_batch`` is a convenience loop
+over ``detect`` for a whole universe.
+"""
+
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# ---------------------------------------------------------------------------
+#  Sliding extrema + pivots
+# ---------------------------------------------------------------------------
+
+def sliding_extrema(values: Sequence[float], window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Trailing-window min and max of ``values`` in O(n).
+
+    ``mins[i]`` / ``maxs[i]`` cover ``values[max(0, i - window + 1):i + 1]``.
+    Each index enters and leaves the monotonic deques at most once.
+    """
+    arr = np.asarray(values, dtype=float)
+    n = len(arr)
+    mins = np.empty(n)
+    maxs = np.empty(n)
+    lo: deque = deque()
+    hi: deque = deque()
+    for i in range(n):
+        v = arr[i]
+        while lo and arr[lo[-1]] >= v:
+            lo.pop()
+        lo.append(i)
+        while hi and arr[hi[-1]] <= v:
+            hi.pop()
+        hi.append(i)
+        start = i - window + 1
+        if lo[0] < start:
+            lo.popleft()
+        if hi[0] < start:
+            hi.popleft()
+        mins[i] = arr[lo[0]]
+        maxs[i] = arr[hi[0]]
+    return mins, maxs
+
+
+def find_pivots(values: Sequence[float], order: int = 5,
+                strict: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices of pivot lows and pivot highs.
+
+    A pivot low at ``i`` is the minimum of the centred window
+    ``values[i - order:i + order + 1]`` (pivot highs likewise). With
+    ``strict=True`` the bar must be strictly below/above each of its
+    ``order`` neighbours on both sides, which avoids flat-top duplicates.
+    """
+    arr = np.asarray(values, dtype=float)
+    n = len(arr)
+    if n < 2 * order + 1:
+        empty = np.empty(0, dtype=int)
+        return empty, empty
+
+    if strict:
+        core = arr[order:n - order]
+        is_low = np.ones(len(core), dtype=bool)
+        is_high = np.ones(len(core), dtype=bool)
+        for k in range(1, order + 1):
+            left = arr[order - k:n - order - k]
+            right = arr[order + k:n - order + k]
+            is_low &= (core < left) & (core < right)
+            is_high &= (core > left) & (core > right)
+        return np.flatnonzero(is_low) + order, np.flatnonzero(is_high) + order
+
+    mins, maxs = sliding_extrema(arr, 2 * order + 1)
+    # Trailing window ending at i + order == centred window around i
+    core = arr[order:n - order]
+    lows = np.flatnonzero(core == mins[2 * order:]) + order
+    highs = np.flatnonzero(core == maxs[2 * order:]) + order
+    return lows, highs
+
+
+# ---------------------------------------------------------------------------
+#  Pattern engine
+# ---------------------------------------------------------------------------
+
+BULLISH = 'Bullish - Potential upward movement'
+BEARISH = 'Bearish - Potential downward movement'
+NEUTRAL = 'Neutral - Continuation or breakout possible'
+
+
+class PatternDetector:
+    """Detect chart patterns from a close series, cached per last bar."""
+
+    PIVOT_ORDER = 5
+    MIN_BARS = 30
+    CACHE_SIZE = 2048
+
+    def __init__(self, pivot_order: int = PIVOT_ORDER, cache_size: int = CACHE_SIZE):
+        self.pivot_order = pivot_order
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple, List[Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    # ── Public API ───────────────────────────────────────────────────
+
+    def detect(self, closes: Sequence[float], symbol: Optional[str] = None,
+               timeframe: str = '1d', last_bar: Optional[str] = None) -> List[Dict]:
+        """Detect patterns in ``closes``.
+
+        Args:
+            closes: Closing prices, oldest first
+            symbol: Symbol used as cache key (no caching when None)
+            timeframe: Timeframe label attached to each pattern
+            last_bar: Identifier of the newest bar (e.g. its timestamp).
+                The series length and last close are always part of the
+                cache key, so intraday updates to the current bar miss.
+
+        Returns:
+            List of detected pattern dicts, a fresh copy on every call so
+            callers may mutate it without touching the cache
+        """
+        if symbol is None:
+            return self._detect(closes, timeframe)
+
+        key = (symbol, timeframe, last_bar, len(closes),
+               float(closes[-1]) if len(closes) else None)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return [dict(p) for p in cached]
+
+        detected = self._detect(closes, timeframe)
+        with self._lock:
+            self.stats['misses'] += 1
+            self._cache[key] = detected
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return [dict(p) for p in detected]
+
+    def detect_batch(self, series: Dict[str, Sequence[float]],
+                     timeframe: str = '1d',
+                     last_bars: Optional[Dict[str, str]] = None) -> Dict[str, List[Dict]]:
+        """Detect patterns for a whole universe of symbols.
+
+        A convenience wrapper: symbols are detected one by one through
+        ``detect`` (and its cache); there is no cross-symbol vectorization.
+
+        Args:
+            series: Mapping of symbol -> closes
+            timeframe: Timeframe label
+            last_bars: Optional mapping of symbol -> newest bar identifier
+
+        Returns:
+            Mapping of symbol -> detected patterns
+        """
+        last_bars = last_bars or {}
+        return {
+            sym: self.detect(closes, sym, timeframe, last_bars.get(sym))
+            for sym, closes in series.items()
+        }
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    # ── Detection ────────────────────────────────────────────────────
+
+    def _detect(self, closes: Sequence[float], timeframe: str) -> List[Dict]:
+        arr = np.asarray(closes, dtype=float)
+        if len(arr) < self.MIN_BARS:
+            return []
+
+        now = datetime.now(timezone.utc).isoformat()
+        lows, highs = find_pivots(arr, self.pivot_order)
+        found: List[Tuple[str, float, str]] = []
+
+        for check in (self._double_extremes, self._head_and_shoulders,
+                      self._triangles):
+            found.extend(check(arr, lows, highs))
+        found.extend(self._flags(arr))
+        found.extend(self._breakouts(arr))
+        found.extend(self._channels(arr))
+
+        return [{
+            'pattern': name,
+            'confidence': round(float(max(0.0, min(95.0, conf))), 1),
+            'timeframe': timeframe,
+            'implication': implication,
+            'detected_at': now,
+        } for name, conf, implication in found]
+
+    @staticmethod
+    def _double_extremes(arr, lows, highs):
+        out = []
+        if len(lows) >= 2:
+            a, b = arr[lows[-2]], arr[lows[-1]]
+            diff = abs(a - b) / max(a, b)
+            if diff < 0.03:
+                out.append(('Double Bottom', 90 - diff * 1000, BULLISH))
+        if len(highs) >= 2:
+            a, b = arr[highs[-2]], arr[highs[-1]]
+            diff = abs(a - b) / max(a, b)
+            if diff < 0.03:
+                out.append(('Double Top', 90 - diff * 1000, BEARISH))
+        return out
+
+    @staticmethod
+    def _head_and_shoulders(arr, lows, highs):
+        out = []
+        if len(highs) >= 3:
+            l, h, r = arr[highs[-3:]]
+            shoulders = max(l, r)
+            skew = abs(l - r) / h
+            if h > shoulders * 1.02 and skew < 0.05:
+                prominence = (h - shoulders) / h
+                out.append(('Head and Shoulders',
+                            65 + prominence * 300 - skew * 400, BEARISH))
+        if len(lows) >= 3:
+            l, h, r = arr[lows[-3:]]
+            shoulders = min(l, r)
+            skew = abs(l - r) / max(l, r)
+            if h < shoulders * 0.98 and skew < 0.05:
+                prominence = (shoulders - h) / shoulders
+                out.append(('Inverse Head and Shoulders',
+                            65 + prominence * 300 - skew * 400, BULLISH))
+        return out
+
+    @staticmethod
+    def _triangles(arr, lows, highs, tol: float = 0.001):
+        if len(highs) < 2 or len(lows) < 2:
+            return []
+        hi_idx, lo_idx = highs[-4:], lows[-4:]
+        price = arr[-1]
+        # Slopes normalised to fraction of price per bar
+        hi_slope = np.polyfit(hi_idx, arr[hi_idx], 1)[0] / price
+        lo_slope = np.polyfit(lo_idx, arr[lo_idx], 1)[0] / price
+        points = len(hi_idx) + len(lo_idx)
+        conf = 55 + points * 4
+
+        if abs(hi_slope) < tol and lo_slope > tol:
+            return [('Triangle (Ascending)', conf + min(15, lo_slope * 3000), BULLISH)]
+        if abs(lo_slope) < tol and hi_slope < -tol:
+            return [('Triangle (Descending)', conf + min(15, -hi_slope * 3000), BEARISH)]
+        if hi_slope < -tol and lo_slope > tol:
+            return [('Triangle (Symmetrical)', conf, NEUTRAL)]
+        return []
+
+    @staticmethod
+    def _flags(arr, pole: int = 10, flag: int = 10):
+        if len(arr) < pole + flag + 1:
+            return []
+        base = arr[-(pole + flag + 1)]
+        top = arr[-(flag + 1)]
+        move = (top - base) / base
+        consolidation = arr[-flag:]
+        rng = (consolidation.max() - consolidation.min()) / consolidation.mean()
+        drift = (consolidation[-1] - consolidation[0]) / consolidation[0]
+        if abs(move) < 0.08 or rng > abs(move) / 2:
+            return []
+        conf = 60 + min(25, abs(move) * 100) - rng * 100
+        if move > 0 and drift <= 0.01:
+            return [('Bull Flag', conf, BULLISH)]
+        if move < 0 and drift >= -0.01:
+            return [('Bear Flag', conf, BEARISH)]
+        return []
+
+    @staticmethod
+    def _breakouts(arr, lookback: int = 20):
+        prior = arr[-(lookback + 1):-1]
+        price = arr[-1]
+        resistance, support = prior.max(), prior.min()
+        if price > resistance:
+            margin = (price - resistance) / resistance
+            return [('Breakout (Resistance)', 65 + min(25, margin * 500), BULLISH)]
+        if price < support:
+            margin = (support - price) / support
+            return [('Breakdown (Support)', 65 + min(25, margin * 500), BEARISH)]
+        return []
+
+    @staticmethod
+    def _channels(arr):
+        recent = arr[-20:]
+        avg_first = recent[:10].mean()
+        avg_last = recent[10:].mean()
+        pct = (avg_last - avg_first) / avg_first
+        if pct > 0.05:
+            return [('Channel (Upward)', 70 + pct * 200, BULLISH)]
+        if pct < -0.05:
+            return [('Channel (Downward)', 70 + abs(pct) * 200, BEARISH)]
+        return []
+
+
+# Global instance shared by MarketAnalyzer and the background worker
+pattern_detector = PatternDetector()
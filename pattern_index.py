@@ -0,0 +1,356 @@
+"""
+Pattern Index — SignalTrust AI Scanner
+======================================
+Nearest-neighbour index over the numeric feature snapshots of past
+predictions, so "similar historical situations" are found by distance
+instead of exact bucket or substring matches.
+
+Each snapshot (the flattened numeric ``extra`` of a prediction) is
+embedded as a fixed-length vector of scale-free indicators: every
+``EMBEDDING_FEATURES`` entry is centred and divided by a typical range,
+and a missing value sits at the centre, so Euclidean distance weighs the
+indicators comparably. Snapshots with fewer than ``MIN_FEATURES`` known
+indicators are not indexed.
+
+Queries use a scikit-learn ``KDTree`` over the bulk of the points plus
+a brute-force scan of the points added since the last build; the tree is
+rebuilt once that tail outgrows ``REBUILD_FRACTION`` of the index. Both
+parts are exact, so results equal a full scan. Outcomes (CORRECT /
+INCORRECT / PARTIAL and the realized price move) are attached when the
+prediction is evaluated. The index is persisted as one ``.npz`` written
+atomically, and the tree is rebuilt on load.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from sklearn.neighbors import KDTree
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Embedding dimension: (name, source keys, centre, typical range)
+EMBEDDING_FEATURES = (
+    ("rsi", ("rsi",), 50.0, 20.0),
+    ("adx", ("adx",), 25.0, 15.0),
+    ("bb_position", ("bb_pct_b", "bollinger_position"), 0.5, 0.5),
+    ("stoch_k", ("stoch_k",), 50.0, 30.0),
+    ("williams", ("williams",), -50.0, 30.0),
+    ("roc", ("roc",), 0.0, 10.0),
+    ("change_24h", ("change_24h", "price_change_24h"), 0.0, 5.0),
+    ("volume_change_24h", ("volume_change_24h",), 0.0, 50.0),
+    ("trend_gap", ("trend_gap",), 0.0, 2.0),
+    ("sentiment", ("sentiment", "sentiment_score"), 0.0, 0.5),
+)
+DIM = len(EMBEDDING_FEATURES)
+MIN_FEATURES = 2
+OUTCOMES = ("CORRECT", "INCORRECT", "PARTIAL")
+
+
+def bollinger_position(features: Dict[str, float]) -> Optional[float]:
+    """Price position in its Bollinger bands (0 = lower, 1 = upper) from raw band levels.
+
+    Covers snapshots such as ``market_analyzer``'s that carry
+    ``bollinger_upper`` / ``bollinger_lower`` / ``current_price`` instead of %B.
+    """
+    upper, lower = features.get("bollinger_upper"), features.get("bollinger_lower")
+    price = features.get("current_price")
+    if None in (upper, lower, price) or not upper > lower:
+        return None
+    return (price - lower) / (upper - lower)
+
+
+def embed(features: Dict[str, float]) -> Optional[np.ndarray]:
+    """Feature snapshot → embedding, or None if too few indicators are known."""
+    features = dict(features)
+    if "bb_pct_b" not in features and "bollinger_position" not in features:
+        position = bollinger_position(features)
+        if position is not None:
+            features["bollinger_position"] = position
+    if "trend_gap" not in features:
+        # Short/long moving-average gap in percent (scale-free trend)
+        for short, long in (("ema9", "ema21"), ("current_price", "sma_50")):
+            if features.get(short) and features.get(long):
+                features["trend_gap"] = (features[short] / features[long] - 1) * 100
+                break
+    vec = np.zeros(DIM)
+    known = 0
+    for i, (_, keys, centre, scale) in enumerate(EMBEDDING_FEATURES):
+        value = next((features[k] for k in keys if features.get(k) is not None), None)
+        if value is not None and np.isfinite(value):
+            vec[i] = (value - centre) / scale
+            known += 1
+    return vec if known >= MIN_FEATURES else None
+
+
+class PatternIndex:
+    """Incrementally built, persisted k-nearest-neighbour index."""
+
+    REBUILD_FRACTION = 0.1    # rebuild the tree when the unindexed tail exceeds this share
+    MIN_TREE_SIZE = 256       # below this many points, queries are brute force only
+    LEAF_SIZE = 32
+    MAX_POINTS = 200_000      # oldest points are dropped beyond this
+    SAVE_EVERY = 1000         # mutations between automatic saves
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._reset(capacity=1024)
+        self.stats = {"added": 0, "skipped": 0, "queries": 0, "rebuilds": 0}
+        if path and os.path.exists(path):
+            self.load()
+
+    def _reset(self, capacity: int):
+        self._vectors = np.empty((capacity, DIM))
+        self._ts = np.empty(capacity)
+        self._outcomes = np.full(capacity, -1, dtype=np.int8)
+        self._moves = np.full(capacity, np.nan)
+        self._ids: List[str] = []
+        self._symbols: List[str] = []
+        self._directions: List[str] = []
+        self._pos: Dict[str, int] = {}
+        self._tree = None
+        self._tree_n = 0
+        self._dirty = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    # ── Writes ───────────────────────────────────────────────────────
+
+    def add(self, pattern_id: str, symbol: str, direction: str, features: Dict[str, float],
+            ts: Optional[float] = None) -> bool:
+        """Index one snapshot; returns False if it has too few known indicators."""
+        vec = embed(features)
+        with self._lock:
+            if vec is None or pattern_id in self._pos:
+                self.stats["skipped"] += 1
+                return False
+            n = len(self._ids)
+            if n == len(self._vectors):
+                self._grow(2 * n)
+            self._vectors[n] = vec
+            self._ts[n] = time.time() if ts is None else ts
+            self._outcomes[n] = -1
+            self._moves[n] = np.nan
+            self._ids.append(pattern_id)
+            self._symbols.append(symbol)
+            self._directions.append(direction)
+            self._pos[pattern_id] = n
+            self.stats["added"] += 1
+            if n + 1 - self._tree_n > max(self.MIN_TREE_SIZE, self.REBUILD_FRACTION * self._tree_n):
+                self._rebuild()
+            self._touch()
+        return True
+
+    def set_outcomes(self, outcomes: Dict[str, Tuple[str, Optional[float]]]) -> int:
+        """Attach ``{pattern_id: (outcome, price move)}``; returns points updated."""
+        updated = 0
+        with self._lock:
+            for pattern_id, (outcome, move) in outcomes.items():
+                i = self._pos.get(pattern_id)
+                if i is None:
+                    continue
+                self._outcomes[i] = OUTCOMES.index(outcome) if outcome in OUTCOMES else -1
+                self._moves[i] = np.nan if move is None else move
+                updated += 1
+            if updated:
+                self._touch()
+        return updated
+
+    def _grow(self, capacity: int):
+        for name in ("_vectors", "_ts", "_outcomes", "_moves"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _rebuild(self):
+        n = len(self._ids)
+        if n > self.MAX_POINTS:
+            self._drop_oldest(n - self.MAX_POINTS)
+            n = len(self._ids)
+        if SKLEARN_AVAILABLE and n >= self.MIN_TREE_SIZE:
+            # The tree owns a copy, so later appends never touch indexed rows
+            self._tree = KDTree(self._vectors[:n].copy(), leaf_size=self.LEAF_SIZE)
+            self._tree_n = n
+            self.stats["rebuilds"] += 1
+
+    def _drop_oldest(self, count: int):
+        keep = np.sort(np.argsort(self._ts[:len(self._ids)], kind="stable")[count:])
+        for name in ("_vectors", "_ts", "_outcomes", "_moves"):
+            setattr(self, name, getattr(self, name)[keep].copy())
+        self._ids = [self._ids[i] for i in keep]
+        self._symbols = [self._symbols[i] for i in keep]
+        self._directions = [self._directions[i] for i in keep]
+        self._pos = {pid: i for i, pid in enumerate(self._ids)}
+        self._tree, self._tree_n = None, 0
+
+    def _touch(self):
+        self._dirty += 1
+        if self.path and self._dirty >= self.SAVE_EVERY:
+            self.save()
+
+    # ── Queries ──────────────────────────────────────────────────────
+
+    def query(self, features: Dict[str, float], k: int = 10) -> List[Dict]:
+        """The ``k`` most similar indexed situations, nearest first."""
+        vec = embed(features)
+        if vec is None:
+            return []
+        with self._lock:
+            dist, idx = self.query_vector(vec, k)
+            return [self._entry(int(i), float(d)) for d, i in zip(dist, idx)]
+
+    def query_vector(self, vec: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """(distances, row indices) of the ``k`` nearest embeddings."""
+        with self._lock:
+            tree, tree_n, n = self._tree, self._tree_n, len(self._ids)
+            # A view is safe: rows below n are never rewritten (growth and
+            # compaction allocate new arrays)
+            tail = self._vectors[tree_n:n]
+            self.stats["queries"] += 1
+        k = min(int(k), n)
+        if k <= 0:
+            return np.empty(0), np.empty(0, dtype=int)
+        dists, idxs = [], []
+        if tree is not None:
+            d, i = tree.query(vec[None, :], k=min(k, tree_n))
+            dists.append(d[0])
+            idxs.append(i[0])
+        if len(tail):
+            d = np.sqrt(((tail - vec) ** 2).sum(axis=1))
+            top = np.argpartition(d, min(k, len(d)) - 1)[:k]
+            dists.append(d[top])
+            idxs.append(top + tree_n)
+        dist, idx = np.concatenate(dists), np.concatenate(idxs)
+        order = np.argsort(dist, kind="stable")[:k]
+        return dist[order], idx[order]
+
+    def brute_force(self, vec: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact scan over every point (reference for the benchmark)."""
+        with self._lock:
+            vectors = self._vectors[:len(self._ids)].copy()
+        d = np.sqrt(((vectors - vec) ** 2).sum(axis=1))
+        order = np.argsort(d, kind="stable")[:k]
+        return d[order], order
+
+    def _entry(self, i: int, distance: float) -> Dict:
+        code = int(self._outcomes[i])
+        move = float(self._moves[i])
+        return {
+            "id": self._ids[i],
+            "symbol": self._symbols[i],
+            "direction": self._directions[i],
+            "timestamp": datetime.fromtimestamp(self._ts[i], timezone.utc).isoformat(),
+            "distance": round(distance, 4),
+            "similarity": round(1 / (1 + distance), 4),
+            "outcome": OUTCOMES[code] if code >= 0 else None,
+            "move": None if np.isnan(move) else round(move, 5),
+        }
+
+    @staticmethod
+    def summarize(neighbours: Sequence[Dict]) -> Dict:
+        """Outcome statistics over a neighbour list."""
+        evaluated = [n for n in neighbours if n["outcome"]]
+        moves = [n["move"] for n in neighbours if n["move"] is not None]
+        return {
+            "neighbours": len(neighbours),
+            "evaluated": len(evaluated),
+            "correct_rate": (round(sum(n["outcome"] == "CORRECT" for n in evaluated) / len(evaluated), 3)
+                             if evaluated else None),
+            "up_ratio": round(sum(m > 0 for m in moves) / len(moves), 3) if moves else None,
+            "mean_move": round(float(np.mean(moves)), 5) if moves else None,
+        }
+
+    # ── Persistence ──────────────────────────────────────────────────
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            n = len(self._ids)
+            tmp = f"{self.path}.tmp.npz"
+            np.savez(tmp, vectors=self._vectors[:n], ts=self._ts[:n],
+                     outcomes=self._outcomes[:n], moves=self._moves[:n],
+                     ids=np.array(self._ids, dtype=str), symbols=np.array(self._symbols, dtype=str),
+                     directions=np.array(self._directions, dtype=str))
+            os.replace(tmp, self.path)
+            self._dirty = 0
+
+    def load(self):
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if data["vectors"].shape[1:] != (DIM,):
+                    logger.warning("Pattern index %s has another embedding size; starting empty", self.path)
+                    return
+                n = len(data["ids"])
+                with self._lock:
+                    self._reset(capacity=max(1024, 2 * n))
+                    self._vectors[:n] = data["vectors"]
+                    self._ts[:n] = data["ts"]
+                    self._outcomes[:n] = data["outcomes"]
+                    self._moves[:n] = data["moves"]
+                    self._ids = data["ids"].tolist()
+                    self._symbols = data["symbols"].tolist()
+                    self._directions = data["directions"].tolist()
+                    self._pos = {pid: i for i, pid in enumerate(self._ids)}
+                    self._rebuild()
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Failed to load pattern index %s: %s", self.path, e)
+
+
+def benchmark(n: int = 100_000, queries: int = 200, k: int = 10, seed: int = 42) -> Dict:
+    """Build time, query latency and recall@k of the index against brute force.
+
+    Synthetic snapshots are correlated like real indicators (a few market
+    factors plus noise); probes are perturbed copies of indexed points.
+    """
+    rng = np.random.default_rng(seed)
+    index = PatternIndex()
+    names = ("rsi", "adx", "bb_pct_b", "stoch_k", "williams", "roc", "change_24h",
+             "volume_change_24h", "trend_gap", "sentiment")
+    centres = np.array([f[2] for f in EMBEDDING_FEATURES])
+    scales = np.array([f[3] for f in EMBEDDING_FEATURES])
+    factors = rng.normal(size=(n, 3)) @ rng.normal(size=(3, DIM)) / np.sqrt(3)
+    raw = centres + scales * (factors + 0.3 * rng.normal(size=(n, DIM)))
+    probes_raw = raw[rng.integers(0, n, queries)] + scales * 0.1 * rng.normal(size=(queries, DIM))
+
+    start = time.perf_counter()
+    for i in range(n):
+        index.add(f"p{i}", "BTC", "BULLISH", dict(zip(names, raw[i])), ts=float(i))
+    build_s = time.perf_counter() - start
+
+    probes = [embed(dict(zip(names, row))) for row in probes_raw]
+    start = time.perf_counter()
+    results = [index.query_vector(v, k)[1] for v in probes]
+    index_s = time.perf_counter() - start
+    start = time.perf_counter()
+    truth = [index.brute_force(v, k)[1] for v in probes]
+    brute_s = time.perf_counter() - start
+
+    recall = np.mean([len(set(r.tolist()) & set(t.tolist())) / k for r, t in zip(results, truth)])
+    return {
+        "points": len(index),
+        "dim": DIM,
+        "k": k,
+        "adds_per_sec": round(n / build_s) if build_s > 0 else None,
+        "rebuilds": index.stats["rebuilds"],
+        "query_ms": round(index_s * 1000 / queries, 4),
+        "brute_force_ms": round(brute_s * 1000 / queries, 4),
+        "speedup": round(brute_s / index_s, 1) if index_s > 0 else None,
+        "recall_at_k": round(float(recall), 4),
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark())
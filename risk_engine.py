@@ -0,0 +1,157 @@
+"""
+Risk Engine — SignalTrust AI Scanner
+====================================
+Vectorized risk metrics for many assets at once.
+
+Close series are right-aligned into one (assets × days) matrix, padded
+with NaN on the left, so returns, drawdown, historical and parametric
+VaR, CVaR, Sharpe, Sortino and beta are computed in a single pass of
+NaN-aware NumPy reductions instead of one Python loop per metric per
+symbol. Per-symbol results are cached until a new bar arrives.
+"""
+
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+RISK_FREE = 0.04        # annual risk-free rate used for Sharpe / Sortino
+PERIODS = 365           # daily bars per year (crypto calendar, as elsewhere)
+Z_95 = 1.6449
+
+
+def _right_aligned(series: Sequence[Sequence[float]]) -> np.ndarray:
+    """Stack series of different lengths, most recent value in the last column."""
+    width = max((len(s) for s in series), default=0)
+    out = np.full((len(series), width), np.nan)
+    for i, s in enumerate(series):
+        if len(s):
+            out[i, width - len(s):] = s
+    return out
+
+
+def _returns(closes: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rets = closes[:, 1:] / closes[:, :-1] - 1
+    rets[~np.isfinite(rets)] = np.nan
+    return rets
+
+
+def risk_metrics(series: Sequence[Sequence[float]],
+                 bench_series: Optional[Sequence[Sequence[float]]] = None) -> Dict[str, np.ndarray]:
+    """Risk metrics for each close series (one value per series).
+
+    ``bench_series[i]`` is the benchmark for ``series[i]`` (used for beta).
+    Metrics follow the definitions the single-symbol ``assess_risk`` used:
+    population statistics over simple daily returns, historical VaR as the
+    5th-percentile order statistic and a 4% risk-free rate.
+    """
+    closes = _right_aligned(series)
+    n_assets = len(series)
+    if closes.shape[1] < 2:
+        nan = np.full(n_assets, np.nan)
+        return {k: nan for k in ('observations', 'volatility', 'max_drawdown', 'var_95',
+                                 'var_95_parametric', 'cvar_95', 'sharpe', 'sortino', 'beta')}
+
+    rets = _returns(closes)
+    valid = ~np.isnan(rets)
+    n = valid.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.nansum(rets, axis=1) / n
+        dev = np.where(valid, rets - mean[:, None], 0.0)
+        std = np.sqrt((dev ** 2).sum(axis=1) / n)
+        downside = np.sqrt((np.minimum(np.nan_to_num(rets), 0.0) ** 2).sum(axis=1) / n)
+
+        # Drawdown from the running peak
+        peak = np.fmax.accumulate(np.where(np.isnan(closes), -np.inf, closes), axis=1)
+        drawdown = np.where(np.isnan(closes), 0.0, closes / peak - 1).min(axis=1)
+
+        # Historical VaR / CVaR: NaN sorts last, so the first n entries are the data
+        ordered = np.sort(rets, axis=1)
+        idx = np.maximum(0, (n * 0.05).astype(int))
+        var_hist = np.take_along_axis(ordered, np.minimum(idx, ordered.shape[1] - 1)[:, None], axis=1)[:, 0]
+        tail = np.arange(ordered.shape[1])[None, :] <= idx[:, None]
+        cvar = np.nansum(np.where(tail, ordered, 0.0), axis=1) / np.minimum(idx + 1, n)
+
+        annual_excess = mean * PERIODS - RISK_FREE
+        sharpe = np.where(std > 0, annual_excess / (std * np.sqrt(PERIODS)), 0.0)
+        sortino = np.where(downside > 0, annual_excess / (downside * np.sqrt(PERIODS)), 0.0)
+
+    beta = np.full(n_assets, np.nan)
+    if bench_series is not None:
+        width = closes.shape[1]
+        bench = _right_aligned([list(b)[-width:] for b in bench_series])
+        if bench.shape[1] < width:
+            bench = np.hstack([np.full((n_assets, width - bench.shape[1]), np.nan), bench])
+        b_rets = _returns(bench)
+        both = valid & ~np.isnan(b_rets)
+        k = both.sum(axis=1)
+        a = np.where(both, rets, 0.0)
+        b = np.where(both, b_rets, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            a_mean, b_mean = a.sum(axis=1) / k, b.sum(axis=1) / k
+            cov = (np.where(both, (a - a_mean[:, None]) * (b - b_mean[:, None]), 0.0)).sum(axis=1) / k
+            var_b = (np.where(both, (b - b_mean[:, None]) ** 2, 0.0)).sum(axis=1) / k
+            beta = np.where((k >= 9) & (var_b > 0), cov / var_b, np.nan)
+
+    return {
+        'observations': n,
+        'volatility': std * np.sqrt(PERIODS) * 100,
+        'max_drawdown': drawdown * 100,
+        'var_95': var_hist * 100,
+        'var_95_parametric': (mean - Z_95 * std) * 100,
+        'cvar_95': cvar * 100,
+        'sharpe': sharpe,
+        'sortino': sortino,
+        'beta': beta,
+    }
+
+
+class RiskEngine:
+    """Batch risk metrics with a per-symbol cache keyed by the last bar."""
+
+    CACHE_SIZE = 5000
+
+    def __init__(self):
+        self._cache: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'computed': 0, 'batches': 0}
+
+    @staticmethod
+    def _bar_key(closes: Sequence[float]) -> tuple:
+        return (len(closes), float(closes[-1])) if len(closes) else (0, None)
+
+    def assess(self, series: Dict[str, List[float]],
+               benchmarks: Optional[Dict[str, List[float]]] = None) -> Dict[str, Dict[str, float]]:
+        """Metrics per symbol; ``benchmarks[symbol]`` is that symbol's benchmark closes.
+
+        Only symbols whose last bar changed since the previous call are
+        recomputed, all of them in one vectorized pass.
+        """
+        benchmarks = benchmarks or {}
+        out, stale = {}, []
+        with self._lock:
+            for sym, closes in series.items():
+                key = (self._bar_key(closes), self._bar_key(benchmarks.get(sym, [])))
+                cached = self._cache.get(sym)
+                if cached and cached[0] == key:
+                    out[sym] = cached[1]
+                    self.stats['hits'] += 1
+                else:
+                    stale.append((sym, key))
+
+        if stale:
+            metrics = risk_metrics([series[s] for s, _ in stale],
+                                   [benchmarks.get(s, []) for s, _ in stale])
+            with self._lock:
+                self.stats['batches'] += 1
+                self.stats['computed'] += len(stale)
+                for i, (sym, key) in enumerate(stale):
+                    row = {name: (None if np.isnan(vals[i]) else float(vals[i]))
+                           for name, vals in metrics.items()}
+                    self._cache[sym] = (key, row)
+                    out[sym] = row
+                if len(self._cache) > self.CACHE_SIZE:
+                    for sym in list(self._cache)[:len(self._cache) - self.CACHE_SIZE]:
+                        del self._cache[sym]
+        return out
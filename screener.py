@@ -0,0 +1,463 @@
+"""
+Indicator Screener — SignalTrust AI Scanner
+===========================================
+Columnar table of the latest indicator values for every tracked asset,
+plus a small filter/sort expression language evaluated with NumPy.
+
+The background worker refreshes the table incrementally (assets whose
+last close has not changed are skipped), so a query such as
+
+    rsi < 30 and price above ema50 and adx > 25
+
+is a handful of vectorized comparisons over the whole universe instead
+of one ``generate_signals`` call per symbol.
+
+Expression grammar (case-insensitive):
+    expr       := or_expr
+    or_expr    := and_expr ("or" and_expr)*
+    and_expr   := not_expr ("and" not_expr)*
+    not_expr   := "not" not_expr | comparison
+    comparison := sum [("<" | "<=" | ">" | ">=" | "==" | "!=" | "above" | "below") sum]
+    sum        := term (("+" | "-") term)*
+    term       := factor (("*" | "/") factor)*
+    factor     := NUMBER | COLUMN | "(" expr ")" | "-" factor
+"""
+
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from signalai_strategy import (
+    SignalAIStrategy, _adx, _atr, _bollinger, _ema, _fetch_closes, _macd,
+    _roc, _rsi, _stochastic, _support_resistance, _williams_r,
+)
+from ohlcv_store import ohlcv_store
+
+logger = logging.getLogger(__name__)
+
+_IND = SignalAIStrategy.INDICATORS
+
+
+# ---------------------------------------------------------------------------
+#  Indicator columns (derived from SignalAIStrategy.INDICATORS)
+# ---------------------------------------------------------------------------
+
+def _last(vals: List[float]) -> float:
+    return vals[-1] if vals else float('nan')
+
+
+def _truthy(values) -> np.ndarray:
+    """Boolean view of an expression result; NaN (missing data) is False."""
+    values = np.asarray(values)
+    if values.dtype == bool:
+        return values
+    return np.nan_to_num(values, nan=0.0) != 0
+
+
+# Indicator key -> function(closes) returning {column: value}
+INDICATOR_COLUMNS: Dict[str, Callable[[List[float]], Dict[str, float]]] = {
+    "EMA9": lambda c: {"ema9": _last(_ema(c, _IND["EMA9"]["period"]))},
+    "EMA21": lambda c: {"ema21": _last(_ema(c, _IND["EMA21"]["period"]))},
+    "EMA50": lambda c: {"ema50": _last(_ema(c, _IND["EMA50"]["period"]))},
+    "RSI": lambda c: {"rsi": _rsi(c, _IND["RSI"]["period"])},
+    "MACD": lambda c: (lambda m: {"macd": m["value"], "macd_signal": m["signal"],
+                                  "macd_hist": m["histogram"]})(_macd(c)),
+    "BB": lambda c: (lambda b: {"bb_pct_b": b["pct_b"], "bb_width": b["bandwidth"]})(
+        _bollinger(c, _IND["BB"]["period"], _IND["BB"]["std"])),
+    "STOCH": lambda c: (lambda s: {"stoch_k": s["k"], "stoch_d": s["d"]})(
+        _stochastic(c, _IND["STOCH"]["period"])),
+    "ADX": lambda c: {"adx": _adx(c, _IND["ADX"]["period"])},
+    "ATR": lambda c: {"atr": _atr(c, _IND["ATR"]["period"])},
+    "ROC": lambda c: {"roc": _roc(c, _IND["ROC"]["period"])},
+    "WILLIAMS": lambda c: {"williams": _williams_r(c, _IND["WILLIAMS"]["period"])},
+    "SR": lambda c: (lambda s: {"support": s["support"], "resistance": s["resistance"]})(
+        _support_resistance(c)),
+}
+
+BASE_COLUMNS = ["price", "change_24h"]
+
+
+def compute_indicator_row(closes: List[float]) -> Dict[str, float]:
+    """Latest value of every screener column for one close series."""
+    row = {"price": closes[-1]}
+    for fn in INDICATOR_COLUMNS.values():
+        try:
+            row.update(fn(closes))
+        except Exception:
+            continue
+    return row
+
+
+# ---------------------------------------------------------------------------
+#  Expression language
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r"\s*(?:(\d+\.?\d*|\.\d+)|([A-Za-z_][A-Za-z0-9_]*)|(<=|>=|==|!=|[<>()+\-*/]))")
+
+_COMPARATORS = {
+    "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+    "==": np.equal, "!=": np.not_equal, "below": np.less, "above": np.greater,
+}
+_ARITH = {"+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide}
+
+Columns = Dict[str, np.ndarray]
+Node = Callable[[Columns], np.ndarray]
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        m = _TOKEN_RE.match(text, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"Unexpected character at position {pos}: {text[pos]!r}")
+        num, ident, op = m.groups()
+        if num is not None:
+            tokens.append(("num", num))
+        elif ident is not None:
+            tokens.append(("ident", ident.lower()))
+        else:
+            tokens.append(("op", op))
+        pos = m.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser producing a closure over table columns."""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.columns_used: List[str] = []
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise ValueError("Empty expression")
+        node = self._or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected token: {self.tokens[self.pos][1]!r}")
+        return node
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos][1] if self.pos < len(self.tokens) else None
+
+    def _take(self) -> Tuple[str, str]:
+        if self.pos >= len(self.tokens):
+            raise ValueError("Unexpected end of expression")
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
+    def _or(self) -> Node:
+        node = self._and()
+        while self._peek() == "or":
+            self._take()
+            left, right = node, self._and()
+            node = lambda cols, l=left, r=right: np.logical_or(_truthy(l(cols)), _truthy(r(cols)))
+        return node
+
+    def _and(self) -> Node:
+        node = self._not()
+        while self._peek() == "and":
+            self._take()
+            left, right = node, self._not()
+            node = lambda cols, l=left, r=right: np.logical_and(_truthy(l(cols)), _truthy(r(cols)))
+        return node
+
+    def _not(self) -> Node:
+        if self._peek() == "not":
+            self._take()
+            inner = self._not()
+            return lambda cols: np.logical_not(_truthy(inner(cols)))
+        return self._comparison()
+
+    def _comparison(self) -> Node:
+        node = self._sum()
+        op = self._peek()
+        if op in _COMPARATORS:
+            self._take()
+            left, right, fn = node, self._sum(), _COMPARATORS[op]
+            node = lambda cols: fn(left(cols), right(cols))
+        return node
+
+    def _sum(self) -> Node:
+        node = self._term()
+        while self._peek() in ("+", "-"):
+            fn = _ARITH[self._take()[1]]
+            left, right = node, self._term()
+            node = lambda cols, l=left, r=right, f=fn: f(l(cols), r(cols))
+        return node
+
+    def _term(self) -> Node:
+        node = self._factor()
+        while self._peek() in ("*", "/"):
+            fn = _ARITH[self._take()[1]]
+            left, right = node, self._factor()
+            node = lambda cols, l=left, r=right, f=fn: f(l(cols), r(cols))
+        return node
+
+    def _factor(self) -> Node:
+        kind, value = self._take()
+        if kind == "num":
+            num = float(value)
+            return lambda cols: num
+        if value == "(":
+            node = self._or()
+            if self._take()[1] != ")":
+                raise ValueError("Missing closing parenthesis")
+            return node
+        if value == "-":
+            inner = self._factor()
+            return lambda cols: np.negative(inner(cols))
+        if kind == "ident" and value not in ("and", "or", "not") and value not in _COMPARATORS:
+            self.columns_used.append(value)
+            return lambda cols: cols[value]
+        raise ValueError(f"Unexpected token: {value!r}")
+
+
+@lru_cache(maxsize=256)
+def compile_expression(text: str) -> Tuple[Node, Tuple[str, ...]]:
+    """Compile a filter expression once; returns (node, columns used)."""
+    parser = _Parser(text)
+    node = parser.parse()
+    return node, tuple(parser.columns_used)
+
+
+# ---------------------------------------------------------------------------
+#  Columnar table
+# ---------------------------------------------------------------------------
+
+class ScreenerTable:
+    """Growable column store: one row per asset, one float array per column."""
+
+    def __init__(self, columns: Sequence[str], capacity: int = 256):
+        self.columns = list(columns)
+        self._data = {c: np.full(capacity, np.nan) for c in self.columns}
+        self.symbols: List[str] = []
+        self.markets: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._fingerprints: Dict[str, Tuple] = {}
+        self._lock = threading.Lock()
+        self.updated_at: Optional[str] = None
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def fingerprint(self, symbol: str) -> Optional[Tuple]:
+        return self._fingerprints.get(symbol)
+
+    def upsert(self, symbol: str, market: str, values: Dict[str, float], fingerprint: Tuple = None):
+        with self._lock:
+            row = self._index.get(symbol)
+            if row is None:
+                row = len(self.symbols)
+                if row >= len(self._data[self.columns[0]]):
+                    for c in self.columns:
+                        grown = np.full(max(1, row) * 2, np.nan)
+                        grown[:row] = self._data[c][:row]
+                        self._data[c] = grown
+                self._index[symbol] = row
+                self.symbols.append(symbol)
+                self.markets.append(market)
+            for c in self.columns:
+                v = values.get(c)
+                self._data[c][row] = np.nan if v is None else float(v)
+            if fingerprint is not None:
+                self._fingerprints[symbol] = fingerprint
+            self.updated_at = datetime.now(timezone.utc).isoformat()
+
+    def export_state(self) -> Dict:
+        """Picklable copy of the table (see ``shared_state``)."""
+        with self._lock:
+            n = len(self.symbols)
+            return {
+                "columns": list(self.columns),
+                "data": {c: self._data[c][:n].copy() for c in self.columns},
+                "symbols": list(self.symbols),
+                "markets": list(self.markets),
+                "fingerprints": dict(self._fingerprints),
+                "updated_at": self.updated_at,
+            }
+
+    def load_state(self, state: Dict):
+        """Replace the table contents with an ``export_state`` snapshot."""
+        with self._lock:
+            self.columns = list(state["columns"])
+            self._data = {c: np.array(state["data"][c], dtype=float) for c in self.columns}
+            self.symbols = list(state["symbols"])
+            self.markets = list(state["markets"])
+            self._index = {s: i for i, s in enumerate(self.symbols)}
+            self._fingerprints = dict(state["fingerprints"])
+            self.updated_at = state["updated_at"]
+
+    def snapshot(self) -> Tuple[Columns, np.ndarray, np.ndarray]:
+        """Consistent view: (columns, symbols, markets) trimmed to size."""
+        with self._lock:
+            n = len(self.symbols)
+            cols = {c: self._data[c][:n].copy() for c in self.columns}
+            return cols, np.array(self.symbols, dtype=object), np.array(self.markets, dtype=object)
+
+
+class Screener:
+    """Maintains the universe table and answers screener queries."""
+
+    MAX_FETCH_WORKERS = 8
+
+    def __init__(self):
+        columns = list(BASE_COLUMNS)
+        for fn in INDICATOR_COLUMNS.values():
+            columns.extend(c for c in fn([1.0] * 60) if c not in columns)
+        self.table = ScreenerTable(columns)
+        self.last_refresh: Dict = {}
+
+    # ── Refresh ──────────────────────────────────────────────────────
+
+    def refresh(self, universe: Dict[str, List[Dict]]) -> Dict:
+        """Incrementally refresh indicator rows.
+
+        Args:
+            universe: market name -> list of asset dicts (``symbol``, optional
+                ``price`` / ``change_percent``) as returned by RealTimeMarketData
+
+        Returns:
+            Refresh statistics
+        """
+        t0 = time.time()
+        jobs = [(market, asset) for market, assets in universe.items()
+                for asset in assets if asset.get("symbol")]
+        with ThreadPoolExecutor(max_workers=self.MAX_FETCH_WORKERS) as pool:
+            outcomes = list(pool.map(lambda job: self._refresh_one(*job), jobs))
+
+        self.last_refresh = {
+            "assets": len(jobs),
+            "updated": outcomes.count("updated"),
+            "unchanged": outcomes.count("unchanged"),
+            "failed": outcomes.count("failed"),
+            "elapsed_seconds": round(time.time() - t0, 2),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+        return self.last_refresh
+
+    def _refresh_one(self, market: str, asset: Dict) -> str:
+        symbol = asset["symbol"]
+        try:
+            closes = self._closes(symbol, market)
+        except Exception as e:
+            logger.debug(f"Screener fetch failed for {symbol}: {e}")
+            closes = []
+        if len(closes) < 15:
+            return "failed"
+
+        fingerprint = (len(closes), closes[-1], asset.get("price"))
+        if self.table.fingerprint(symbol) == fingerprint:
+            return "unchanged"
+
+        row = compute_indicator_row(closes)
+        if asset.get("price"):
+            row["price"] = asset["price"]
+        row["change_24h"] = asset.get("change_percent")
+        self.table.upsert(symbol, market, row, fingerprint)
+        return "updated"
+
+    @staticmethod
+    def _closes(symbol: str, market: str) -> List[float]:
+        ticker = f"{symbol}-USD" if market == "crypto" else symbol
+        closes = ohlcv_store.get_closes(ticker, "1d")
+        return closes if len(closes) >= 15 else _fetch_closes(symbol)
+
+    def export_state(self) -> Dict:
+        return {"table": self.table.export_state(), "last_refresh": dict(self.last_refresh)}
+
+    def load_state(self, state: Dict):
+        self.table.load_state(state["table"])
+        self.last_refresh = state["last_refresh"]
+
+    # ── Query ────────────────────────────────────────────────────────
+
+    def query(self, expression: str = "", market: str = None, sort: str = None,
+              limit: int = 50) -> Dict:
+        """Filter and sort the universe table.
+
+        Args:
+            expression: Filter expression, e.g. ``rsi < 30 and adx > 25``
+            market: Restrict to one market (e.g. ``crypto``)
+            sort: Column to sort by; prefix with ``-`` for descending
+            limit: Maximum rows returned
+
+        Returns:
+            Matching rows and query metadata
+
+        Raises:
+            ValueError: On a malformed expression or unknown column
+        """
+        t0 = time.perf_counter()
+        cols, symbols, markets = self.table.snapshot()
+        n = len(symbols)
+        mask = np.ones(n, dtype=bool)
+
+        if expression and expression.strip():
+            node, used = compile_expression(expression.strip().lower())
+            unknown = [c for c in used if c not in cols]
+            if unknown:
+                raise ValueError(f"Unknown column(s): {', '.join(sorted(set(unknown)))}")
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mask &= np.broadcast_to(_truthy(node(cols)), (n,))
+        if market:
+            mask &= markets == market
+
+        idx = np.flatnonzero(mask)
+        if sort:
+            descending = sort.startswith("-")
+            key = sort.lstrip("-+").lower()
+            if key not in cols:
+                raise ValueError(f"Unknown sort column: {key}")
+            values = cols[key][idx]
+            # NaNs always sort last
+            order = np.argsort(-values if descending else values, kind="stable")
+            idx = idx[order]
+        idx = idx[:max(0, int(limit))]
+
+        results = []
+        for i in idx:
+            row = {"symbol": symbols[i], "market": markets[i]}
+            for c, arr in cols.items():
+                v = arr[i]
+                row[c] = None if np.isnan(v) else round(float(v), 6)
+            results.append(row)
+
+        return {
+            "query": expression,
+            "market": market,
+            "sort": sort,
+            "count": int(mask.sum()),
+            "universe_size": n,
+            "results": results,
+            "columns": self.table.columns,
+            "updated_at": self.table.updated_at,
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 3),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Module singleton
+# ---------------------------------------------------------------------------
+
+_screener: Optional[Screener] = None
+_screener_lock = threading.Lock()
+
+
+def get_screener() -> Screener:
+    """Get or create the global screener instance."""
+    global _screener
+    if _screener is None:
+        with _screener_lock:
+            if _screener is None:
+                _screener = Screener()
+    return _screener
@@ -0,0 +1,132 @@
+"""
+Shared State — SignalTrust AI Scanner
+=====================================
+Cross-process snapshots of results computed by the background worker.
+
+gunicorn runs the app with ``--preload``: the module (and the
+BackgroundAIWorker thread it starts) is loaded once in the master
+process, then request workers are forked. Forked workers do not inherit
+running threads, so anything the worker refreshes in memory would stay
+at its initial state in every process that serves requests.
+
+The worker therefore publishes each refreshed result here — one pickle
+file per name, written to a temporary file and swapped in with
+``os.replace`` — and request workers call ``sync`` before reading. A
+sync is one ``stat``; the snapshot is only unpickled when its file
+changed since this process last applied it. Files are written and read
+by this application only (``data/shared_state``).
+"""
+
+import logging
+import os
+import pickle
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR = os.path.join("data", "shared_state")
+
+
+class SharedState:
+    """Named snapshots on disk, re-read by each process only when they change."""
+
+    def __init__(self, directory: str = STATE_DIR):
+        self.directory = directory
+        self._applied: Dict[str, Tuple[int, int, int]] = {}  # name -> file stamp seen here
+        self._lock = threading.Lock()
+        self.stats = {"published": 0, "loaded": 0, "load_errors": 0}
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.pkl")
+
+    @staticmethod
+    def _stamp(path: str) -> Tuple[int, int, int]:
+        st = os.stat(path)
+        # os.replace installs a new inode, so this changes even within one mtime tick
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def publish(self, name: str, value: Any) -> bool:
+        """Atomically replace snapshot ``name``; returns False on I/O failure."""
+        path = self._path(name)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+            stamp = self._stamp(path)
+        except OSError as e:
+            logger.warning("Failed to publish shared state %s: %s", name, e)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+        with self._lock:
+            # The publishing process already holds this value in memory
+            self._applied[name] = stamp
+            self.stats["published"] += 1
+        return True
+
+    def sync(self, name: str, apply: Callable[[Any], None]) -> bool:
+        """Call ``apply(value)`` if snapshot ``name`` changed since this process saw it.
+
+        Returns True when a newer snapshot was applied.
+        """
+        path = self._path(name)
+        try:
+            stamp = self._stamp(path)
+        except OSError:
+            return False
+        with self._lock:
+            if self._applied.get(name) == stamp:
+                return False
+            # Claimed before loading so concurrent requests do not all unpickle it
+            self._applied[name] = stamp
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except Exception as e:
+            # Stamp kept: a corrupt file is not re-read on every request, only once replaced
+            logger.warning("Failed to load shared state %s: %s", name, e)
+            with self._lock:
+                self.stats["load_errors"] += 1
+            return False
+        try:
+            apply(value)
+        except Exception as e:
+            # Kept as applied: a snapshot this code cannot read is skipped until the next publish
+            logger.warning("Failed to apply shared state %s: %s", name, e)
+            with self._lock:
+                self.stats["load_errors"] += 1
+            return False
+        with self._lock:
+            self.stats["loaded"] += 1
+        return True
+
+    def load(self, name: str, default: Any = None) -> Any:
+        """Current snapshot ``name`` (read from disk), or ``default``."""
+        try:
+            with open(self._path(name), "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            return default
+
+
+# ── Singleton ───────────────────────────────────────────────────────
+
+_shared_state: Optional[SharedState] = None
+_shared_state_lock = threading.Lock()
+
+
+def get_shared_state() -> SharedState:
+    """Get or create the global SharedState."""
+    global _shared_state
+    if _shared_state is None:
+        with _shared_state_lock:
+            if _shared_state is None:
+                _shared_state = SharedState()
+    return _shared_state
@@ -0,0 +1,477 @@
+"""
+Signal History Store — SignalTrust AI Scanner
+=============================================
+Append-only SQLite store for SignalAI signals.
+
+Every generated signal is one INSERT (no rewrite of the whole history),
+indexed on (symbol, ts), (strategy, ts), (regime, ts) and ts so history
+queries are range scans with time filters and pagination. The database
+runs in WAL mode with a busy timeout, so the gunicorn workers can all
+append to the same history without overwriting each other.
+
+Retention by row count and age runs every ``RETENTION_EVERY`` appends.
+The legacy ``data/signalai_history.json`` is imported once on first use.
+
+Performance aggregates (signal counts, confidence / risk-reward sums and,
+once outcomes are resolved, wins and return sums) are kept per
+(symbol, strategy, regime) and updated in the same transaction as each
+insert, so stats are read from a handful of counter rows instead of
+scanning the history. They are lifetime counters: retention trims the
+raw signals, not the aggregates.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _epoch(timestamp) -> float:
+    """ISO-8601 string (or epoch number) to unix seconds."""
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    try:
+        return datetime.fromisoformat(str(timestamp).replace('Z', '+00:00')).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+class SignalHistoryStore:
+    """Indexed, concurrent-safe signal history."""
+
+    MAX_ROWS = 100_000
+    MAX_AGE_DAYS = 180
+    RETENTION_EVERY = 1000
+    BUSY_TIMEOUT_MS = 5000
+
+    def __init__(self, db_path: str = 'data/signalai_history.db',
+                 legacy_json: Optional[str] = 'data/signalai_history.json',
+                 max_rows: int = MAX_ROWS, max_age_days: float = MAX_AGE_DAYS):
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self.max_age_days = max_age_days
+        self._local = threading.local()
+        self._appends = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._init_database()
+        if legacy_json:
+            self.migrate_json(legacy_json)
+        conn = self._conn()
+        if (conn.execute('SELECT 1 FROM signals LIMIT 1').fetchone()
+                and not conn.execute('SELECT 1 FROM signal_aggregates LIMIT 1').fetchone()):
+            self.rebuild_aggregates()
+
+    # ── Connections ──────────────────────────────────────────────────
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT_MS / 1000)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={self.BUSY_TIMEOUT_MS}')
+            self._local.conn = conn
+        return conn
+
+    def _init_database(self):
+        conn = self._conn()
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS signals (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ts REAL NOT NULL,
+                    symbol TEXT NOT NULL,
+                    strategy TEXT,
+                    regime TEXT,
+                    signal TEXT,
+                    confidence REAL,
+                    price REAL,
+                    payload TEXT NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_signals_symbol_ts ON signals(symbol, ts)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_signals_strategy_ts ON signals(strategy, ts)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_signals_regime_ts ON signals(regime, ts)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_signals_ts ON signals(ts)')
+            columns = {r[1] for r in conn.execute('PRAGMA table_info(signals)')}
+            for column in ('risk_reward', 'outcome', 'resolved_at'):
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE signals ADD COLUMN {column} REAL')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_pending ON signals(ts) "
+                         "WHERE resolved_at IS NULL AND signal IN ('BUY', 'SELL')")
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_signals_resolved ON signals(resolved_at, id) '
+                         'WHERE resolved_at IS NOT NULL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS signal_aggregates (
+                    symbol TEXT NOT NULL,
+                    strategy TEXT NOT NULL,
+                    regime TEXT NOT NULL,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    buy INTEGER NOT NULL DEFAULT 0,
+                    sell INTEGER NOT NULL DEFAULT 0,
+                    hold INTEGER NOT NULL DEFAULT 0,
+                    confidence_sum REAL NOT NULL DEFAULT 0,
+                    rr_count INTEGER NOT NULL DEFAULT 0,
+                    rr_sum REAL NOT NULL DEFAULT 0,
+                    resolved INTEGER NOT NULL DEFAULT 0,
+                    wins INTEGER NOT NULL DEFAULT 0,
+                    return_sum REAL NOT NULL DEFAULT 0,
+                    win_return_sum REAL NOT NULL DEFAULT 0,
+                    loss_return_sum REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (symbol, strategy, regime)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS store_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+
+    # ── Writing ──────────────────────────────────────────────────────
+
+    _INSERT = ('INSERT INTO signals (ts, symbol, strategy, regime, signal, confidence, '
+               'price, risk_reward, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)')
+
+    _AGGREGATE = '''
+        INSERT INTO signal_aggregates
+            (symbol, strategy, regime, total, buy, sell, hold, confidence_sum, rr_count, rr_sum)
+        VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(symbol, strategy, regime) DO UPDATE SET
+            total = total + 1,
+            buy = buy + excluded.buy,
+            sell = sell + excluded.sell,
+            hold = hold + excluded.hold,
+            confidence_sum = confidence_sum + excluded.confidence_sum,
+            rr_count = rr_count + excluded.rr_count,
+            rr_sum = rr_sum + excluded.rr_sum
+    '''
+
+    @staticmethod
+    def _row(record: Dict) -> tuple:
+        return (
+            _epoch(record.get('timestamp', time.time())),
+            record.get('symbol', ''),
+            record.get('strategy'),
+            record.get('regime'),
+            record.get('signal'),
+            record.get('confidence'),
+            record.get('current_price'),
+            record.get('risk_reward'),
+            json.dumps(record, default=str),
+        )
+
+    @staticmethod
+    def _aggregate_row(row: tuple) -> tuple:
+        _, symbol, strategy, regime, signal, confidence, _, rr, _ = row
+        return (symbol, strategy or '', regime or '',
+                int(signal == 'BUY'), int(signal == 'SELL'), int(signal == 'HOLD'),
+                confidence or 0.0, int(bool(rr)), rr or 0.0)
+
+    def append(self, record: Dict) -> int:
+        """Append one signal; returns its row id."""
+        row = self._row(record)
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(self._INSERT, row)
+            conn.execute(self._AGGREGATE, self._aggregate_row(row))
+        self._after_append(1)
+        return cur.lastrowid
+
+    def append_many(self, records: Iterable[Dict]) -> int:
+        """Append many signals in one transaction; returns the count."""
+        rows = [self._row(r) for r in records]
+        if not rows:
+            return 0
+        conn = self._conn()
+        with conn:
+            conn.executemany(self._INSERT, rows)
+            conn.executemany(self._AGGREGATE, [self._aggregate_row(r) for r in rows])
+        self._after_append(len(rows))
+        return len(rows)
+
+    def _after_append(self, n: int):
+        with self._lock:
+            self._appends += n
+            due = self._appends >= self.RETENTION_EVERY
+            if due:
+                self._appends = 0
+        if due:
+            self.apply_retention()
+
+    def apply_retention(self) -> int:
+        """Drop rows older than ``max_age_days`` and beyond ``max_rows``."""
+        conn = self._conn()
+        with conn:
+            removed = conn.execute('DELETE FROM signals WHERE ts < ?',
+                                   (time.time() - self.max_age_days * 86400,)).rowcount
+            cutoff = conn.execute('SELECT id FROM signals ORDER BY id DESC LIMIT 1 OFFSET ?',
+                                  (self.max_rows,)).fetchone()
+            if cutoff:
+                removed += conn.execute('DELETE FROM signals WHERE id <= ?', (cutoff[0],)).rowcount
+        return removed
+
+    def migrate_json(self, path: str) -> int:
+        """Import a legacy JSON history file once (tracked in store_meta)."""
+        if not os.path.exists(path):
+            return 0
+        conn = self._conn()
+        key = f'migrated:{os.path.abspath(path)}'
+        if conn.execute('SELECT 1 FROM store_meta WHERE key = ?', (key,)).fetchone():
+            return 0
+        try:
+            with open(path, 'r') as f:
+                records = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read legacy signal history {path}: {e}")
+            return 0
+        records = [r for r in records if isinstance(r, dict)] if isinstance(records, list) else []
+        with conn:
+            # Claim the migration inside the transaction so only one worker imports
+            claimed = conn.execute('INSERT OR IGNORE INTO store_meta (key, value) VALUES (?, ?)',
+                                   (key, datetime.now().isoformat())).rowcount
+            if claimed:
+                rows = [self._row(r) for r in records]
+                conn.executemany(self._INSERT, rows)
+                conn.executemany(self._AGGREGATE, [self._aggregate_row(r) for r in rows])
+        if claimed:
+            logger.info(f"Migrated {len(records)} signals from {path}")
+        return len(records) if claimed else 0
+
+    # ── Outcomes ─────────────────────────────────────────────────────
+
+    def pending_outcomes(self, before_ts: float, limit: int = 1000,
+                         after: tuple = (float('-inf'), 0)) -> List[Dict]:
+        """Unresolved BUY/SELL signals issued at or before ``before_ts``, oldest first.
+
+        ``after`` is a ``(ts, id)`` cursor; pass the last row's pair to page
+        past rows that could not be resolved yet.
+        """
+        rows = self._conn().execute(
+            "SELECT id, ts, symbol, strategy, regime, signal, price FROM signals "
+            "WHERE resolved_at IS NULL AND signal IN ('BUY', 'SELL') AND ts <= ? "
+            "AND (ts, id) > (?, ?) ORDER BY ts, id LIMIT ?",
+            (before_ts, *after, limit)).fetchall()
+        return [dict(r) for r in rows]
+
+    def expire_outcomes(self, ids: Iterable[int]) -> int:
+        """Close pending signals that can no longer be scored.
+
+        They get a ``resolved_at`` with no ``outcome``: they leave the
+        pending set but are not counted in the win/return aggregates.
+        """
+        ids = list(ids)
+        if not ids:
+            return 0
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            cur = conn.executemany('UPDATE signals SET resolved_at = ? WHERE id = ? AND resolved_at IS NULL',
+                                   [(now, i) for i in ids])
+        return cur.rowcount
+
+    def record_outcomes(self, outcomes: List[tuple]) -> int:
+        """Store resolved returns and fold them into the aggregates.
+
+        Args:
+            outcomes: ``(pending_row, return)`` pairs, where ``return`` is
+                      the signed fractional return of following the signal
+        """
+        if not outcomes:
+            return 0
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            updated = 0
+            for row, ret in outcomes:
+                # Guard against another worker resolving the same signal
+                cur = conn.execute('UPDATE signals SET outcome = ?, resolved_at = ? '
+                                   'WHERE id = ? AND resolved_at IS NULL', (ret, now, row['id']))
+                if not cur.rowcount:
+                    continue
+                updated += 1
+                conn.execute('''
+                    UPDATE signal_aggregates SET
+                        resolved = resolved + 1,
+                        wins = wins + ?,
+                        return_sum = return_sum + ?,
+                        win_return_sum = win_return_sum + ?,
+                        loss_return_sum = loss_return_sum + ?
+                    WHERE symbol = ? AND strategy = ? AND regime = ?
+                ''', (int(ret > 0), ret, max(ret, 0.0), min(ret, 0.0),
+                      row['symbol'], row['strategy'] or '', row['regime'] or ''))
+        return updated
+
+    def resolved_since(self, after: tuple = (0.0, 0), limit: int = 10_000) -> List[Dict]:
+        """Resolved signals with their payload, oldest resolution first.
+
+        ``after`` is a ``(resolved_at, id)`` cursor; pass the last row's
+        pair to continue where the previous call stopped.
+        """
+        rows = self._conn().execute(
+            'SELECT id, ts, symbol, strategy, signal, confidence, outcome, resolved_at, payload '
+            'FROM signals WHERE resolved_at IS NOT NULL AND outcome IS NOT NULL '
+            'AND (resolved_at, id) > (?, ?) ORDER BY resolved_at, id LIMIT ?',
+            (*after, limit)).fetchall()
+        return [{**dict(r), 'payload': json.loads(r['payload'])} for r in rows]
+
+    # ── Aggregates ───────────────────────────────────────────────────
+
+    _SUM_COLUMNS = ('total', 'buy', 'sell', 'hold', 'confidence_sum', 'rr_count',
+                    'rr_sum', 'resolved', 'wins', 'return_sum', 'win_return_sum',
+                    'loss_return_sum')
+
+    @staticmethod
+    def _summarize(sums: Dict, regimes: Dict[str, int]) -> Dict:
+        total, resolved, wins = sums['total'] or 0, sums['resolved'] or 0, sums['wins'] or 0
+        losses = resolved - wins
+        return {
+            'total_signals': total,
+            'buy_signals': sums['buy'] or 0,
+            'sell_signals': sums['sell'] or 0,
+            'hold_signals': sums['hold'] or 0,
+            'avg_confidence': round(sums['confidence_sum'] / total, 2) if total else 0,
+            'avg_risk_reward': round(sums['rr_sum'] / max(sums['rr_count'] or 0, 1), 2),
+            'regime_distribution': regimes,
+            'resolved_signals': resolved,
+            'win_rate': round(wins / resolved * 100, 2) if resolved else None,
+            'expectancy_pct': round(sums['return_sum'] / resolved * 100, 3) if resolved else None,
+            'avg_win_pct': round(sums['win_return_sum'] / wins * 100, 3) if wins else None,
+            'avg_loss_pct': round(sums['loss_return_sum'] / losses * 100, 3) if losses else None,
+        }
+
+    def aggregates(self, symbol: str = None, strategy: str = None) -> Dict:
+        """Performance summary from the counter rows (no history scan)."""
+        where, params = self._where(symbol=symbol, strategy=strategy)
+        rows = self._conn().execute(
+            f'SELECT regime, {", ".join(self._SUM_COLUMNS)} FROM signal_aggregates{where}',
+            params).fetchall()
+        sums = {c: sum(r[c] for r in rows) for c in self._SUM_COLUMNS}
+        regimes: Dict[str, int] = {}
+        for r in rows:
+            if r['regime']:
+                regimes[r['regime']] = regimes.get(r['regime'], 0) + r['total']
+        return self._summarize(sums, regimes)
+
+    def aggregates_by_symbol(self, strategy: str = None) -> Dict[str, Dict]:
+        """Performance summary for every symbol in one grouped query."""
+        where, params = self._where(strategy=strategy)
+        sums_sql = ', '.join(f'SUM({c}) AS {c}' for c in self._SUM_COLUMNS)
+        rows = self._conn().execute(
+            f'SELECT symbol, regime, {sums_sql} FROM signal_aggregates{where} '
+            f'GROUP BY symbol, regime', params).fetchall()
+        grouped: Dict[str, List] = {}
+        for r in rows:
+            grouped.setdefault(r['symbol'], []).append(r)
+        out = {}
+        for symbol, group in grouped.items():
+            sums = {c: sum(r[c] or 0 for r in group) for c in self._SUM_COLUMNS}
+            regimes = {r['regime']: r['total'] for r in group if r['regime']}
+            out[symbol] = self._summarize(sums, regimes)
+        return out
+
+    def rebuild_aggregates(self):
+        """Recompute the counters from the stored signals (one GROUP BY)."""
+        conn = self._conn()
+        with conn:
+            conn.execute('DELETE FROM signal_aggregates')
+            conn.execute('''
+                INSERT INTO signal_aggregates
+                SELECT symbol, COALESCE(strategy, ''), COALESCE(regime, ''),
+                       COUNT(*),
+                       SUM(signal = 'BUY'), SUM(signal = 'SELL'), SUM(signal = 'HOLD'),
+                       COALESCE(SUM(confidence), 0),
+                       SUM(risk_reward IS NOT NULL AND risk_reward != 0),
+                       COALESCE(SUM(risk_reward), 0),
+                       SUM(resolved_at IS NOT NULL AND outcome IS NOT NULL),
+                       SUM(COALESCE(outcome, 0) > 0),
+                       COALESCE(SUM(outcome), 0),
+                       COALESCE(SUM(MAX(COALESCE(outcome, 0), 0)), 0),
+                       COALESCE(SUM(MIN(COALESCE(outcome, 0), 0)), 0)
+                FROM signals
+                GROUP BY symbol, COALESCE(strategy, ''), COALESCE(regime, '')
+            ''')
+
+    # ── Reading ──────────────────────────────────────────────────────
+
+    @staticmethod
+    def _where(symbol=None, strategy=None, regime=None, signal=None,
+               start=None, end=None, before_id=None):
+        clauses, params = [], []
+        for column, value in (('symbol', symbol), ('strategy', strategy),
+                              ('regime', regime), ('signal', signal)):
+            if value:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if start is not None:
+            clauses.append('ts >= ?')
+            params.append(_epoch(start))
+        if end is not None:
+            clauses.append('ts <= ?')
+            params.append(_epoch(end))
+        if before_id is not None:
+            clauses.append('id < ?')
+            params.append(int(before_id))
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def query(self, symbol: str = None, strategy: str = None, regime: str = None,
+              signal: str = None, start=None, end=None, limit: int = 50,
+              offset: int = 0, before_id: int = None) -> List[Dict]:
+        """Most recent matching signals, returned oldest first.
+
+        ``start``/``end`` accept ISO timestamps or epoch seconds. Page with
+        ``offset`` or, for stable pages while new signals arrive, with
+        ``before_id`` set to the smallest ``id`` of the previous page.
+        """
+        where, params = self._where(symbol, strategy, regime, signal, start, end, before_id)
+        rows = self._conn().execute(
+            f'SELECT id, payload FROM signals{where} ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?',
+            params + [max(0, int(limit)), max(0, int(offset))]).fetchall()
+        out = []
+        for row in reversed(rows):
+            record = json.loads(row['payload'])
+            record['id'] = row['id']
+            out.append(record)
+        return out
+
+    def count(self, symbol: str = None, strategy: str = None, regime: str = None,
+              signal: str = None, start=None, end=None) -> int:
+        where, params = self._where(symbol, strategy, regime, signal, start, end)
+        return self._conn().execute(f'SELECT COUNT(*) FROM signals{where}', params).fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def benchmark_writes(db_path: str, n: int = 5000, batch: int = 100) -> Dict:
+    """Write-throughput benchmark: single appends vs batched appends."""
+    store = SignalHistoryStore(db_path, legacy_json=None)
+    record = {'symbol': 'BTC', 'strategy': 'SignalAI', 'regime': 'trending_up',
+              'signal': 'BUY', 'confidence': 72.5, 'current_price': 50000.0,
+              'timestamp': datetime.now().isoformat(), 'indicators': {'RSI': {'value': 41.2}}}
+    report = {'records': n}
+
+    start = time.perf_counter()
+    for _ in range(n):
+        store.append(record)
+    elapsed = time.perf_counter() - start
+    report['single'] = {'seconds': round(elapsed, 3), 'writes_per_sec': int(n / elapsed)}
+
+    start = time.perf_counter()
+    for _ in range(0, n, batch):
+        store.append_many([record] * batch)
+    elapsed = time.perf_counter() - start
+    report['batched'] = {'seconds': round(elapsed, 3), 'writes_per_sec': int(n / elapsed)}
+    store.close()
+    return report
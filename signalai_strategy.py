@@ -8,15 +8,19 @@ parameters, and AI-powered signal enhancement.
 Zero random — every number derives from real market data.
 """
 
-import json
 import math
-import os
 import time
 import logging
 import requests
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
+
+from ohlcv_store import ohlcv_store
+from pattern_detector import find_pivots
+from signal_history_store import SignalHistoryStore
+
 logger = logging.getLogger(__name__)
 
 # Lazy import to avoid circular dependency
@@ -425,15 +429,9 @@ def _support_resistance(closes: List[float], lookback: int = 30) -> Dict:
         p = closes[-1] if closes else 0
         return {"support": p * 0.97, "resistance": p * 1.03, "levels": []}
     window = closes[-lookback:]
-    pivots_high = []
-    pivots_low = []
-    for i in range(2, len(window) - 2):
-        if window[i] > window[i - 1] and window[i] > window[i - 2] and \
-           window[i] > window[i + 1] and window[i] > window[i + 2]:
-            pivots_high.append(window[i])
-        if window[i] < window[i - 1] and window[i] < window[i - 2] and \
-           window[i] < window[i + 1] and window[i] < window[i + 2]:
-            pivots_low.append(window[i])
+    low_idx, high_idx = find_pivots(window, order=2, strict=True)
+    pivots_high = [window[i] for i in high_idx]
+    pivots_low = [window[i] for i in low_idx]
 
     price = closes[-1]
     # Nearest support: highest pivot_low below price
@@ -546,37 +544,54 @@ def _detect_regime(closes: List[float], adx_val: float) -> Dict:
 #  Multi-timeframe confirmation
 # ---------------------------------------------------------------------------
 
-def _multi_timeframe_bias(closes: List[float]) -> Dict:
-    """Simulate multi-timeframe analysis using different EMA windows.
+# Real bars used for each bias when the OHLCV store has them
+_MTF_TIMEFRAMES = {"short": "4h", "medium": "1d", "long": "1w"}
+
+
+def _ema_bias(data: List[float], fast: int, slow: int) -> str:
+    fast_vals = _ema(data, fast)
+    slow_vals = _ema(data, slow)
+    if not fast_vals or not slow_vals:
+        return "neutral"
+    return "bullish" if fast_vals[-1] > slow_vals[-1] else "bearish"
+
+
+def _multi_timeframe_bias(closes: List[float], symbol: str = None) -> Dict:
+    """Multi-timeframe analysis from real resampled bars.
 
-    Short-term (last 20 bars), medium-term (last 50), long-term (last 90).
-    Returns bias for each "timeframe" and overall consensus.
+    When ``symbol`` is given, short/medium/long biases use EMA9 vs EMA21 on
+    4h, daily and weekly bars resampled from the shared OHLCV store (one
+    download for all three). Any timeframe without enough bars falls back
+    to different EMA windows over ``closes``:
+    short-term (last 20 bars), medium-term (last 50), long-term (last 90).
+    Returns bias for each timeframe and overall consensus.
     """
     result = {"short": "neutral", "medium": "neutral", "long": "neutral", "consensus": "neutral"}
     n = len(closes)
 
     # Short-term: EMA5 vs EMA13 on last 20 bars
     if n >= 20:
-        short_data = closes[-20:]
-        ema5 = _ema(short_data, 5)
-        ema13 = _ema(short_data, 13)
-        if ema5 and ema13:
-            result["short"] = "bullish" if ema5[-1] > ema13[-1] else "bearish"
+        result["short"] = _ema_bias(closes[-20:], 5, 13)
 
     # Medium-term: EMA9 vs EMA21 on last 50 bars
     if n >= 50:
-        med_data = closes[-50:]
-        ema9 = _ema(med_data, 9)
-        ema21 = _ema(med_data, 21)
-        if ema9 and ema21:
-            result["medium"] = "bullish" if ema9[-1] > ema21[-1] else "bearish"
+        result["medium"] = _ema_bias(closes[-50:], 9, 21)
 
     # Long-term: EMA21 vs EMA50 on all data
     if n >= 50:
-        ema21 = _ema(closes, 21)
-        ema50 = _ema(closes, 50)
-        if ema21 and ema50:
-            result["long"] = "bullish" if ema21[-1] > ema50[-1] else "bearish"
+        result["long"] = _ema_bias(closes, 21, 50)
+
+    if symbol:
+        sources = {}
+        for horizon, timeframe in _MTF_TIMEFRAMES.items():
+            try:
+                tf_closes = ohlcv_store.get_closes(symbol, timeframe)
+            except Exception:
+                tf_closes = []
+            if len(tf_closes) >= 21:
+                result[horizon] = _ema_bias(tf_closes[-100:], 9, 21)
+                sources[horizon] = timeframe
+        result["timeframes"] = sources
 
     # Consensus
     biases = [result["short"], result["medium"], result["long"]]
@@ -600,6 +615,10 @@ class SignalAIStrategy:
     """Advanced AI-powered trading strategy with 12+ real indicators,
     regime detection, multi-timeframe confirmation, and adaptive risk."""
 
+    OUTCOME_HORIZON_HOURS = 24  # signal outcome = return over the next day
+    OUTCOME_MAX_PENDING_HOURS = 24 * 7  # after this, a signal without exit prices is expired
+    OUTCOME_PAGE_SIZE = 1000
+
     INDICATORS = {
         "EMA9": {"name": "EMA 9", "type": "moving_average", "period": 9},
         "EMA21": {"name": "EMA 21", "type": "moving_average", "period": 21},
@@ -669,26 +688,9 @@ class SignalAIStrategy:
         "MTF": 1.5,             # Multi-timeframe alignment is powerful
     }
 
-    def __init__(self):
-        self.signals_history: List[Dict] = []
-        self._load_history()
-
-    # ── persistence ─────────────────────────────────────────────────
-
-    def _load_history(self):
-        path = "data/signalai_history.json"
-        if os.path.exists(path):
-            try:
-                with open(path, "r") as f:
-                    self.signals_history = json.load(f)
-            except Exception:
-                self.signals_history = []
-
-    def _save_history(self):
-        path = "data/signalai_history.json"
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w") as f:
-            json.dump(self.signals_history[-1000:], f, indent=2)
+    def __init__(self, history: Optional[SignalHistoryStore] = None):
+        # Shared SQLite history (migrates data/signalai_history.json once)
+        self.history = history or SignalHistoryStore()
 
     # ── public API ──────────────────────────────────────────────────
 
@@ -764,7 +766,7 @@ class SignalAIStrategy:
         indicators_data["volatility"] = regime["volatility"]
 
         # 5. Multi-timeframe confirmation
-        mtf = _multi_timeframe_bias(closes)
+        mtf = _multi_timeframe_bias(closes, symbol)
         indicators_data["multi_timeframe"] = mtf
 
         # 6. Weighted signal analysis
@@ -797,8 +799,10 @@ class SignalAIStrategy:
             "data_source": "live" if len(closes) >= 20 else "limited",
         }
 
-        self.signals_history.append(result)
-        self._save_history()
+        try:
+            self.history.append(result)
+        except Exception as e:
+            logger.warning(f"Failed to record signal for {symbol}: {e}")
         return result
 
     # ── indicator computation (100% real) ───────────────────────────
@@ -1351,44 +1355,74 @@ class SignalAIStrategy:
             return "Weak Sell — Monitor position closely, early bearish signals"
         return "Hold — No clear direction, wait for better setup"
 
-    def get_signal_history(self, symbol: str = None, limit: int = 50) -> List[Dict]:
-        history = self.signals_history
-        if symbol:
-            history = [s for s in history if s.get("symbol") == symbol]
-        return history[-limit:]
-
-    def get_performance_stats(self, symbol: str = None) -> Dict:
-        signals = self.get_signal_history(symbol)
-        if not signals:
-            return {"total_signals": 0, "buy_signals": 0, "sell_signals": 0,
-                    "hold_signals": 0, "avg_confidence": 0}
-
-        buy_c = sum(1 for s in signals if s["signal"] == "BUY")
-        sell_c = sum(1 for s in signals if s["signal"] == "SELL")
-        hold_c = sum(1 for s in signals if s["signal"] == "HOLD")
-        avg_conf = sum(s.get("confidence", 0) for s in signals) / len(signals)
-        avg_rr = sum(s.get("risk_reward", 0) for s in signals if s.get("risk_reward")) / max(
-            sum(1 for s in signals if s.get("risk_reward")), 1
-        )
+    def get_signal_history(self, symbol: str = None, limit: int = 50, **filters) -> List[Dict]:
+        """Most recent signals, oldest first.
 
-        # Win rate (if we have historical outcomes)
-        recent = [s for s in signals if s.get("regime")]  # v3 signals only
-        regime_dist = {}
-        for s in recent:
-            r = s.get("regime", "unknown")
-            regime_dist[r] = regime_dist.get(r, 0) + 1
+        ``filters`` are passed to ``SignalHistoryStore.query``: strategy,
+        regime, signal, start, end, offset, before_id.
+        """
+        return self.history.query(symbol=symbol, limit=limit, **filters)
 
-        return {
-            "total_signals": len(signals),
-            "buy_signals": buy_c,
-            "sell_signals": sell_c,
-            "hold_signals": hold_c,
-            "avg_confidence": round(avg_conf, 2),
-            "avg_risk_reward": round(avg_rr, 2),
-            "regime_distribution": regime_dist,
-            "last_signal": signals[-1] if signals else None,
-        }
+    def get_performance_stats(self, symbol: str = None, strategy: str = None) -> Dict:
+        """Performance summary from the incrementally maintained aggregates.
 
+        Win rate and expectancy cover signals resolved by ``resolve_outcomes``.
+        """
+        stats = self.history.aggregates(symbol=symbol, strategy=strategy)
+        last = self.history.query(symbol=symbol, strategy=strategy, limit=1)
+        stats["last_signal"] = last[-1] if last else None
+        return stats
+
+    def get_performance_by_symbol(self, strategy: str = None) -> Dict[str, Dict]:
+        """Performance summary for every symbol (dashboard view)."""
+        return self.history.aggregates_by_symbol(strategy=strategy)
+
+    def resolve_outcomes(self, horizon_hours: float = None) -> Dict:
+        """Score BUY/SELL signals older than ``horizon_hours`` against stored prices.
+
+        The outcome is the return from the signal price to the close
+        ``horizon_hours`` later (negated for SELL), read from the OHLCV store.
+        Signals whose exit bar is not available yet stay pending, and the
+        scan pages past them so they cannot starve newer signals. Once a
+        signal is ``OUTCOME_MAX_PENDING_HOURS`` past its horizon without a
+        price (delisted symbol, no stored history, zero price) it is expired.
+        """
+        horizon = (horizon_hours or self.OUTCOME_HORIZON_HOURS) * 3600
+        now = time.time()
+        expire_before = now - horizon - self.OUTCOME_MAX_PENDING_HOURS * 3600
+        columns: Dict[str, Optional[Dict]] = {}
+        pending = resolved = 0
+        expired = []
+        cursor = (float("-inf"), 0)
+        while True:
+            page = self.history.pending_outcomes(now - horizon, limit=self.OUTCOME_PAGE_SIZE,
+                                                 after=cursor)
+            if not page:
+                break
+            pending += len(page)
+            cursor = (page[-1]["ts"], page[-1]["id"])
+            outcomes = []
+            for row in page:
+                symbol = row["symbol"]
+                if symbol not in columns:
+                    columns[symbol] = (ohlcv_store.get_columns(symbol, "1h")
+                                       or ohlcv_store.get_columns(symbol, "1d"))
+                cols = columns[symbol]
+                target = row["ts"] + horizon
+                if cols is not None and len(cols["ts"]) and row["price"] and cols["ts"][-1] >= target:
+                    idx = int(np.searchsorted(cols["ts"], target, side="right")) - 1
+                    if idx >= 0:
+                        ret = cols["close"][idx] / row["price"] - 1
+                        outcomes.append((row, float(-ret if row["signal"] == "SELL" else ret)))
+                        continue
+                if row["ts"] < expire_before:
+                    expired.append(row["id"])
+            resolved += self.history.record_outcomes(outcomes)
+            if len(page) < self.OUTCOME_PAGE_SIZE:
+                break
+
+        return {"pending": pending, "resolved": resolved,
+                "expired": self.history.expire_outcomes(expired)}
 
 # Global instance
 signalai_strategy = SignalAIStrategy()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite-backed AI learning system
+"""
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import ai_learning_system
+from ai_learning_system import AILearningSystem, PredictionRecord, benchmark
+
+
+def _fresh_dir():
+    return tempfile.mkdtemp(prefix="ai_learning_test_")
+
+
+def test_record_and_evaluate():
+    print("Testing record/evaluate round trip...")
+    d = _fresh_dir()
+    try:
+        ls = AILearningSystem(data_dir=d)
+        pid = ls.record_prediction("btc", "BULLISH", 0.8, "gpt", "momentum", 100.0)
+        rec = ls.store.get(pid)
+        assert rec.symbol == "BTC" and rec.outcome is None
+
+        assert ls.evaluate_prediction(pid, "CORRECT", 105.0)
+        assert not ls.evaluate_prediction(pid, "INCORRECT", 90.0)  # already evaluated
+        assert not ls.evaluate_prediction("missing", "CORRECT", 1.0)
+        rec = ls.store.get(pid)
+        assert rec.outcome == "CORRECT" and rec.price_at_evaluation == 105.0
+        assert abs(rec.importance - 1.3) < 1e-9
+        assert ls.scores == {"gpt": {"correct": 1, "incorrect": 0, "partial": 0, "total": 1}}
+
+        # State survives a restart
+        again = AILearningSystem(data_dir=d)
+        assert again.get_model_accuracy("gpt")["accuracy"] == 1.0
+        assert again.get_learning_summary()["total_predictions"] == 1
+        print("✓ Predictions and scores persist transactionally")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_aggregates_match_brute_force():
+    print("Testing indexed accuracy queries...")
+    d = _fresh_dir()
+    try:
+        ls = AILearningSystem(data_dir=d)
+        rng = random.Random(1)
+        outcomes = {}
+        for i in range(400):
+            pid = ls.record_prediction(rng.choice(["BTC", "ETH", "SOL"]),
+                                       rng.choice(["BULLISH", "BEARISH"]), rng.random(),
+                                       rng.choice(["gpt", "local"]),
+                                       rng.choice(["momentum", "breakout"]), 10.0)
+            if i % 2:
+                outcomes[pid] = rng.choice(["CORRECT", "INCORRECT", "PARTIAL"])
+                ls.evaluate_prediction(pid, outcomes[pid], 11.0)
+
+        rows = ls.store.select()
+        assert len(rows) == 400
+        for strategy in ("momentum", "breakout"):
+            ev = [r for r in rows if r.strategy == strategy and r.outcome]
+            correct = sum(r.outcome == "CORRECT" for r in ev)
+            got = ls.get_strategy_accuracy(strategy)
+            assert got["total"] == len(ev) and got["correct"] == correct
+        for model in ("gpt", "local"):
+            ev = [r for r in rows if r.model == model and r.outcome]
+            got = ls.get_model_accuracy(model)
+            assert got["total_predictions"] == len(ev)
+            assert got["correct"] == sum(r.outcome == "CORRECT" for r in ev)
+        btc = [r for r in rows if r.symbol == "BTC"]
+        insights = ls.get_symbol_insights("btc")
+        assert insights["total_predictions"] == len(btc)
+        assert insights["evaluated"] == sum(1 for r in btc if r.outcome)
+        assert insights["avg_confidence"] == round(sum(r.confidence for r in btc) / len(btc), 2)
+        summary = ls.get_learning_summary()
+        assert summary["evaluated"] == len(outcomes)
+        print("✓ Aggregates match a scan of all rows")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_batch_evaluate():
+    print("Testing bulk evaluation...")
+    d = _fresh_dir()
+    try:
+        ls = AILearningSystem(data_dir=d)
+        ids = [ls.record_prediction("SOL", "BULLISH", 0.75, m, "trend", 20.0)
+               for m in ("gpt", "gpt", "local", "local")]
+        ls.evaluate_prediction(ids[3], "PARTIAL", 20.5)
+
+        report = ls.batch_evaluate([
+            {"prediction_id": ids[0], "outcome": "correct", "price_now": 22.0},
+            {"prediction_id": ids[1], "outcome": "INCORRECT", "price_now": 18.0},
+            {"prediction_id": ids[1], "outcome": "CORRECT", "price_now": 18.0},  # duplicate
+            {"prediction_id": ids[2], "outcome": "CORRECT", "price_now": 21.0},
+            {"prediction_id": ids[3], "outcome": "CORRECT", "price_now": 21.0},  # already done
+            {"prediction_id": "unknown", "outcome": "CORRECT", "price_now": 1.0},
+        ])
+        assert report["requested"] == 6 and report["evaluated"] == 3 and report["skipped"] == 3
+        assert all(k in report for k in ("lookup_ms", "apply_ms", "persist_ms", "total_ms"))
+        assert ls.store.get(ids[1]).outcome == "INCORRECT"
+        assert abs(ls.store.get(ids[0]).importance - 1.3) < 1e-9
+        assert ls.scores["gpt"] == {"correct": 1, "incorrect": 1, "partial": 0, "total": 2}
+        assert ls.scores["local"] == {"correct": 1, "incorrect": 0, "partial": 1, "total": 2}
+
+        # A failing batch leaves nothing half-applied
+        fresh = [ls.record_prediction("SOL", "BEARISH", 0.5, "gpt", "trend", 20.0) for _ in range(2)]
+        try:
+            ls.batch_evaluate([{"prediction_id": fresh[0], "outcome": "CORRECT"},
+                               {"prediction_id": fresh[1]}])
+            assert False, "expected KeyError"
+        except KeyError:
+            pass
+        assert ls.store.get(fresh[0]).outcome is None
+        assert ls.scores["gpt"]["total"] == 2
+        print("✓ One lookup, one transaction, atomic on failure")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+class _OfflineLearning(AILearningSystem):
+    """Price changes served from a dict instead of CoinPaprika/CoinCap."""
+
+    def __init__(self, data_dir, bulk, single):
+        super().__init__(data_dir=data_dir)
+        self.bulk, self.single = bulk, single
+        self.calls = {"bulk": 0, "single": []}
+
+    def _get_price_changes_coinpaprika_bulk(self, symbols):
+        self.calls["bulk"] += 1
+        return {s: self.bulk[s] for s in symbols if s in self.bulk}
+
+    def _get_price_change_coinpaprika(self, symbol):
+        self.calls["single"].append(symbol)
+        return self.single.get(symbol)
+
+    def _get_price_change_coincap(self, symbol):
+        return None
+
+
+def test_grouped_auto_evaluation():
+    print("Testing grouped auto-evaluation...")
+    d = _fresh_dir()
+    try:
+        symbols = [f"C{i}" for i in range(20)]
+        bulk = {s: (5.0 if i % 2 else -5.0) for i, s in enumerate(symbols[:15])}
+        single = {s: 0.5 for s in symbols[15:18]}
+        ls = _OfflineLearning(d, bulk, single)
+        old = datetime.fromtimestamp(time.time() - 3 * 86400, timezone.utc).isoformat()
+        ls.store.insert([
+            PredictionRecord(f"a{i}", symbols[i % 20], "BULLISH", 0.5, "gpt", "trend", 100.0,
+                             timestamp=old)
+            for i in range(500)
+        ])
+        ls.record_prediction("C1", "BULLISH", 0.5, "gpt", "trend", 100.0)  # too recent
+
+        report = ls.daily_evolution()
+        auto = report["auto_evaluation"]
+        assert ls.calls["bulk"] == 1
+        assert sorted(ls.calls["single"]) == sorted(symbols[15:])  # only bulk misses
+        assert auto["pending"] == 500 and auto["symbols"] == 20 and auto["symbols_priced"] == 18
+        assert auto["evaluated"] == 450 and auto["unpriced_predictions"] == 50
+        assert report["predictions_auto_evaluated"] == 450
+        assert auto["fetch"]["bulk_hits"] == 15 and auto["fetch"]["missing"] == 2
+        assert auto["predictions_per_sec"] > 0
+
+        assert ls.store.get("a1").outcome == "CORRECT"      # C1: +5%
+        assert ls.store.get("a0").outcome == "INCORRECT"    # C0: -5%
+        assert ls.store.get("a15").outcome == "PARTIAL"     # C15: +0.5%
+        assert abs(ls.store.get("a1").price_at_evaluation - 105.0) < 1e-9
+        assert ls.store.get("a19").outcome is None
+        assert ls.store.count("outcome IS NULL") == 51
+        print("✓ One price fetch per symbol, applied in one batch")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_json_migration():
+    print("Testing legacy JSON migration...")
+    d = _fresh_dir()
+    try:
+        legacy = [PredictionRecord(f"p{i}", "ETH", "BEARISH", 0.5, "gpt", "trend", 50.0,
+                                   timestamp="2024-05-01T00:00:00+00:00",
+                                   outcome="CORRECT" if i < 3 else None).to_dict()
+                  for i in range(5)]
+        with open(os.path.join(d, "predictions.json"), "w") as f:
+            json.dump(legacy, f)
+        with open(os.path.join(d, "scores.json"), "w") as f:
+            json.dump({"gpt": {"correct": 3, "incorrect": 0, "partial": 0, "total": 3}}, f)
+
+        ls = AILearningSystem(data_dir=d)
+        assert ls.store.count() == 5
+        assert ls.store.count("outcome IS NULL") == 2
+        assert ls.get_model_accuracy("gpt")["correct"] == 3
+        # Migration only runs once
+        assert ls.store.migrate_json(os.path.join(d, "predictions.json"),
+                                     os.path.join(d, "scores.json")) == 0
+        assert AILearningSystem(data_dir=d).store.count() == 5
+        print("✓ predictions.json imported once")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_smart_prune():
+    print("Testing smart pruning...")
+    d = _fresh_dir()
+    original = ai_learning_system.MAX_PREDICTIONS
+    try:
+        ai_learning_system.MAX_PREDICTIONS = 10
+        ls = AILearningSystem(data_dir=d)
+        keep = [ls.record_prediction("BTC", "BULLISH", 0.9, "gpt", "m", 1.0) for _ in range(5)]
+        for pid in keep:
+            ls.evaluate_prediction(pid, "CORRECT", 2.0)
+        for _ in range(15):
+            ls.record_prediction("BTC", "BEARISH", 0.2, "gpt", "m", 1.0)
+        assert ls._smart_prune_predictions() == 10
+        assert ls.store.count() == 10
+        assert all(ls.store.get(pid) for pid in keep)
+        print("✓ Lowest-value predictions pruned first")
+    finally:
+        ai_learning_system.MAX_PREDICTIONS = original
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_benchmark():
+    print("Testing benchmark...")
+    report = benchmark(n=2000)
+    assert report["predictions"] == 2000
+    assert report["model_accuracy_ms"] >= 0 and report["learning_summary_ms"] >= 0
+    print(f"✓ Benchmark ran: {report}")
+
+
+def main():
+    print("=" * 60)
+    print("AI LEARNING SYSTEM TESTS")
+    print("=" * 60)
+    try:
+        test_record_and_evaluate()
+        test_aggregates_match_brute_force()
+        test_batch_evaluate()
+        test_grouped_auto_evaluation()
+        test_json_migration()
+        test_smart_prune()
+        test_benchmark()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All AI learning system tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled, WAL-mode AI memory database
+"""
+
+import gc
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import ai_memory_system
+from ai_memory_system import AIMemorySystem, benchmark_concurrency, benchmark_search, fts_query
+
+
+def _memory():
+    d = tempfile.mkdtemp(prefix="ai_memory_test_")
+    return AIMemorySystem(os.path.join(d, "ai_memory.db")), d
+
+
+def test_pooled_connections():
+    print("Testing pooled WAL connections...")
+    memory, d = _memory()
+    try:
+        conn = memory._connect()
+        assert memory._connect() is conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+        other = []
+        t = threading.Thread(target=lambda: other.append(memory._connect()))
+        t.start()
+        t.join()
+        assert other[0] is not conn
+        gc.collect()
+        # The exited thread's connection was closed and left the pool
+        assert memory._pool == [conn]
+        try:
+            other[0].execute("SELECT 1")
+            assert False, "expected a closed connection"
+        except sqlite3.ProgrammingError:
+            pass
+
+        # A failed write does not leave the pooled connection mid-transaction
+        conn.execute("INSERT INTO events (event_type, event_data) VALUES ('x', '{}')")
+        assert conn.in_transaction
+        memory.remember_preference("u1", "lang", "fr")
+        assert memory.recall_preference("u1", "lang") == "fr"
+        assert memory.get_memory_stats()["events"] == 0
+        print("✓ One connection per live thread, stale transactions rolled back")
+    finally:
+        memory.close()
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_close_with_live_threads():
+    print("Testing close() while other threads hold connections...")
+    memory, d = _memory()
+    try:
+        mine = memory._connect()
+        opened, closed, results = threading.Event(), threading.Event(), []
+
+        def worker():
+            before = memory._connect()
+            opened.set()
+            closed.wait(5)
+            try:
+                before.execute("SELECT COUNT(*) FROM events").fetchone()  # not closed under us
+                memory.remember_event("after_close", {"n": 1})
+                after = memory._connect()
+                results.append((after is not before, memory.get_memory_stats()["events"],
+                                before in memory._pool, after in memory._pool))
+                before.execute("SELECT 1")
+            except sqlite3.ProgrammingError as e:
+                results.append(str(e))
+
+        t = threading.Thread(target=worker)
+        t.start()
+        opened.wait(5)
+        memory.close()
+        closed.set()
+        t.join()
+        assert results == [(True, 1, False, True), "Cannot operate on a closed database."], results
+        try:
+            mine.execute("SELECT 1")
+            assert False, "expected the caller's connection to be closed"
+        except sqlite3.ProgrammingError:
+            pass
+        print("✓ close() never closes a connection another thread is using")
+    finally:
+        memory.close()
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_indexes_used():
+    print("Testing composite indexes...")
+    memory, d = _memory()
+    try:
+        conn = memory._connect()
+        plans = {
+            "conversations": "SELECT role FROM conversations WHERE user_id = 'a' ORDER BY timestamp DESC LIMIT 5",
+            "commands": "SELECT id FROM commands WHERE status = 'pending' ORDER BY timestamp DESC LIMIT 5",
+            "market_data": "SELECT id FROM market_data WHERE symbol = 'BTC' AND data_type = 'price' "
+                           "ORDER BY timestamp DESC LIMIT 5",
+        }
+        for table, sql in plans.items():
+            plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql))
+            assert "INDEX idx_" in plan and "TEMP B-TREE" not in plan, (table, plan)
+
+        for i in range(5):
+            memory.remember_conversation("a", "user", f"m{i}")
+        recalled = memory.recall_conversations("a", limit=3)
+        assert len(recalled) == 3 and recalled[-1]["content"] in {"m2", "m3", "m4"}
+        print("✓ Recall queries use the composite indexes")
+    finally:
+        memory.close()
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_batched_and_deferred_writes():
+    print("Testing batched writes...")
+    memory, d = _memory()
+    flush_interval = ai_memory_system.FLUSH_INTERVAL
+    try:
+        assert memory.remember_market_data_batch(
+            [("BTC", "price", {"p": i}, "test") for i in range(100)]) == 100
+        assert memory.remember_events_batch([("tick", {"n": 1}), ("tick", "{}", "high")]) == 2
+
+        for i in range(10):
+            memory.remember_market_data("ETH", "price", {"p": i}, defer=True)
+            memory.remember_event("tick", {"n": i}, defer=True)
+        raw = sqlite3.connect(memory.db_path)
+        assert raw.execute("SELECT COUNT(*) FROM market_data").fetchone()[0] == 100
+        stats = memory.get_memory_stats()  # flushes first
+        assert stats["market_data"] == 110 and stats["events"] == 12
+        assert memory.flush() == 0
+
+        # A lone deferred row is written by the timer, without another write
+        ai_memory_system.FLUSH_INTERVAL = 0.05
+        memory.remember_event("tick", {"n": "late"}, defer=True)
+        deadline = time.monotonic() + 5
+        while raw.execute("SELECT COUNT(*) FROM events").fetchone()[0] < 13:
+            assert time.monotonic() < deadline, "deferred row never flushed"
+            time.sleep(0.02)
+        assert memory._flush_timer is None
+        raw.close()
+        print("✓ Batches and deferred writes land in one transaction")
+    finally:
+        ai_memory_system.FLUSH_INTERVAL = flush_interval
+        memory.close()
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_fts_search():
+    print("Testing full-text search...")
+    memory, d = _memory()
+    try:
+        memory.remember_conversation("alice", "user", "Is the bitcoin breakout real?")
+        memory.remember_conversation("bob", "user", "Ethereum staking yields are falling")
+        memory.remember_conversation("alice", "assistant", "Bitcoin broke resistance on strong volume")
+        cmd = memory.remember_command("alice", "scan bitcoin whales")
+        memory.remember_learning("pattern", "BTC breakout", "Breakouts after halving tend to hold", 0.8)
+
+        hits = memory.search_memory("bitcoin")
+        assert {h["type"] for h in hits} == {"conversation", "command"} and len(hits) == 3
+        assert all("[" in h["snippet"] for h in hits)
+
+        # Prefix and phrase queries; subject is searchable for learnings
+        assert {h["type"] for h in memory.search_memory("break*")} == {"conversation", "learning"}
+        assert len(memory.search_memory('"strong volume"')) == 1
+        assert memory.search_memory('"volume strong"') == []
+        assert memory.search_memory("btc")[0]["type"] == "learning"
+        assert len(memory.search_memory("bitcoin OR ethereum")) == 4
+
+        # Filters
+        assert {h["user_id"] for h in memory.search_memory("bitcoin", user_id="alice")} == {"alice"}
+        only = memory.search_memory("bitcoin", types=["command"])
+        assert len(only) == 1 and only[0]["id"] == cmd
+        assert memory.search_memory("bitcoin", since="2999-01-01") == []
+        assert len(memory.search_memory("bitcoin", until="2999-01-01T00:00:00")) == 3
+
+        # Triggers keep the index in sync on update and delete
+        conn = memory._connect()
+        with conn:
+            conn.execute("UPDATE commands SET command = 'scan solana' WHERE id = ?", (cmd,))
+        assert len(memory.search_memory("bitcoin")) == 2 and memory.search_memory("solana")
+        memory.update_command_status(cmd, "completed", {"ok": True})
+        assert len(memory.search_memory("solana")) == 1
+        with conn:
+            conn.execute("DELETE FROM conversations WHERE user_id = 'bob'")
+        assert memory.search_memory("ethereum") == []
+
+        # Odd input never reaches FTS5 as raw syntax
+        assert fts_query('AND ( "unclosed') == '"AND" "unclosed"'
+        assert memory.search_memory('NOT :: ^') == []
+        print("✓ Ranked FTS search with prefix, phrase and filters")
+    finally:
+        memory.close()
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_fts_recent_across_kinds():
+    print("Testing most-recent search across memory kinds...")
+    memory, d = _memory()
+    candidates = ai_memory_system.FTS_CANDIDATES
+    try:
+        ai_memory_system.FTS_CANDIDATES = 5
+        for i in range(20):
+            memory.remember_conversation("alice", "user", f"bitcoin note {i}")
+        # Newest memory overall, but learning #1 has a far lower rowid than conversation #20
+        conn = memory._connect()
+        with conn:
+            conn.execute("UPDATE conversations SET timestamp = datetime('now', '-1 hour')")
+        memory.remember_learning("pattern", "BTC", "bitcoin dips get bought", 0.7)
+
+        recent = memory.search_memory("bitcoin", limit=3, order="recent")
+        assert recent[0]["type"] == "learning" and recent[0]["id"] == 1, recent
+        assert [h["content"] for h in recent[1:]] == ["bitcoin note 19", "bitcoin note 18"]
+        assert {h["type"] for h in memory.search_memory("bitcoin", limit=50)} == \
+            {"conversation", "learning"}
+        print("✓ Candidates are the newest matches of every kind")
+    finally:
+        ai_memory_system.FTS_CANDIDATES = candidates
+        memory.close()
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_fts_backfill():
+    print("Testing FTS backfill of an existing database...")
+    d = tempfile.mkdtemp(prefix="ai_memory_test_")
+    try:
+        path = os.path.join(d, "legacy.db")
+        raw = sqlite3.connect(path)
+        raw.execute("CREATE TABLE conversations (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, "
+                    "role TEXT NOT NULL, content TEXT NOT NULL, ai_type TEXT, "
+                    "timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, metadata TEXT)")
+        raw.execute("INSERT INTO conversations (user_id, role, content) VALUES ('u', 'user', 'legacy solana note')")
+        raw.commit()
+        raw.close()
+
+        memory = AIMemorySystem(path)
+        assert memory.search_memory("solana")[0]["content"] == "legacy solana note"
+        memory.close()
+        assert len(AIMemorySystem(path).search_memory("solana")) == 1  # not indexed twice
+        print("✓ Existing rows indexed once")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def _count(memory, table):
+    return memory._connect().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_cached_counts():
+    print("Testing trigger-maintained counts...")
+    memory, d = _memory()
+    try:
+        memory.remember_conversation("u", "user", "hello")
+        memory.remember_market_data_batch([("BTC", "price", {"p": i}) for i in range(30)])
+        memory.remember_preference("u", "lang", "fr")
+        memory.remember_preference("u", "lang", "en")  # upsert, not a second row
+        with memory._connect() as conn:
+            conn.execute("DELETE FROM market_data WHERE id <= 10")
+        stats = memory.get_memory_stats()
+        for table in ("conversations", "market_data", "user_preferences", "events"):
+            assert stats[table] == _count(memory, table), table
+        assert stats["market_data"] == 20 and stats["user_preferences"] == 1
+        assert memory.recall_preference("u", "lang") == "en"
+        assert stats["total_memories"] == 22 and stats["last_compaction"] is None
+        print("✓ Stats served from counters that track inserts and deletes")
+    finally:
+        memory.close()
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def _insert_aged(memory, table, columns, rows, days_ago, hour=None):
+    """Insert rows with a timestamp ``days_ago`` days in the past"""
+    offset = f"-{days_ago} days"
+    ts_sql = (f"strftime('%Y-%m-%d {hour:02d}:%M:%S', 'now', '{offset}')" if hour is not None
+              else f"datetime('now', '{offset}')")
+    with memory._connect() as conn:
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}, timestamp) "
+            f"VALUES ({', '.join('?' * len(columns))}, {ts_sql})", rows)
+
+
+def test_compaction():
+    print("Testing retention, downsampling and compaction...")
+    memory, d = _memory()
+    try:
+        assert memory._connect().execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        cols = ("symbol", "data_type", "data", "source")
+        _insert_aged(memory, "market_data", cols,
+                     [("BTC", "price", json.dumps({"price": p, "note": "x"}), "feed") for p in (1, 3, 5)],
+                     days_ago=10, hour=4)
+        _insert_aged(memory, "market_data", cols,
+                     [("BTC", "price", json.dumps({"price": p}), "feed") for p in (10, 20)],
+                     days_ago=100, hour=1)
+        _insert_aged(memory, "market_data", cols,
+                     [("BTC", "price", json.dumps({"price": 30}), "feed")], days_ago=100, hour=7)
+        memory.remember_market_data("BTC", "price", {"price": 99})
+        _insert_aged(memory, "conversations", ("user_id", "role", "content"),
+                     [("u", "user", "ancient solana chat")], days_ago=400)
+        _insert_aged(memory, "events", ("event_type", "event_data"),
+                     [("old", "x" * 4000) for _ in range(300)], days_ago=200)
+        memory.remember_conversation("u", "user", "fresh solana chat")
+
+        report = memory.compact(vacuum_pages=None)
+        assert report["rolled_up"] == {"hourly": 6, "daily": 2}
+        assert report["deleted"]["conversations"] == 1 and report["deleted"]["events"] == 300
+        assert report["reclaimed_bytes"] > 0 and report["freed_pages"] > 0 and report["seconds"] >= 0
+
+        hourly = memory.recall_market_history("BTC", bucket="hour")
+        assert len(hourly) == 1 and hourly[0]["samples"] == 3
+        assert hourly[0]["fields"]["price"] == {"min": 1, "max": 5, "avg": 3}
+        assert hourly[0]["first"]["price"] == 1 and hourly[0]["last"]["price"] == 5
+        daily = memory.recall_market_history("BTC", "price", bucket="day")
+        assert len(daily) == 1 and daily[0]["samples"] == 3
+        assert daily[0]["fields"]["price"] == {"min": 10, "max": 30, "avg": 20}
+
+        assert _count(memory, "market_data") == 1
+        assert [h["content"] for h in memory.search_memory("solana")] == ["fresh solana chat"]
+        stats = memory.get_memory_stats()
+        assert stats["market_data"] == 1 and stats["events"] == 0
+        assert stats["market_data_rollups"] == _count(memory, "market_data_rollups") == 2
+        assert stats["last_compaction"]["reclaimed_bytes"] == report["reclaimed_bytes"]
+
+        # Late rows for an already rolled-up hour are merged, not duplicated
+        _insert_aged(memory, "market_data", cols,
+                     [("BTC", "price", json.dumps({"price": 7}), "feed")], days_ago=10, hour=4)
+        memory.compact()
+        hourly = memory.recall_market_history("BTC", bucket="hour")
+        assert len(hourly) == 1 and hourly[0]["samples"] == 4
+        assert hourly[0]["fields"]["price"]["max"] == 7
+        print("✓ Old rows expired, market data downsampled, space reclaimed")
+    finally:
+        memory.close()
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_auto_vacuum_conversion_deferred():
+    print("Testing auto-vacuum conversion of an existing database...")
+    d = tempfile.mkdtemp(prefix="ai_memory_test_")
+    path = os.path.join(d, "ai_memory.db")
+    try:
+        legacy = sqlite3.connect(path)
+        legacy.execute("CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, event_type TEXT NOT NULL, "
+                       "event_data TEXT, importance TEXT DEFAULT 'normal', "
+                       "timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+        legacy.executemany("INSERT INTO events (event_type, event_data) VALUES ('old', ?)",
+                           [("x" * 1000,) for _ in range(200)])
+        legacy.commit()
+        legacy.close()
+
+        memory = AIMemorySystem(path)
+        try:
+            conn = memory._connect()
+            assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0  # no VACUUM at startup
+            assert _count(memory, "events") == 200
+            report = memory.compact()
+            assert report["converted_auto_vacuum"]
+            assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+            assert "converted_auto_vacuum" not in memory.compact()
+        finally:
+            memory.close()
+        print("✓ The full VACUUM runs in compact(), not when the app starts")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_concurrency_benchmark():
+    print("Testing concurrency benchmark...")
+    d = tempfile.mkdtemp(prefix="ai_memory_bench_")
+    try:
+        report = benchmark_concurrency(os.path.join(d, "bench.db"), writers=4, readers=4,
+                                       writes_per_thread=50, batch_size=10)
+        for phase in ("single_writes", "batched_writes"):
+            assert report[phase]["errors"] == 0 and report[phase]["rows"] == 200
+        print(f"✓ Benchmark ran without lock errors: {report}")
+
+        report = benchmark_search(os.path.join(d, "search.db"), sizes=(500, 1000), queries=5)
+        assert [s["rows"] for s in report["sizes"]] == [500, 1000]
+        print(f"✓ Search benchmark ran: {report}")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def main():
+    print("=" * 60)
+    print("AI MEMORY SYSTEM TESTS")
+    print("=" * 60)
+    try:
+        test_pooled_connections()
+        test_close_with_live_threads()
+        test_indexes_used()
+        test_batched_and_deferred_writes()
+        test_fts_search()
+        test_fts_recent_across_kinds()
+        test_fts_backfill()
+        test_cached_counts()
+        test_compaction()
+        test_auto_vacuum_conversion_deferred()
+        test_concurrency_benchmark()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All AI memory system tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
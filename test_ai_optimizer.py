@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Tests for AIOptimizer write-behind persistence
+"""
+
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from ai_optimizer import AIOptimizer, benchmark_persistence
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_debounced_writes():
+    print("Testing debounced write-behind...")
+    d = tempfile.mkdtemp(prefix="ai_optimizer_test_")
+    try:
+        path = os.path.join(d, "state.json")
+        opt = AIOptimizer(data_file=path)
+        opt.SAVE_INTERVAL = 0.3
+        for i in range(500):
+            opt.record_strategy_result("sentiment", "consensus", i % 2 == 0, 1000.0)
+        opt.update_regime_risk("volatile", "size_mult", 0.4)
+
+        # One write shortly after the burst instead of one per call
+        assert _wait(lambda: not opt.dirty)
+        assert opt.persistence["saves"] <= 2
+        with open(path) as f:
+            saved = json.load(f)
+        assert saved["task_strategy_map"]["sentiment:consensus"]["total"] == 500
+        assert saved["regime_risk"]["volatile"]["size_mult"] == 0.4
+        assert not os.path.exists(path + ".tmp")
+
+        # Further changes wait out SAVE_INTERVAL, then land on disk
+        opt.record_strategy_result("sentiment", "fastest", True, 300.0)
+        assert opt.dirty
+        assert _wait(lambda: not opt.dirty)
+        assert AIOptimizer(data_file=path).state["task_strategy_map"]["sentiment:fastest"]["total"] == 1
+
+        # close() writes whatever is pending, including buffered outcomes
+        opt.SAVE_INTERVAL = 3600
+        opt.record_strategy_result("sentiment", "fastest", True, 300.0)
+        opt.record_prediction_outcome("gpt", "BULLISH", "BULLISH", 70, "trending")
+        opt.close()
+        reloaded = AIOptimizer(data_file=path)
+        assert reloaded.state["task_strategy_map"]["sentiment:fastest"]["total"] == 2
+        assert reloaded.state["worker_scores"]["gpt"]["total"] == 1
+        print("✓ Mutations mark dirty; one atomic write per SAVE_INTERVAL and on close")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_failed_write_keeps_last_state():
+    print("Testing failed write...")
+    d = tempfile.mkdtemp(prefix="ai_optimizer_test_")
+    try:
+        path = os.path.join(d, "state.json")
+        opt = AIOptimizer(data_file=path)
+        opt.record_strategy_result("ta", "consensus", True, 100.0)
+        assert opt.save_state()
+        opt.record_strategy_result("ta", "consensus", True, 100.0)
+
+        real_fsync = os.fsync
+
+        def broken_fsync(fd):
+            raise OSError("disk full")
+
+        os.fsync = broken_fsync
+        try:
+            assert not opt.save_state()
+        finally:
+            os.fsync = real_fsync
+        assert opt.dirty and opt.persistence["failed_saves"] == 1
+        assert not os.path.exists(path + ".tmp")
+        with open(path) as f:
+            assert json.load(f)["task_strategy_map"]["ta:consensus"]["total"] == 1
+
+        assert opt.save_state() and not opt.dirty
+        with open(path) as f:
+            assert json.load(f)["task_strategy_map"]["ta:consensus"]["total"] == 2
+        opt.close()
+        print("✓ A failed write leaves the previous file intact and stays dirty")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_dirty_wakes_idle_flusher():
+    print("Testing write-behind wakeup after an idle period...")
+    d = tempfile.mkdtemp(prefix="ai_optimizer_test_")
+    try:
+        path = os.path.join(d, "state.json")
+        opt = AIOptimizer(data_file=path)
+        opt.FLUSH_INTERVAL, opt.SAVE_INTERVAL = 3600, 0.05
+
+        opt.record_strategy_result("deep_analysis", "consensus", True, 120.0)
+        assert _wait(lambda: not opt.dirty, 2)
+        time.sleep(0.1)  # flusher is now idle, waiting out FLUSH_INTERVAL
+        opt.record_strategy_result("deep_analysis", "fastest", False, 80.0)
+        assert _wait(lambda: not opt.dirty, 2), "clean -> dirty did not wake the flusher"
+        with open(path) as f:
+            assert "fastest" in json.dumps(json.load(f)["task_strategy_map"])
+        opt.close()
+        print("✓ A change after an idle period is saved within SAVE_INTERVAL")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+CHILD = r"""
+import sys, time
+sys.path.insert(0, {here!r})
+from ai_optimizer import AIOptimizer
+opt = AIOptimizer(data_file={path!r})
+opt.SAVE_INTERVAL = 0.0
+opt.FLUSH_INTERVAL = 0.001
+i = 0
+while True:
+    opt.record_strategy_result("task%d" % (i % 40), "consensus", True, 100.0)
+    i += 1
+    time.sleep(0.0002)  # keep the flusher writing while the kill lands
+    if i % 200 == 0:
+        print(i, flush=True)
+"""
+
+
+def test_crash_consistency():
+    print("Testing crash consistency (SIGKILL during writes)...")
+    d = tempfile.mkdtemp(prefix="ai_optimizer_test_")
+    try:
+        path = os.path.join(d, "state.json")
+        previous = 0
+        for attempt in range(3):
+            child = subprocess.Popen([sys.executable, "-c", CHILD.format(here=HERE, path=path)],
+                                     stdout=subprocess.PIPE, text=True)
+            recorded = 0
+            for line in child.stdout:
+                recorded = int(line)
+                if recorded >= 1000 + 400 * attempt:
+                    break
+            assert _wait(lambda: os.path.exists(path))
+            child.send_signal(signal.SIGKILL)
+            child.wait()
+
+            # Whatever instant the kill hit, the state file is complete JSON
+            with open(path) as f:
+                saved = json.load(f)
+            total = sum(v["total"] for v in saved["task_strategy_map"].values())
+            # Progress was saved, and never more than the child had recorded
+            assert previous < total <= previous + recorded + 200
+            previous = total
+            reloaded = AIOptimizer(data_file=path)
+            assert reloaded.state["task_strategy_map"] == saved["task_strategy_map"]
+        print("✓ Killed writers always leave the last complete state on disk")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_benchmark():
+    print("Testing persistence benchmark...")
+    report = benchmark_persistence(records=300)
+    assert report["before"]["writes"] == 300 and report["after"]["writes"] <= 2
+    assert report["after"]["records_per_sec"] > report["before"]["records_per_sec"]
+    print(f"✓ Benchmark ran: {report}")
+
+
+def main():
+    print("=" * 60)
+    print("AI OPTIMIZER PERSISTENCE TESTS")
+    print("=" * 60)
+    try:
+        test_debounced_writes()
+        test_failed_write_keeps_last_state()
+        test_dirty_wakes_idle_flusher()
+        test_crash_consistency()
+        test_benchmark()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All AI optimizer persistence tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for online isotonic confidence calibration
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from ai_optimizer import AIOptimizer
+from calibration_engine import CalibrationEngine, benchmark, pav
+
+
+def _overconfident(rng, n, worker="gpt", regime="trending", slope=0.4):
+    conf = rng.uniform(0.3, 0.95, n)
+    hit = rng.random(n) < 0.5 + slope * (conf - 0.5)
+    return [(worker, regime, float(c), bool(h)) for c, h in zip(conf, hit)]
+
+
+def test_pav():
+    print("Testing pool-adjacent-violators...")
+    starts, weights, values = pav([0.1, 0.5, 0.3, 0.7, 0.6], [1, 1, 1, 1, 3])
+    assert starts == [0, 1, 3] and weights == [1, 2, 4]
+    assert np.allclose(values, [0.1, 0.4, 0.625])
+    assert pav([], []) == ([], [], [])
+    print("✓ Violating neighbours are pooled into weighted means")
+
+
+def test_curves_and_fallback():
+    print("Testing per-worker / per-regime curves...")
+    rng = np.random.default_rng(3)
+    engine = CalibrationEngine()
+    assert engine.calibrate(0.8) is None  # nothing learned yet
+
+    engine.update(_overconfident(rng, 4000, "gpt", "trending", slope=0.4))
+    engine.update(_overconfident(rng, 4000, "claude", "ranging", slope=1.0))
+    assert set(engine.curves()) == {"gpt|trending", "gpt|*", "*|trending", "claude|ranging",
+                                    "claude|*", "*|ranging", "*|*"}
+
+    gpt = engine.calibrate(0.9, "gpt", "trending")
+    claude = engine.calibrate(0.9, "claude", "ranging")
+    assert abs(gpt - 0.66) < 0.06 and abs(claude - 0.9) < 0.06
+    # Unknown regime falls back to the worker curve, unknown worker to the global one
+    assert engine.calibrate(0.9, "gpt", "volatile") == engine.calibrate(0.9, "gpt")
+    assert engine.calibrate(0.9, "mistral", "volatile") == engine.calibrate(0.9)
+
+    grid = np.linspace(0, 1, 101)
+    batch = engine.calibrate_batch(grid, "gpt", "trending")
+    assert np.all(np.diff(batch) >= -1e-12)  # monotone
+    assert np.allclose(batch, [engine.calibrate(x, "gpt", "trending") for x in grid])
+
+    diagram = engine.reliability_diagram("gpt", "trending")
+    assert diagram["samples"] == 4000 and len(diagram["bins"]) == 7
+    assert diagram["ece_calibrated"] < diagram["ece_raw"]
+    top = diagram["bins"][-1]
+    assert top["mean_confidence"] > top["observed_rate"]
+    assert engine.reliability_diagram("nobody")["samples"] == 0
+
+    restored = CalibrationEngine.from_dict(engine.to_dict())
+    assert restored.calibrate(0.9, "gpt", "trending") == gpt
+    # Running counts match the bins without re-summing them per lookup
+    for key in engine.curves():
+        assert engine._curves[key].total == restored._curves[key].total == engine._curves[key].n.sum()
+    assert engine._curves["*|*"].total == 8000
+    print("✓ Monotone curves, most-specific fallback, diagrams and round trip")
+
+
+def test_optimizer_buffered_outcomes():
+    print("Testing buffered outcomes in AIOptimizer...")
+    d = tempfile.mkdtemp(prefix="calibration_test_")
+    try:
+        path = os.path.join(d, "state.json")
+        opt = AIOptimizer(data_file=path)
+        opt.FLUSH_INTERVAL = 3600  # only explicit / size-triggered flushes
+        rng = np.random.default_rng(5)
+        for worker, regime, conf, hit in _overconfident(rng, 300):
+            opt.record_prediction_outcome(worker, "BULLISH", "BULLISH" if hit else "BEARISH",
+                                          conf * 100, regime, ["rsi", "macd"])
+        assert not os.path.exists(path)  # no write per outcome
+        assert opt.get_status()["pending_outcomes"] == 300
+
+        assert opt.flush_outcomes() == 300 and opt.flush_outcomes() == 0
+        assert opt.dirty
+        status = opt.get_status()
+        assert status["total_predictions"] == 300 and status["pending_outcomes"] == 0
+        assert opt.state["indicator_scores"]["trending"]["rsi"]["total"] == 300
+        assert sum(b["total"] for b in opt.state["calibration"]["buckets"].values()) == 300
+
+        calibrated = opt.get_calibrated_confidence(90, "gpt", "trending")
+        assert calibrated < 85
+        assert opt.get_calibrated_confidence(90, "gpt", "trending") == \
+            opt.get_calibrated_confidence(90, "gpt", "volatile")
+        report = opt.run_full_optimization()
+        assert report["calibration_reliability"]["samples"] == 300
+
+        # Size-triggered background flush
+        opt.FLUSH_SIZE = 50
+        for worker, regime, conf, hit in _overconfident(rng, 60):
+            opt.record_prediction_outcome(worker, "BULLISH", "BULLISH" if hit else "BEARISH",
+                                          conf * 100, regime)
+        for _ in range(200):
+            if not opt._outcomes:
+                break
+            opt._flush_event.wait(0.01)
+        opt.close()
+        assert opt.get_status()["total_predictions"] == 360 and not opt.dirty
+
+        reloaded = AIOptimizer(data_file=path)
+        assert reloaded.get_calibrated_confidence(90, "gpt", "trending") == \
+            opt.get_calibrated_confidence(90, "gpt", "trending")
+        assert reloaded.get_reliability_diagram()["samples"] == 360
+        print("✓ Outcomes batched, persisted once per flush and reloaded")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_benchmark():
+    print("Testing calibration benchmark...")
+    report = benchmark(outcomes=20_000, lookups=5_000)
+    assert report["outcomes_per_sec"] > 0 and report["lookup_us"] > 0
+    assert report["ece_calibrated"] < report["ece_raw"]
+    print(f"✓ Benchmark ran: {report}")
+
+
+def main():
+    print("=" * 60)
+    print("CALIBRATION ENGINE TESTS")
+    print("=" * 60)
+    try:
+        test_pav()
+        test_curves_and_fallback()
+        test_optimizer_buffered_outcomes()
+        test_benchmark()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All calibration engine tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Tests for the rolling cross-asset correlation engine
+"""
+
+import numpy as np
+import pandas as pd
+
+from correlation_engine import DAY, CorrelationEngine
+
+START_DAY = 19723  # 2024-01-01 (a Monday)
+
+
+class _FakeStore:
+    """Daily closes per ticker; stocks skip weekends."""
+
+    def __init__(self, n_days=200, seed=3):
+        rng = np.random.default_rng(seed)
+        market = rng.normal(0, 0.02, n_days)
+        days = START_DAY + np.arange(n_days)
+        weekday = (days - START_DAY) % 7 < 5
+        self.returns = {
+            'BTC-USD': market,
+            'ETH-USD': 1.3 * market + rng.normal(0, 0.01, n_days),
+            'SOL-USD': 1.6 * market + rng.normal(0, 0.02, n_days),
+            'SPY': np.where(weekday, 0.4 * market + rng.normal(0, 0.005, n_days), 0.0),
+            'GLD': rng.normal(0, 0.01, n_days),
+        }
+        self.observed = {t: np.ones(n_days, dtype=bool) for t in self.returns}
+        self.observed['SPY'] = weekday
+        self.observed['GLD'] = weekday
+        self.days = days
+        self.visible = n_days
+
+    def get_columns(self, ticker, timeframe='1d'):
+        keep = self.observed[ticker][:self.visible]
+        close = 100 * np.cumprod(1 + self.returns[ticker][:self.visible])
+        return {'ts': self.days[:self.visible][keep] * DAY, 'close': close[keep]}
+
+
+TICKERS = {'BTC': 'BTC-USD', 'ETH': 'ETH-USD', 'SOL': 'SOL-USD', 'SPY': 'SPY', 'GLD': 'GLD'}
+
+
+def _frame(store, engine):
+    """Pandas view of the engine window (NaN where unobserved)."""
+    cols = {}
+    for sym, ticker in TICKERS.items():
+        c = store.get_columns(ticker)
+        rets = pd.Series(c['close'][1:] / c['close'][:-1] - 1, index=c['ts'][1:] // DAY)
+        cols[sym] = rets
+    frame = pd.DataFrame(cols)
+    lo = engine.last_day - engine.window + 1
+    return frame.loc[(frame.index >= lo) & (frame.index <= engine.last_day), sorted(TICKERS)]
+
+
+def test_matrix_matches_pandas():
+    """Pairwise-complete correlations agree with DataFrame.corr."""
+    print("Testing correlation matrix against pandas...")
+    store = _FakeStore()
+    engine = CorrelationEngine(store=store)
+    engine.update(TICKERS, now=(START_DAY + 200) * DAY)
+    symbols, corr = engine.correlation_matrix()
+    expected = _frame(store, engine).corr(min_periods=engine.MIN_OBS)
+    assert symbols == list(expected.columns)
+    assert np.allclose(corr, expected.values, atol=1e-9, equal_nan=True)
+    print("✓ Matrix matches pandas pairwise correlation")
+
+
+def test_incremental_equals_rebuild():
+    """Sliding the window bar by bar gives the same sums as a rebuild."""
+    print("Testing incremental update...")
+    store = _FakeStore()
+    engine = CorrelationEngine(store=store)
+    store.visible = 150
+    engine.update(TICKERS, now=(START_DAY + 150) * DAY)
+    for day in range(151, 201):
+        store.visible = day
+        stats = engine.update(TICKERS, now=(START_DAY + day) * DAY)
+        assert stats['rows_added'] == 1
+    assert engine.stats['rebuilds'] == 1
+    assert engine.stats['incremental_rows'] == 50
+
+    fresh = CorrelationEngine(store=store)
+    fresh.update(TICKERS, now=(START_DAY + 200) * DAY)
+    _, a = engine.correlation_matrix()
+    _, b = fresh.correlation_matrix()
+    assert np.allclose(a, b, atol=1e-9, equal_nan=True)
+    assert engine.update(TICKERS, now=(START_DAY + 200) * DAY)['rows_added'] == 0
+    print("✓ Rank updates match full rebuild")
+
+
+def test_beta_and_pairs():
+    print("Testing beta, pairs and clusters...")
+    store = _FakeStore()
+    engine = CorrelationEngine(store=store)
+    engine.update(TICKERS, now=(START_DAY + 200) * DAY)
+
+    frame = _frame(store, engine)
+    both = frame[['ETH', 'BTC']].dropna()
+    expected = np.cov(both['ETH'], both['BTC'], ddof=0)[0, 1] / both['BTC'].var(ddof=0)
+    assert engine.beta('ETH') == round(expected, 2)
+    assert engine.benchmark_for('GLD') == 'SPY'
+    betas = engine.betas()
+    assert betas['ETH'] == engine.beta('ETH') and betas['BTC'] == 1.0
+
+    pairs = engine.top_pairs(limit=3, min_abs=0.0)
+    assert len(pairs) == 3
+    strengths = [abs(p['correlation']) for p in pairs]
+    assert strengths == sorted(strengths, reverse=True)
+    assert set(pairs[0]['pair']) <= {'BTC', 'ETH', 'SOL', 'SPY'}
+
+    clusters = engine.clusters(threshold=0.7)
+    assert clusters and {'BTC', 'ETH'} <= set(clusters[0])
+    assert all('GLD' not in c for c in clusters)
+    matrix = engine.get_matrix(['btc', 'eth', 'UNKNOWN'])
+    assert set(matrix) == {'BTC', 'ETH'} and matrix['BTC']['BTC'] == 1.0
+    print("✓ Beta, top pairs and clusters")
+
+
+def test_rolling_correlation_matches_pandas():
+    print("Testing rolling correlation...")
+    store = _FakeStore()
+    engine = CorrelationEngine(store=store)
+    engine.update(TICKERS, now=(START_DAY + 200) * DAY)
+    ours = engine.rolling_correlation('BTC', 'SOL', window=30)
+    frame = _frame(store, engine)
+    theirs = frame['BTC'].rolling(30).corr(frame['SOL']).dropna()
+    assert len(ours) == len(theirs)
+    assert np.allclose([p['correlation'] for p in ours], theirs.values, atol=1e-4)
+    print("✓ Rolling correlation matches pandas")
+
+
+def main():
+    print("=" * 60)
+    print("CORRELATION ENGINE TESTS")
+    print("=" * 60)
+    try:
+        test_matrix_matches_pandas()
+        test_incremental_equals_rebuild()
+        test_beta_and_pairs()
+        test_rolling_correlation_matches_pandas()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All correlation engine tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Tests for concurrent, diffed gem discovery
+"""
+
+import os
+import time
+
+from crypto_gem_finder import CryptoGemFinder, benchmark_discovery
+from shared_state import SharedState
+
+
+def _finder(**sources):
+    finder = CryptoGemFinder()
+    finder._save_discoveries = lambda: None
+    finder.sources = list(sources.items())
+    return finder
+
+
+def test_merge_and_diff():
+    print("Testing hash merge and discovery diff...")
+    paprika = [
+        {'symbol': 'AAA', 'market_cap': 500_000, 'volume_24h': 400_000,
+         'price_change_24h': 30, 'data_source': 'coinpaprika'},
+        {'symbol': 'BBB', 'market_cap': 20_000_000, 'volume_24h': 100_000,
+         'price_change_24h': 4, 'data_source': 'coinpaprika'},
+    ]
+    trending = [{'symbol': 'aaa', 'market_cap': 0, 'data_source': 'coingecko'}]
+    dex = [
+        {'symbol': 'PEPE', 'chain': 'solana', 'address': 'Addr1', 'data_source': 'dexscreener'},
+        {'symbol': 'PEPE', 'chain': 'base', 'address': 'Addr2', 'data_source': 'dexscreener'},
+    ]
+    finder = _finder(coingecko=lambda limit: trending, coinpaprika=lambda limit: list(paprika),
+                     dexscreener=lambda limit: dex)
+
+    first = finder.discover_gem_changes()
+    assert first['total'] == 4 and len(first['new']) == 4 and first['rescored'] == 4
+    assert first['sources']['coinpaprika']['status'] == 'ok'
+    # The first source reporting a symbol wins; address-keyed tokens stay distinct
+    assert finder._index['AAA']['data_source'] == 'coingecko'
+    assert {'solana:addr1', 'base:addr2'} <= set(finder._index)
+    ranked = finder.get_top_gems(10)
+    assert [g['gem_score'] for g in ranked] == sorted((g['gem_score'] for g in ranked), reverse=True)
+
+    second = finder.discover_gem_changes()
+    assert second['new'] == [] and second['changed'] == [] and second['delisted'] == []
+    assert second['rescored'] == 0 and second['unchanged'] == 4
+
+    paprika[1] = {**paprika[1], 'volume_24h': 15_000_000, 'price_change_24h': 60}
+    dex = dex[:1]
+    third = finder.discover_gem_changes()
+    assert third['rescored'] == 1 and third['unchanged'] == 2
+    assert [(c['symbol'], c['old_score'], c['new_score']) for c in third['changed']] == \
+        [('BBB', 15, 60)]
+    assert [d['key'] for d in third['delisted']] == ['base:addr2']
+    assert len(finder.discover_new_gems(limit=2)) == 2
+    print("✓ Only new/changed tokens rescored; diff lists new, changed and delisted")
+
+
+def test_source_deadlines():
+    print("Testing per-source deadlines...")
+    calls = {'slow': 0}
+
+    def slow(limit):
+        calls['slow'] += 1
+        if calls['slow'] > 1:
+            time.sleep(0.5)
+        return [{'symbol': 'SLOW', 'market_cap': 2e6, 'data_source': 'slow'}]
+
+    def broken(limit):
+        raise RuntimeError("HTTP 429")
+
+    finder = _finder(fast=lambda limit: [{'symbol': 'FAST', 'data_source': 'fast'}],
+                     slow=slow, broken=broken)
+    finder.SOURCE_DEADLINES = {'fast': 1.0, 'slow': 0.1, 'broken': 1.0}
+    first = finder.discover_gem_changes()
+    assert first['total'] == 2 and first['sources']['broken']['status'] == 'error'
+
+    start = time.perf_counter()
+    second = finder.discover_gem_changes()
+    assert time.perf_counter() - start < 0.4  # bounded by the deadline, not the sleep
+    assert second['sources']['slow']['status'] == 'timeout'
+    # The timed-out source's last rows are carried over, not reported as delisted
+    assert second['delisted'] == [] and second['total'] == 2
+    print("✓ Slow sources time out without stalling the run or delisting their tokens")
+
+
+def test_changes_endpoint_reads_published_diff():
+    print("Testing /api/gems/changes in a request worker...")
+    os.environ.setdefault('SECRET_KEY', 'test-secret-key-gems')
+    import app as app_module
+
+    finder = app_module.gem_finder
+    saved_diff, calls = finder.last_diff, []
+    finder.discover_gem_changes = lambda limit=50: calls.append(limit) or {}
+    path = os.path.join(app_module.shared_state.directory, "gem_diff.pkl")
+    try:
+        finder.last_diff = {}
+        client = app_module.app.test_client()
+        resp = client.get('/api/gems/changes')
+        assert resp.status_code == 200 and resp.get_json()["data"] == {} and calls == []
+
+        # The master's background worker publishes its diff; this process applies it
+        SharedState(app_module.shared_state.directory).publish("gem_diff", {"new": [], "total": 7})
+        assert client.get('/api/gems/changes').get_json()["data"]["total"] == 7
+        assert calls == []
+    finally:
+        del finder.discover_gem_changes
+        finder.last_diff = saved_diff
+        if os.path.exists(path):
+            os.remove(path)
+    print("✓ The route serves the published diff and never runs discovery")
+
+
+def test_benchmark():
+    print("Testing gem discovery benchmark...")
+    report = benchmark_discovery(latencies=(0.05, 0.1, 0.15), universe=2000)
+    assert report['fetch_concurrent_s'] < report['fetch_sequential_s']
+    assert report['rescored'] == 20
+    print(f"✓ Benchmark ran: {report}")
+
+
+def main():
+    print("=" * 60)
+    print("CRYPTO GEM FINDER TESTS")
+    print("=" * 60)
+    try:
+        test_merge_and_diff()
+        test_source_deadlines()
+        test_changes_endpoint_reads_published_diff()
+        test_benchmark()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All crypto gem finder tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
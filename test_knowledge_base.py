@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Tests for the indexed, journaled evolution KnowledgeBase
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from ai_evolution_engine import KnowledgeBase, benchmark_knowledge_base
+
+
+def test_inverted_index_search():
+    print("Testing token index search...")
+    d = tempfile.mkdtemp(prefix="kb_test_")
+    try:
+        kb = KnowledgeBase(d)
+        kb.add("agent_patterns", "btc_trend", "Bullish breakout on BTC volume")
+        kb.add("agent_patterns", "eth_trend", {"note": "bearish divergence", "asset": "ETH"})
+        kb.add("agent_patterns", "btc_rsi", "RSI oversold bounce")
+        kb.add("other", "btc_trend", "unrelated")
+
+        assert [r["key"] for r in kb.search("agent_patterns", "btc")] == ["btc_trend", "btc_rsi"]
+        assert [r["key"] for r in kb.search("agent_patterns", "BTC breakout")] == ["btc_trend"]
+        assert [r["key"] for r in kb.search("agent_patterns", "divergence")] == ["eth_trend"]
+        assert kb.search("agent_patterns", "btc solana") == []
+        assert kb.search("missing", "btc") == []
+        assert len(kb.search("agent_patterns", "")) == 3
+        assert len(kb.search("agent_patterns", "trend", limit=1)) == 1
+
+        # Re-adding a key re-indexes it in place (order kept, old words dropped)
+        kb.add("agent_patterns", "btc_trend", "Range bound chop")
+        assert kb.search("agent_patterns", "breakout") == []
+        assert [r["key"] for r in kb.search("agent_patterns", "btc")] == ["btc_trend", "btc_rsi"]
+        assert kb.get_stats()["total_entries"] == 4
+        print("✓ All-words match in insertion order, index follows updates")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_journal_and_snapshots():
+    print("Testing write-ahead journal and snapshots...")
+    d = tempfile.mkdtemp(prefix="kb_test_")
+    try:
+        kb = KnowledgeBase(d)
+        for i in range(25):
+            kb.add("cat", f"k{i}", f"value {i}")
+        assert not os.path.exists(kb.kb_file)  # only journaled so far
+        with open(kb.wal_file) as f:
+            assert len(f.readlines()) == 25
+
+        # A fresh instance replays the journal and compacts it into a snapshot
+        again = KnowledgeBase(d)
+        assert again.get("cat", "k7") == "value 7" and again.get_stats()["total_entries"] == 25
+        assert os.path.exists(again.kb_file) and os.path.getsize(again.wal_file) == 0
+
+        # Background snapshot once the journal outgrows SNAPSHOT_EVERY
+        again.SNAPSHOT_EVERY, again.SNAPSHOT_RATIO = 10, 0.2
+        for i in range(25, 40):
+            again.add("cat", f"k{i}", f"value {i}")
+        again._snapshot_thread.join()
+        assert not os.path.exists(again.wal_prev_file)
+        with open(again.kb_file) as f:
+            assert len(json.load(f)["cat"]) >= 35
+
+        # Writer that crashed mid-snapshot: rotated journal + live journal with a torn last line
+        dead = os.path.join(d, "knowledge.999999-dead.wal")
+        with open(dead + ".prev", "w") as f:
+            f.write(json.dumps({"c": "cat", "k": "prev", "e": {"value": 1, "metadata": {},
+                                                              "timestamp": "t", "access_count": 0}}) + "\n")
+        with open(dead, "a") as f:
+            f.write('{"c": "cat", "k": "torn", "e": {"val')
+        recovered = KnowledgeBase(d)
+        assert recovered.get("cat", "prev") == 1 and recovered.get("cat", "torn") is None
+        assert recovered.get("cat", "k39") == "value 39"
+        assert not os.path.exists(dead) and not os.path.exists(dead + ".prev")
+        # Journals of live writers are replayed but left to their owners
+        assert os.path.exists(kb.wal_file) and os.path.exists(again.wal_file)
+        print("✓ Appends are journaled, replayed and compacted crash-consistently")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def _forked_writer(kb, worker, n):
+    """A gunicorn worker forked after the knowledge base was loaded (--preload)."""
+    kb.SNAPSHOT_EVERY, kb.SNAPSHOT_RATIO = 15, 0.05
+    for i in range(n):
+        kb.add("shared", f"w{worker}-{i}", f"worker {worker} note {i}")
+    kb._save()
+
+
+def test_concurrent_processes():
+    print("Testing journals and snapshots across forked processes...")
+    d = tempfile.mkdtemp(prefix="kb_test_")
+    try:
+        kb = KnowledgeBase(d)
+        kb.add("shared", "parent", "loaded before fork")
+        ctx = multiprocessing.get_context("fork")
+        workers = [ctx.Process(target=_forked_writer, args=(kb, w, 200)) for w in range(3)]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join(60)
+            assert p.exitcode == 0
+
+        fresh = KnowledgeBase(d)
+        assert fresh.get_stats()["total_entries"] == 601
+        assert all(fresh.get("shared", f"w{w}-{i}") == f"worker {w} note {i}"
+                   for w in range(3) for i in range(200))
+        # Exited workers' journals were folded into the snapshot; the parent's is still live
+        journals = sorted(n for n in os.listdir(d) if ".wal" in n)
+        assert journals == sorted(os.path.basename(p) for p in (kb.wal_file, fresh.wal_file))
+        print("✓ Each process journals to its own file and snapshots merge")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_batched_access_counters():
+    print("Testing batched access counters...")
+    d = tempfile.mkdtemp(prefix="kb_test_")
+    try:
+        kb = KnowledgeBase(d)
+        kb.ACCESS_BATCH = 50
+        kb.add("cat", "hot", "x")
+        kb.add("cat", "cold", "y")
+        for _ in range(120):
+            assert kb.get("cat", "hot") == "x"
+        kb.get("cat", "cold")
+        assert kb.get("cat", "missing") is None
+        assert len(kb._access_queue) < 50  # drained in batches, not per call
+        assert kb.access_count("cat", "hot") == 120 and kb.access_count("cat", "cold") == 1
+
+        kb._save()
+        reloaded = KnowledgeBase(d)
+        assert reloaded.access_count("cat", "hot") == 120
+        reloaded.get("cat", "hot")
+        assert reloaded.access_count("cat", "hot") == 121
+        reloaded.add("cat", "hot", "z")  # re-adding resets the counter
+        assert reloaded.access_count("cat", "hot") == 0
+        print("✓ Lock-free gets, counts survive snapshots")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_benchmark():
+    print("Testing knowledge base benchmark...")
+    report = benchmark_knowledge_base(sizes=(2000, 6000), probes=50)
+    assert [s["entries"] for s in report["sizes"]] == [2000, 6000]
+    assert all(s["search_ms"] < s["scan_ms"] for s in report["sizes"])
+    print(f"✓ Benchmark ran: {report}")
+
+
+def main():
+    print("=" * 60)
+    print("KNOWLEDGE BASE TESTS")
+    print("=" * 60)
+    try:
+        test_inverted_index_search()
+        test_journal_and_snapshots()
+        test_concurrent_processes()
+        test_batched_access_counters()
+        test_benchmark()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All knowledge base tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Tests for batched MetaModel / HybridSignalGenerator inference
+"""
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+from meta_model import BreakoutScorer, FeatureEngineer, HybridSignalGenerator, MetaModel, benchmark
+
+
+def _reference_features(data):
+    """Per-sample formulas the dict-based extractor used"""
+    return {
+        "price_change_1h": data.get("price_change_1h", 0.0),
+        "rsi_14": data.get("rsi", 50.0) / 100.0,
+        "adx": data.get("adx", 0.0) / 100.0,
+        "ema_cross": 1.0 if data.get("ema_cross", False) else 0.0,
+        "bollinger_position": data.get("bollinger_position", 0.5),
+        "whale_flow_24h": min(data.get("whale_flow", 0.0) / 1e7, 1.0),
+        "sentiment_score": (data.get("sentiment", 0.0) + 1) / 2,
+        "twitter_volume": min(data.get("twitter_volume", 0.0) / 1000, 1.0),
+        "fed_rate": data.get("fed_rate", 5.0) / 10.0,
+        "unemployment": data.get("unemployment", 4.0) / 10.0,
+        "macro_event": 1.0 if data.get("macro_event", False) else 0.0,
+        "fundamentals_score": data.get("fundamentals_score", 0.5),
+    }
+
+
+SAMPLES = [
+    {},
+    {"rsi": 72, "adx": 41, "ema_cross": True, "whale_flow": 3e7, "sentiment": -0.4,
+     "twitter_volume": 250, "macro_event": 1, "fed_rate": 4.5, "bollinger_position": 0.9},
+    {"rsi": 20.5, "whale_flow": 5e6, "sentiment": 0.8, "ema_cross": 0, "fundamentals_score": 0.7},
+]
+
+
+def _trained_model(seed=0):
+    rng = np.random.default_rng(seed)
+    model = MetaModel()
+    n_features = len(model.feature_engineer.feature_names)
+    X = rng.normal(size=(200, n_features))
+    y = (X[:, 0] + X[:, 5] > 0).astype(int)
+    model.model = LogisticRegression().fit(X, y)
+    model.is_trained = True
+    return model
+
+
+def test_schema_matches_reference():
+    print("Testing compiled feature schema...")
+    engineer = FeatureEngineer()
+    X = engineer.transform(SAMPLES)
+    assert X.shape == (3, len(engineer.feature_names))
+    assert engineer.feature_names == sorted(engineer.feature_names)
+    for row, sample in zip(X, SAMPLES):
+        expected = _reference_features(sample)
+        for name, value in expected.items():
+            assert abs(row[engineer.feature_names.index(name)] - value) < 1e-12, name
+        features = engineer.extract_features(sample)
+        assert np.allclose(engineer.get_feature_vector(features), row)
+
+    out = np.full((3, len(engineer.feature_names)), np.nan)
+    assert engineer.transform(SAMPLES, out=out) is out and not np.isnan(out).any()
+    print("✓ Columnar extraction matches the per-sample formulas")
+
+
+def test_batch_predictions_match_single():
+    print("Testing batched predict_proba...")
+    model = _trained_model()
+    rng = np.random.default_rng(3)
+    samples = [{"rsi": float(r), "adx": float(a), "sentiment": float(s)}
+               for r, a, s in zip(rng.uniform(0, 100, 50), rng.uniform(0, 60, 50), rng.uniform(-1, 1, 50))]
+    batch = model.predict_proba_batch(samples)
+    single = [model.predict_proba(s) for s in samples]
+    assert batch.shape == (50,) and np.allclose(batch, single)
+    assert model.predict_proba_batch([]).shape == (0,)
+    assert np.all(MetaModel().predict_proba_batch(samples[:4]) == 0.5)
+    print("✓ One model call per batch, same probabilities")
+
+
+def test_generate_signals_batch():
+    print("Testing HybridSignalGenerator.generate_signals_batch...")
+    generator = HybridSignalGenerator(_trained_model())
+    batch = [(f"T{i}", {"confidence": 0.3 + i / 10}, sample) for i, sample in enumerate(SAMPLES)]
+    signals = generator.generate_signals_batch(batch)
+    assert [s["ticker"] for s in signals] == ["T0", "T1", "T2"]
+    for item, signal in zip(batch, signals):
+        single = generator.generate_signal(*item)
+        for key in ("final_score", "ml_probability", "breakout_score", "signal_class",
+                    "recommendation", "components", "explanation"):
+            assert single[key] == signal[key], key
+    assert generator.generate_signals_batch(batch, explain=False)[0]["explanation"] is None
+    print("✓ Batch signals equal per-asset signals")
+
+
+def _reference_breakout(data):
+    """Scalar breakout formula the dict-based scorer used"""
+    momentum = data.get("rsi", 50.0) / 100 * data.get("adx", 0.0) / 100 * (1.0 if data.get("ema_cross") else 0.0)
+    return (0.25 * momentum + 0.25 * min(data.get("whale_flow", 0.0) / 1e7, 1.0)
+            + 0.20 * (data.get("sentiment", 0.0) + 1) / 2
+            + 0.15 * (1.0 if data.get("macro_event") else 0.0)
+            + 0.15 * data.get("news_impact_score", 0.0))
+
+
+def test_breakout_scorer_vectorized():
+    print("Testing vectorized BreakoutScorer...")
+    scorer = BreakoutScorer()
+    rng = np.random.default_rng(5)
+    samples = SAMPLES + [{"rsi": float(r), "adx": float(a), "ema_cross": bool(e), "whale_flow": float(w),
+                          "sentiment": float(s), "macro_event": bool(m), "news_impact_score": float(ni)}
+                         for r, a, e, w, s, m, ni in zip(
+                             rng.uniform(0, 100, 500), rng.uniform(0, 80, 500), rng.random(500) > 0.5,
+                             rng.uniform(0, 2e7, 500), rng.uniform(-1, 1, 500), rng.random(500) > 0.7,
+                             rng.random(500))]
+    scores = scorer.score_batch(samples)
+    assert np.allclose(scores, [_reference_breakout(s) for s in samples], atol=1e-12)
+    assert scorer.calculate_score(SAMPLES[1]) == scores[1]
+
+    edges = np.array([0.73, 0.7299, 0.60, 0.5999, 0.50, 0.4999, np.nan])
+    assert scorer.classify_batch(edges).tolist() == [
+        "Strong Breakout", "Moderate Breakout", "Moderate Breakout", "Weak Signal",
+        "Weak Signal", "No Signal", "No Signal"]
+    assert scorer.classify_breakout(0.8) == "Strong Breakout"
+
+    symbols = [f"S{i}" for i in range(len(samples))]
+    X = scorer.schema.transform(samples)
+    ranking = scorer.rank(symbols, X, k=10)
+    expected = np.argsort(-scores, kind="stable")[:10]
+    assert [r["symbol"] for r in ranking] == [symbols[i] for i in expected]
+    assert [r["rank"] for r in ranking] == list(range(1, 11))
+    assert ranking[0]["signal_class"] == scorer.classify_breakout(scores[expected[0]])
+    assert len(scorer.rank(symbols[:3], X[:3], k=10)) == 3 and scorer.rank([], X[:0]) == []
+
+    # Columnar input (NaN = missing) scores like the equivalent dictionaries
+    columns = {"rsi": np.array([70.0, np.nan]), "adx": np.array([40.0, 10.0]),
+               "ema_cross": np.array([1.0, np.nan]), "whale_flow": np.array([np.nan, 2e7])}
+    rows = [{"rsi": 70.0, "adx": 40.0, "ema_cross": True}, {"adx": 10.0, "whale_flow": 2e7}]
+    assert np.allclose(scorer.schema.from_columns(columns), scorer.schema.transform(rows))
+    ranked = scorer.rank_columns(columns, ["A", "B"], k=2)
+    assert [r["symbol"] for r in ranked] == ["B", "A"]
+    weights = scorer.weights_for(columns)
+    assert weights == {"momentum": 0.5, "onchain_flow": 0.5}
+    expected_b = scorer.score_matrix(scorer.schema.transform(rows[1:]), weights)[0]
+    assert ranked[0]["breakout_score"] == round(float(expected_b), 3) == 0.5
+    assert set(ranked[0]["components"]) == set(weights)
+    print("✓ Matrix scoring, np.select classes and top-K ranking match the scalar scorer")
+
+
+def test_breakout_ranking_on_screener_columns():
+    print("Testing breakout ranking on screener-only data...")
+    scorer = BreakoutScorer()
+    # Screener snapshot: indicators only, no on-chain / sentiment / macro / news columns
+    columns = {
+        "rsi": np.array([85.0, 55.0, 30.0, np.nan]),
+        "adx": np.array([75.0, 20.0, 45.0, np.nan]),
+        "ema_cross": np.array([1.0, 1.0, 0.0, 0.0]),
+        "price_change_24h": np.array([9.0, 0.5, -4.0, np.nan]),
+        "bollinger_position": np.array([1.05, 0.55, 0.1, np.nan]),
+    }
+    assert scorer.weights_for(columns) == {"momentum": 1.0}
+    ranked = scorer.rank_columns(columns, ["BRK", "FLAT", "DOWN", "NEW"], k=4)
+    assert ranked[0]["symbol"] == "BRK"
+    assert ranked[0]["breakout_score"] == round(0.85 * 0.75, 3)
+    assert ranked[0]["signal_class"] == "Moderate Breakout"
+    assert [r["signal_class"] for r in ranked[1:]] == ["No Signal"] * 3
+    # The full weights would have left the breakout as "No Signal"
+    full = scorer.score_matrix(scorer.schema.from_columns(columns))
+    assert scorer.classify_breakout(full[0]) == "No Signal"
+    assert scorer.weights_for({}) == scorer.weights
+    print("✓ A strong screener breakout ranks as a signal")
+
+
+def test_benchmark():
+    print("Testing inference benchmark...")
+    report = benchmark(batch_sizes=(1, 100))
+    assert report["model"] != "untrained"
+    assert [b["batch_size"] for b in report["batches"]] == [1, 100]
+    assert all(b["rows_per_sec"] for b in report["batches"])
+    print(f"✓ Benchmark ran: {report}")
+
+
+def main():
+    print("=" * 60)
+    print("META MODEL BATCH INFERENCE TESTS")
+    print("=" * 60)
+    try:
+        test_schema_matches_reference()
+        test_batch_predictions_match_single()
+        test_generate_signals_batch()
+        test_breakout_scorer_vectorized()
+        test_breakout_ranking_on_screener_columns()
+        test_benchmark()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All meta model tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
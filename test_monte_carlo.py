@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the Monte Carlo price-path engine
+"""
+
+import numpy as np
+
+from monte_carlo import MonteCarloEngine, benchmark, simulate_paths
+
+
+def _closes(n=120, seed=9):
+    rng = np.random.default_rng(seed)
+    return list(100 * np.exp(np.cumsum(rng.normal(0.001, 0.02, n))))
+
+
+def test_gbm_matches_lognormal():
+    """GBM quantiles converge to the analytic lognormal quantiles."""
+    print("Testing GBM quantiles...")
+    log_returns = np.random.default_rng(1).normal(0.001, 0.02, 500)
+    mu, sigma = log_returns.mean(), log_returns.std()
+    paths = simulate_paths(log_returns, 10, 200000, 'gbm', np.random.default_rng(2))
+    for q, z in ((0.05, -1.6449), (0.5, 0.0), (0.95, 1.6449)):
+        expected = np.exp(10 * mu + z * sigma * np.sqrt(10))
+        assert abs(np.quantile(paths[:, -1], q) / expected - 1) < 0.005, q
+    print("✓ GBM matches lognormal")
+
+
+def test_bootstrap_uses_history():
+    print("Testing bootstrap paths...")
+    log_returns = np.array([-0.01, 0.0, 0.02])
+    paths = simulate_paths(log_returns, 1, 1000, 'bootstrap', np.random.default_rng(0))
+    assert set(np.round(np.log(paths[:, 0]), 6)) == {-0.01, 0.0, 0.02}
+    print("✓ Bootstrap resamples historical returns")
+
+
+def test_memoized_per_last_close():
+    """Repeat forecasts with the same last close skip resimulation."""
+    print("Testing memoization...")
+    engine = MonteCarloEngine(n_paths=5000)
+    closes = _closes()
+    first = engine.forecast('BTC', closes, 7)
+    second = engine.forecast('btc', closes, 7)
+    assert not first['cached'] and second['cached']
+    assert second['quantiles'] is first['quantiles']
+    q = first['quantiles']
+    assert np.all(q[0.05] <= q[0.5]) and np.all(q[0.5] <= q[0.95])
+    assert len(q[0.5]) == 7
+
+    engine.forecast('BTC', closes + [closes[-1] * 1.01], 7)
+    assert engine.stats['hits'] == 1 and engine.stats['misses'] == 2
+    assert engine.forecast('BTC', closes[:5], 7) is None
+    print("✓ Memoized per (symbol, last close, horizon)")
+
+
+def test_simulation_budget():
+    """Long horizons are capped by the cell and time budgets."""
+    print("Testing simulation budget...")
+    engine = MonteCarloEngine(n_paths=100000)
+    result = engine.forecast('ETH', _closes(), 365)
+    assert result['paths'] <= max(engine.CHUNK_PATHS, engine.MAX_CELLS // 365)
+
+    engine = MonteCarloEngine(n_paths=100000, time_budget=0.0)
+    result = engine.forecast('ETH', _closes(), 30)
+    assert result['paths'] == engine.CHUNK_PATHS
+    assert engine.stats['budget_cuts'] == 1
+    print("✓ Budget bounds simulated paths")
+
+
+def test_benchmark_reports_throughput():
+    print("Testing seeded benchmark...")
+    report = benchmark(n_paths=20000, horizon=30, seed=42)
+    for method in ('bootstrap', 'gbm'):
+        assert report[method]['paths_per_sec'] > 0
+        print(f"  {method}: {report[method]['paths_per_sec']:,} paths/sec")
+    print("✓ Benchmark reports paths/sec")
+
+
+def main():
+    print("=" * 60)
+    print("MONTE CARLO TESTS")
+    print("=" * 60)
+    try:
+        test_gbm_matches_lognormal()
+        test_bootstrap_uses_history()
+        test_memoized_per_last_close()
+        test_simulation_budget()
+        test_benchmark_reports_throughput()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All Monte Carlo tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Tests for multi-symbol prompt batching in the MultiAICoordinator
+"""
+
+import json
+import os
+import threading
+import time
+
+from multi_ai_coordinator import (AIWorker, MultiAICoordinator, estimate_tokens, pack_batches,
+                                  split_batch_response)
+
+
+class SimulatedWorker(AIWorker):
+    """LLM worker with a fixed-latency, canned-JSON transport."""
+
+    def __init__(self, name, latency):
+        super().__init__(name, "groq", {"api_key": "simulated"}, None)
+        self.latency = latency
+
+    def _complete(self, system_msg, user_msg, max_tokens=1500):
+        time.sleep(self.latency)
+        start = user_msg.find("Assets: ")
+        if start >= 0:
+            ids = list(json.loads(user_msg[start + 8:]))
+            content = json.dumps({k: {"direction": "BULLISH", "confidence": 0.7,
+                                      "key_factors": ["momentum"], "summary": k} for k in ids})
+        else:
+            content = json.dumps({"direction": "BULLISH", "confidence": 0.7,
+                                  "key_factors": ["momentum"], "summary": "single"})
+        tokens = estimate_tokens(system_msg) + estimate_tokens(user_msg) + estimate_tokens(content)
+        with self._lock:
+            self.requests += 1
+            self.tokens_used += tokens
+        return content, "simulated", tokens
+
+
+def benchmark_batching(symbols=30, workers=2, latency=0.05):
+    """One ``analyze`` per symbol vs one ``analyze_batch``, over simulated LLM workers."""
+    items = [{"symbol": f"SYM{i}", "price": 100 + i, "rsi": 30 + i % 40,
+              "change_24h": (i % 7) - 3, "volume_change_24h": 10 * (i % 5)} for i in range(symbols)]
+    report = {"symbols": symbols, "workers": workers}
+    for mode in ("single", "batch"):
+        c = MultiAICoordinator(auto_register=False)
+        sims = [SimulatedWorker(f"Sim{n}", latency) for n in range(workers)]
+        c.workers.extend(sims)
+        c._weights.update({w.name: 1.0 for w in sims})
+        start = time.perf_counter()
+        if mode == "single":
+            for item in items:
+                c.analyze("deep_analysis", c.DEEP_PROMPT.replace("{symbol}", item["symbol"]), item)
+        else:
+            c.analyze_batch("deep_analysis", c.DEEP_PROMPT, items)
+        report[f"{mode}_wall_s"] = round(time.perf_counter() - start, 3)
+        report[f"{mode}_requests"] = sum(w.requests for w in sims)
+        report[f"{mode}_tokens"] = sum(w.tokens_used for w in sims)
+        c.shutdown()
+    return report
+
+
+class DroppingWorker(SimulatedWorker):
+    """Answers batches but leaves out every id listed in ``drop``."""
+
+    def __init__(self, name, drop=(), garbage=False):
+        super().__init__(name, 0)
+        self.drop = set(drop)
+        self.garbage = garbage
+        self.batch_sizes = []
+
+    def _complete(self, system_msg, user_msg, max_tokens=1500):
+        content, model, tokens = super()._complete(system_msg, user_msg, max_tokens)
+        if "Assets: " in user_msg:
+            body = json.loads(content)
+            self.batch_sizes.append(len(body))
+            if self.garbage:
+                return "Sorry, I cannot help with that.", model, tokens
+            content = "```json\n" + json.dumps({k: v for k, v in body.items()
+                                                if k not in self.drop}) + "\n```"
+        return content, model, tokens
+
+
+def _coordinator(*workers):
+    c = MultiAICoordinator(auto_register=False)
+    c._register("RuleEngine", "rule_based", {})
+    for w in workers:
+        c.workers.append(w)
+        c._weights[w.name] = 1.0
+    return c
+
+
+def _items(n):
+    return [{"symbol": f"S{i}", "rsi": 20 if i % 2 else 80, "change_24h": 1.0} for i in range(n)]
+
+
+def test_packing_and_splitting():
+    print("Testing batch packing and response splitting...")
+    assert pack_batches([10] * 5, budget=1000, per_item_output=100, max_output=1000,
+                        max_items=16) == [[0, 1, 2, 3, 4]]
+    # Budget of 250 holds two 10+100 items
+    assert pack_batches([10] * 5, 250, 100, 1000, 16) == [[0, 1], [2, 3], [4]]
+    assert pack_batches([10] * 5, 10_000, 100, 300, 16) == [[0, 1, 2], [3, 4]]
+    assert pack_batches([5000, 10], 1000, 100, 1000, 16) == [[0], [1]]
+
+    assert split_batch_response('{"A": {"direction": "BULLISH"}, "Z": {}, "B": 3}', ["A", "B"]) == \
+        {"A": {"direction": "BULLISH"}}
+    assert split_batch_response('Here:\n```json\n{"results": [{"id": "A", "confidence": 0.6}]}\n```',
+                                ["A"]) == {"A": {"id": "A", "confidence": 0.6}}
+    try:
+        split_batch_response("no json here", ["A"])
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("✓ Items fit the context budget and responses split by id")
+
+
+def test_analyze_batch_saves_requests():
+    print("Testing analyze_batch request savings...")
+    sim = DroppingWorker("Sim")
+    c = _coordinator(sim)
+    items = _items(20)
+    results = c.analyze_batch("deep_analysis", c.DEEP_PROMPT, items)
+    assert len(results) == 20 and all(r["success"] and r["batched"] for r in results)
+    assert all(r["analysis"]["voters"] == 2 for r in results)  # rule engine + simulated LLM
+    assert sim.batch_sizes == [AIWorker.MAX_BATCH_ITEMS, 4] and sim.requests == 2
+    stats = c.get_batch_stats()
+    assert stats["requests"] == 2 and stats["requests_unbatched"] == 20
+    assert stats["requests_saved"] == 18 and stats["tokens"] == sim.tokens_used > 0
+
+    # Same cache keys as analyze() with the symbol filled in
+    single = c.analyze("deep_analysis", c.DEEP_PROMPT.replace("{symbol}", "S3"), items[3])
+    assert single.get("from_cache") and sim.requests == 2
+    again = c.analyze_batch("deep_analysis", c.DEEP_PROMPT, items)
+    assert all(r.get("from_cache") for r in again) and sim.requests == 2
+    assert c.get_batch_stats()["cached"] == 20
+    c.shutdown()
+    print("✓ 20 symbols cost 2 requests instead of 20")
+
+
+def test_fallback_to_singles():
+    print("Testing single-call fallback...")
+    sim = DroppingWorker("Sim", drop={"S1", "S4"})
+    c = _coordinator(sim)
+    results = c.analyze_batch("deep_analysis", c.DEEP_PROMPT, _items(6), strategy="redundant")
+    assert all(r["success"] for r in results)
+    assert sim.requests == 3 and c.get_batch_stats()["fallback_singles"] == 2
+    c.shutdown()
+
+    broken = DroppingWorker("Broken", garbage=True)
+    c = _coordinator(broken)
+    results = c.analyze_batch("deep_analysis", c.DEEP_PROMPT, _items(5))
+    assert all(r["success"] and r["analysis"]["voters"] == 2 for r in results)
+    assert broken.requests == 6 and c.get_batch_stats()["fallback_singles"] == 5
+    c.shutdown()
+
+    # Duplicate symbols get distinct ids
+    sim = DroppingWorker("Sim")
+    c = _coordinator(sim)
+    results = c.analyze_batch("deep_analysis", "Compare {symbol}", [{"symbol": "BTC", "tf": "1h"},
+                                                                    {"symbol": "BTC", "tf": "4h"}],
+                              use_cache=False)
+    assert all(r["success"] for r in results) and sim.requests == 1
+    assert c.get_batch_stats()["fallback_singles"] == 0
+    c.shutdown()
+    print("✓ Missing or unparseable ids are retried one by one")
+
+
+def test_submit_window():
+    print("Testing submit() collection window...")
+    sim = DroppingWorker("Sim")
+    c = _coordinator(sim)
+    results = [None] * 6
+
+    def run(i):
+        results[i] = c.deep_analysis(f"S{i}", {"rsi": 50})
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(r["success"] for r in results)
+    assert sim.batch_sizes == [6] and sim.requests == 1
+    assert c.get_batch_stats()["batches"] == 1
+
+    # A lone task goes through the plain single-call path
+    single = c.deep_analysis("ETH", {"rsi": 50})
+    assert single["success"] and "batched" not in single and sim.requests == 2
+    c.shutdown()
+    print("✓ Concurrent deep analyses share one request")
+
+
+def test_batch_endpoint_limit():
+    print("Testing /api/ai/coordinator/batch item limit...")
+    os.environ.setdefault('SECRET_KEY', 'test-secret-key-coordinator')
+    import app as app_module
+
+    calls = []
+    original = app_module.ai_coordinator.deep_analysis_batch
+    app_module.ai_coordinator.deep_analysis_batch = lambda items: calls.append(items) or []
+    try:
+        client = app_module.app.test_client()
+        limit = app_module.COORDINATOR_BATCH_MAX_ITEMS
+        resp = client.post('/api/ai/coordinator/batch', json={"items": _items(limit + 1)})
+        assert resp.status_code == 400 and not resp.get_json()["success"]
+        assert calls == []
+        resp = client.post('/api/ai/coordinator/batch', json={"items": _items(limit)})
+        assert resp.status_code == 200 and len(calls[0]) == limit
+    finally:
+        app_module.ai_coordinator.deep_analysis_batch = original
+    print(f"✓ More than {limit} items is rejected before any provider call")
+
+
+def test_batching_benchmark():
+    print("Testing batching benchmark...")
+    report = benchmark_batching(symbols=30, workers=2, latency=0.01)
+    assert report["single_requests"] == 60 and report["batch_requests"] == 4
+    assert report["batch_tokens"] < report["single_tokens"]
+    assert report["batch_wall_s"] < report["single_wall_s"]
+    print(f"✓ {report['single_requests']} → {report['batch_requests']} requests, "
+          f"{report['single_tokens']} → {report['batch_tokens']} tokens")
+
+
+def main():
+    print("=" * 60)
+    print("MULTI-AI COORDINATOR BATCHING TESTS")
+    print("=" * 60)
+    try:
+        test_packing_and_splitting()
+        test_analyze_batch_saves_requests()
+        test_fallback_to_singles()
+        test_submit_window()
+        test_batch_endpoint_limit()
+        test_batching_benchmark()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All multi-AI coordinator tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
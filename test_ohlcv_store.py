@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Tests for the OHLCV store and local timeframe resampling
+"""
+
+import numpy as np
+import pandas as pd
+
+from ohlcv_store import OHLCVStore, TIMEFRAME_SECONDS, resample, yahoo_ticker
+
+START = 1704067200  # 2024-01-01 00:00 UTC (a Monday)
+
+
+def _hourly_bars(hours, start=START):
+    rng = np.random.default_rng(11)
+    close = 100 + np.cumsum(rng.normal(0, 1, hours))
+    return {
+        'ts': start + 3600 * np.arange(hours),
+        'open': close - 0.5,
+        'high': close + 1.0,
+        'low': close - 1.0,
+        'close': close,
+        'volume': rng.integers(1, 1000, hours).astype(float),
+    }
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def __init__(self, bars):
+        self._bars = bars
+
+    def json(self):
+        return {'chart': {'result': [{
+            'timestamp': [int(t) for t in self._bars['ts']],
+            'indicators': {'quote': [{
+                k: [float(v) for v in self._bars[k]]
+                for k in ('open', 'high', 'low', 'close', 'volume')
+            }]},
+        }]}}
+
+
+class _FakeSession:
+    def __init__(self, bars):
+        self.bars = bars
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(params)
+        return _FakeResponse(self.bars)
+
+
+def test_resample_matches_pandas():
+    """Vectorized resampling agrees with pandas OHLC aggregation."""
+    print("Testing resample against pandas...")
+    bars = _hourly_bars(24 * 21 + 7)
+    frame = pd.DataFrame({k: v for k, v in bars.items() if k != 'ts'},
+                         index=pd.to_datetime(bars['ts'], unit='s'))
+    rules = {'4h': '4h', '1d': '1D', '1w': 'W-MON'}
+    for timeframe, rule in rules.items():
+        ours = resample(bars, TIMEFRAME_SECONDS[timeframe])
+        kwargs = {'label': 'left', 'closed': 'left'} if timeframe == '1w' else {}
+        theirs = frame.resample(rule, **kwargs).agg({
+            'open': 'first', 'high': 'max', 'low': 'min',
+            'close': 'last', 'volume': 'sum'}).dropna()
+        assert len(ours['ts']) == len(theirs), timeframe
+        for col in ('open', 'high', 'low', 'close', 'volume'):
+            assert np.allclose(ours[col], theirs[col].values), (timeframe, col)
+    print("✓ 4h / 1d / 1w bars match pandas")
+
+
+def test_one_download_serves_all_timeframes():
+    """All timeframes come from one stored series."""
+    print("Testing single download for every timeframe...")
+    session = _FakeSession(_hourly_bars(24 * 60))
+    store = OHLCVStore(session=session)
+    hourly = store.get_bars('BTC', '1h')
+    daily = store.get_bars('BTC', '1d')
+    weekly = store.get_bars('BINANCE:BTCUSDT', '1w')
+    store.get_bars('BTC', '4h')
+    assert len(session.calls) == 1, session.calls
+    assert len(hourly) == 24 * 60
+    assert len(daily) == 60
+    assert len(weekly) == 9
+    assert daily[0]['high'] == max(b['high'] for b in hourly[:24])
+    assert store.base_interval('BTC') == 3600
+    print("✓ One fetch, four timeframes")
+
+
+def test_incremental_merge():
+    """Refreshed tail bars replace the overlapping part of the series."""
+    print("Testing incremental merge...")
+    store = OHLCVStore(session=None)
+    store.ingest('ETH', _hourly_bars(48), 3600)
+    tail = _hourly_bars(10, start=START + 3600 * 45)
+    store.ingest('ETH', tail, 3600)
+    cols = store.get_columns('ETH', '1h')
+    assert len(cols['ts']) == 55
+    assert np.all(np.diff(cols['ts']) == 3600)
+    assert cols['close'][-1] == tail['close'][-1]
+    assert store.get_columns('ETH', '1h') is cols  # cached until the series changes
+    print("✓ Tail merged without duplicates")
+
+
+def test_current_bar_update_invalidates_cache():
+    """A merge that rewrites the last bar (same timestamp) is not served stale."""
+    print("Testing current-bar update...")
+    store = OHLCVStore(session=None)
+    bars = _hourly_bars(48)
+    store.ingest('SOL', bars, 3600)
+    daily = store.get_columns('SOL', '1d')
+    assert store.get_columns('SOL', '1d') is daily
+
+    last = {k: v[-1:].copy() for k, v in bars.items()}
+    last['close'] = last['close'] + 50
+    last['high'] = last['high'] + 60
+    last['volume'] = last['volume'] + 1000
+    store.ingest('SOL', last, 3600)
+    updated = store.get_columns('SOL', '1d')
+    assert updated['ts'][-1] == daily['ts'][-1]
+    assert updated['close'][-1] == bars['close'][-1] + 50
+    assert updated['high'][-1] >= bars['high'][-1] + 60
+    assert updated['volume'][-1] == daily['volume'][-1] + 1000
+    print("✓ Resampled bars follow in-place updates of the current bar")
+
+
+def test_lru_bound():
+    print("Testing the per-process series bound...")
+    store = OHLCVStore(session=None)
+    store.MAX_SERIES = 3
+    for sym in ('AAA', 'BBB', 'CCC'):
+        store.ingest(sym, _hourly_bars(48), 3600)
+        store.get_columns(sym, '4h')
+    store.get_columns('AAA', '1d')  # AAA is now the most recently used
+    store.ingest('DDD', _hourly_bars(48), 3600)
+    assert list(store._series) == ['CCC', 'AAA', 'DDD'] and store.stats['evictions'] == 1
+    assert not [k for k in store._resampled if k[0] == 'BBB']
+    assert store.get_columns('BBB', '4h') is None  # evicted (no session to refetch)
+
+    for i in range(10):
+        store.get_columns(f'X{i}', '1d')
+    assert len(store._failed) == 3 and 'X9' in store._failed
+    print("✓ Least recently used series and their timeframes are evicted")
+
+
+def test_ticker_mapping():
+    print("Testing ticker mapping...")
+    assert yahoo_ticker('btc') == 'BTC-USD'
+    assert yahoo_ticker('BINANCE:ETHUSDT') == 'ETH-USD'
+    assert yahoo_ticker('AAPL') == 'AAPL'
+    print("✓ Tickers mapped")
+
+
+def main():
+    print("=" * 60)
+    print("OHLCV STORE TESTS")
+    print("=" * 60)
+    try:
+        test_resample_matches_pandas()
+        test_one_download_serves_all_timeframes()
+        test_incremental_merge()
+        test_current_bar_update_invalidates_cache()
+        test_lru_bound()
+        test_ticker_mapping()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All OHLCV store tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the sliding-window Pattern Detector
+"""
+
+import random
+
+import numpy as np
+
+from pattern_detector import PatternDetector, find_pivots, sliding_extrema
+
+
+def _ramp(start, end, n):
+    return list(np.linspace(start, end, n, endpoint=False))
+
+
+def test_sliding_extrema_matches_naive():
+    """Deque extrema must equal slice-based min/max."""
+    print("Testing sliding extrema...")
+    rng = random.Random(7)
+    values = [rng.uniform(1, 100) for _ in range(300)]
+    mins, maxs = sliding_extrema(values, 11)
+    for i in range(len(values)):
+        window = values[max(0, i - 10):i + 1]
+        assert mins[i] == min(window), f"min mismatch at {i}"
+        assert maxs[i] == max(window), f"max mismatch at {i}"
+    print("✓ Sliding extrema match naive scan")
+
+
+def test_find_pivots_matches_naive():
+    """Vectorized pivots must equal the per-bar loop they replace."""
+    print("Testing pivot detection...")
+    rng = random.Random(3)
+    for _ in range(100):
+        w = [float(rng.randint(1, 10)) for _ in range(rng.randint(5, 80))]
+        lows, highs = find_pivots(w, 5)
+        assert list(lows) == [i for i in range(5, len(w) - 5) if w[i] == min(w[i - 5:i + 6])]
+        assert list(highs) == [i for i in range(5, len(w) - 5) if w[i] == max(w[i - 5:i + 6])]
+
+        lows, highs = find_pivots(w, 2, strict=True)
+        expected_lows = [i for i in range(2, len(w) - 2)
+                         if all(w[i] < w[i + k] and w[i] < w[i - k] for k in (1, 2))]
+        expected_highs = [i for i in range(2, len(w) - 2)
+                          if all(w[i] > w[i + k] and w[i] > w[i - k] for k in (1, 2))]
+        assert list(lows) == expected_lows
+        assert list(highs) == expected_highs
+    print("✓ Pivots match naive scan")
+
+
+def test_head_and_shoulders():
+    """Three peaks with a higher middle one is a Head and Shoulders."""
+    print("Testing head and shoulders...")
+    closes = ([100.0] * 10 + _ramp(100, 110, 8) + _ramp(110, 100, 8)
+              + _ramp(100, 120, 8) + _ramp(120, 100, 8)
+              + _ramp(100, 110, 8) + _ramp(110, 100, 8) + [100.0] * 3)
+    names = [p['pattern'] for p in PatternDetector().detect(closes)]
+    assert 'Head and Shoulders' in names, names
+    print("✓ Head and Shoulders detected")
+
+
+def test_flag_and_breakout():
+    """A strong pole followed by tight consolidation is a Bull Flag."""
+    print("Testing flag and breakout...")
+    detector = PatternDetector()
+    closes = [100.0] * 20 + _ramp(100, 120, 10) + [120, 119, 120, 119.5, 119,
+                                                     120, 119.2, 119.8, 119, 119.5]
+    names = [p['pattern'] for p in detector.detect(closes)]
+    assert 'Bull Flag' in names, names
+
+    closes = [100.0 + (i % 7) for i in range(40)] + [110.0]
+    names = [p['pattern'] for p in detector.detect(closes)]
+    assert 'Breakout (Resistance)' in names, names
+    print("✓ Bull Flag and Breakout detected")
+
+
+def test_cache_per_last_bar():
+    """Results are reused until a new bar arrives."""
+    print("Testing per-bar cache...")
+    detector = PatternDetector()
+    closes = [100 + 10 * np.sin(i / 5) for i in range(120)]
+    first = detector.detect(closes, 'BTC', last_bar='2024-01-01')
+    second = detector.detect(closes, 'BTC', last_bar='2024-01-01')
+    assert first == second and first is not second
+    assert detector.stats == {'hits': 1, 'misses': 1}
+
+    # Mutating a result must not leak into later cache hits
+    expected = [dict(p) for p in second]
+    first.clear()
+    second.append({'pattern': 'Injected'})
+    assert expected
+    second[0]['confidence'] = -1
+    assert detector.detect(closes, 'BTC', last_bar='2024-01-01') == expected
+    assert detector.stats == {'hits': 2, 'misses': 1}
+
+    detector.detect(closes, 'BTC', last_bar='2024-01-02')
+    assert detector.stats['misses'] == 2
+
+    batch = detector.detect_batch({'BTC': closes, 'ETH': closes},
+                                  last_bars={'BTC': '2024-01-02'})
+    assert set(batch) == {'BTC', 'ETH'}
+    assert detector.stats['hits'] == 3
+
+    # Intraday update of the current bar: same timestamp, new close
+    updated = closes[:-1] + [closes[-1] * 1.5]
+    detector.detect(updated, 'BTC', last_bar='2024-01-02')
+    assert detector.stats['misses'] == 4  # ETH + the updated bar
+    print("✓ Cache keyed by (symbol, last bar, last close)")
+
+
+def main():
+    print("=" * 60)
+    print("PATTERN DETECTOR TESTS")
+    print("=" * 60)
+    try:
+        test_sliding_extrema_matches_naive()
+        test_find_pivots_matches_naive()
+        test_head_and_shoulders()
+        test_flag_and_breakout()
+        test_cache_per_last_bar()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All pattern detector tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
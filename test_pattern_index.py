@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Tests for the nearest-neighbour pattern index
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from ai_learning_system import AILearningSystem
+from pattern_index import DIM, PatternIndex, benchmark, embed
+
+NAMES = ("rsi", "adx", "bb_pct_b", "stoch_k", "williams", "roc", "change_24h",
+         "volume_change_24h", "trend_gap", "sentiment")
+
+
+def _random_features(rng, n):
+    return [dict(zip(NAMES, row)) for row in
+            np.array([50, 25, 0.5, 50, -50, 0, 0, 0, 0, 0]) + rng.normal(size=(n, DIM)) * 10]
+
+
+def test_embedding():
+    print("Testing embeddings...")
+    assert embed({"rsi": 50}) is None  # fewer than MIN_FEATURES indicators
+    vec = embed({"rsi": 70, "adx": 25, "ema9": 102, "ema21": 100})
+    assert vec.shape == (DIM,) and vec[0] == 1.0 and vec[1] == 0.0
+    assert abs(vec[NAMES.index("trend_gap")] - 1.0) < 1e-9  # 2% gap / 2% range
+    assert np.array_equal(embed({"rsi": 70, "bollinger_position": 1.0}),
+                          embed({"rsi": 70, "bb_pct_b": 1.0}))
+
+    # Raw market_analyzer snapshot: band levels instead of %B
+    snapshot = {"current_price": 105.0, "sma_20": 100.0, "sma_50": 100.0, "sma_200": 95.0,
+                "rsi": 60.0, "macd": 0.8, "macd_signal": 0.5, "bollinger_upper": 110.0,
+                "bollinger_lower": 90.0, "volume_avg": 1200}
+    vec = embed(snapshot)
+    assert vec[NAMES.index("bb_pct_b")] == 0.5  # (0.75 - 0.5) / 0.5
+    assert np.array_equal(vec, embed({**snapshot, "bollinger_position": 0.75}))
+    assert embed({**snapshot, "bollinger_upper": 90.0})[NAMES.index("bb_pct_b")] == 0.0
+    print("✓ Scale-free, centred embeddings with aliases")
+
+
+def test_exact_neighbours_across_rebuilds():
+    print("Testing tree + tail queries against brute force...")
+    rng = np.random.default_rng(4)
+    index = PatternIndex()
+    for i, features in enumerate(_random_features(rng, 3000)):
+        assert index.add(f"p{i}", "BTC", "BULLISH", features, ts=float(i))
+    assert not index.add("p0", "BTC", "BULLISH", {"rsi": 1, "adx": 2})  # duplicate id
+    assert index.stats["rebuilds"] >= 2 and index._tree_n < len(index)  # tail not yet indexed
+
+    for features in _random_features(rng, 50):
+        vec = embed(features)
+        d, i = index.query_vector(vec, k=8)
+        bd, bi = index.brute_force(vec, k=8)
+        assert np.allclose(d, bd) and set(i.tolist()) == set(bi.tolist())
+    assert len(index.query_vector(vec, k=5000)[0]) == 3000
+    print("✓ Results equal a brute-force scan")
+
+
+def test_outcomes_persistence_and_capacity():
+    print("Testing outcomes, persistence and capacity...")
+    d = tempfile.mkdtemp(prefix="pattern_index_test_")
+    try:
+        path = os.path.join(d, "index.npz")
+        index = PatternIndex(path)
+        index.add("a", "BTC", "BULLISH", {"rsi": 70, "adx": 30}, ts=1.0)
+        index.add("b", "ETH", "BEARISH", {"rsi": 72, "adx": 31}, ts=2.0)
+        index.add("c", "SOL", "BULLISH", {"rsi": 20, "adx": 10}, ts=3.0)
+        assert index.set_outcomes({"a": ("CORRECT", 0.05), "b": ("INCORRECT", 0.02),
+                                   "missing": ("CORRECT", None)}) == 2
+        hits = index.query({"rsi": 71, "adx": 30}, k=2)
+        assert [h["id"] for h in hits] == ["a", "b"] and hits[0]["outcome"] == "CORRECT"
+        assert PatternIndex.summarize(hits) == {"neighbours": 2, "evaluated": 2, "correct_rate": 0.5,
+                                                "up_ratio": 1.0, "mean_move": 0.035}
+        index.save()
+
+        reloaded = PatternIndex(path)
+        assert len(reloaded) == 3 and reloaded.query({"rsi": 71, "adx": 30}, k=2) == hits
+
+        small = PatternIndex()
+        small.MAX_POINTS, small.MIN_TREE_SIZE = 300, 100
+        rng = np.random.default_rng(1)
+        for i, features in enumerate(_random_features(rng, 400)):
+            small.add(f"s{i}", "X", "BULLISH", features, ts=float(i))
+        small._rebuild()
+        assert len(small) == 300 and "s0" not in small._pos and small._pos["s399"] == 299
+        print("✓ Outcomes attach, index round-trips and drops the oldest points")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_learning_system_similarity():
+    print("Testing AILearningSystem.find_similar_patterns...")
+    d = tempfile.mkdtemp(prefix="pattern_index_test_")
+    try:
+        ls = AILearningSystem(data_dir=d)
+        up = ls.record_prediction("BTC", "BULLISH", 0.8, "gpt", "m", 100.0,
+                                  extra={"RSI": 75, "ADX": 35, "BB": {"pct_b": 0.9}})
+        down = ls.record_prediction("ETH", "BULLISH", 0.6, "gpt", "m", 50.0,
+                                    extra={"RSI": 25, "ADX": 15, "BB": {"pct_b": 0.1}})
+        ls.record_prediction("SOL", "BULLISH", 0.6, "gpt", "m", 5.0, extra={"note": "no numbers"})
+        ls.batch_evaluate([{"prediction_id": up, "outcome": "CORRECT", "price_now": 110.0},
+                           {"prediction_id": down, "outcome": "INCORRECT", "price_now": 45.0}])
+        result = ls.find_similar_patterns({"RSI": 73, "ADX": 33, "BB": {"pct_b": 0.85}}, k=1)
+        assert result["indexed"] == 2
+        best = result["neighbours"][0]
+        assert best["id"] == up and best["outcome"] == "CORRECT" and abs(best["move"] - 0.1) < 1e-9
+        ls.save_all()
+        assert len(AILearningSystem(data_dir=d).pattern_index) == 2
+        assert not [f for f in os.listdir(d) if f.endswith(".npz")]  # rebuilt from learning.db
+        print("✓ Recorded snapshots are searchable with their outcomes")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_learning_system_shared_across_processes():
+    print("Testing pattern index catch-up between processes...")
+    d = tempfile.mkdtemp(prefix="pattern_index_test_")
+    try:
+        master = AILearningSystem(data_dir=d)
+        web = AILearningSystem(data_dir=d)  # a forked gunicorn worker: same database, own index
+        early = master.record_prediction("BTC", "BULLISH", 0.8, "gpt", "m", 100.0,
+                                         extra={"RSI": 70, "ADX": 30})
+        master.batch_evaluate([{"prediction_id": early, "outcome": "CORRECT", "price_now": 105.0}])
+        # Predictions recorded by a request handler reach the master...
+        late = web.record_prediction("ETH", "BEARISH", 0.7, "gpt", "m", 50.0,
+                                     extra={"RSI": 30, "ADX": 20})
+        probe = {"RSI": 31, "ADX": 21}
+        assert master.find_similar_patterns(probe, k=1)["neighbours"][0]["id"] == late
+        # ...and outcomes recorded by the master reach the worker
+        master.batch_evaluate([{"prediction_id": late, "outcome": "INCORRECT", "price_now": 55.0}])
+        seen = {n["id"]: n for n in web.find_similar_patterns(probe, k=2)["neighbours"]}
+        assert seen[early]["outcome"] == "CORRECT" and abs(seen[early]["move"] - 0.05) < 1e-9
+        assert seen[late]["outcome"] == "INCORRECT"
+        assert web.sync_pattern_index() == 0 and len(web.pattern_index) == 2
+        print("✓ Every process sees every snapshot and outcome")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_benchmark():
+    print("Testing recall/latency benchmark...")
+    report = benchmark(n=5000, queries=50)
+    assert report["recall_at_k"] == 1.0 and report["points"] == 5000
+    assert report["query_ms"] > 0 and report["brute_force_ms"] > 0
+    print(f"✓ Benchmark ran: {report}")
+
+
+def main():
+    print("=" * 60)
+    print("PATTERN INDEX TESTS")
+    print("=" * 60)
+    try:
+        test_embedding()
+        test_exact_neighbours_across_rebuilds()
+        test_outcomes_persistence_and_capacity()
+        test_learning_system_similarity()
+        test_learning_system_shared_across_processes()
+        test_benchmark()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All pattern index tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests for the batch risk engine
+"""
+
+import math
+import time
+
+import numpy as np
+
+from risk_engine import RiskEngine, risk_metrics
+
+
+def _closes(n, seed, drift=0.0005, vol=0.03):
+    rng = np.random.default_rng(seed)
+    return list(100 * np.cumprod(1 + rng.normal(drift, vol, n)))
+
+
+def _loop_metrics(closes, bench):
+    """The per-symbol loops assess_risk used before the batch engine."""
+    rets = [(closes[i] / closes[i - 1] - 1) for i in range(1, len(closes))]
+    mean_r = sum(rets) / len(rets)
+    std_r = math.sqrt(sum((r - mean_r) ** 2 for r in rets) / len(rets))
+    peak, max_dd = closes[0], 0
+    for c in closes:
+        peak = max(peak, c)
+        max_dd = min(max_dd, (c - peak) / peak * 100)
+    ordered = sorted(rets)
+    n = min(len(closes), len(bench))
+    r_a = [(closes[-(n - i)] / closes[-(n - i) - 1] - 1) for i in range(1, n)]
+    r_b = [(bench[-(n - i)] / bench[-(n - i) - 1] - 1) for i in range(1, n)]
+    m_a, m_b = sum(r_a) / len(r_a), sum(r_b) / len(r_b)
+    cov = sum((a - m_a) * (b - m_b) for a, b in zip(r_a, r_b)) / len(r_a)
+    var_b = sum((b - m_b) ** 2 for b in r_b) / len(r_b)
+    return {
+        'volatility': std_r * math.sqrt(365) * 100,
+        'max_drawdown': max_dd,
+        'var_95': ordered[max(0, int(len(ordered) * 0.05))] * 100,
+        'sharpe': ((mean_r * 365) - 0.04) / (std_r * math.sqrt(365)),
+        'beta': cov / var_b,
+    }
+
+
+def test_matches_loop_definitions():
+    """Vectorized metrics equal the old per-symbol loops, lengths differing."""
+    print("Testing metrics against loop implementation...")
+    bench = _closes(90, 0)
+    series = [_closes(n, seed) for seed, n in enumerate((90, 60, 75, 31), start=1)]
+    metrics = risk_metrics(series, [bench] * len(series))
+    for i, closes in enumerate(series):
+        expected = _loop_metrics(closes, bench)
+        for name, value in expected.items():
+            assert abs(metrics[name][i] - value) < 1e-9, (i, name, metrics[name][i], value)
+    print("✓ Batch metrics match loops")
+
+
+def test_tail_metrics():
+    print("Testing CVaR and Sortino...")
+    closes = _closes(200, 7)
+    m = risk_metrics([closes])
+    rets = np.diff(closes) / np.array(closes[:-1])
+    k = int(len(rets) * 0.05)
+    assert abs(m['cvar_95'][0] - np.sort(rets)[:k + 1].mean() * 100) < 1e-9
+    assert m['cvar_95'][0] <= m['var_95'][0]
+    downside = np.sqrt(np.mean(np.minimum(rets, 0) ** 2))
+    expected = (rets.mean() * 365 - 0.04) / (downside * np.sqrt(365))
+    assert abs(m['sortino'][0] - expected) < 1e-9
+    assert np.isnan(m['beta'][0])
+    print("✓ CVaR and Sortino")
+
+
+def test_cache_by_last_bar():
+    print("Testing per-bar cache...")
+    engine = RiskEngine()
+    bench = _closes(90, 0)
+    series = {f"S{i}": _closes(90, i + 1) for i in range(5)}
+    first = engine.assess(series, {s: bench for s in series})
+    assert engine.stats == {'hits': 0, 'computed': 5, 'batches': 1}
+
+    series['S0'] = series['S0'] + [series['S0'][-1] * 1.01]
+    second = engine.assess(series, {s: bench for s in series})
+    assert engine.stats == {'hits': 4, 'computed': 6, 'batches': 2}
+    assert second['S1'] is first['S1'] and second['S0'] is not first['S0']
+    print("✓ Only changed symbols recomputed")
+
+
+def test_watchlist_is_one_pass():
+    """200 assets are one call and faster than the loops."""
+    print("Testing 200-asset watchlist...")
+    bench = _closes(90, 0)
+    series = [_closes(90, i + 1) for i in range(200)]
+    start = time.perf_counter()
+    metrics = risk_metrics(series, [bench] * 200)
+    batched = time.perf_counter() - start
+    start = time.perf_counter()
+    for closes in series:
+        _loop_metrics(closes, bench)
+    looped = time.perf_counter() - start
+    assert len(metrics['volatility']) == 200
+    print(f"  batch {batched * 1000:.1f} ms vs loops {looped * 1000:.1f} ms")
+    print("✓ Watchlist assessed in one pass")
+
+
+def test_benchmark_fetched_only_when_needed():
+    """assess_risk_batch skips the benchmark when the matrix covers every beta."""
+    print("Testing benchmark fetch avoidance...")
+    import ai_predictor
+
+    class _Matrix:
+        def __init__(self, betas):
+            self.betas = betas
+
+        def beta(self, symbol):
+            return self.betas.get(symbol)
+
+    fetched = []
+
+    def fake_closes(symbol, days=90):
+        fetched.append(symbol)
+        return _closes(90, len(symbol))
+
+    saved = (ai_predictor._fetch_closes, ai_predictor._fetch_live_price,
+             ai_predictor.get_correlation_engine)
+    ai_predictor._fetch_closes = fake_closes
+    ai_predictor._fetch_live_price = lambda symbol: None
+    try:
+        predictor = ai_predictor.AIPredictor(use_real_ai=False)
+        ai_predictor.get_correlation_engine = lambda: _Matrix({'ETH': 1.3, 'AAPL': 1.1})
+        reports = predictor.assess_risk_batch(['ETH', 'AAPL'])
+        assert sorted(fetched) == ['AAPL', 'ETH'], fetched
+        assert reports['ETH']['metrics']['beta'] == 1.3
+
+        fetched.clear()
+        ai_predictor.get_correlation_engine = lambda: _Matrix({'ETH': 1.3})
+        predictor.assess_risk_batch(['ETH', 'AAPL'])
+        assert sorted(fetched) == ['AAPL', 'ETH', 'SPY'], fetched  # only AAPL needs one
+    finally:
+        (ai_predictor._fetch_closes, ai_predictor._fetch_live_price,
+         ai_predictor.get_correlation_engine) = saved
+    print("✓ Benchmark series fetched only for betas the matrix lacks")
+
+
+def main():
+    print("=" * 60)
+    print("RISK ENGINE TESTS")
+    print("=" * 60)
+    try:
+        test_matches_loop_definitions()
+        test_tail_metrics()
+        test_cache_by_last_bar()
+        test_watchlist_is_one_pass()
+        test_benchmark_fetched_only_when_needed()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All risk engine tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
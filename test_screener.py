@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the indicator screener and its expression language
+"""
+
+import numpy as np
+
+from screener import Screener, compile_expression, compute_indicator_row
+
+
+def _screener_with_universe(n=200):
+    screener = Screener()
+    rng = np.random.default_rng(5)
+    for i in range(n):
+        closes = list(100 + np.cumsum(rng.normal(0, 2, 90)))
+        market = 'crypto' if i % 2 else 'us_stocks'
+        screener.table.upsert(f"SYM{i}", market, compute_indicator_row(closes))
+    return screener
+
+
+def test_expression_matches_python():
+    """Vectorized filter agrees with a per-row Python evaluation."""
+    print("Testing expression evaluation...")
+    screener = _screener_with_universe()
+    cols, symbols, markets = screener.table.snapshot()
+
+    result = screener.query("RSI < 45 and price above EMA50 or adx > 40", limit=1000)
+    expected = {
+        symbols[i] for i in range(len(symbols))
+        if (cols['rsi'][i] < 45 and cols['price'][i] > cols['ema50'][i]) or cols['adx'][i] > 40
+    }
+    assert {r['symbol'] for r in result['results']} == expected
+    assert result['count'] == len(expected)
+
+    result = screener.query("not (rsi >= 30) or (price - ema21) / ema21 * 100 > 5",
+                            market='crypto', limit=1000)
+    for row in result['results']:
+        assert row['market'] == 'crypto'
+        assert row['rsi'] < 30 or (row['price'] - row['ema21']) / row['ema21'] * 100 > 5
+    print("✓ Filter matches row-by-row evaluation")
+
+
+def test_sort_and_limit():
+    print("Testing sort and limit...")
+    screener = _screener_with_universe()
+    result = screener.query("adx > 0", sort="-adx", limit=5)
+    adx = [r['adx'] for r in result['results']]
+    assert len(adx) == 5
+    assert adx == sorted(adx, reverse=True)
+    assert result['universe_size'] == 200
+    print("✓ Descending sort with limit")
+
+
+def test_invalid_expressions():
+    print("Testing invalid expressions...")
+    screener = _screener_with_universe(10)
+    for bad in ("rsi <", "unknown_col > 1", "rsi > 30)", "(rsi > 30", "rsi $ 3"):
+        try:
+            screener.query(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"Expected ValueError for {bad!r}")
+    try:
+        screener.query("", sort="nope")
+        raise AssertionError("Expected ValueError for unknown sort column")
+    except ValueError:
+        pass
+    print("✓ Malformed queries rejected")
+
+
+def test_compiled_once():
+    print("Testing expression cache...")
+    compile_expression.cache_clear()
+    compile_expression("rsi < 30")
+    compile_expression("rsi < 30")
+    assert compile_expression.cache_info().hits == 1
+    print("✓ Expressions compiled once")
+
+
+def test_missing_values_never_match():
+    """A bare numeric column treats NaN as False, not as a truthy value."""
+    print("Testing NaN handling...")
+    screener = Screener()
+    screener.table.upsert("OK", "crypto", {"macd_hist": 0.5, "rsi": 20.0})
+    screener.table.upsert("ZERO", "crypto", {"macd_hist": 0.0, "rsi": 20.0})
+    screener.table.upsert("MISSING", "crypto", {"macd_hist": float('nan'), "rsi": 20.0})
+
+    assert {r['symbol'] for r in screener.query("macd_hist")['results']} == {"OK"}
+    assert {r['symbol'] for r in screener.query("macd_hist and rsi < 30")['results']} == {"OK"}
+    assert {r['symbol'] for r in screener.query("not macd_hist")['results']} == {"ZERO", "MISSING"}
+    print("✓ Missing values never match")
+
+
+def test_incremental_refresh():
+    """Unchanged assets are skipped on the next refresh."""
+    print("Testing incremental refresh...")
+    screener = Screener()
+    closes = list(np.linspace(100, 120, 60))
+    screener._closes = staticmethod(lambda symbol, market: closes)
+    universe = {'crypto': [{'symbol': 'BTC', 'price': 120.0}, {'symbol': 'ETH', 'price': 120.0}]}
+
+    first = screener.refresh(universe)
+    second = screener.refresh(universe)
+    assert first['updated'] == 2
+    assert second['unchanged'] == 2 and second['updated'] == 0
+    print("✓ Refresh skips unchanged assets")
+
+
+def main():
+    print("=" * 60)
+    print("SCREENER TESTS")
+    print("=" * 60)
+    try:
+        test_expression_matches_python()
+        test_sort_and_limit()
+        test_invalid_expressions()
+        test_compiled_once()
+        test_missing_values_never_match()
+        test_incremental_refresh()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All screener tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
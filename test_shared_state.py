@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests for cross-process snapshots of background-worker results
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+
+from correlation_engine import CorrelationEngine
+from screener import Screener
+from shared_state import SharedState
+from test_correlation_engine import TICKERS, _FakeStore
+
+NOW = (19723 + 200) * 86400
+
+
+def _request_worker(directory, screener, engine, holder, refreshed, conn):
+    """Runs in a forked child, like a gunicorn worker after --preload.
+
+    Its copies of the engines were forked while still empty and no
+    background thread runs here; only the published snapshots can fill them.
+    """
+    state = SharedState(directory)
+    snapshots = {
+        "screener": screener.load_state,
+        "correlations": engine.load_state,
+        "breakout_ranking": lambda value: holder.update(value),
+    }
+    refreshed.wait(30)
+    applied = [name for name, apply in snapshots.items() if state.sync(name, apply)]
+    again = [name for name, apply in snapshots.items() if state.sync(name, apply)]
+    conn.send({
+        "applied": applied,
+        "again": again,
+        "oversold": [r["symbol"] for r in screener.query("rsi < 30")["results"]],
+        "last_refresh": screener.last_refresh,
+        "corr": engine.get_matrix(["BTC", "ETH"]).get("BTC", {}).get("ETH"),
+        "ranking": holder.get("results"),
+    })
+
+
+def test_refresh_visible_in_forked_worker():
+    print("Testing refreshed state in a forked request worker...")
+    d = tempfile.mkdtemp(prefix="shared_state_test_")
+    try:
+        screener, engine, holder = Screener(), CorrelationEngine(store=_FakeStore()), {}
+        ctx = multiprocessing.get_context("fork")
+        refreshed = ctx.Event()
+        parent_conn, child_conn = ctx.Pipe()
+        child = ctx.Process(target=_request_worker,
+                            args=(d, screener, engine, holder, refreshed, child_conn))
+        child.start()  # forked before any refresh, as gunicorn forks after import
+
+        def background_refresh():
+            state = SharedState(d)
+            screener.table.upsert("BTC", "crypto", {"price": 100.0, "rsi": 25.0}, (1,))
+            screener.table.upsert("ETH", "crypto", {"price": 10.0, "rsi": 55.0}, (1,))
+            screener.last_refresh = {"assets": 2, "updated": 2}
+            state.publish("screener", screener.export_state())
+            engine.update(TICKERS, now=NOW)
+            state.publish("correlations", engine.export_state())
+            state.publish("breakout_ranking", {"results": [{"symbol": "BTC"}]})
+            refreshed.set()
+
+        thread = threading.Thread(target=background_refresh)
+        thread.start()
+        thread.join()
+        seen = parent_conn.recv()
+        child.join(30)
+
+        assert seen["applied"] == ["screener", "correlations", "breakout_ranking"], seen
+        assert seen["again"] == []  # unchanged files are not re-read
+        assert seen["oversold"] == ["BTC"] and seen["last_refresh"]["updated"] == 2
+        expected = engine.get_matrix(["BTC", "ETH"])["BTC"]["ETH"]
+        assert seen["corr"] == expected and expected > 0.5
+        assert seen["ranking"] == [{"symbol": "BTC"}]
+        print("✓ Worker results reach a process that never ran the worker")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_publisher_and_bad_snapshots():
+    print("Testing publisher bookkeeping and unreadable snapshots...")
+    d = tempfile.mkdtemp(prefix="shared_state_test_")
+    try:
+        state = SharedState(d)
+        got = []
+        assert not state.sync("missing", got.append)
+        assert state.publish("ranking", {"v": 1})
+        assert not state.sync("ranking", got.append)  # the publisher already has it
+        reader = SharedState(d)
+        assert reader.sync("ranking", got.append) and got == [{"v": 1}]
+        state.publish("ranking", {"v": 2})
+        assert reader.sync("ranking", got.append) and got[-1] == {"v": 2}
+
+        def broken(value):
+            raise KeyError("old format")
+
+        state.publish("ranking", {"v": 3})
+        assert not reader.sync("ranking", broken)
+        assert reader.stats["load_errors"] == 1
+        assert not reader.sync("ranking", got.append)  # skipped until the next publish
+
+        with open(os.path.join(d, "ranking.pkl"), "wb") as f:
+            f.write(b"not a pickle")
+        assert not reader.sync("ranking", got.append)
+        assert not reader.sync("ranking", got.append)  # not re-read on every request
+        assert reader.stats["load_errors"] == 2
+        state.publish("ranking", {"v": 4})
+        assert reader.sync("ranking", got.append) and got[-1] == {"v": 4}
+        assert [f for f in os.listdir(d) if f.endswith(".tmp")] == []
+        print("✓ Applied once per change; bad snapshots never break a request")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def main():
+    print("=" * 60)
+    print("SHARED STATE TESTS")
+    print("=" * 60)
+    try:
+        test_refresh_visible_in_forked_worker()
+        test_publisher_and_bad_snapshots()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All shared state tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite signal history store
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from ohlcv_store import ohlcv_store
+from signal_history_store import SignalHistoryStore, benchmark_writes
+from signalai_strategy import SignalAIStrategy
+
+BASE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _signal(i, symbol='BTC', regime='trending_up', strategy='SignalAI'):
+    return {
+        'symbol': symbol, 'strategy': strategy, 'regime': regime,
+        'signal': ('BUY', 'SELL', 'HOLD')[i % 3], 'confidence': 50 + i % 40,
+        'current_price': 100.0 + i,
+        'timestamp': (BASE + timedelta(hours=i)).isoformat(),
+    }
+
+
+def _store(tmp, **kwargs):
+    return SignalHistoryStore(os.path.join(tmp, 'history.db'), legacy_json=None, **kwargs)
+
+
+def test_query_filters_and_pagination():
+    print("Testing filtered queries...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        store.append_many(_signal(i, 'BTC' if i % 2 else 'ETH',
+                                  regime='ranging' if i % 5 == 0 else 'trending_up')
+                          for i in range(100))
+
+        last = store.query(symbol='BTC', limit=10)
+        assert [s['current_price'] for s in last] == [100.0 + i for i in range(81, 100, 2)]
+
+        window = store.query(start=(BASE + timedelta(hours=10)).isoformat(),
+                             end=(BASE + timedelta(hours=19)).isoformat(), limit=100)
+        assert len(window) == 10
+        assert store.count(regime='ranging') == 20
+        assert all(s['regime'] == 'ranging' for s in store.query(regime='ranging'))
+
+        page1 = store.query(limit=30)
+        page2 = store.query(limit=30, before_id=page1[0]['id'])
+        assert page2[-1]['id'] == page1[0]['id'] - 1
+        assert store.query(limit=30, offset=30) == page2
+    print("✓ Symbol/regime/time filters and pagination")
+
+
+def test_retention():
+    print("Testing retention...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp, max_rows=50, max_age_days=5000)
+        store.append_many(_signal(i) for i in range(120))
+        store.apply_retention()
+        kept = store.query(limit=1000)
+        assert len(kept) == 50 and kept[-1]['current_price'] == 219.0
+
+        old = dict(_signal(0), timestamp='2000-01-01T00:00:00+00:00')
+        store.append(old)
+        store.apply_retention()
+        assert store.count(start='1999-01-01', end='2001-01-01') == 0
+    print("✓ Count and age retention")
+
+
+def test_json_migration_runs_once():
+    print("Testing legacy JSON migration...")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, 'legacy.json')
+        with open(legacy, 'w') as f:
+            json.dump([_signal(i) for i in range(14)], f)
+        db = os.path.join(tmp, 'history.db')
+        first = SignalHistoryStore(db, legacy_json=legacy)
+        assert first.count() == 14
+        second = SignalHistoryStore(db, legacy_json=legacy)
+        assert second.count() == 14
+    print("✓ JSON imported exactly once")
+
+
+def test_concurrent_writers():
+    """Separate store instances (like gunicorn workers) share one history."""
+    print("Testing concurrent writers...")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, 'history.db')
+        stores = [SignalHistoryStore(db, legacy_json=None) for _ in range(3)]
+
+        def write(store, worker):
+            for i in range(200):
+                store.append(_signal(i, symbol=f"W{worker}"))
+
+        threads = [threading.Thread(target=write, args=(s, k)) for k, s in enumerate(stores)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert stores[0].count() == 600
+        assert stores[1].count(symbol='W2') == 200
+    print("✓ No lost writes across instances")
+
+
+def test_write_benchmark():
+    print("Testing write benchmark...")
+    with tempfile.TemporaryDirectory() as tmp:
+        report = benchmark_writes(os.path.join(tmp, 'bench.db'), n=2000)
+    assert report['batched']['writes_per_sec'] > 0
+    print(f"  single {report['single']['writes_per_sec']:,}/s, "
+          f"batched {report['batched']['writes_per_sec']:,}/s")
+    print("✓ Benchmark reports writes/sec")
+
+
+def test_aggregates_match_history_scan():
+    """Running counters equal a full scan, and survive a rebuild."""
+    print("Testing incremental aggregates...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        signals = [dict(_signal(i, 'BTC' if i % 2 else 'ETH',
+                                regime=('ranging', 'trending_up', 'volatile')[i % 3]),
+                        risk_reward=(1.5 + i % 4) if i % 5 else None)
+                   for i in range(90)]
+        for sig in signals[:40]:
+            store.append(sig)
+        store.append_many(signals[40:])
+
+        btc = [s for s in signals if s['symbol'] == 'BTC']
+        stats = store.aggregates(symbol='BTC')
+        assert stats['total_signals'] == len(btc)
+        assert stats['buy_signals'] == sum(s['signal'] == 'BUY' for s in btc)
+        assert stats['avg_confidence'] == round(sum(s['confidence'] for s in btc) / len(btc), 2)
+        rr = [s['risk_reward'] for s in btc if s['risk_reward']]
+        assert stats['avg_risk_reward'] == round(sum(rr) / len(rr), 2)
+        assert sum(stats['regime_distribution'].values()) == len(btc)
+        assert stats['win_rate'] is None
+
+        by_symbol = store.aggregates_by_symbol()
+        assert by_symbol['BTC'] == stats and by_symbol['ETH']['total_signals'] == 45
+
+        store.rebuild_aggregates()
+        assert store.aggregates(symbol='BTC') == stats
+    print("✓ Aggregates match a history scan")
+
+
+def test_outcome_resolution():
+    """Matured signals are scored against stored prices into win rate/expectancy."""
+    print("Testing outcome resolution...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        strategy = SignalAIStrategy(history=store)
+        start = 1_700_000_000 - 1_700_000_000 % 3600
+        hours = 24 * 10
+        close = np.linspace(100, 200, hours)          # steadily rising
+        ohlcv_store.ingest('TESTUP', {'ts': start + 3600 * np.arange(hours), 'open': close,
+                                      'high': close, 'low': close, 'close': close,
+                                      'volume': np.ones(hours)}, 3600)
+        for k, side in enumerate(('BUY', 'BUY', 'SELL', 'HOLD')):
+            ts = start + 3600 * 24 * k
+            store.append({'symbol': 'TESTUP', 'strategy': 'SignalAI', 'regime': 'trending_up',
+                          'signal': side, 'confidence': 70, 'current_price': float(close[24 * k]),
+                          'timestamp': ts})
+
+        result = strategy.resolve_outcomes()
+        assert result == {'pending': 3, 'resolved': 3, 'expired': 0}
+        assert strategy.resolve_outcomes()['pending'] == 0
+
+        stats = strategy.get_performance_stats('TESTUP')
+        assert stats['resolved_signals'] == 3
+        assert stats['win_rate'] == round(2 / 3 * 100, 2)
+        rets = [close[24 * (k + 1)] / close[24 * k] - 1 for k in range(3)]
+        rets[2] = -rets[2]
+        assert abs(stats['expectancy_pct'] - round(sum(rets) / 3 * 100, 3)) < 1e-9
+        assert stats['avg_loss_pct'] < 0 < stats['avg_win_pct']
+        assert stats['last_signal']['signal'] == 'HOLD'
+    print("✓ Win rate and expectancy from resolved outcomes")
+
+
+def test_unresolvable_outcomes_do_not_starve():
+    """Signals without exit prices are paged past, then expired."""
+    print("Testing unresolvable pending signals...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        strategy = SignalAIStrategy(history=store)
+        strategy.OUTCOME_PAGE_SIZE = 5
+        now = time.time()
+        hours = 24 * 4
+        start = now - 3600 * hours
+        close = np.linspace(100, 110, hours)
+        ohlcv_store.ingest('TESTNEW', {'ts': start + 3600 * np.arange(hours), 'open': close,
+                                       'high': close, 'low': close, 'close': close,
+                                       'volume': np.ones(hours)}, 3600)
+
+        def signal(symbol, ts, price=100.0):
+            store.append({'symbol': symbol, 'strategy': 'SignalAI', 'regime': 'ranging',
+                          'signal': 'BUY', 'confidence': 60, 'current_price': price,
+                          'timestamp': ts})
+
+        for k in range(3):
+            signal('NODATA', now - 86400 * 30 + k)     # long past the max pending age
+        for k in range(12):
+            signal('NODATA', now - 86400 * 2 + k)      # too recent to give up on
+        signal('TESTNEW', start + 3600, float(close[1]))
+
+        result = strategy.resolve_outcomes()
+        assert result == {'pending': 16, 'resolved': 1, 'expired': 3}, result
+        assert strategy.resolve_outcomes() == {'pending': 12, 'resolved': 0, 'expired': 0}
+        stats = store.aggregates(symbol='NODATA')
+        assert stats['total_signals'] == 15 and stats['resolved_signals'] == 0
+        store.rebuild_aggregates()
+        assert store.aggregates(symbol='NODATA') == stats
+    print("✓ Newer signals resolve behind a backlog of unresolvable ones")
+
+
+def main():
+    print("=" * 60)
+    print("SIGNAL HISTORY STORE TESTS")
+    print("=" * 60)
+    try:
+        test_query_filters_and_pagination()
+        test_retention()
+        test_json_migration_runs_once()
+        test_concurrent_writers()
+        test_write_benchmark()
+        test_aggregates_match_history_scan()
+        test_outcome_resolution()
+        test_unresolvable_outcomes_do_not_starve()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All signal history store tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline MetaModel training pipeline
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from ai_learning_system import AILearningSystem, numeric_features
+from signal_history_store import SignalHistoryStore
+from meta_model import MetaModel
+from training_pipeline import (TrainingPipeline, load_meta_model, prediction_label, signal_label,
+                               signal_probability, training_sample)
+
+
+def _log_predictions(ls, n, rng):
+    """Evaluated predictions whose price move is driven by RSI and sentiment."""
+    evaluations = []
+    for _ in range(n):
+        rsi, sentiment = rng.uniform(10, 90), rng.uniform(-1, 1)
+        up = rsi / 100 + sentiment / 2 + rng.normal(0, 0.1) > 0.5
+        pid = ls.record_prediction("BTC", "BULLISH", 0.6, "gpt", "momentum", 100.0,
+                                   extra={"rsi": rsi, "sentiment": sentiment, "note": "text"})
+        evaluations.append({"prediction_id": pid, "outcome": "CORRECT" if up else "INCORRECT",
+                            "price_now": 105.0 if up else 95.0})
+    ls.batch_evaluate(evaluations)
+
+
+def _log_signals(store, n, rng):
+    store.append_many([{
+        "symbol": "ETH", "strategy": "trend", "signal": "BUY" if i % 2 else "SELL",
+        "timestamp": 1_700_000_000 + i, "current_price": 10.0,
+        "indicators": {"RSI": rng.uniform(10, 90), "EMA9": 10.5, "EMA21": 10.0,
+                       "MACD": {"histogram": 0.2}, "BB": {"pct_b": 0.7}},
+    } for i in range(n)])
+    pending = store.pending_outcomes(before_ts=2e9, limit=n)
+    store.record_outcomes([(row, 0.02 if row["id"] % 3 else -0.01) for row in pending])
+
+
+def test_features_and_labels():
+    print("Testing feature capture and labelling...")
+    assert numeric_features({"RSI": 55, "MACD": {"histogram": 0.3, "crossover": "up"},
+                             "bad": float("nan"), "flag": True}) == \
+        {"rsi": 55.0, "macd_histogram": 0.3, "flag": 1.0}
+    sample = training_sample({"macd_histogram": 0.3, "bb_pct_b": 0.8, "ema9": 2.0, "ema21": 1.0})
+    assert sample["macd_signal"] == 0.3 and sample["bollinger_position"] == 0.8 and sample["ema_cross"]
+    sample = training_sample({"current_price": 15.0, "bollinger_upper": 20.0, "bollinger_lower": 10.0})
+    assert sample["bollinger_position"] == 0.5
+
+    assert prediction_label({"price_at_prediction": 10, "price_at_evaluation": 11}) == 1
+    assert prediction_label({"price_at_prediction": 0, "price_at_evaluation": 11,
+                             "direction": "BEARISH", "outcome": "CORRECT"}) == 0
+    assert prediction_label({"direction": "NEUTRAL", "outcome": "CORRECT"}) is None
+    assert signal_label({"signal": "BUY", "outcome": 0.02}) == 1
+    assert signal_label({"signal": "SELL", "outcome": 0.02}) == 0  # short won: price fell
+    assert signal_label({"signal": "SELL", "outcome": 0.0}) is None
+    print("✓ Extras are flattened, aliased and labelled by price direction")
+
+
+def test_incremental_training_and_reload():
+    print("Testing incremental materialization and training...")
+    d = tempfile.mkdtemp(prefix="training_pipeline_test_")
+    try:
+        rng = np.random.default_rng(7)
+        ls = AILearningSystem(data_dir=os.path.join(d, "learning"))
+        store = SignalHistoryStore(os.path.join(d, "history.db"), legacy_json=None)
+        _log_predictions(ls, 600, rng)
+        _log_signals(store, 90, rng)
+        ls.record_prediction("BTC", "BULLISH", 0.6, "gpt", "m", 100.0, extra={"rsi": 50})  # pending
+
+        model_dir = os.path.join(d, "models")
+        pipeline = TrainingPipeline(model_dir, learning_store=ls.store, signal_store=store)
+        first = pipeline.run()
+        mat = first["materialize"]
+        assert mat["sources"]["predictions"] == {"scanned": 600, "labelled": 600}
+        assert mat["sources"]["signals"] == {"scanned": 90, "labelled": 90}
+        assert mat["new_rows"] == 690 and mat["rows_per_sec"] > 0
+        training = first["training"]
+        assert training["trained"] and training["version"] == 1
+        assert training["train_rows"] + training["val_rows"] == 690
+        assert training["val_auc"] > 0.75 and training["train_seconds"] >= 0
+
+        # Nothing new: no part, no retraining
+        again = pipeline.run()
+        assert again["materialize"]["new_rows"] == 0 and not again["training"]["trained"]
+
+        # Only the new rows are read, by a fresh pipeline resuming from state.json
+        _log_predictions(ls, 100, rng)
+        resumed = TrainingPipeline(model_dir, learning_store=ls.store, signal_store=store)
+        third = resumed.run()
+        assert third["materialize"]["new_rows"] == 100 and third["materialize"]["total_rows"] == 790
+        assert third["training"]["version"] == 2
+        assert resumed.state["parts"] == ["part-000001.npz", "part-000002.npz"]
+        X, y, ts = resumed.load_dataset()
+        assert X.shape == (790, len(resumed.schema.names)) and X.dtype == np.float32
+        assert np.all(np.diff(ts) >= 0)
+
+        model = load_meta_model(model_dir)
+        assert model is not None and model.is_trained and model.version == 2
+        assert load_meta_model(model_dir, version=1).version == 1
+        probs = model.predict_proba_batch([{"rsi": 85, "sentiment": 0.9}, {"rsi": 15, "sentiment": -0.9}])
+        assert probs[0] > 0.5 > probs[1]
+        signal = {"symbol": "ETH", "signal": "BUY", "confidence": 70, "current_price": 10.0,
+                  "indicators": {"RSI": 85, "MACD": {"histogram": 0.2}}}
+        assert 0 < signal_probability(model, signal) < 1
+        assert signal_probability(MetaModel(), signal) is None
+        manifest = resumed.load_manifest()
+        assert manifest["latest"] == 2 and [v["version"] for v in manifest["versions"]] == [1, 2]
+        print("✓ New rows only, time-split training and memory-mapped reload")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_too_few_rows():
+    print("Testing minimum row guard...")
+    d = tempfile.mkdtemp(prefix="training_pipeline_test_")
+    try:
+        ls = AILearningSystem(data_dir=os.path.join(d, "learning"))
+        _log_predictions(ls, 20, np.random.default_rng(1))
+        pipeline = TrainingPipeline(os.path.join(d, "models"), learning_store=ls.store)
+        report = pipeline.run()
+        assert report["materialize"]["new_rows"] == 20
+        assert not report["training"]["trained"] and "rows" in report["training"]["reason"]
+        assert load_meta_model(os.path.join(d, "models")) is None
+        print("✓ No artifact is published below MIN_TRAIN_ROWS")
+    finally:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def main():
+    print("=" * 60)
+    print("TRAINING PIPELINE TESTS")
+    print("=" * 60)
+    try:
+        test_features_and_labels()
+        test_incremental_training_and_reload()
+        test_too_few_rows()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All training pipeline tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Tests for the parallel universe scan engine
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import universal_market_analyzer as uma
+from universal_market_analyzer import UniversalMarketAnalyzer, _score_asset
+from universe_scan import UniverseScanner, benchmark, score_assets
+
+
+def test_vectorized_score_matches_scalar():
+    print("Testing vectorized scoring...")
+    rng = np.random.default_rng(2)
+    changes = np.round(np.concatenate([rng.normal(0, 8, 2000), [0, 20, -20, 25, -0.01]]), 2)
+    volumes = np.concatenate([rng.lognormal(10, 4, 2000), [0, 1, 1e12, 5, 0]])
+    vectorized = score_assets(changes, volumes)
+    scalar = [_score_asset(c, v) for c, v in zip(changes.tolist(), volumes.tolist())]
+    assert vectorized.tolist() == scalar
+    print("✓ Same scores as _score_asset")
+
+
+def test_rank_and_fingerprint_skip():
+    print("Testing heap ranking and fingerprint skipping...")
+    scanner = UniverseScanner(max_workers=2)
+    assets = [{"symbol": f"S{i}", "change_pct": c, "volume": 1e6}
+              for i, c in enumerate([5, 12, -3, 12, 0.5, 18])]
+    top = scanner.rank("m", assets, k=3, min_score=60)
+    assert [a["symbol"] for a, _ in top] == ["S5", "S1", "S3"]  # ties keep input order
+    assert [s for _, s in top] == sorted((s for _, s in top), reverse=True)
+    assert all(s >= 60 for _, s in scanner.rank("m", assets, k=10, min_score=60))
+    assert scanner.stats["scored"] == 6 and scanner.stats["skipped"] == 6
+
+    # One changed, one new, one gone: only two rescored, table follows the universe
+    assets = assets[1:] + [{"symbol": "S9", "change_pct": 3, "volume": 10}]
+    assets[0] = {**assets[0], "change_pct": -12}
+    scores = scanner.score("m", assets)
+    assert scanner.stats["scored"] == 8
+    assert scores.tolist() == [_score_asset(a["change_pct"], a["volume"]) for a in assets]
+    assert scanner.get_stats()["assets_tracked"] == 6
+    print("✓ Top-K by heap, only changed assets rescored")
+
+
+def test_fetch_many_bounded():
+    print("Testing bounded concurrent fetches...")
+    scanner = UniverseScanner(max_workers=4)
+    lock = threading.Lock()
+    in_flight = {"now": 0, "max": 0}
+
+    def fetch(sym):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        time.sleep(0.01)
+        with lock:
+            in_flight["now"] -= 1
+        if sym.endswith("7"):
+            raise RuntimeError("rate limited")
+        return None if sym.endswith("3") else {"symbol": sym}
+
+    names = [f"T{i}" for i in range(20)]
+    rows = scanner.fetch_many(names, fetch)
+    assert [r["symbol"] for r in rows] == [n for n in names if n[-1] not in "37"]
+    assert in_flight["max"] == 4
+    assert scanner.stats["fetch_failed"] == 4
+    print("✓ At most max_workers in flight, order kept, failures dropped")
+
+
+def _stub_analyzer(stocks, crypto):
+    analyzer = UniversalMarketAnalyzer()
+    analyzer.scanner = UniverseScanner(max_workers=2)
+    analyzer._fetch_yahoo_batch = lambda tickers: stocks
+    analyzer.market_data.get_all_crypto = lambda limit=None: crypto
+    analyzer._analyze_defi = lambda: {"count": 0, "analyzed": 0, "opportunities": []}
+    return analyzer
+
+
+def test_analyzer_scan_opportunities():
+    print("Testing UniversalMarketAnalyzer opportunity scan...")
+    d = tempfile.mkdtemp(prefix="uma_test_")
+    saved_file = uma.ANALYSIS_FILE
+    uma.ANALYSIS_FILE = os.path.join(d, "universal_market_analysis.json")  # no full analysis yet
+    try:
+        uma._uma_cache.clear()
+        stocks = [{"symbol": f"ST{i}", "price": 10.0, "change_pct": float(i), "volume": 1e7}
+                  for i in range(12)]
+        analyzer = _stub_analyzer(stocks, [
+            {"symbol": "BTC", "price": 1.0, "change_percent": 9.0, "volume_24h": 1e10},
+            {"symbol": "DOGE", "price": 1.0, "change_percent": -15.0, "volume_24h": 1e9},
+        ])
+
+        scan = analyzer.scan_opportunities(limit=5)
+        top = scan["top_opportunities"]
+        assert scan["total_assets_analyzed"] == 12 + 12 + 2
+        assert len(top) == 5 and top[0]["symbol"] == "BTC" and top[0]["market"] == "cryptocurrencies"
+        assert [o["score"] for o in top] == sorted((o["score"] for o in top), reverse=True)
+        assert analyzer.latest_scan is scan and scan["rescored"] == 26
+
+        # Cached sections, nothing changed: the next cycle rescored nothing
+        uma._uma_cache.clear()
+        again = analyzer.scan_opportunities(limit=5)
+        assert again["rescored"] == 0 and again["unchanged"] == 26
+        assert again["top_opportunities"] == top
+        print("✓ Cross-market top-K, unchanged assets skipped on the next cycle")
+    finally:
+        uma.ANALYSIS_FILE = saved_file
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_scan_keeps_gems_after_cache_expiry():
+    print("Testing hidden gems from the last full analysis...")
+    d = tempfile.mkdtemp(prefix="uma_test_")
+    saved_file = uma.ANALYSIS_FILE
+    uma.ANALYSIS_FILE = os.path.join(d, "universal_market_analysis.json")
+    try:
+        uma._uma_cache.clear()
+        stocks = [{"symbol": "ST", "price": 10.0, "change_pct": 1.0, "volume": 1e7}]
+        crypto = [{"symbol": "BTC", "price": 1.0, "change_percent": 2.0, "volume_24h": 1e10}]
+        gems = {"count": 1, "top_gems": [{"symbol": "GEM", "gem_score": 99,
+                                          "explosion_potential": "HIGH"}]}
+        analyzer = _stub_analyzer(stocks, crypto)
+        analyzer._discover_gems = lambda: gems
+        analyzer.analyze_everything()
+
+        # The full pass runs every 2 h; the section cache (and its copy) lasts 5 min
+        uma._uma_cache.clear()
+        scan = analyzer.scan_opportunities(limit=3)
+        assert scan["top_opportunities"][0]["symbol"] == "GEM"
+        assert scan["total_assets_analyzed"] == 1 + 1 + 1 + 1
+
+        # After a restart the gems come from the saved analysis
+        uma._uma_cache.clear()
+        restarted = _stub_analyzer(stocks, crypto)
+        top = restarted.scan_opportunities(limit=3)["top_opportunities"]
+        assert top[0]["symbol"] == "GEM" and top[0]["market"] == "hidden_gems"
+        print("✓ Gems stay in the scan between full analyses")
+    finally:
+        uma.ANALYSIS_FILE = saved_file
+        uma._uma_cache.clear()
+        shutil.rmtree(d, ignore_errors=True)
+
+
+def test_benchmark():
+    print("Testing universe scan benchmark...")
+    report = benchmark(symbols=16, latency=0.01, assets=5000)
+    assert report["fetch_pooled_s"] < report["fetch_sequential_s"]
+    assert report["top_k_agrees"]
+    print(f"✓ Benchmark ran: {report}")
+
+
+def main():
+    print("=" * 60)
+    print("UNIVERSE SCAN TESTS")
+    print("=" * 60)
+    try:
+        test_vectorized_score_matches_scalar()
+        test_rank_and_fingerprint_skip()
+        test_fetch_many_bounded()
+        test_analyzer_scan_opportunities()
+        test_scan_keeps_gems_after_cache_expiry()
+        test_benchmark()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All universe scan tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Tests for WhaleWatcher incremental polling, dedupe and flow aggregates
+"""
+
+import threading
+import time
+
+from whale_watcher import EXCHANGE_WALLETS, FlowAggregator, RotatingBloomFilter, WhaleWatcher
+
+BINANCE = next(iter(EXCHANGE_WALLETS))
+
+
+class _Response:
+    def __init__(self, payload):
+        self.status_code = 200
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class FakeChain:
+    """Etherscan + Whale Alert stand-in recording every request."""
+
+    def __init__(self):
+        self.txs = {}          # address -> list of txlist rows
+        self.alerts = []
+        self.calls = []
+
+    def send(self, address, block, value_eth=10, outgoing=False, other='0xabc'):
+        rows = self.txs.setdefault(address, [])
+        rows.append({
+            'hash': f'0x{address[-4:]}{block:08d}{len(rows):04d}',
+            'blockNumber': str(block),
+            'timeStamp': str(int(time.time())),
+            'from': address if outgoing else other,
+            'to': other if outgoing else address,
+            'value': str(int(value_eth * 1e18)),
+        })
+
+    def balance(self, address):
+        return sum(int(r['value']) * (-1 if r['from'] == address else 1)
+                   for r in self.txs.get(address, []))
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url, dict(params)))
+        if 'whale-alert' in url:
+            rows = [a for a in self.alerts if a['timestamp'] >= params['start']]
+            return _Response({'result': 'success', 'cursor': 'c1', 'transactions': rows})
+        if params['action'] == 'balancemulti':
+            rows = [{'account': a, 'balance': str(self.balance(a))}
+                    for a in params['address'].split(',')]
+            return _Response({'status': '1', 'result': rows})
+        rows = [r for r in self.txs.get(params['address'], [])
+                if int(r['blockNumber']) >= params['startblock']]
+        rows.sort(key=lambda r: int(r['blockNumber']), reverse=params['sort'] == 'desc')
+        rows = rows[:params['offset']]
+        return _Response({'status': '1' if rows else '0', 'result': rows})
+
+
+def _watcher(chain, whale_alert=False):
+    watcher = WhaleWatcher()
+    watcher._session = chain
+    watcher._etherscan_key = 'test'
+    watcher._whale_alert_key = 'test' if whale_alert else ''
+    return watcher
+
+
+def test_cursor_polling():
+    print("Testing cursor-based Etherscan polling...")
+    chain = FakeChain()
+    for block in range(100, 130):
+        chain.send(BINANCE, block)
+    watcher = _watcher(chain)
+
+    first = watcher.poll()
+    assert len(first['new_transactions']) == 20  # bootstrap reads the latest page only
+    assert watcher._cursors[f'etherscan:{BINANCE}'] == 129
+    # One balancemulti for both exchange wallets, one txlist for each
+    assert first['api_calls'] == 1 + len(EXCHANGE_WALLETS)
+
+    chain.calls.clear()
+    quiet = watcher.poll()
+    assert quiet['new_transactions'] == [] and quiet['api_calls'] == 1
+    assert [c[1]['action'] for c in chain.calls] == ['balancemulti']
+
+    chain.send(BINANCE, 130, value_eth=400)
+    chain.send(BINANCE, 131, outgoing=True)
+    chain.calls.clear()
+    third = watcher.poll()
+    assert len(third['new_transactions']) == 2
+    txlist = [c[1] for c in chain.calls if c[1]['action'] == 'txlist']
+    assert len(txlist) == 1 and txlist[0]['startblock'] == 129 and txlist[0]['sort'] == 'asc'
+    assert third['duplicates'] == 1  # block 129 is re-read and filtered
+    assert {t['flow'] for t in third['new_transactions']} == {'exchange_inflow', 'exchange_outflow'}
+
+    recent = watcher.get_recent_transactions(limit=5)
+    assert recent['transactions'][0]['amount'] == 400
+    print("✓ Only changed wallets are listed, from their block cursor")
+
+
+def test_whale_alert_dedupe_and_flows():
+    print("Testing Whale Alert cursor, dedupe and flow aggregates...")
+    chain = FakeChain()
+    now = int(time.time())
+    chain.alerts = [
+        {'hash': 'h1', 'symbol': 'usdt', 'amount': 1, 'amount_usd': 2_000_000, 'blockchain': 'tron',
+         'timestamp': now - 10, 'from': {'owner_type': 'unknown'}, 'to': {'owner_type': 'exchange'}},
+        {'hash': 'h2', 'symbol': 'usdt', 'amount': 1, 'amount_usd': 500_000, 'blockchain': 'tron',
+         'timestamp': now - 5, 'from': {'owner_type': 'exchange'}, 'to': {'owner_type': 'unknown'}},
+    ]
+    watcher = _watcher(chain, whale_alert=True)
+    first = watcher.poll()
+    assert len(first['new_transactions']) == 2
+    second = watcher.poll()  # start is inclusive: h2 comes back and is dropped
+    assert second['new_transactions'] == [] and second['duplicates'] == 1
+    last = [c[1] for c in chain.calls if 'whale-alert' in c[0]][-1]
+    assert last['start'] == now - 5 and last['cursor'] == 'c1'
+
+    flows = watcher.get_flow_stats('usdt')['windows']
+    assert flows['24h'] == {'inflow_usd': 2_000_000, 'outflow_usd': 500_000,
+                            'net_exchange_flow_usd': 1_500_000, 'volume_usd': 2_500_000, 'count': 2}
+    stats = watcher.get_whale_statistics(WhaleWatcher.OWNER_ID, 'free')['stats']
+    assert stats['total_transactions_24h'] == 2 and stats['top_token'] == 'USDT'
+    assert stats['most_active_chain'] == 'tron'
+    print("✓ Replayed transactions are skipped and flows are net of exchanges")
+
+
+def test_cross_source_dedupe_and_shared_flows():
+    print("Testing cross-source dedupe and published flow windows...")
+    chain = FakeChain()
+    chain.send(BINANCE, 200, value_eth=1000)
+    row = chain.txs[BINANCE][0]
+    chain.alerts = [{'hash': row['hash'][2:], 'symbol': 'eth', 'amount': 1000, 'amount_usd': 3_500_000,
+                     'blockchain': 'ethereum', 'timestamp': int(row['timeStamp']),
+                     'from': {'owner_type': 'unknown'}, 'to': {'owner_type': 'exchange'}}]
+    master = _watcher(chain, whale_alert=True)
+    result = master.poll()
+    assert len(result['new_transactions']) == 1 and result['duplicates'] == 1
+    assert master.get_flow_stats('ETH')['windows']['24h']['count'] == 1
+
+    # A request worker that never polls serves the master's published windows
+    worker = WhaleWatcher()
+    assert worker.get_flow_stats('ETH')['windows']['24h']['count'] == 0
+    worker.load_flows(master.export_flows())
+    assert worker.get_flow_stats('ETH')['windows'] == master.get_flow_stats('ETH')['windows']
+    assert worker.get_flow_stats()['ingestion']['polls'] == 1
+    print("✓ One transfer seen by two sources is counted once, in every process")
+
+
+def test_tracked_wallets():
+    print("Testing tracked wallet balances...")
+    chain = FakeChain()
+    wallet = '0x' + 'ab' * 20
+    chain.send(wallet, 50, value_eth=3)
+    watcher = _watcher(chain)
+    watcher.track_wallet(WhaleWatcher.OWNER_ID, 'free', wallet, 'fund')
+    watcher.poll()
+    tracked = watcher.tracked_wallets[0]
+    assert tracked['transaction_count'] == 1 and tracked['balance_eth'] == 3
+    before = watcher.stats['wallets_skipped']
+    watcher.poll()
+    assert watcher.stats['wallets_skipped'] - before == len(EXCHANGE_WALLETS) + 1
+    print("✓ Unchanged balances skip the transaction listing")
+
+
+def test_flow_windows_expire():
+    print("Testing rolling flow windows...")
+    agg = FlowAggregator({'1h': 3600, '24h': 86400})
+    now = time.time()
+    agg.add('ETH', 'Ethereum', 100, 'exchange_inflow', now - 7200)
+    agg.add('ETH', 'Ethereum', 50, 'exchange_outflow', now - 60)
+    agg.add('BTC', 'Bitcoin', 10, 'transfer', now - 60)
+    flows = agg.flows('eth', now=now)
+    assert flows['1h']['count'] == 1 and flows['1h']['net_exchange_flow_usd'] == -50
+    assert flows['24h']['count'] == 2 and flows['24h']['net_exchange_flow_usd'] == 50
+    later = agg.flows(now=now + 3600)
+    assert later['1h']['count'] == 0 and later['24h']['count'] == 3
+    assert agg.flows(now=now + 90000)['24h'] == {'inflow_usd': 0, 'outflow_usd': 0,
+                                                  'net_exchange_flow_usd': 0, 'volume_usd': 0,
+                                                  'count': 0}
+    assert agg.top('24h', now=now + 90000) == {'token': None, 'chain': None, 'tokens': 0}
+    print("✓ Expired events are subtracted from the running totals")
+
+
+def test_bloom_filter_rotation():
+    print("Testing rotating Bloom filter...")
+    bloom = RotatingBloomFilter(capacity=1000, error_rate=1e-3)
+    assert bloom.add('a') and not bloom.add('a') and 'a' in bloom
+    for i in range(1000):
+        bloom.add(f'k{i}')
+    assert bloom.rotations == 1 and 'a' in bloom  # still in the previous generation
+    for i in range(1000, 2100):
+        bloom.add(f'k{i}')
+    assert bloom.rotations == 2 and 'a' not in bloom
+    false_positives = sum(f'x{i}' in bloom for i in range(10_000))
+    assert false_positives < 100
+    print("✓ Memory is bounded and recent keys are remembered")
+
+
+def test_top_transactions_during_poll():
+    print("Testing top transactions while a poll ingests...")
+    watcher = WhaleWatcher()
+    watcher._set_cached('whale_poll', True)
+    stamp = time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime())
+    done = threading.Event()
+
+    def ingest():
+        for batch in range(50):
+            txs = [{'tx_hash': f'0x{batch:04x}{i:060x}', 'token': 'ETH', 'chain': 'Ethereum',
+                    'value_usd': float(i), 'timestamp': stamp} for i in range(500)]
+            with watcher._poll_lock:  # as poll() does
+                watcher._ingest(txs)
+        done.set()
+
+    thread = threading.Thread(target=ingest)
+    thread.start()
+    errors = 0
+    while not done.is_set():
+        try:
+            top = watcher._fetch_real_whale_txs(5)
+            assert [t['value_usd'] for t in top] == sorted((t['value_usd'] for t in top), reverse=True)
+        except RuntimeError:  # deque mutated during iteration
+            errors += 1
+    thread.join()
+    assert errors == 0, f"{errors} reads raced with ingestion"
+    assert watcher._fetch_real_whale_txs(1)[0]['value_usd'] == 499
+    print("✓ Readers rank a snapshot taken under the poll lock")
+
+
+def test_poll_benchmark():
+    print("Testing ingestion throughput...")
+    watcher = WhaleWatcher()
+    now = time.time()
+    txs = [{'tx_hash': f'0x{i:064x}', 'token': 'ETH', 'chain': 'Ethereum', 'value_usd': 1e6,
+            'flow': 'exchange_inflow', 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S+00:00',
+                                                                    time.gmtime(now))}
+           for i in range(20_000)]
+    start = time.perf_counter()
+    assert len(watcher._ingest(txs)) == 20_000
+    assert watcher._ingest(txs) == []
+    rate = 40_000 / (time.perf_counter() - start)
+    assert rate > 10_000
+    assert watcher.get_flow_stats('ETH')['windows']['24h']['count'] == 20_000
+    print(f"✓ {rate:,.0f} transactions/s ingested and deduplicated")
+
+
+def main():
+    print("=" * 60)
+    print("WHALE WATCHER TESTS")
+    print("=" * 60)
+    try:
+        test_cursor_polling()
+        test_whale_alert_dedupe_and_flows()
+        test_cross_source_dedupe_and_shared_flows()
+        test_tracked_wallets()
+        test_flow_windows_expire()
+        test_bloom_filter_rotation()
+        test_top_transactions_during_poll()
+        test_poll_benchmark()
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        return False
+
+    print("\n✅ All whale watcher tests passed")
+    return True
+
+
+if __name__ == '__main__':
+    main()
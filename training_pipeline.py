@@ -0,0 +1,443 @@
+"""
+Meta-Model Training Pipeline — SignalTrust AI Scanner
+=====================================================
+Turns logged predictions into MetaModel training sets and versioned
+model artifacts.
+
+Sources (label = 1 when the price rose after the prediction):
+
+- ``AILearningSystem`` predictions that were evaluated and have stored
+  features — label from the evaluation price, else direction + outcome
+- resolved SignalAI signals in ``SignalHistoryStore`` — label from the
+  signed return and the BUY/SELL side, features from the payload
+
+``AIOptimizer`` only keeps aggregate calibration buckets, no per-
+prediction rows, so it is not a source.
+
+Each run reads only rows past the per-source cursors in ``state.json``,
+featurizes them with the MetaModel ``FeatureSchema`` and appends one
+``dataset/part-NNNNNN.npz``. Training uses the whole dataset with a
+time-based split (newest ``VAL_FRACTION`` as validation and early-
+stopping set) and writes ``meta_model-vN.joblib`` plus a manifest entry,
+both atomically. Workers warm-load the latest version at boot with its
+arrays memory-mapped.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ai_learning_system import numeric_features
+from meta_model import (FEATURE_SCHEMA, LIGHTGBM_AVAILABLE, SHAP_AVAILABLE, XGBOOST_AVAILABLE,
+                        FeatureSchema, MetaModel)
+from pattern_index import bollinger_position
+
+try:
+    import joblib
+    JOBLIB_AVAILABLE = True
+except ImportError:
+    JOBLIB_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "models")
+
+VAL_FRACTION = 0.2      # newest share of rows held out for validation / early stopping
+MIN_TRAIN_ROWS = 200    # labelled rows needed before a model is trained
+FETCH_LIMIT = 10_000    # rows per cursor query
+KEEP_VERSIONS = 5       # model artifacts kept on disk
+
+# Flattened indicator names → MetaModel source keys
+FEATURE_ALIASES = {
+    "macd_histogram": "macd_signal",
+    "bb_pct_b": "bollinger_position",
+    "volatility": "volatility_1m",
+    "whale_flow_24h": "whale_flow",
+    "sentiment_score": "sentiment",
+}
+
+
+def training_sample(features: Dict[str, float]) -> Dict[str, float]:
+    """Map flattened indicator values onto the keys ``FeatureSchema`` reads."""
+    sample = dict(features)
+    for src, dst in FEATURE_ALIASES.items():
+        if src in sample and dst not in sample:
+            sample[dst] = sample[src]
+    if "ema_cross" not in sample and "ema9" in sample and "ema21" in sample:
+        sample["ema_cross"] = sample["ema9"] > sample["ema21"]
+    if "bollinger_position" not in sample:
+        position = bollinger_position(sample)
+        if position is not None:
+            sample["bollinger_position"] = position
+    return sample
+
+
+def prediction_label(row: Dict) -> Optional[int]:
+    """1/0 for an evaluated learning-system prediction, None if undecidable."""
+    before, after = row.get("price_at_prediction"), row.get("price_at_evaluation")
+    if before and after and after != before:
+        return int(after > before)
+    direction, outcome = row.get("direction"), row.get("outcome")
+    if direction in ("BULLISH", "BEARISH") and outcome in ("CORRECT", "INCORRECT"):
+        return int((direction == "BULLISH") == (outcome == "CORRECT"))
+    return None
+
+
+def signal_label(row: Dict) -> Optional[int]:
+    """1/0 for a resolved signal (``outcome`` is the return of following it)."""
+    ret = row.get("outcome")
+    if not ret or row.get("signal") not in ("BUY", "SELL"):
+        return None
+    return int((ret > 0) == (row["signal"] == "BUY"))
+
+
+def signal_features(payload: Dict) -> Dict[str, float]:
+    """Top-level numeric payload fields plus the flattened indicators."""
+    top = {k: v for k, v in payload.items() if not isinstance(v, dict)}
+    return {**numeric_features(top), **numeric_features(payload.get("indicators"))}
+
+
+def signal_probability(model: MetaModel, signal: Dict) -> Optional[float]:
+    """Probability that price rises after ``signal``, or None without a trained model.
+
+    The signal is featurized exactly like the resolved signals the model
+    was trained on.
+    """
+    if not model.is_trained:
+        return None
+    return model.predict_proba(training_sample(signal_features(signal)))
+
+
+def _atomic_json(path: str, data: Dict):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class TrainingPipeline:
+    """Incremental dataset materialization and versioned MetaModel training."""
+
+    def __init__(self, model_dir: str = MODEL_DIR, learning_store=None, signal_store=None,
+                 schema: FeatureSchema = FEATURE_SCHEMA):
+        """
+        Args:
+            model_dir: Directory for the dataset, state, manifest and artifacts
+            learning_store: ``LearningStore`` of the AI learning system (optional)
+            signal_store: ``SignalHistoryStore`` with resolved signals (optional)
+            schema: Feature schema the model is trained on
+        """
+        self.model_dir = model_dir
+        self.dataset_dir = os.path.join(model_dir, "dataset")
+        self.state_path = os.path.join(model_dir, "state.json")
+        self.manifest_path = os.path.join(model_dir, "manifest.json")
+        self.learning_store = learning_store
+        self.signal_store = signal_store
+        self.schema = schema
+        self._lock = threading.Lock()
+        os.makedirs(self.dataset_dir, exist_ok=True)
+        self.state = self._load_state()
+
+    # ── State ────────────────────────────────────────────────────────
+
+    def _empty_state(self) -> Dict:
+        return {
+            "feature_names": self.schema.names,
+            "cursors": {"predictions": ["", ""], "signals": [0.0, 0]},
+            "parts": [],
+            "next_part": 1,
+            "rows": 0,
+            "rows_at_last_train": 0,
+        }
+
+    def _load_state(self) -> Dict:
+        state = None
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Unreadable training state, rebuilding dataset: %s", e)
+        if not state or state.get("feature_names") != self.schema.names:
+            # New schema (or first run): parts built with other columns are unusable
+            for name in os.listdir(self.dataset_dir):
+                os.remove(os.path.join(self.dataset_dir, name))
+            state = self._empty_state()
+        return state
+
+    def load_manifest(self) -> Dict:
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        return {"latest": None, "versions": []}
+
+    # ── Materialization ──────────────────────────────────────────────
+
+    def _read_predictions(self) -> Tuple[List[Dict], List[int], List[float], int]:
+        samples, labels, ts, scanned = [], [], [], 0
+        cursor = tuple(self.state["cursors"]["predictions"])
+        while True:
+            rows = self.learning_store.evaluated_with_features(cursor, FETCH_LIMIT)
+            for row in rows:
+                label = prediction_label(row)
+                if label is not None:
+                    samples.append(training_sample(row["features"]))
+                    labels.append(label)
+                    ts.append(row["ts"])
+            scanned += len(rows)
+            if rows:
+                cursor = (rows[-1]["evaluated_at"], rows[-1]["prediction_id"])
+            if len(rows) < FETCH_LIMIT:
+                break
+        self.state["cursors"]["predictions"] = list(cursor)
+        return samples, labels, ts, scanned
+
+    def _read_signals(self) -> Tuple[List[Dict], List[int], List[float], int]:
+        samples, labels, ts, scanned = [], [], [], 0
+        cursor = tuple(self.state["cursors"]["signals"])
+        while True:
+            rows = self.signal_store.resolved_since(cursor, FETCH_LIMIT)
+            for row in rows:
+                label = signal_label(row)
+                if label is not None:
+                    samples.append(training_sample(signal_features(row["payload"])))
+                    labels.append(label)
+                    ts.append(row["ts"])
+            scanned += len(rows)
+            if rows:
+                cursor = (rows[-1]["resolved_at"], rows[-1]["id"])
+            if len(rows) < FETCH_LIMIT:
+                break
+        self.state["cursors"]["signals"] = list(cursor)
+        return samples, labels, ts, scanned
+
+    def materialize(self) -> Dict:
+        """Append newly labelled rows from every source as one dataset part."""
+        start = time.perf_counter()
+        samples, labels, ts = [], [], []
+        report = {"sources": {}}
+        for name, store, reader in (("predictions", self.learning_store, self._read_predictions),
+                                    ("signals", self.signal_store, self._read_signals)):
+            if store is None:
+                continue
+            s, y, t, scanned = reader()
+            samples += s
+            labels += y
+            ts += t
+            report["sources"][name] = {"scanned": scanned, "labelled": len(y)}
+
+        if samples:
+            X = self.schema.transform(samples).astype(np.float32)
+            part = f"part-{self.state['next_part']:06d}.npz"
+            tmp = os.path.join(self.dataset_dir, f"{part}.tmp.npz")
+            np.savez(tmp, X=X, y=np.asarray(labels, dtype=np.int8), ts=np.asarray(ts, dtype=np.float64))
+            os.replace(tmp, os.path.join(self.dataset_dir, part))
+            self.state["parts"].append(part)
+            self.state["next_part"] += 1
+            self.state["rows"] += len(samples)
+        # Cursors only move once the part is on disk; an unlisted part is overwritten next run
+        _atomic_json(self.state_path, self.state)
+
+        elapsed = time.perf_counter() - start
+        scanned = sum(s["scanned"] for s in report["sources"].values())
+        report.update({
+            "new_rows": len(samples),
+            "total_rows": self.state["rows"],
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(scanned / elapsed) if elapsed > 0 else None,
+        })
+        return report
+
+    def load_dataset(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """All materialized rows ``(X, y, ts)`` in time order."""
+        n_features = len(self.schema.names)
+        if not self.state["parts"]:
+            return np.empty((0, n_features), np.float32), np.empty(0, np.int8), np.empty(0)
+        Xs, ys, tss = [], [], []
+        for part in self.state["parts"]:
+            with np.load(os.path.join(self.dataset_dir, part)) as data:
+                Xs.append(data["X"])
+                ys.append(data["y"])
+                tss.append(data["ts"])
+        ts = np.concatenate(tss)
+        order = np.argsort(ts, kind="stable")
+        return np.concatenate(Xs)[order], np.concatenate(ys)[order], ts[order]
+
+    # ── Training ─────────────────────────────────────────────────────
+
+    def _fit(self, X_train, y_train, X_val, y_val) -> MetaModel:
+        names = self.schema.names
+        for model_type, available in (("xgboost", XGBOOST_AVAILABLE), ("lightgbm", LIGHTGBM_AVAILABLE)):
+            if not available:
+                continue
+            meta = MetaModel(model_type)
+            meta.train(pd.DataFrame(X_train, columns=names), pd.Series(y_train),
+                       pd.DataFrame(X_val, columns=names), pd.Series(y_val))
+            if meta.is_trained:
+                return meta
+
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        meta = MetaModel("sklearn")
+        meta.model = HistGradientBoostingClassifier(
+            max_iter=1000, learning_rate=0.05, early_stopping=True, n_iter_no_change=50,
+            validation_fraction=None, scoring="roc_auc", random_state=42)
+        meta.model.fit(X_train, y_train, X_val=X_val, y_val=y_val)
+        meta.is_trained = True
+        return meta
+
+    def train(self, min_rows: int = MIN_TRAIN_ROWS) -> Dict:
+        """Train on the full dataset and publish a new artifact version."""
+        X, y, ts = self.load_dataset()
+        if len(y) < min_rows:
+            return {"trained": False, "reason": f"{len(y)} rows < {min_rows}"}
+        n_val = max(1, int(len(y) * VAL_FRACTION))
+        X_train, y_train, X_val, y_val = X[:-n_val], y[:-n_val], X[-n_val:], y[-n_val:]
+        if len(np.unique(y_train)) < 2 or len(np.unique(y_val)) < 2:
+            return {"trained": False, "reason": "single-class training or validation split"}
+
+        start = time.perf_counter()
+        meta = self._fit(X_train, y_train, X_val, y_val)
+        train_seconds = time.perf_counter() - start
+
+        from sklearn.metrics import roc_auc_score
+        val_auc = float(roc_auc_score(y_val, meta.model.predict_proba(X_val)[:, 1]))
+        entry = {
+            "trained_at": datetime.now(timezone.utc).isoformat(),
+            "model_type": meta.model_type,
+            "estimator": type(meta.model).__name__,
+            "iterations": int(getattr(meta.model, "n_iter_", 0)
+                              or getattr(meta.model, "best_iteration", 0) or 0),
+            "rows": int(len(y)),
+            "train_rows": int(len(y_train)),
+            "val_rows": int(n_val),
+            "val_start_ts": float(ts[-n_val]),
+            "val_auc": round(val_auc, 4),
+            "train_seconds": round(train_seconds, 3),
+            "feature_names": self.schema.names,
+        }
+        entry.update(self._publish(meta, entry))
+        self.state["rows_at_last_train"] = self.state["rows"]
+        _atomic_json(self.state_path, self.state)
+        return {"trained": True, **{k: v for k, v in entry.items() if k != "feature_names"}}
+
+    def _publish(self, meta: MetaModel, entry: Dict) -> Dict:
+        if not JOBLIB_AVAILABLE:
+            raise RuntimeError("joblib is required to save model artifacts")
+        manifest = self.load_manifest()
+        version = (manifest["latest"] or 0) + 1
+        filename = f"meta_model-v{version}.joblib"
+        path = os.path.join(self.model_dir, filename)
+        # Uncompressed so the arrays can be memory-mapped on load
+        joblib.dump({"model": meta.model, "model_type": meta.model_type,
+                     "feature_names": self.schema.names}, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
+        manifest["versions"].append({"version": version, "file": filename, **entry})
+        for old in manifest["versions"][:-KEEP_VERSIONS]:
+            try:
+                os.remove(os.path.join(self.model_dir, old["file"]))
+            except OSError:
+                pass
+        manifest["versions"] = manifest["versions"][-KEEP_VERSIONS:]
+        manifest["latest"] = version
+        _atomic_json(self.manifest_path, manifest)
+        return {"version": version, "file": filename}
+
+    def run(self, force: bool = False, min_rows: int = MIN_TRAIN_ROWS) -> Dict:
+        """Materialize new rows, then retrain if any arrived (or ``force``)."""
+        with self._lock:
+            start = time.perf_counter()
+            materialized = self.materialize()
+            if force or self.state["rows"] > self.state["rows_at_last_train"]:
+                training = self.train(min_rows)
+            else:
+                training = {"trained": False, "reason": "no new labelled rows"}
+            return {
+                "materialize": materialized,
+                "training": training,
+                "seconds": round(time.perf_counter() - start, 3),
+            }
+
+
+def load_meta_model(model_dir: str = MODEL_DIR, version: Optional[int] = None) -> Optional[MetaModel]:
+    """Load a published model (latest by default) with memory-mapped arrays."""
+    manifest_path = os.path.join(model_dir, "manifest.json")
+    if not JOBLIB_AVAILABLE or not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    version = version or manifest.get("latest")
+    entry = next((v for v in manifest["versions"] if v["version"] == version), None)
+    if entry is None:
+        return None
+    artifact = joblib.load(os.path.join(model_dir, entry["file"]), mmap_mode="r")
+    if artifact["feature_names"] != FEATURE_SCHEMA.names:
+        logger.warning("Model v%s was trained on a different feature schema; ignoring it", version)
+        return None
+
+    meta = MetaModel(artifact["model_type"])
+    meta.model = artifact["model"]
+    meta.is_trained = True
+    meta.version = version
+    if SHAP_AVAILABLE:
+        try:
+            import shap
+            meta.explainer = shap.TreeExplainer(meta.model)
+        except Exception:
+            meta.explainer = None
+    return meta
+
+
+# Global instance
+_meta_model: Optional[MetaModel] = None
+_meta_model_stamp: Optional[tuple] = None
+_meta_model_lock = threading.Lock()
+
+
+def _manifest_stamp(model_dir: str = MODEL_DIR) -> Optional[tuple]:
+    try:
+        st = os.stat(os.path.join(model_dir, "manifest.json"))
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def get_meta_model(reload: bool = False) -> MetaModel:
+    """Latest published MetaModel (an untrained one until a model is published).
+
+    The manifest is stat-ed on every call and the model reloaded when it
+    changed, so processes that did not run the training (e.g. forked
+    gunicorn workers) pick up new versions too.
+    """
+    global _meta_model, _meta_model_stamp
+    stamp = _manifest_stamp()
+    if _meta_model is None or reload or stamp != _meta_model_stamp:
+        with _meta_model_lock:
+            if _meta_model is None or reload or stamp != _meta_model_stamp:
+                try:
+                    loaded = load_meta_model()
+                except Exception as e:
+                    logger.warning("Failed to load meta-model: %s", e)
+                    loaded = None
+                if loaded is not None or _meta_model is None:
+                    _meta_model = loaded or MetaModel()
+                _meta_model_stamp = stamp
+    return _meta_model
+
+
+if __name__ == "__main__":
+    from ai_learning_system import get_learning_system
+    from signal_history_store import SignalHistoryStore
+
+    pipeline = TrainingPipeline(learning_store=get_learning_system().store,
+                                signal_store=SignalHistoryStore())
+    print(json.dumps(pipeline.run(), indent=2))
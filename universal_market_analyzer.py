@@ -9,17 +9,26 @@ Data sources:
   • CryptoGemFinder (DEXScreener / CoinPaprika)
   • Yahoo Finance chart API (stocks)
   • DefiLlama (DeFi TVL)
+
+Quote fetches, per-market scoring and top-K selection go through the
+shared ``UniverseScanner`` (bounded concurrency, incremental vectorized
+scores, heap ranking), so ``scan_opportunities`` is cheap enough for
+every worker cycle.
 """
 
+import heapq
 import json
 import logging
+import os
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from realtime_market_data import RealTimeMarketData
 from crypto_gem_finder import CryptoGemFinder
+from universe_scan import get_universe_scanner
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +36,8 @@ logger = logging.getLogger(__name__)
 _uma_cache: Dict[str, dict] = {}
 _CACHE_TTL = 300
 
+ANALYSIS_FILE = os.path.join("data", "universal_market_analysis.json")
+
 
 def _cached(key: str):
     e = _uma_cache.get(key)
@@ -88,6 +99,9 @@ class UniversalMarketAnalyzer:
     def __init__(self):
         self.market_data = RealTimeMarketData()
         self.gem_finder = CryptoGemFinder()
+        self.scanner = get_universe_scanner()
+        self.latest_scan: Optional[Dict] = None
+        self._last_gems: Optional[Dict] = None  # hidden_gems of the last completed full analysis
 
     # ── public API (same interface) ────────────────────────────────
 
@@ -106,39 +120,71 @@ class UniversalMarketAnalyzer:
             "markets": {},
         }
 
-        us = self._analyze_us_stocks()
-        analysis["markets"]["us_stocks"] = us
-        analysis["total_assets_analyzed"] += us["count"]
-
-        ca = self._analyze_canadian_stocks()
-        analysis["markets"]["canadian_stocks"] = ca
-        analysis["total_assets_analyzed"] += ca["count"]
-
-        crypto = self._analyze_crypto()
-        analysis["markets"]["cryptocurrencies"] = crypto
-        analysis["total_assets_analyzed"] += crypto["count"]
-
-        gems = self._discover_gems()
-        analysis["markets"]["hidden_gems"] = gems
-        analysis["total_assets_analyzed"] += gems["count"]
-
-        defi = self._analyze_defi()
-        analysis["markets"]["defi"] = defi
-        analysis["total_assets_analyzed"] += defi["count"]
-
+        analysis["markets"] = self._run_markets({
+            "us_stocks": self._analyze_us_stocks,
+            "canadian_stocks": self._analyze_canadian_stocks,
+            "cryptocurrencies": self._analyze_crypto,
+            "hidden_gems": self._discover_gems,
+            "defi": self._analyze_defi,
+        })
+        analysis["total_assets_analyzed"] = sum(m["count"] for m in analysis["markets"].values())
         analysis["top_opportunities"] = self._find_top_opportunities(analysis)
 
         self._save_analysis(analysis)
         _store("full_analysis", analysis)
+        self._last_gems = analysis["markets"]["hidden_gems"]
         return analysis
 
+    def scan_opportunities(self, limit: int = 50) -> Dict:
+        """Cross-market top opportunities without the gem discovery pass.
+
+        Stocks, crypto and DeFi are refreshed (each behind its own cache),
+        only assets whose inputs changed are rescored, and the hidden gems
+        of the last completed full analysis are merged in. The full pass
+        runs every 2 hours, far longer than the section cache TTL, so the
+        gems are kept from the analysis itself (or its saved file after a
+        restart) rather than from the cache.
+        """
+        t0 = time.perf_counter()
+        before = self.scanner.get_stats()
+        markets = self._run_markets({
+            "us_stocks": self._analyze_us_stocks,
+            "canadian_stocks": self._analyze_canadian_stocks,
+            "cryptocurrencies": self._analyze_crypto,
+            "defi": self._analyze_defi,
+        })
+        gems = self._latest_gems()
+        if gems:
+            markets["hidden_gems"] = gems
+        scan = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "total_assets_analyzed": sum(m["count"] for m in markets.values()),
+            "top_opportunities": self._find_top_opportunities({"markets": markets}, limit),
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+        }
+        after = self.scanner.get_stats()
+        scan["rescored"] = after["scored"] - before["scored"]
+        scan["unchanged"] = after["skipped"] - before["skipped"]
+        self.latest_scan = scan
+        return scan
+
+    @staticmethod
+    def _run_markets(tasks: Dict) -> Dict[str, Dict]:
+        """Run independent market sections concurrently (results keep task order)."""
+        with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="uma-market") as pool:
+            futures = {name: pool.submit(fn) for name, fn in tasks.items()}
+        return {name: fut.result() for name, fut in futures.items()}
+
+    def _latest_gems(self) -> Dict:
+        """hidden_gems section of the last completed full analysis ({} if none yet)."""
+        if self._last_gems is None:
+            saved = self._load_analysis() or {}
+            self._last_gems = saved.get("markets", {}).get("hidden_gems") or {}
+        return self._last_gems
+
     def get_analysis_summary(self) -> Dict:
         """Load cached analysis or run fresh."""
-        try:
-            with open("data/universal_market_analysis.json", "r") as f:
-                return json.load(f)
-        except Exception:
-            return self.analyze_everything()
+        return self._load_analysis() or self.analyze_everything()
 
     def get_total_coverage(self) -> Dict:
         return {
@@ -175,20 +221,15 @@ class UniversalMarketAnalyzer:
         tickers = self._us_tickers()
         assets = self._fetch_yahoo_batch(tickers)
 
-        opps = []
-        for a in assets:
-            s = _score_asset(a["change_pct"], a.get("volume", 0))
-            if s >= 60:
-                opps.append({
-                    "symbol": a["symbol"], "price": a["price"],
-                    "change_pct": a["change_pct"], "score": s,
-                    "recommendation": _recommendation(s, a["change_pct"]),
-                })
-
-        opps.sort(key=lambda x: x["score"], reverse=True)
+        opps = [{
+            "symbol": a["symbol"], "price": a["price"],
+            "change_pct": a["change_pct"], "score": s,
+            "recommendation": _recommendation(s, a["change_pct"]),
+        } for a, s in self.scanner.rank("us_stocks", assets, k=20, min_score=60)]
+
         result = {
             "count": len(assets), "analyzed": len(assets),
-            "opportunities": opps[:20], "data_source": "yahoo_finance",
+            "opportunities": opps, "data_source": "yahoo_finance",
         }
         _store("us_analysis", result)
         return result
@@ -213,49 +254,23 @@ class UniversalMarketAnalyzer:
         tickers = self._ca_tickers()
         assets = self._fetch_yahoo_batch(tickers)
 
-        opps = []
-        for a in assets:
-            s = _score_asset(a["change_pct"], a.get("volume", 0))
-            if s >= 55:
-                opps.append({
-                    "symbol": a["symbol"], "price": a["price"],
-                    "change_pct": a["change_pct"], "score": s,
-                    "recommendation": _recommendation(s, a["change_pct"]),
-                })
-
-        opps.sort(key=lambda x: x["score"], reverse=True)
+        opps = [{
+            "symbol": a["symbol"], "price": a["price"],
+            "change_pct": a["change_pct"], "score": s,
+            "recommendation": _recommendation(s, a["change_pct"]),
+        } for a, s in self.scanner.rank("canadian_stocks", assets, k=10, min_score=55)]
+
         result = {
             "count": len(assets), "analyzed": len(assets),
-            "opportunities": opps[:10], "data_source": "yahoo_finance",
+            "opportunities": opps, "data_source": "yahoo_finance",
         }
         _store("ca_analysis", result)
         return result
 
     # ── shared Yahoo helper ────────────────────────────────────────
 
-    @staticmethod
-    def _fetch_yahoo_batch(tickers: List[str]) -> List[Dict]:
-        results: List[Dict] = []
-        for t in tickers:
-            try:
-                r = requests.get(
-                    f"https://query1.finance.yahoo.com/v8/finance/chart/{t}",
-                    params={"range": "2d", "interval": "1d"},
-                    headers={"User-Agent": "Mozilla/5.0"}, timeout=6,
-                )
-                if r.status_code == 200:
-                    meta = r.json()["chart"]["result"][0]["meta"]
-                    prev = meta.get("chartPreviousClose", meta.get("previousClose", 0))
-                    price = meta.get("regularMarketPrice", prev)
-                    chg = ((price - prev) / prev * 100) if prev else 0
-                    results.append({
-                        "symbol": t, "price": round(price, 2),
-                        "change_pct": round(chg, 2),
-                        "volume": meta.get("regularMarketVolume", 0),
-                    })
-            except Exception:
-                continue
-        return results
+    def _fetch_yahoo_batch(self, tickers: List[str]) -> List[Dict]:
+        return self.scanner.fetch_many(tickers)
 
     # ══════════════════════════════════════════════════════════════
     #  Crypto — CoinPaprika tickers (free, no key)
@@ -267,23 +282,21 @@ class UniversalMarketAnalyzer:
             return cached
 
         cryptos = self.market_data.get_all_crypto(limit=100)
+        rows = [{
+            "symbol": c.get("symbol", ""), "price": c.get("price", 0),
+            "change_pct": c.get("change_percent", c.get("change_24h", 0)) or 0,
+            "volume": c.get("volume_24h", c.get("volume", 0)) or 0,
+        } for c in cryptos]
+
+        opps = [{
+            "symbol": r["symbol"], "price": r["price"],
+            "change_pct": round(r["change_pct"], 2), "score": s,
+            "recommendation": _recommendation(s, r["change_pct"]),
+        } for r, s in self.scanner.rank("cryptocurrencies", rows, k=30, min_score=60)]
 
-        opps = []
-        for c in cryptos:
-            chg = c.get("change_percent", c.get("change_24h", 0)) or 0
-            vol = c.get("volume_24h", c.get("volume", 0)) or 0
-            s = _score_asset(chg, vol)
-            if s >= 60:
-                opps.append({
-                    "symbol": c.get("symbol", ""), "price": c.get("price", 0),
-                    "change_pct": round(chg, 2), "score": s,
-                    "recommendation": _recommendation(s, chg),
-                })
-
-        opps.sort(key=lambda x: x["score"], reverse=True)
         result = {
             "count": len(cryptos), "analyzed": len(cryptos),
-            "opportunities": opps[:30], "data_source": "coinpaprika",
+            "opportunities": opps, "data_source": "coinpaprika",
         }
         _store("crypto_analysis", result)
         return result
@@ -333,22 +346,16 @@ class UniversalMarketAnalyzer:
         except Exception as e:
             logger.error(f"DefiLlama: {e}")
 
-        opps = []
-        for p in protocols:
-            chg = p.get("change_1d", 0)
-            tvl_val = p.get("tvl", 0)
-            s = _score_asset(chg, tvl_val)
-            if s >= 50:
-                opps.append({
-                    "symbol": p["symbol"], "name": p.get("name", ""),
-                    "tvl": p["tvl_display"], "change_1d": p["change_1d"],
-                    "score": s, "recommendation": _recommendation(s, chg),
-                })
-
-        opps.sort(key=lambda x: x["score"], reverse=True)
+        opps = [{
+            "symbol": p["symbol"], "name": p.get("name", ""),
+            "tvl": p["tvl_display"], "change_1d": p["change_1d"],
+            "score": s, "recommendation": _recommendation(s, p["change_1d"]),
+        } for p, s in self.scanner.rank("defi", protocols, k=10, min_score=50,
+                                         change_key="change_1d", volume_key="tvl")]
+
         result = {
             "count": len(protocols), "analyzed": len(protocols),
-            "opportunities": opps[:10], "data_source": "defillama",
+            "opportunities": opps, "data_source": "defillama",
         }
         _store("defi_analysis", result)
         return result
@@ -357,13 +364,12 @@ class UniversalMarketAnalyzer:
     #  Cross-market opportunity ranking
     # ══════════════════════════════════════════════════════════════
 
-    def _find_top_opportunities(self, analysis: Dict) -> List[Dict]:
+    def _find_top_opportunities(self, analysis: Dict, limit: int = 50) -> List[Dict]:
         all_opps: List[Dict] = []
         for market, data in analysis["markets"].items():
             if "opportunities" in data:
                 for opp in data["opportunities"]:
-                    opp["market"] = market
-                    all_opps.append(opp)
+                    all_opps.append({**opp, "market": market})
             elif "top_gems" in data:
                 for gem in data["top_gems"][:10]:
                     all_opps.append({
@@ -373,16 +379,23 @@ class UniversalMarketAnalyzer:
                         "recommendation": "GEM",
                         "explosion_potential": gem.get("explosion_potential", ""),
                     })
-        return sorted(all_opps, key=lambda x: x.get("score", 0), reverse=True)[:50]
+        return heapq.nlargest(limit, all_opps, key=lambda x: x.get("score", 0))
 
     # ── persistence ────────────────────────────────────────────────
 
+    @staticmethod
+    def _load_analysis() -> Optional[Dict]:
+        try:
+            with open(ANALYSIS_FILE, "r") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
     @staticmethod
     def _save_analysis(analysis: Dict):
         try:
-            import os
-            os.makedirs("data", exist_ok=True)
-            with open("data/universal_market_analysis.json", "w") as f:
+            os.makedirs(os.path.dirname(ANALYSIS_FILE), exist_ok=True)
+            with open(ANALYSIS_FILE, "w") as f:
                 json.dump(analysis, f, indent=2)
         except Exception as e:
             logger.error(f"Save analysis: {e}")
@@ -0,0 +1,216 @@
+"""
+Universe Scan — SignalTrust AI Scanner
+======================================
+Shared scan engine for the market-wide analyzers (``AIMarketIntelligence``
+and ``UniversalMarketAnalyzer``).
+
+  • Per-symbol quote fetches fan out over one bounded thread pool
+    (``MAX_WORKERS`` requests in flight, shared by every analyzer).
+  • Opportunity scores are computed for a whole market at once with NumPy,
+    and only for assets whose inputs changed: each asset keeps a
+    fingerprint of the inputs it was last scored from.
+  • Top-K selection uses a heap instead of sorting the full result list.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import requests
+
+logger = logging.getLogger(__name__)
+
+YAHOO_CHART = "https://query1.finance.yahoo.com/v8/finance/chart/{}"
+
+
+def fetch_yahoo_quote(ticker: str, timeout: float = 6) -> Optional[Dict]:
+    """Last price, daily change and volume from the Yahoo Finance chart API."""
+    try:
+        r = requests.get(YAHOO_CHART.format(ticker),
+                         params={"range": "2d", "interval": "1d"},
+                         headers={"User-Agent": "Mozilla/5.0"}, timeout=timeout)
+        if r.status_code != 200:
+            return None
+        meta = r.json()["chart"]["result"][0]["meta"]
+        prev = meta.get("chartPreviousClose", meta.get("previousClose", 0))
+        price = meta.get("regularMarketPrice", prev)
+        chg = ((price - prev) / prev * 100) if prev else 0
+        return {
+            "symbol": ticker, "price": round(price, 2),
+            "change_pct": round(chg, 2),
+            "volume": meta.get("regularMarketVolume", 0),
+        }
+    except Exception:
+        return None
+
+
+def score_assets(change_pct: Sequence[float], volume: Sequence[float]) -> np.ndarray:
+    """Vectorized 0-100 opportunity score (same formula as ``_score_asset``).
+
+    Momentum (0-40) from abs(change) capped at 20%, direction (0-30) and a
+    log-scaled volume premium (0-30).
+    """
+    chg = np.nan_to_num(np.asarray(change_pct, dtype=float))
+    vol = np.nan_to_num(np.asarray(volume, dtype=float))
+    abs_chg = np.minimum(np.abs(chg), 20)
+    momentum = abs_chg / 20 * 40
+    direction = np.where(chg > 0, 30.0, np.maximum(0.0, 30 * (1 - abs_chg / 20)))
+    vol_score = np.where(vol > 0, np.minimum(30.0, np.log10(np.maximum(vol, 1)) * 3), 0.0)
+    return np.round(np.minimum(100.0, momentum + direction + vol_score), 1)
+
+
+class UniverseScanner:
+    """Bounded-concurrency fetches and incremental, heap-ranked scoring."""
+
+    MAX_WORKERS = 8      # concurrent quote requests across all analyzers
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix="universe-scan")
+        self._lock = threading.Lock()
+        # market -> symbol -> (input fingerprint, score)
+        self._seen: Dict[str, Dict[str, Tuple[tuple, float]]] = {}
+        self.stats = {"fetched": 0, "fetch_failed": 0, "scored": 0, "skipped": 0, "ranked": 0}
+
+    def fetch_many(self, symbols: Sequence[str],
+                   fetch: Callable[[str], Optional[Dict]] = fetch_yahoo_quote) -> List[Dict]:
+        """Fetch every symbol concurrently; failed fetches are dropped, order is kept."""
+        futures = [self._pool.submit(fetch, s) for s in symbols]
+        results, failed = [], 0
+        for fut in futures:
+            try:
+                row = fut.result()
+            except Exception:
+                row = None
+            if row:
+                results.append(row)
+            else:
+                failed += 1
+        with self._lock:
+            self.stats["fetched"] += len(results)
+            self.stats["fetch_failed"] += failed
+        return results
+
+    def score(self, market: str, assets: Sequence[Dict], change_key: str = "change_pct",
+              volume_key: str = "volume") -> np.ndarray:
+        """Scores for ``assets``, recomputing only those whose inputs changed."""
+        symbols = [a.get("symbol") for a in assets]
+        fingerprints = [(a.get(change_key) or 0, a.get(volume_key) or 0) for a in assets]
+        with self._lock:
+            seen = self._seen.setdefault(market, {})
+            cached = [seen.get(sym) for sym in symbols]
+        stale = [i for i, (c, fp) in enumerate(zip(cached, fingerprints))
+                 if c is None or c[0] != fp]
+        scores = np.array([c[1] if c is not None else 0.0 for c in cached])
+        if stale:
+            fresh = score_assets([fingerprints[i][0] for i in stale],
+                                 [fingerprints[i][1] for i in stale])
+            scores[stale] = fresh
+        with self._lock:
+            for i, value in zip(stale, scores[stale].tolist()):
+                seen[symbols[i]] = (fingerprints[i], value)
+            if len(seen) > len(symbols):
+                # Only the current universe is remembered, so the table stays bounded
+                keep = set(symbols)
+                for sym in [s for s in seen if s not in keep]:
+                    del seen[sym]
+            self.stats["scored"] += len(stale)
+            self.stats["skipped"] += len(assets) - len(stale)
+        return scores
+
+    def rank(self, market: str, assets: Sequence[Dict], k: int, min_score: float = 0.0,
+             change_key: str = "change_pct", volume_key: str = "volume") -> List[Tuple[Dict, float]]:
+        """Top ``k`` ``(asset, score)`` pairs with ``score >= min_score``, best first.
+
+        Ties keep input order, as the stable full sort did.
+        """
+        scores = self.score(market, assets, change_key, volume_key)
+        eligible = np.flatnonzero(scores >= min_score).tolist()
+        top = heapq.nlargest(k, eligible, key=scores.__getitem__)
+        with self._lock:
+            self.stats["ranked"] += 1
+        return [(assets[i], float(scores[i])) for i in top]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "markets_tracked": len(self._seen),
+                    "assets_tracked": sum(len(m) for m in self._seen.values())}
+
+
+# ── Singleton ───────────────────────────────────────────────────────
+
+_universe_scanner: Optional[UniverseScanner] = None
+_universe_scanner_lock = threading.Lock()
+
+
+def get_universe_scanner() -> UniverseScanner:
+    """Get or create the shared UniverseScanner."""
+    global _universe_scanner
+    if _universe_scanner is None:
+        with _universe_scanner_lock:
+            if _universe_scanner is None:
+                _universe_scanner = UniverseScanner()
+    return _universe_scanner
+
+
+def benchmark(symbols: int = 64, latency: float = 0.02, assets: int = 50_000,
+              changed: float = 0.1, k: int = 50, seed: int = 0) -> Dict:
+    """Sequential vs pooled fetches, and full re-sort vs incremental heap ranking.
+
+    Fetches are simulated with a fixed ``latency`` sleep; ranking runs over
+    ``assets`` synthetic rows of which a ``changed`` fraction moves between
+    two scans.
+    """
+    from universal_market_analyzer import _score_asset
+
+    def fake_fetch(sym):
+        time.sleep(latency)
+        return {"symbol": sym, "change_pct": 1.0, "volume": 1e6}
+
+    names = [f"S{i}" for i in range(symbols)]
+    start = time.perf_counter()
+    for s in names:
+        fake_fetch(s)
+    sequential = time.perf_counter() - start
+
+    scanner = UniverseScanner()
+    start = time.perf_counter()
+    scanner.fetch_many(names, fake_fetch)
+    pooled = time.perf_counter() - start
+
+    rng = np.random.default_rng(seed)
+    rows = [{"symbol": f"A{i}", "change_pct": round(float(c), 2), "volume": float(v)}
+            for i, (c, v) in enumerate(zip(rng.normal(0, 6, assets),
+                                           rng.lognormal(12, 2, assets)))]
+    start = time.perf_counter()
+    old = sorted(({"symbol": r["symbol"], "score": _score_asset(r["change_pct"], r["volume"])}
+                  for r in rows), key=lambda x: x["score"], reverse=True)[:k]
+    full_sort = time.perf_counter() - start
+
+    scanner.rank("bench", rows, k)
+    for i in rng.choice(assets, int(assets * changed), replace=False):
+        rows[i] = {**rows[i], "change_pct": rows[i]["change_pct"] + 0.5}
+    start = time.perf_counter()
+    new = scanner.rank("bench", rows, k)
+    incremental = time.perf_counter() - start
+    old = sorted(({"symbol": r["symbol"], "score": _score_asset(r["change_pct"], r["volume"])}
+                  for r in rows), key=lambda x: x["score"], reverse=True)[:k]
+
+    return {
+        "symbols": symbols,
+        "fetch_sequential_s": round(sequential, 3),
+        "fetch_pooled_s": round(pooled, 3),
+        "assets": assets,
+        "changed_fraction": changed,
+        "rank_full_sort_ms": round(full_sort * 1000, 2),
+        "rank_incremental_ms": round(incremental * 1000, 2),
+        "top_k_agrees": [o["score"] for o in old] == [score for _, score in new],
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark())
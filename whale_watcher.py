@@ -10,13 +10,26 @@ Data sources:
   • Whale Alert API (if key provided)
 
 Keeps access control for premium features.
+
+Ingestion is incremental: each source keeps a cursor (last block per
+address for Etherscan, last timestamp / page cursor for Whale Alert),
+watched wallets are checked with one batched balance call per 20
+addresses and only wallets whose balance moved are re-listed, and every
+transaction hash passes a rotating Bloom filter so nothing is processed
+twice. Exchange inflow/outflow per token is kept in rolling windows
+updated on arrival, so flow statistics are O(1) reads.
 """
 
 import os
 import hashlib
+import heapq
 import logging
+import math
+import threading
+import time
+from collections import deque
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 
 try:
     import requests
@@ -25,6 +38,160 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Exchange hot wallets polled for large ETH transfers
+EXCHANGE_WALLETS = {
+    '0x28c6c06298d514db089934071355e5743bf21d60': 'Binance 14',
+    '0x21a31ee1afc51d94c2efccaa2092ad1028285549': 'Binance 15',
+}
+
+
+class RotatingBloomFilter:
+    """Bounded "seen" set for transaction hashes.
+
+    Two Bloom filter generations: keys go into the current one and are
+    looked up in both. When the current generation holds ``capacity``
+    keys it becomes the previous one and a fresh generation starts, so
+    memory stays fixed and every key is remembered for at least
+    ``capacity`` further insertions.
+    """
+
+    def __init__(self, capacity: int = 50_000, error_rate: float = 1e-4):
+        self.capacity = capacity
+        self.bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._current = bytearray((self.bits + 7) // 8)
+        self._previous = bytearray((self.bits + 7) // 8)
+        self._count = 0
+        self.rotations = 0
+
+    def _positions(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    @staticmethod
+    def _has(bits: bytearray, positions: List[int]) -> bool:
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def __contains__(self, key: str) -> bool:
+        positions = self._positions(key)
+        return self._has(self._current, positions) or self._has(self._previous, positions)
+
+    def add(self, key: str) -> bool:
+        """Insert ``key``; returns False if it was (probably) already present."""
+        positions = self._positions(key)
+        if self._has(self._current, positions) or self._has(self._previous, positions):
+            return False
+        if self._count >= self.capacity:
+            self._previous, self._current = self._current, bytearray(len(self._current))
+            self._count = 0
+            self.rotations += 1
+        for p in positions:
+            self._current[p >> 3] |= 1 << (p & 7)
+        self._count += 1
+        return True
+
+
+class FlowAggregator:
+    """Rolling per-token exchange inflow / outflow, updated incrementally.
+
+    Every window keeps its events in arrival order plus running totals;
+    expired events are subtracted from the head, so ``add`` and reads are
+    amortized O(1) whatever the history length.
+    """
+
+    WINDOWS = {'1h': 3600, '24h': 86400}
+
+    def __init__(self, windows: Optional[Dict[str, int]] = None):
+        self.windows = dict(windows or self.WINDOWS)
+        self._events = {name: deque() for name in self.windows}
+        # window -> token -> [inflow_usd, outflow_usd, volume_usd, count]
+        self._tokens: Dict[str, Dict[str, List[float]]] = {name: {} for name in self.windows}
+        self._chains: Dict[str, Dict[str, int]] = {name: {} for name in self.windows}
+        self._lock = threading.Lock()
+
+    def add(self, token: str, chain: str, value_usd: float, flow: str, ts: float):
+        with self._lock:
+            for name, span in self.windows.items():
+                if ts < time.time() - span:
+                    continue
+                self._events[name].append((ts, token, chain, value_usd, flow))
+                self._apply(name, token, chain, value_usd, flow, 1)
+
+    def _apply(self, name: str, token: str, chain: str, value: float, flow: str, sign: int):
+        totals = self._tokens[name].setdefault(token, [0.0, 0.0, 0.0, 0])
+        if flow == 'exchange_inflow':
+            totals[0] += sign * value
+        elif flow == 'exchange_outflow':
+            totals[1] += sign * value
+        totals[2] += sign * value
+        totals[3] += sign
+        if totals[3] <= 0:
+            del self._tokens[name][token]
+        chains = self._chains[name]
+        chains[chain] = chains.get(chain, 0) + sign
+        if chains[chain] <= 0:
+            del chains[chain]
+
+    def _expire(self, now: float):
+        for name, span in self.windows.items():
+            events, cutoff = self._events[name], now - span
+            while events and events[0][0] < cutoff:
+                ts, token, chain, value, flow = events.popleft()
+                self._apply(name, token, chain, value, flow, -1)
+
+    @staticmethod
+    def _row(totals: List[float]) -> Dict:
+        inflow, outflow, volume, count = totals
+        return {'inflow_usd': round(inflow, 2), 'outflow_usd': round(outflow, 2),
+                'net_exchange_flow_usd': round(inflow - outflow, 2),
+                'volume_usd': round(volume, 2), 'count': int(count)}
+
+    def flows(self, token: Optional[str] = None, now: Optional[float] = None) -> Dict:
+        """Per-window flows for one token, or the totals over all tokens."""
+        with self._lock:
+            self._expire(now or time.time())
+            out = {}
+            for name in self.windows:
+                tokens = self._tokens[name]
+                if token is not None:
+                    out[name] = self._row(tokens.get(token.upper(), [0.0, 0.0, 0.0, 0]))
+                else:
+                    out[name] = self._row([sum(t[i] for t in tokens.values()) for i in range(4)])
+            return out
+
+    def export_state(self) -> Dict:
+        """Picklable copy of the windows and running totals (see ``shared_state``)."""
+        with self._lock:
+            return {
+                'windows': dict(self.windows),
+                'events': {name: list(events) for name, events in self._events.items()},
+                'tokens': {name: {t: list(v) for t, v in tokens.items()}
+                           for name, tokens in self._tokens.items()},
+                'chains': {name: dict(chains) for name, chains in self._chains.items()},
+            }
+
+    def load_state(self, state: Dict):
+        """Replace the windows with an ``export_state`` snapshot."""
+        with self._lock:
+            self.windows = dict(state['windows'])
+            self._events = {name: deque(events) for name, events in state['events'].items()}
+            self._tokens = {name: {t: list(v) for t, v in tokens.items()}
+                            for name, tokens in state['tokens'].items()}
+            self._chains = {name: dict(chains) for name, chains in state['chains'].items()}
+
+    def top(self, window: str = '24h', now: Optional[float] = None) -> Dict:
+        """Most active token and chain in ``window`` by transaction count."""
+        with self._lock:
+            self._expire(now or time.time())
+            tokens, chains = self._tokens[window], self._chains[window]
+            return {
+                'token': max(tokens, key=lambda t: tokens[t][3]) if tokens else None,
+                'chain': max(chains, key=chains.get) if chains else None,
+                'tokens': len(tokens),
+            }
+
 
 class WhaleWatcher:
     """Whale transaction tracking with access control and real API data."""
@@ -34,11 +201,22 @@ class WhaleWatcher:
     
     # Subscription tiers with whale watcher access
     ALLOWED_TIERS = ['pro', 'enterprise']
-    
+
+    HISTORY_SIZE = 2000     # ingested transactions kept for listings
+    BALANCE_BATCH = 20      # addresses per Etherscan balancemulti call
+    PAGE_SIZE = 100         # transactions per incremental page
+
     def __init__(self):
         """Initialize whale watcher."""
         self.tracked_wallets: List[Dict] = []
-        self.transaction_history: List[Dict] = []
+        self.transaction_history: deque = deque(maxlen=self.HISTORY_SIZE)
+        self.flows = FlowAggregator()
+        self._seen = RotatingBloomFilter()
+        self._cursors: Dict[str, object] = {}     # source -> last block / timestamp / page cursor
+        self._balances: Dict[str, int] = {}       # address -> last balance (wei)
+        self._poll_lock = threading.Lock()
+        self.stats = {'polls': 0, 'api_calls': 0, 'new_transactions': 0,
+                      'duplicates': 0, 'wallets_skipped': 0}
         self._session = requests.Session() if requests else None
         if self._session:
             self._session.headers.update({'User-Agent': 'SignalTrust-WhaleWatcher/2.0'})
@@ -165,105 +343,187 @@ class WhaleWatcher:
         if not self.check_access(user_id, user_plan):
             return {'success': False, 'error': 'Access denied'}
         
-        # Try to compute from real data
-        txs = self._fetch_real_whale_txs(100)
-        if txs:
-            total_value = sum(t.get('value_usd', 0) for t in txs)
-            avg_size = total_value / len(txs) if txs else 0
-            chains = {}
-            tokens = {}
-            for t in txs:
-                c = t.get('chain', 'Unknown')
-                chains[c] = chains.get(c, 0) + 1
-                tk = t.get('token', 'Unknown')
-                tokens[tk] = tokens.get(tk, 0) + 1
-            most_active_chain = max(chains, key=chains.get) if chains else 'Ethereum'
-            top_token = max(tokens, key=tokens.get) if tokens else 'ETH'
-        else:
-            total_value = 0
-            avg_size = 0
-            most_active_chain = 'Ethereum'
-            top_token = 'ETH'
+        # Rolling 24h aggregates, maintained as transactions arrive
+        self._fetch_real_whale_txs(1)
+        flows = self.flows.flows()['24h']
+        top = self.flows.top('24h')
+        total_value = flows['volume_usd']
+        avg_size = total_value / flows['count'] if flows['count'] else 0
+        most_active_chain = top['chain'] or 'Ethereum'
+        top_token = top['token'] or 'ETH'
 
         return {
             'success': True,
             'stats': {
-                'total_transactions_24h': len(txs) if txs else 0,
+                'total_transactions_24h': flows['count'],
                 'total_value_24h_usd': f'${total_value/1_000_000:.1f}M',
                 'avg_transaction_size': f'${avg_size/1000:.0f}K',
                 'most_active_chain': most_active_chain,
                 'top_token': top_token,
+                'exchange_inflow_24h_usd': flows['inflow_usd'],
+                'exchange_outflow_24h_usd': flows['outflow_usd'],
             },
             'timestamp': datetime.now(timezone.utc).isoformat(),
         }
 
-    # ── Real API fetchers ────────────────────────────────────────────
+    def export_flows(self) -> Dict:
+        """Flow windows and ingestion counters, published for processes that do not poll."""
+        return {'flows': self.flows.export_state(), 'stats': dict(self.stats)}
 
-    def _fetch_real_whale_txs(self, limit: int) -> List[Dict]:
-        """Fetch real whale transactions from multiple sources."""
-        cached = self._get_cached('whale_txs')
-        if cached:
-            return cached[:limit]
+    def load_flows(self, state: Dict):
+        """Apply an ``export_flows`` snapshot."""
+        self.flows.load_state(state['flows'])
+        self.stats = dict(state['stats'])
 
-        txs: List[Dict] = []
+    def get_flow_stats(self, token: Optional[str] = None) -> Dict:
+        """Rolling exchange inflow/outflow per window (O(1), no API call).
 
-        # Source 1: Etherscan — recent large ETH transfers
-        eth_txs = self._fetch_etherscan_whales(limit)
-        txs.extend(eth_txs)
+        Args:
+            token: Token symbol, or None for all tokens combined
+        """
+        return {
+            'token': token.upper() if token else 'ALL',
+            'windows': self.flows.flows(token),
+            'ingestion': dict(self.stats),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+        }
 
-        # Source 2: Whale Alert API (if key available)
-        if self._whale_alert_key:
-            wa_txs = self._fetch_whale_alert(limit)
-            txs.extend(wa_txs)
+    # ── Real API fetchers ────────────────────────────────────────────
 
-        # Sort by value descending
-        txs.sort(key=lambda x: x.get('value_usd', 0), reverse=True)
+    def _fetch_real_whale_txs(self, limit: int) -> List[Dict]:
+        """Largest ingested whale transactions (polls at most once per cache TTL)."""
+        if not self._get_cached('whale_poll'):
+            self.poll()
+            self._set_cached('whale_poll', True)
+        # A concurrent poll() appends to the deque, which breaks iteration over it
+        with self._poll_lock:
+            snapshot = list(self.transaction_history)
+        return heapq.nlargest(limit, snapshot, key=lambda x: x.get('value_usd', 0))
+
+    def poll(self) -> Dict:
+        """Fetch only what is new since the last poll from every source.
 
-        if txs:
-            self._set_cached('whale_txs', txs)
+        Returns:
+            Dict with the new transactions and the API calls spent
+        """
+        with self._poll_lock:
+            calls_before = self.stats['api_calls']
+            fetched = self._fetch_etherscan_whales(self.PAGE_SIZE)
+            if self._whale_alert_key:
+                fetched += self._fetch_whale_alert(self.PAGE_SIZE)
+            new = self._ingest(fetched)
+            self.stats['polls'] += 1
+            return {
+                'new_transactions': new,
+                'fetched': len(fetched),
+                'duplicates': len(fetched) - len(new),
+                'api_calls': self.stats['api_calls'] - calls_before,
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+            }
 
-        return txs[:limit]
+    def _ingest(self, txs: Iterable[Dict]) -> List[Dict]:
+        """Drop already-seen hashes; record the rest in history and flow windows."""
+        new = []
+        tracked = {w['address'].lower(): w for w in self.tracked_wallets}
+        for tx in txs:
+            key = (tx.get('tx_hash') or tx.get('id') or '').lower()
+            if key.startswith('0x'):
+                key = key[2:]
+            # Sources label chains differently ('Ethereum' vs Whale Alert's 'ethereum')
+            if not key or not self._seen.add(f"{str(tx.get('chain', '')).lower()}:{key}"):
+                self.stats['duplicates'] += 1
+                continue
+            new.append(tx)
+            self.transaction_history.append(tx)
+            try:
+                ts = datetime.fromisoformat(tx['timestamp']).timestamp()
+            except (KeyError, TypeError, ValueError):
+                ts = time.time()
+            self.flows.add(tx.get('token', 'Unknown'), tx.get('chain', 'Unknown'),
+                           tx.get('value_usd', 0) or 0, tx.get('flow', 'transfer'), ts)
+            for addr in (tx.get('from_address', ''), tx.get('to_address', '')):
+                wallet = tracked.get((addr or '').lower())
+                if wallet is not None:
+                    wallet['transaction_count'] += 1
+        self.stats['new_transactions'] += len(new)
+        return new
+
+    def _etherscan_get(self, params: Dict) -> Optional[Dict]:
+        self.stats['api_calls'] += 1
+        resp = self._session.get(
+            'https://api.etherscan.io/v2/api',
+            params={'chainid': 1, **params, 'apikey': self._etherscan_key},
+            timeout=10,
+        )
+        if resp.status_code != 200:
+            return None
+        data = resp.json()
+        return data if data.get('status') == '1' else None
+
+    def _refresh_balances(self, addresses: List[str]) -> List[str]:
+        """Batched balance check; returns the addresses whose balance moved."""
+        moved = []
+        for i in range(0, len(addresses), self.BALANCE_BATCH):
+            chunk = addresses[i:i + self.BALANCE_BATCH]
+            data = self._etherscan_get({'module': 'account', 'action': 'balancemulti',
+                                        'address': ','.join(chunk), 'tag': 'latest'})
+            if data is None:
+                moved.extend(chunk)  # unknown: list them rather than miss activity
+                continue
+            for row in data.get('result', []):
+                addr = row.get('account', '').lower()
+                balance = int(row.get('balance', 0) or 0)
+                if self._balances.get(addr) != balance:
+                    moved.append(addr)
+                self._balances[addr] = balance
+                wallet = next((w for w in self.tracked_wallets
+                               if w['address'].lower() == addr), None)
+                if wallet is not None:
+                    wallet['balance_eth'] = round(balance / 1e18, 6)
+        self.stats['wallets_skipped'] += len(addresses) - len(moved)
+        return moved
 
     def _fetch_etherscan_whales(self, limit: int) -> List[Dict]:
-        """Fetch large ETH transactions from Etherscan API v2."""
+        """Fetch new large ETH transactions of exchange and tracked wallets.
+
+        One batched balance call per ``BALANCE_BATCH`` wallets, then one
+        ``txlist`` call per wallet whose balance changed, starting at that
+        wallet's block cursor.
+        """
         if not self._session or not self._etherscan_key:
             return []
         try:
-            # Get recent blocks and find large ETH transfers
-            # Use a known whale address (Binance hot wallet)
-            whale_addresses = [
-                '0x28C6c06298d514Db089934071355E5743bf21d60',  # Binance 14
-                '0x21a31Ee1afC51d94C2eFcCAa2092aD1028285549',  # Binance 15
-            ]
+            addresses = list(EXCHANGE_WALLETS)
+            addresses += [w['address'].lower() for w in self.tracked_wallets
+                          if w['address'].lower() not in EXCHANGE_WALLETS]
             txs = []
-            for addr in whale_addresses[:1]:  # Limit API calls
-                resp = self._session.get(
-                    'https://api.etherscan.io/v2/api',
-                    params={
-                        'chainid': 1,
-                        'module': 'account',
-                        'action': 'txlist',
-                        'address': addr,
-                        'startblock': 0,
-                        'endblock': 99999999,
-                        'page': 1,
-                        'offset': min(limit, 20),
-                        'sort': 'desc',
-                        'apikey': self._etherscan_key,
-                    },
-                    timeout=10,
-                )
-                if resp.status_code != 200:
-                    continue
-                data = resp.json()
-                if data.get('status') != '1':
+            for addr in self._refresh_balances(addresses):
+                cursor = self._cursors.get(f'etherscan:{addr}')
+                if cursor is None:
+                    # Bootstrap: the latest page only
+                    params = {'startblock': 0, 'sort': 'desc', 'offset': min(limit, 20)}
+                else:
+                    # Inclusive start: a block cut by the page limit is re-read, the filter dedupes
+                    params = {'startblock': cursor, 'sort': 'asc', 'offset': limit}
+                data = self._etherscan_get({'module': 'account', 'action': 'txlist',
+                                            'address': addr, 'endblock': 99999999,
+                                            'page': 1, **params})
+                if data is None:
                     continue
-                for tx in data.get('result', []):
+                rows = data.get('result', [])
+                if rows:
+                    last = max(int(tx.get('blockNumber', 0) or 0) for tx in rows)
+                    self._cursors[f'etherscan:{addr}'] = max(last, cursor or 0)
+                for tx in rows:
                     value_eth = int(tx.get('value', '0')) / 1e18
                     if value_eth < 1:
                         continue
                     # Estimate USD (rough)
                     value_usd = value_eth * 3500  # Approximate ETH price
+                    if addr in EXCHANGE_WALLETS:
+                        flow = 'exchange_inflow' if tx.get('to', '').lower() == addr else 'exchange_outflow'
+                    else:
+                        flow = 'transfer'
                     txs.append({
                         'id': tx.get('hash', '')[:16],
                         'token': 'ETH',
@@ -273,6 +533,8 @@ class WhaleWatcher:
                         'to_address': tx.get('to', ''),
                         'chain': 'Ethereum',
                         'type': 'transfer',
+                        'flow': flow,
+                        'block': int(tx.get('blockNumber', 0) or 0),
                         'timestamp': datetime.fromtimestamp(
                             int(tx.get('timeStamp', 0)), tz=timezone.utc
                         ).isoformat(),
@@ -285,41 +547,61 @@ class WhaleWatcher:
             return []
 
     def _fetch_whale_alert(self, limit: int) -> List[Dict]:
-        """Fetch from Whale Alert API (requires free API key)."""
+        """Fetch new transactions from Whale Alert since the stored cursor."""
         if not self._session or not self._whale_alert_key:
             return []
         try:
-            start = int((datetime.now(timezone.utc) - timedelta(hours=24)).timestamp())
+            start = self._cursors.get('whale_alert:start')
+            if start is None:
+                start = int((datetime.now(timezone.utc) - timedelta(hours=24)).timestamp())
+            params = {
+                'api_key': self._whale_alert_key,
+                'min_value': 500000,
+                'start': start,
+                'limit': min(limit, 100),
+            }
+            if self._cursors.get('whale_alert:cursor'):
+                params['cursor'] = self._cursors['whale_alert:cursor']
+            self.stats['api_calls'] += 1
             resp = self._session.get(
                 'https://api.whale-alert.io/v1/transactions',
-                params={
-                    'api_key': self._whale_alert_key,
-                    'min_value': 500000,
-                    'start': start,
-                    'limit': min(limit, 100),
-                },
+                params=params,
                 timeout=10,
             )
             if resp.status_code != 200:
                 return []
             data = resp.json()
             txs = []
+            newest = start
             for tx in data.get('transactions', []):
+                sender, receiver = tx.get('from', {}), tx.get('to', {})
+                to_exchange = receiver.get('owner_type') == 'exchange'
+                from_exchange = sender.get('owner_type') == 'exchange'
+                if to_exchange and not from_exchange:
+                    flow = 'exchange_inflow'
+                elif from_exchange and not to_exchange:
+                    flow = 'exchange_outflow'
+                else:
+                    flow = 'transfer'
+                newest = max(newest, int(tx.get('timestamp', 0) or 0))
                 txs.append({
                     'id': tx.get('hash', '')[:16],
                     'token': tx.get('symbol', 'Unknown').upper(),
                     'amount': tx.get('amount', 0),
                     'value_usd': tx.get('amount_usd', 0),
-                    'from_address': tx.get('from', {}).get('address', 'Unknown'),
-                    'to_address': tx.get('to', {}).get('address', 'Unknown'),
+                    'from_address': sender.get('address', 'Unknown'),
+                    'to_address': receiver.get('address', 'Unknown'),
                     'chain': tx.get('blockchain', 'Unknown'),
                     'type': tx.get('transaction_type', 'transfer'),
+                    'flow': flow,
                     'timestamp': datetime.fromtimestamp(
                         tx.get('timestamp', 0), tz=timezone.utc
                     ).isoformat(),
                     'tx_hash': tx.get('hash', ''),
                     'data_source': 'whale_alert',
                 })
+            self._cursors['whale_alert:start'] = newest
+            self._cursors['whale_alert:cursor'] = data.get('cursor')
             return txs
         except Exception as e:
             logger.debug(f"Whale Alert API failed: {e}")